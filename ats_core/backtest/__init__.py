@@ -14,6 +14,12 @@ Public API:
 - StepMetrics: 步骤级指标数据类
 - PortfolioMetrics: 组合级指标数据类
 - DistributionMetrics: 分布分析指标数据类
+- FactorCache: 因子快照缓存（参数扫描复用）[v1.7新增]
+- ParameterSweep: 四步系统参数扫描器 [v1.7新增]
+- WalkForwardRunner: 滚动前推优化与样本外评估 [v1.8新增]
+- MetricsAccumulator: 流式/批量增量指标累加器 [v2.1新增]
+- MonteCarloAnalyzer: 交易序列蒙特卡洛稳健性分析 [v2.2新增]
+- EngineCheckpoint: 回测引擎检查点（断点续跑/分叉）[v2.3新增]
 
 Usage:
     from ats_core.backtest import (
@@ -41,6 +47,10 @@ Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
 """
 
 from ats_core.backtest.data_loader import HistoricalDataLoader
+from ats_core.backtest.checkpoint import (
+    EngineCheckpoint,
+    SymbolProgress
+)
 from ats_core.backtest.engine import (
     BacktestEngine,
     BacktestResult,
@@ -54,18 +64,47 @@ from ats_core.backtest.metrics import (
     PortfolioMetrics,
     DistributionMetrics
 )
+from ats_core.backtest.metrics_accumulator import MetricsAccumulator
+from ats_core.backtest.monte_carlo import (
+    MonteCarloAnalyzer,
+    MonteCarloReport,
+    ConfidenceInterval
+)
+from ats_core.backtest.factor_cache import (
+    FactorCache,
+    DecisionSnapshot
+)
+from ats_core.backtest.sweep import (
+    ParameterSweep,
+    SweepResult,
+    SweepCandidateResult
+)
+from ats_core.backtest.walk_forward import (
+    WalkForwardRunner,
+    WalkForwardFold,
+    WalkForwardResult,
+    FoldResult
+)
 from ats_core.backtest.v8_data_loader import (
     V8BacktestDataLoader,
     create_v8_data_loader
 )
 
-__version__ = "1.1.0"
+__version__ = "1.6.0"
 
 __all__ = [
     # Core Classes
     "HistoricalDataLoader",
     "BacktestEngine",
     "BacktestMetrics",
+    "MetricsAccumulator",
+    "MonteCarloAnalyzer",
+
+    # Sweep Classes (v1.7)
+    "FactorCache",
+    "ParameterSweep",
+    "WalkForwardRunner",
+    "EngineCheckpoint",
 
     # V8 Classes
     "V8BacktestDataLoader",
@@ -79,4 +118,13 @@ __all__ = [
     "StepMetrics",
     "PortfolioMetrics",
     "DistributionMetrics",
+    "DecisionSnapshot",
+    "SweepResult",
+    "SweepCandidateResult",
+    "WalkForwardFold",
+    "WalkForwardResult",
+    "FoldResult",
+    "MonteCarloReport",
+    "ConfidenceInterval",
+    "SymbolProgress",
 ]
@@ -0,0 +1,308 @@
+# coding: utf-8
+"""
+Backtest Framework v2.3 - Engine Checkpoint / Resume
+回测框架 - 引擎检查点与断点续跑
+
+功能：
+1. 信号生成阶段按主周期bar边界周期性保存引擎完整状态（gzip + pickle，原子写入）
+2. 断点续跑（resume）：从检查点恢复，结果与不中断运行逐位一致
+3. 分叉（fork）：多个参数变体共享同一段预热前缀，从检查点继续而不重复计算
+
+检查点内容:
+- 各symbol进度（SymbolProgress）：已生成信号/REJECT、冷却期时间戳、下一个待分析时刻
+- StandardizationChain状态（因子标准化链的EW中位数/MAD等，跨调用累积）：
+  chain_mode=shared时为所有symbol共享的一份（EngineCheckpoint.chain_states），
+  per_symbol时由各symbol进度携带（SymbolProgress.chain_states）
+- random模块状态（撮合阶段滑点随机数）
+
+说明:
+- 撮合阶段（simulate_execution）只回放已生成信号，耗时远小于信号生成，
+  因此在信号生成全部完成时保存最终检查点，撮合阶段从该检查点整体重放
+- symbol_workers > 1（仅per_symbol）时按symbol完成粒度保存
+- 回测的标准化链在独立状态下运行（isolated_chain_states），从空链开始，
+  不影响也不依赖调用方进程中的模块级链
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+from __future__ import annotations
+
+import gzip
+import contextlib
+import hashlib
+import importlib
+import json
+import logging
+import os
+import pickle
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from ats_core.backtest.engine import RejectedAnalysis, SimulatedSignal
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 3  # v3: 新增chain_mode（shared=共享链状态，per_symbol=按symbol保存）
+
+# 模块级StandardizationChain实例（四步系统因子计算时累积状态）
+STANDARDIZATION_CHAINS = (
+    ("ats_core.features.trend", "_trend_chain"),
+    ("ats_core.features.momentum", "_momentum_chain"),
+    ("ats_core.features.accel", "_accel_chain"),
+    ("ats_core.features.volume", "_volume_chain"),
+    ("ats_core.features.cvd_flow", "_cvd_chain"),
+    ("ats_core.features.open_interest", "_oi_chain"),
+    ("ats_core.features.structure_sq", "_structure_chain"),
+    ("ats_core.factors_v2.basis_funding", "_basis_chain"),
+)
+
+# 不影响回测结果的引擎配置（不参与配置指纹）
+_NON_RESULT_KEYS = ("checkpoint", "symbol_workers", "progress_log_interval", "batch_size")
+
+
+@dataclass
+class SymbolProgress:
+    """
+    单个symbol的信号生成进度（bar边界状态）
+
+    Attributes:
+        symbol: 交易对
+        next_time: 下一个待分析时刻（早于该时刻的主周期收盘均已处理）
+        last_signal_time: 最近一次信号时间（Anti-Jitter冷却期）
+        signals: 已生成的候选信号
+        rejected: 已记录的REJECT分析
+        chain_states: 本symbol的标准化链状态（chain_mode=per_symbol，空=从空链开始）
+    """
+    symbol: str
+    next_time: int
+    last_signal_time: int = 0
+    signals: List["SimulatedSignal"] = field(default_factory=list)
+    rejected: List["RejectedAnalysis"] = field(default_factory=list)
+    chain_states: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class EngineCheckpoint:
+    """
+    引擎检查点
+
+    Attributes:
+        symbols: 交易对列表
+        start_time: 回测开始时间（毫秒）
+        end_time: 保存时的回测结束时间（毫秒）
+        interval: 主周期
+        config_fingerprint: 引擎配置 + 全局参数的指纹（resume要求一致）
+        progress: {symbol: SymbolProgress}
+        chain_mode: 标准化链模式（shared/per_symbol，续跑/分叉要求一致）
+        chain_states: 共享的标准化链状态（chain_mode=shared，空=从空链开始）
+        random_state: random.getstate()
+        saved_at: 保存时间（毫秒）
+    """
+    symbols: List[str]
+    start_time: int
+    end_time: int
+    interval: str
+    config_fingerprint: str
+    progress: Dict[str, SymbolProgress] = field(default_factory=dict)
+    chain_mode: str = "shared"
+    chain_states: Dict[str, Any] = field(default_factory=dict)
+    random_state: Any = None
+    saved_at: int = 0
+    version: int = CHECKPOINT_VERSION
+
+    @property
+    def generation_complete(self) -> bool:
+        """信号生成阶段是否已全部完成（截至end_time）"""
+        return all(
+            symbol in self.progress and self.progress[symbol].next_time > self.end_time
+            for symbol in self.symbols
+        )
+
+    def save(self, path: str) -> None:
+        """
+        原子写入（临时文件 + fsync + os.replace，中断时旧检查点保持完整）
+
+        Args:
+            path: 检查点文件路径（如 data/backtest_cache/checkpoints/eth.ckpt.gz）
+        """
+        checkpoint_file = Path(path)
+        checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = checkpoint_file.with_name(checkpoint_file.name + ".tmp")
+
+        self.saved_at = int(time.time() * 1000)
+        with open(temp_file, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=3) as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temp_file, checkpoint_file)
+
+    @classmethod
+    def load(cls, path: str) -> "EngineCheckpoint":
+        """
+        加载检查点
+
+        Args:
+            path: save()写出的文件路径
+
+        Returns:
+            EngineCheckpoint
+        """
+        with gzip.open(path, "rb") as f:
+            checkpoint = pickle.load(f)
+        if not isinstance(checkpoint, cls) or checkpoint.version != CHECKPOINT_VERSION:
+            raise ValueError(f"检查点格式不兼容: {path}")
+        return checkpoint
+
+    def validate(
+        self,
+        symbols: List[str],
+        start_time: int,
+        end_time: int,
+        interval: str,
+        config_fingerprint: Optional[str] = None
+    ) -> None:
+        """
+        校验检查点能否用于当前回测（config_fingerprint=None时跳过配置校验，用于fork）
+
+        Raises:
+            ValueError: 时间范围/symbol/周期/配置不一致
+        """
+        if list(symbols) != list(self.symbols) or start_time != self.start_time or interval != self.interval:
+            raise ValueError(
+                f"检查点与当前回测不一致: symbols={self.symbols}, "
+                f"start_time={self.start_time}, interval={self.interval}"
+            )
+        if config_fingerprint is not None and config_fingerprint != self.config_fingerprint:
+            raise ValueError("检查点配置指纹不一致（参数已修改，请使用fork_from）")
+        beyond = [s for s, p in self.progress.items() if p.next_time - 1 > end_time]
+        if beyond:
+            raise ValueError(f"检查点进度超出end_time: {beyond}")
+
+
+class CheckpointWriter:
+    """
+    周期性检查点写入器（按bar数或时间间隔触发）
+
+    配置驱动（config/params.json -> backtest.engine.checkpoint）:
+    - path: 检查点文件路径（null=关闭）
+    - interval_bars: 每N个已处理主周期bar（所有symbol合计）保存一次（0=不按bar数）
+    - interval_seconds: 距上次保存超过N秒时保存（0=不按时间）
+    """
+
+    def __init__(self, config: Dict, path: Optional[str] = None):
+        """
+        Args:
+            config: 检查点配置
+            path: 覆盖配置中的检查点路径
+        """
+        self.path = path or config.get("path")
+        self.interval_bars = config.get("interval_bars", 0)
+        self.interval_seconds = config.get("interval_seconds", 300)
+        self._bars_since_save = 0
+        self._last_save_time = time.time()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def on_bar(self, checkpoint: EngineCheckpoint) -> bool:
+        """
+        bar边界回调：达到间隔时保存
+
+        Returns:
+            是否保存
+        """
+        if not self.path:
+            return False
+        self._bars_since_save += 1
+        due_by_bars = self.interval_bars > 0 and self._bars_since_save >= self.interval_bars
+        due_by_time = (
+            self.interval_seconds > 0
+            and time.time() - self._last_save_time >= self.interval_seconds
+        )
+        if not (due_by_bars or due_by_time):
+            return False
+        self.save(checkpoint)
+        return True
+
+    def save(self, checkpoint: EngineCheckpoint) -> None:
+        """立即保存（同时采集随机数状态；标准化链状态由引擎在bar边界写入）"""
+        if not self.path:
+            return
+        checkpoint.random_state = random.getstate()
+        checkpoint.save(self.path)
+        self._bars_since_save = 0
+        self._last_save_time = time.time()
+        logger.info(
+            f"💾 检查点已保存: {self.path} "
+            f"({sum(len(p.signals) for p in checkpoint.progress.values())} signals)"
+        )
+
+
+def config_fingerprint(engine_config: Dict, params: Dict) -> str:
+    """
+    计算配置指纹（引擎配置中与结果无关的键除外）
+
+    Args:
+        engine_config: backtest.engine配置
+        params: 全局参数（CFG.params，含四步系统配置）
+
+    Returns:
+        sha256十六进制摘要
+    """
+    payload = {
+        "engine": {k: v for k, v in engine_config.items() if k not in _NON_RESULT_KEYS},
+        "params": params,
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def capture_chain_states() -> Dict[str, Any]:
+    """采集已导入模块中的StandardizationChain实例（未导入的模块跳过）"""
+    states: Dict[str, Any] = {}
+    for module_name, attr in STANDARDIZATION_CHAINS:
+        module = sys.modules.get(module_name)
+        if module is not None and hasattr(module, attr):
+            states[f"{module_name}.{attr}"] = getattr(module, attr)
+    return states
+
+
+def fresh_chain_states() -> Dict[str, Any]:
+    """全部标准化链置为未初始化（None：首次调用时按配置新建）"""
+    return {f"{module_name}.{attr}": None for module_name, attr in STANDARDIZATION_CHAINS}
+
+
+@contextlib.contextmanager
+def isolated_chain_states(states: Optional[Dict[str, Any]] = None):
+    """
+    在独立的标准化链状态下执行，退出时恢复调用方的状态
+
+    Args:
+        states: 进入时使用的状态（None/空=从空链开始）
+    """
+    saved = {**fresh_chain_states(), **capture_chain_states()}
+    restore_chain_states({**fresh_chain_states(), **(states or {})})
+    try:
+        yield
+    finally:
+        restore_chain_states(saved)
+
+
+def restore_chain_states(states: Dict[str, Any]) -> None:
+    """恢复StandardizationChain实例（写回模块属性，含未初始化的None）"""
+    for key, chain in states.items():
+        module_name, attr = key.rsplit(".", 1)
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            logger.warning(f"标准化链模块导入失败，跳过恢复: {module_name} - {e}")
+            continue
+        setattr(module, attr, chain)
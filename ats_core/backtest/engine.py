@@ -15,19 +15,51 @@ v1.5 P0修复（专家方案）:
 - 手续费建模：双边Taker手续费（0.05%），从PnL扣除
 - 悲观SL/TP假设：同bar触发时优先止损
 
+v1.7 两阶段执行:
+- 阶段1：生成候选信号（chain_mode=per_symbol时各symbol独立，可多进程并行，symbol_workers）
+- 阶段2：单线程按时间顺序撮合（simulate_execution）
+- chain_mode（标准化链模式，v2.4）：
+  - shared（默认）：按时间交错各symbol、共享模块级标准化链，与实盘扫描器一致（单进程）
+  - per_symbol：标准化链按symbol隔离，结果与symbol_workers无关（逐位一致），
+    多symbol回测的因子值与实盘（共享链）会有差异（见run()说明）
+
+v1.9 低周期路径解析（可选，intrabar_interval）:
+- 用1m/5m K线向量化定位入场/SL/TP/超时的首次触达，信号从入场直接跳到离场事件
+
+v2.0 事件驱动多周期内核:
+- 信号生成由事件堆驱动（K线收盘/资金费率/OI），主周期收盘才分析，空闲时刻零开销
+- 可选附加周期（15m/4h/1d）以已收盘对齐视图传入四步系统（与实盘扫描器输入一致）
+
+v2.3 检查点与断点续跑（可选，checkpoint）:
+- 信号生成阶段按bar边界原子保存引擎状态，resume_from续跑结果逐位一致
+- fork_from：参数变体共享预热前缀，从检查点继续生成
+
 Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
 Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
 """
 
 from __future__ import annotations
 
+import bisect
 import logging
+import os
 import random
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass, field, asdict
-from typing import Dict, List, Optional, Any
-
+from typing import Callable, Dict, Iterator, List, Optional, Any
+
+from ats_core.backtest.checkpoint import (
+    CheckpointWriter,
+    EngineCheckpoint,
+    SymbolProgress,
+    config_fingerprint,
+    capture_chain_states,
+    isolated_chain_states
+)
 from ats_core.backtest.data_loader import HistoricalDataLoader
+from ats_core.backtest.event_core import SymbolEventFeed, interleave_steps, load_mtf_klines
+from ats_core.backtest.intrabar import IntrabarSeries, earliest
 from ats_core.pipeline.analyze_symbol import analyze_symbol_with_preloaded_klines
 from ats_core.cfg import CFG
 
@@ -178,6 +210,8 @@ class BacktestEngine:
 
     配置驱动（config/params.json -> backtest.engine）:
     - batch_size: 批次大小（暂时不用，v1.0单线程）
+    - symbol_workers: 信号生成阶段的进程数（1=单进程，0=CPU核数；仅chain_mode=per_symbol）[v1.7新增]
+    - chain_mode: 标准化链模式（shared=共享链，与实盘一致；per_symbol=按symbol隔离）[v2.4新增]
     - progress_log_interval: 进度日志间隔（每N次迭代）
     - signal_cooldown_hours: 信号冷却期（小时）
     - max_entry_bars: 限价单有效期（1h bar数）[v1.5新增]
@@ -188,6 +222,10 @@ class BacktestEngine:
     - max_holding_hours: 最大持仓时长（小时）
     - enable_anti_jitter: 是否启用Anti-Jitter（2小时冷却）
     - exit_classification: 退出原因分类配置
+    - intrabar_interval: 低周期路径解析K线周期（如 "5m"，null=按主周期bar解析）[v1.9新增]
+    - mtf_intervals: 附加分析周期（如 ["4h", "15m", "1d"]）[v2.0新增]
+    - mtf_lookback_bars: 各周期回看长度（默认15m/4h=200, 1h=300, 1d=100）[v2.0新增]
+    - checkpoint: 检查点配置（path/interval_bars/interval_seconds）[v2.3新增]
     """
 
     def __init__(self, config: Dict, data_loader: HistoricalDataLoader):
@@ -203,6 +241,12 @@ class BacktestEngine:
 
         # §6.2 函数签名演进：所有参数都有默认值（向后兼容）
         self.batch_size = config.get("batch_size", 1)
+        self.symbol_workers = config.get("symbol_workers", 1)  # v1.7新增：symbol并行
+        self.chain_mode = config.get("chain_mode", "shared")  # v2.4新增：标准化链模式
+        if self.chain_mode not in ("shared", "per_symbol"):
+            raise ValueError(f"chain_mode必须为shared或per_symbol: {self.chain_mode}")
+        if self.chain_mode == "shared" and self.symbol_workers != 1:
+            logger.warning(f"chain_mode=shared时信号生成为单进程，忽略symbol_workers={self.symbol_workers}")
         self.progress_log_interval = config.get("progress_log_interval", 100)
         self.signal_cooldown_hours = config.get("signal_cooldown_hours", 2)
 
@@ -216,6 +260,16 @@ class BacktestEngine:
         self.max_holding_hours = config.get("max_holding_hours", 168)  # 7天
         self.enable_anti_jitter = config.get("enable_anti_jitter", True)
 
+        # v2.0新增：多周期输入（附加周期K线收盘事件进入事件堆，分析时提供已收盘对齐视图）
+        self.mtf_intervals = config.get("mtf_intervals", [])
+        self.mtf_lookback_bars = config.get("mtf_lookback_bars", {})
+
+        # v1.9新增：低周期路径解析（null=关闭，使用主周期bar的high/low）
+        self.intrabar_interval = config.get("intrabar_interval", None)
+
+        # v2.3新增：检查点（path=null时关闭，run()参数可覆盖）
+        self.checkpoint_config = config.get("checkpoint", {})
+
         # §6.4 分段逻辑配置：退出原因分类
         self.exit_classification = config.get("exit_classification", {
             "sl_hit": {"priority": 1, "label": "SL_HIT"},
@@ -250,7 +304,10 @@ class BacktestEngine:
         symbols: List[str],
         start_time: int,
         end_time: int,
-        interval: Optional[str] = None
+        interval: Optional[str] = None,
+        checkpoint_path: Optional[str] = None,
+        resume_from: Optional[str] = None,
+        fork_from: Optional[str] = None
     ) -> BacktestResult:
         """
         执行回测
@@ -260,29 +317,87 @@ class BacktestEngine:
             start_time: 开始时间（Unix时间戳，毫秒）
             end_time: 结束时间（Unix时间戳，毫秒）
             interval: K线周期（默认使用data_loader配置）
+            checkpoint_path: 检查点写入路径（默认checkpoint.path，null=不保存）[v2.3新增]
+            resume_from: 从检查点续跑（要求symbols/时间/周期/配置指纹一致）[v2.3新增]
+            fork_from: 从检查点分叉（允许参数不同，共享预热前缀；end_time可延长）[v2.3新增]
 
         Returns:
             BacktestResult: 回测结果（包含所有信号和元数据）
 
-        算法流程 (v1.5 限价单模型):
-        1. For each timestamp in [start_time, end_time] (hourly step):
-            2. Try to fill pending entry orders (limit order model)
-            3. For each symbol:
-                4. Fetch historical klines up to current timestamp
+        算法流程 (v1.5 限价单模型 / v1.7 两阶段):
+        Phase 1 - 信号生成（chain_mode=per_symbol且symbol_workers>1时进程并行）:
+        1. For each symbol:
+            2. For each primary bar close in [start_time, end_time] (v2.0 event heap):
+                3. Check cooldown (Anti-Jitter, per symbol)
+                4. Read closed klines of every interval (aligned views)
                 5. Calculate factor scores via analyze_symbol_with_preloaded_klines()
-                6. Check if signal generated (four_step_system.decision == ACCEPT)
-                7. If signal:
-                    8. Check cooldown (Anti-Jitter)
-                    9. Add to pending_entries queue (entry attempt starts at t+1)
-            10. For each active position:
-                11. Monitor current candle for SL/TP hit (pessimistic assumption)
-                12. If hit: close position, record signal
-            13. Expire pending entries that exceed max_entry_bars
-        14. Return BacktestResult with all signals and metadata
+                6. If signal (four_step_system.decision == ACCEPT):
+                    entry attempt starts at t+1
+        7. Merge: stable sort by timestamp (same-timestamp signals keep symbol order)
+        Phase 2 - 撮合（单线程，simulate_execution）:
+        8. For each timestamp in [start_time, end_time]:
+            9. Try to fill pending entry orders (limit order model)
+            10. Queue signals generated at this timestamp
+            11. Monitor active positions for SL/TP hit (pessimistic assumption)
+            12. Expire pending entries that exceed max_entry_bars
+        13. Return BacktestResult with all signals and metadata
+
+        标准化链模式（chain_mode，结果元数据中记录）:
+        - shared（默认）：与v1.6循环和实盘扫描器相同，按时间交错各symbol（同一时刻按
+          symbols顺序），模块级标准化链（EW中位数/MAD）混合累积所有symbol的原始值；
+          每次回测从空链开始，信号生成单进程（symbol_workers被忽略）
+        - per_symbol：每个symbol从空链开始、只累积本symbol的历史（isolated_chain_states），
+          结果与symbol_workers无关（逐位一致）；单symbol回测与shared相同，
+          多symbol回测的因子值（进而信号）与实盘可能不同
+        撮合阶段的处理顺序（含滑点随机数的消耗顺序）固定。
+
+        v2.3检查点：阶段1在bar边界周期性保存，阶段1完成时保存最终检查点，
+        续跑时恢复各symbol进度、标准化链（shared=共享链，per_symbol=各symbol的链）
+        与random状态，已完成部分不再重算。
         """
         interval = interval or self.data_loader.default_interval
         interval_ms = self._interval_to_ms(interval)
 
+        # v2.3新增：检查点恢复（resume=同配置续跑，fork=新配置共享前缀）
+        if resume_from and fork_from:
+            raise ValueError("resume_from与fork_from不能同时指定")
+        fingerprint = config_fingerprint(self.config, CFG.params)
+        checkpoint = EngineCheckpoint(
+            symbols=list(symbols),
+            start_time=start_time,
+            end_time=end_time,
+            interval=interval,
+            config_fingerprint=fingerprint,
+            chain_mode=self.chain_mode
+        )
+        source_path = resume_from or fork_from
+        if source_path:
+            loaded = EngineCheckpoint.load(source_path)
+            loaded.validate(
+                symbols, start_time, end_time, interval,
+                config_fingerprint=fingerprint if resume_from else None
+            )
+            if loaded.chain_mode != self.chain_mode:
+                raise ValueError(
+                    f"检查点标准化链模式不一致: {loaded.chain_mode} != {self.chain_mode}"
+                )
+            checkpoint.progress = loaded.progress
+            checkpoint.chain_states = loaded.chain_states
+            if loaded.random_state is not None:
+                random.setstate(loaded.random_state)
+            logger.info(
+                f"{'续跑' if resume_from else '分叉'}自检查点: {source_path} "
+                f"({sum(len(p.signals) for p in loaded.progress.values())} signals, "
+                f"saved_at={self._format_timestamp(loaded.saved_at)})"
+            )
+
+        writer = CheckpointWriter(
+            self.checkpoint_config,
+            path=checkpoint_path or (resume_from if resume_from else None)
+        )
+        if fork_from and writer.path and os.path.abspath(writer.path) == os.path.abspath(fork_from):
+            raise ValueError("fork时检查点写入路径不能与fork_from相同（会覆盖共享前缀）")
+
         logger.info(
             f"开始回测 (v1.6一次性预加载): symbols={symbols}, "
             f"time_range={self._format_timestamp(start_time)}-{self._format_timestamp(end_time)}, "
@@ -300,406 +415,880 @@ class BacktestEngine:
         )
         # ====================================================================
 
+        # v2.0新增：预加载附加周期K线（MTF，与OptimizedBatchScanner相同的周期组合）
+        if self.mtf_intervals:
+            preloaded_data["_mtf_klines"] = load_mtf_klines(
+                self.data_loader, symbols, start_time, end_time,
+                self.mtf_intervals, self.mtf_lookback_bars
+            )
+
+        # v1.9新增：预加载低周期K线（路径解析用）
+        if self.intrabar_interval:
+            if self._interval_to_ms(self.intrabar_interval) > interval_ms:
+                raise ValueError(
+                    f"intrabar_interval必须不大于主周期: {self.intrabar_interval} > {interval}"
+                )
+            preloaded_data["_intrabar_klines"] = {
+                symbol: self.data_loader.load_klines(symbol, start_time, end_time, self.intrabar_interval)
+                for symbol in symbols
+            }
+
         # v7.4.4 调试：确认REJECT记录配置
         logger.info(f"REJECT记录配置: record_reject_analyses={self.record_reject_analyses}")
 
-        # 统计信息
-        total_iterations = 0
-        all_signals: List[SimulatedSignal] = []
-        rejected_analyses: List[RejectedAnalysis] = []  # v1.1新增：被拒绝的分析记录
-        active_positions: List[SimulatedSignal] = []
-        pending_entries: List[SimulatedSignal] = []  # v1.5新增：待入场队列
-        last_signal_time_by_symbol: Dict[str, int] = {}
-
         # 开始计时
         backtest_start_time = time.time()
+        total_iterations = (end_time - start_time) // interval_ms + 1 if end_time >= start_time else 0
+
+        # ==================== v1.7: 两阶段执行 ====================
+        # 阶段1：生成候选信号（shared=按时间交错、共享标准化链；per_symbol=各symbol独立）
+        # 阶段2：按时间顺序统一撮合（限价单成交 → SL/TP/超时监控）
+        all_signals, rejected_analyses = self._generate_signals(
+            symbols, preloaded_data, start_time, end_time, interval,
+            checkpoint=checkpoint, writer=writer
+        )
+        writer.save(checkpoint)  # 阶段1完成：最终检查点（撮合阶段整体重放）
+        self.simulate_execution(all_signals, preloaded_data, start_time, end_time, interval)
+        # ========================================================
 
-        # 时间循环（按小时步进）
-        current_timestamp = start_time
+        # 计算执行时长
+        backtest_duration = time.time() - backtest_start_time
 
-        while current_timestamp <= end_time:
-            total_iterations += 1
+        # 构建元数据
+        metadata = {
+            "start_time": start_time,
+            "end_time": end_time,
+            "symbols": symbols,
+            "interval": interval,
+            "total_iterations": total_iterations,
+            "symbol_workers": self._resolve_symbol_workers(len(symbols)),  # v1.7新增
+            "chain_mode": self.chain_mode,  # v2.4新增：标准化链模式
+            "checkpoint": {  # v2.3新增
+                "path": writer.path,
+                "resumed_from": resume_from,
+                "forked_from": fork_from
+            },
+            "execution_time_seconds": round(backtest_duration, 2),
+            "config_snapshot": self.config,
+            "total_signals": len(all_signals),
+            "total_rejected_analyses": len(rejected_analyses),  # v1.1新增
+            "signals_by_symbol": {
+                symbol: sum(1 for s in all_signals if s.symbol == symbol)
+                for symbol in symbols
+            },
+            "rejected_by_symbol": {  # v1.1新增
+                symbol: sum(1 for r in rejected_analyses if r.symbol == symbol)
+                for symbol in symbols
+            }
+        }
+
+        logger.info(
+            f"✅ 回测完成: "
+            f"{total_iterations} iterations, "
+            f"{len(all_signals)} signals, "
+            f"{len(rejected_analyses)} rejects, "
+            f"{backtest_duration:.1f}秒"
+        )
+
+        return BacktestResult(
+            signals=all_signals,
+            metadata=metadata,
+            rejected_analyses=rejected_analyses  # v1.1新增
+        )
+
+    def _resolve_symbol_workers(self, n_symbols: int) -> int:
+        """信号生成阶段实际进程数（不超过symbol数量；shared模式按时间交错，固定单进程）"""
+        if self.chain_mode == "shared":
+            return 1
+        workers = self.symbol_workers or os.cpu_count() or 1
+        return max(1, min(workers, n_symbols))
+
+    def _generate_signals(
+        self,
+        symbols: List[str],
+        preloaded_data: Dict[str, Any],
+        start_time: int,
+        end_time: int,
+        interval: str,
+        checkpoint: Optional[EngineCheckpoint] = None,
+        writer: Optional[CheckpointWriter] = None
+    ) -> tuple[List[SimulatedSignal], List[RejectedAnalysis]]:
+        """
+        阶段1：生成所有symbol的候选信号（v1.7新增）
+
+        Args:
+            symbols: 交易对列表
+            preloaded_data: 预加载数据
+            start_time: 开始时间（毫秒）
+            end_time: 结束时间（毫秒）
+            interval: 主周期（如 "1h"）
+            checkpoint: 检查点（progress中已有的symbol从next_time继续）[v2.3新增]
+            writer: 检查点写入器（串行：bar边界；并行：每个symbol完成时）[v2.3新增]
+
+        Returns:
+            (signals, rejected_analyses): 按时间排序（同一时间步内保持symbols顺序）
+        """
+        workers = self._resolve_symbol_workers(len(symbols))
+        progress = checkpoint.progress if checkpoint is not None else {}
+        for symbol in symbols:
+            if symbol not in progress:
+                progress[symbol] = SymbolProgress(symbol=symbol, next_time=start_time)
+        remaining = [symbol for symbol in symbols if progress[symbol].next_time <= end_time]
+        if len(remaining) < len(symbols):
+            logger.info(f"检查点：{len(symbols) - len(remaining)}个symbol信号生成已完成，跳过")
+
+        if self.chain_mode == "shared":
+            self._generate_interleaved(
+                remaining, preloaded_data, end_time, interval, progress, checkpoint, writer
+            )
+        elif workers <= 1:
+            on_bar = None
+            if writer is not None and writer.enabled:
+                def on_bar(_progress: SymbolProgress) -> None:
+                    writer.on_bar(checkpoint)
+            for symbol in remaining:
+                self._generate_symbol_signals(
+                    symbol, preloaded_data, start_time, end_time, interval,
+                    progress=progress[symbol], on_bar=on_bar
+                )
+        elif remaining:
+            logger.info(f"信号生成并行: {len(remaining)}个symbol, {workers}个进程")
+            tasks = [
+                (symbol, self._symbol_data(symbol, preloaded_data), start_time, end_time, interval,
+                 progress[symbol])
+                for symbol in remaining
+            ]
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_symbol_worker,
+                initargs=(self.config, self.data_loader)
+            ) as pool:
+                futures = {
+                    pool.submit(_generate_symbol_signals_worker, task): task[0]
+                    for task in tasks
+                }
+                # 按完成顺序写回进度；合并时按symbols顺序，结果与调度顺序无关
+                for future in as_completed(futures):
+                    progress[futures[future]] = future.result()
+                    if writer is not None:
+                        writer.save(checkpoint)
+
+        per_symbol = [(progress[symbol].signals, progress[symbol].rejected) for symbol in symbols]
+
+        # 稳定排序：同一时间步内保持symbols顺序（与进程数、完成顺序无关）
+        signals = sorted(
+            (s for symbol_signals, _ in per_symbol for s in symbol_signals),
+            key=lambda s: s.timestamp
+        )
+        rejected = sorted(
+            (r for _, symbol_rejected in per_symbol for r in symbol_rejected),
+            key=lambda r: r.timestamp
+        )
+        return signals, rejected
+
+    def _symbol_data(self, symbol: str, preloaded_data: Dict[str, Any]) -> Dict[str, Any]:
+        """提取单个symbol信号生成所需的预加载数据子集（减少进程间传输）"""
+        return {
+            symbol: preloaded_data.get(symbol, []),
+            "BTCUSDT": preloaded_data.get("BTCUSDT", []),
+            "_oi_data": {symbol: preloaded_data.get("_oi_data", {}).get(symbol, [])},
+            "_funding_data": {symbol: preloaded_data.get("_funding_data", {}).get(symbol, [])},
+            "_mtf_klines": {
+                mtf_interval: {symbol: klines_by_symbol.get(symbol, [])}
+                for mtf_interval, klines_by_symbol in preloaded_data.get("_mtf_klines", {}).items()
+            }
+        }
+
+    def _generate_symbol_signals(
+        self,
+        symbol: str,
+        preloaded_data: Dict[str, Any],
+        start_time: int,
+        end_time: int,
+        interval: str,
+        progress: Optional[SymbolProgress] = None,
+        on_bar: Optional[Callable[[SymbolProgress], Any]] = None
+    ) -> tuple[List[SimulatedSignal], List[RejectedAnalysis]]:
+        """
+        单个symbol的事件循环：主周期收盘 → 冷却期检查 → 四步系统分析 → 候选信号
+
+        v2.0: 由SymbolEventFeed驱动（K线收盘/资金费率/OI事件堆），
+        只在主周期K线收盘时分析，附加周期（mtf_intervals）提供已收盘的对齐视图
+
+        标准化链在本symbol独立的状态下运行（progress.chain_states，空=从空链开始），
+        结束时写回progress，调用方的模块级链状态不受影响
+
+        Args:
+            symbol: 交易对
+            preloaded_data: 预加载数据（至少包含symbol、BTCUSDT、_oi_data、_funding_data，
+                            可选_mtf_klines）
+            start_time: 开始时间（毫秒）
+            end_time: 结束时间（毫秒）
+            interval: 主周期（如 "1h"）
+            progress: 生成进度（从progress.next_time继续，结果追加到其中）[v2.3新增]
+            on_bar: bar边界回调（处理每个分析时刻之前调用，用于保存检查点）[v2.3新增]
+
+        Returns:
+            (signals, rejected_analyses): 按时间顺序，entry_attempt_time已设置
+        """
+        if progress is None:
+            progress = SymbolProgress(symbol=symbol, next_time=start_time)
+        with isolated_chain_states(progress.chain_states):
+            for _ in self._symbol_steps(symbol, preloaded_data, end_time, interval, progress):
+                if on_bar is not None:
+                    progress.chain_states = capture_chain_states()
+                    on_bar(progress)
+            progress.chain_states = capture_chain_states()
+        return progress.signals, progress.rejected
+
+    def _generate_interleaved(
+        self,
+        symbols: List[str],
+        preloaded_data: Dict[str, Any],
+        end_time: int,
+        interval: str,
+        progress: Dict[str, SymbolProgress],
+        checkpoint: Optional[EngineCheckpoint] = None,
+        writer: Optional[CheckpointWriter] = None
+    ) -> None:
+        """
+        chain_mode=shared：按时间交错推进各symbol，共享模块级标准化链（与实盘扫描器一致）
+
+        同一时刻按symbols顺序分析；标准化链从checkpoint.chain_states继续（空=从空链开始），
+        结束时写回检查点，调用方的模块级链状态不受影响
+
+        Args:
+            symbols: 未完成的交易对（保持symbols顺序）
+            preloaded_data: 预加载数据
+            end_time: 结束时间（毫秒）
+            interval: 主周期
+            progress: {symbol: SymbolProgress}（结果追加到其中）
+            checkpoint: 检查点（bar边界写入共享链状态）
+            writer: 检查点写入器
+        """
+        steps = [
+            self._symbol_steps(symbol, preloaded_data, end_time, interval, progress[symbol])
+            for symbol in symbols
+        ]
+        before_step = None
+        if checkpoint is not None and writer is not None and writer.enabled:
+            def before_step(_timestamp: int, _index: int) -> None:
+                checkpoint.chain_states = capture_chain_states()
+                writer.on_bar(checkpoint)
+
+        with isolated_chain_states(checkpoint.chain_states if checkpoint is not None else None):
+            interleave_steps(steps, before_step)
+            if checkpoint is not None:
+                checkpoint.chain_states = capture_chain_states()
+
+    def _symbol_steps(
+        self,
+        symbol: str,
+        preloaded_data: Dict[str, Any],
+        end_time: int,
+        interval: str,
+        progress: SymbolProgress
+    ) -> Iterator[int]:
+        """
+        单个symbol的事件循环（步进生成器，结果追加到progress）
+
+        每个分析时刻处理之前写入progress（next_time/last_signal_time）并产出该时刻，
+        调用方在产出点保存检查点或切换到其他symbol（chain_mode=shared）
+        """
+        signals = progress.signals
+        rejected_analyses = progress.rejected
+        last_signal_time = progress.last_signal_time
+        cooldown_ms = self.signal_cooldown_hours * 3600 * 1000
+        interval_ms = self._interval_to_ms(interval)
+
+        feed = self._build_event_feed(symbol, preloaded_data, interval)
+
+        iterations = 0
+        for current_timestamp in feed.analysis_times(progress.next_time, end_time):
+            progress.next_time = current_timestamp
+            progress.last_signal_time = last_signal_time
+            yield current_timestamp
+            iterations += 1
 
             # 进度日志
-            if total_iterations % self.progress_log_interval == 0:
+            if iterations % self.progress_log_interval == 0:
                 logger.info(
-                    f"回测进度: {total_iterations} iterations, "
+                    f"信号生成进度: {symbol} {iterations} iterations, "
                     f"timestamp={self._format_timestamp(current_timestamp)}, "
-                    f"signals={len(all_signals)}, "
-                    f"active_positions={len(active_positions)}, "
-                    f"pending_entries={len(pending_entries)}"
+                    f"signals={len(signals)}"
+                )
+
+            try:
+                # 检查冷却期（Anti-Jitter）
+                if self.enable_anti_jitter and current_timestamp - last_signal_time < cooldown_ms:
+                    continue
+
+                # 主周期已收盘K线（事件游标切片，无需逐步过滤）
+                klines_1h = feed.klines(interval)
+
+                if len(klines_1h) < 100:
+                    # K线不足，跳过（避免噪声信号）
+                    continue
+
+                # 计算mark_price和spot_price（使用最新K线收盘价近似）
+                latest_kline = klines_1h[-1]
+                mark_price = float(latest_kline.get("close", 0))
+                # spot_price近似为mark_price（实际应该从现货数据获取）
+                spot_price = mark_price
+
+                # 调用四步系统分析
+                analysis_result = analyze_symbol_with_preloaded_klines(
+                    symbol=symbol,
+                    k1h=klines_1h,  # 直接传递字典格式（从缓存读取）
+                    k4h=feed.klines("4h"),  # v2.0: mtf_intervals未配置4h时为[]（与v1.0相同）
+                    oi_data=feed.oi_data(),  # v7.4.4修复：传递OI数据
+                    spot_k1h=None,
+                    k15m=feed.klines("15m") or None,  # v2.0: MTF输入（与OptimizedBatchScanner一致）
+                    k1d=feed.klines("1d") or None,
+                    orderbook=None,
+                    mark_price=mark_price,  # v7.4.4修复：传递标记价格
+                    funding_rate=feed.funding_rate(),  # v7.4.4修复：传递资金费率
+                    spot_price=spot_price,  # v7.4.4修复：传递现货价格
+                    btc_klines=feed.btc_klines(),  # P0 Bugfix: 传递BTC K线
+                    eth_klines=None
                 )
 
-            # ==================== v1.6优化：从预加载数据获取K线切片 ====================
-            # 优势：无需每次迭代调用API/缓存，直接从内存切片
-            # 用途：
-            # 1. 限价单成交检查（_try_fill_pending_entry）
-            # 2. 头寸监控（_monitor_active_positions）
-            # 3. 信号生成（analyze_symbol）
-            current_klines_cache = {}
-
-            # 获取BTC K线切片（用于Step1 BTC对齐检测）
-            btc_klines = self.data_loader.get_klines_slice(
-                preloaded_data.get("BTCUSDT", []),
-                current_timestamp,
-                lookback_bars=300
+                # v7.4.4 修复：检查分析结果是否有效（防止NoneType错误）
+                if analysis_result is None:
+                    logger.warning(f"分析返回None: {symbol} at {current_timestamp}")
+                    continue
+
+                # 检查是否生成信号
+                is_signal = analysis_result.get("is_prime", False)
+
+                if not is_signal:
+                    # v7.4.4 调试：追踪is_prime值
+                    logger.info(f"📝 分析结果: {symbol} is_prime=False, 准备记录REJECT")
+
+                    # v1.1增强：记录REJECT分析结果
+                    if self.record_reject_analyses:
+                        rejected_analyses.append(
+                            self._build_rejected_analysis(symbol, current_timestamp, analysis_result)
+                        )
+                    continue
+
+                # 提取信号信息（价格提取/校验逻辑见_build_signal）
+                signal = self._build_signal(symbol, current_timestamp, analysis_result, klines_1h)
+                if signal is None:
+                    continue
+
+                # v1.5 P0修复：不立即执行，由撮合阶段处理（限价单模型）
+                signal.entry_attempt_time = current_timestamp + interval_ms  # 下一个bar开始尝试
+                signals.append(signal)
+
+                # 更新最后信号时间（Anti-Jitter）
+                last_signal_time = current_timestamp
+
+                logger.info(
+                    f"📊 信号生成: {symbol} {signal.side.upper()} @ {signal.entry_price_recommended:.4f} "
+                    f"(SL={signal.stop_loss_recommended:.4f}, TP1={signal.take_profit_1_recommended:.4f}) "
+                    f"[pending entry attempt at {self._format_timestamp(signal.entry_attempt_time)}]"
+                )
+
+            except Exception as e:
+                logger.error(f"分析失败: {symbol} at {current_timestamp} - {e}")
+
+        progress.next_time = end_time + 1
+        progress.last_signal_time = last_signal_time
+
+    def _build_event_feed(
+        self,
+        symbol: str,
+        preloaded_data: Dict[str, Any],
+        interval: str
+    ) -> SymbolEventFeed:
+        """
+        构建单个symbol的事件源（主周期 + mtf_intervals + BTC + OI + 资金费率）
+
+        Args:
+            symbol: 交易对
+            preloaded_data: 预加载数据
+            interval: 主周期
+
+        Returns:
+            SymbolEventFeed
+        """
+        klines_by_interval = {interval: preloaded_data.get(symbol, [])}
+        for mtf_interval, klines_by_symbol in preloaded_data.get("_mtf_klines", {}).items():
+            if mtf_interval != interval:
+                klines_by_interval[mtf_interval] = klines_by_symbol.get(symbol, [])
+
+        return SymbolEventFeed(
+            symbol=symbol,
+            primary_interval=interval,
+            interval_to_ms=self._interval_to_ms,
+            klines_by_interval=klines_by_interval,
+            btc_klines=preloaded_data.get("BTCUSDT", []),
+            oi_data=preloaded_data.get("_oi_data", {}).get(symbol, []),  # v7.4.4新增
+            funding_data=preloaded_data.get("_funding_data", {}).get(symbol, []),  # v7.4.4新增
+            lookback_bars=self.mtf_lookback_bars
+        )
+
+    def simulate_execution(
+        self,
+        signals: List[SimulatedSignal],
+        preloaded_data: Dict[str, Any],
+        start_time: int,
+        end_time: int,
+        interval: Optional[str] = None
+    ) -> List[SimulatedSignal]:
+        """
+        回放候选信号的执行过程（限价单成交 → SL/TP/超时监控 → 强制平仓）
+
+        与run()主循环中的执行逻辑完全一致（同一组_try_fill_pending_entry/
+        _monitor_active_positions/_close_position方法、同一处理顺序），
+        但不再调用四步系统，用于参数扫描等"信号已知、只需撮合"的场景。
+
+        Args:
+            signals: 候选信号列表（按生成顺序排列，entry_attempt_time已设置）
+            preloaded_data: preload_backtest_data()返回的预加载数据
+            start_time: 回测开始时间（毫秒）
+            end_time: 回测结束时间（毫秒）
+            interval: K线周期（默认使用data_loader配置）
+
+        Returns:
+            原信号列表（执行结果已写入各信号字段）
+
+        优化:
+        - 空闲时间步（无待入场/无持仓）直接跳到下一个信号时间
+        - 当前bar通过二分查找定位（O(log n)），无需每步切片K线
+        - v1.9: 配置intrabar_interval且preloaded_data含"_intrabar_klines"时，
+          改用低周期路径解析（_simulate_execution_intrabar）
+        """
+        if interval is None:
+            interval = self.data_loader.default_interval if self.data_loader else "1h"
+        interval_ms = self._interval_to_ms(interval)
+
+        intrabar_klines = preloaded_data.get("_intrabar_klines")
+        if self.intrabar_interval and intrabar_klines:
+            return self._simulate_execution_intrabar(
+                signals, intrabar_klines, start_time, end_time, interval_ms
             )
 
-            # 获取所有symbol的K线切片（信号生成用）
-            for symbol in symbols:
-                klines = self.data_loader.get_klines_slice(
-                    preloaded_data.get(symbol, []),
-                    current_timestamp,
-                    lookback_bars=300
+        # 每个symbol的K线开盘时间索引（二分查找当前bar）
+        open_times: Dict[str, Any] = {}
+        for signal in signals:
+            if signal.symbol not in open_times:
+                klines = preloaded_data.get(signal.symbol, [])
+                timestamps = getattr(klines, "timestamps", None)  # KlineArray（内存映射）直接提供
+                open_times[signal.symbol] = (
+                    timestamps if timestamps is not None else [k["timestamp"] for k in klines]
                 )
-                current_klines_cache[symbol] = klines
 
-            # v7.4.4新增：获取OI和资金费率数据
-            oi_data_all = preloaded_data.get("_oi_data", {})
-            funding_data_all = preloaded_data.get("_funding_data", {})
-            # ===============================================================
+        ordered = sorted(signals, key=lambda s: s.timestamp)  # 稳定排序，保持同一时间步内的生成顺序
+        next_index = 0
+        pending_entries: List[SimulatedSignal] = []
+        active_positions: List[SimulatedSignal] = []
+
+        current_timestamp = start_time
+        while current_timestamp <= end_time:
+            # 空闲：跳到下一个信号的生成时间（对齐到时间网格）
+            if not pending_entries and not active_positions:
+                if next_index >= len(ordered):
+                    break
+                next_ts = ordered[next_index].timestamp
+                if next_ts > current_timestamp:
+                    steps = (next_ts - current_timestamp + interval_ms - 1) // interval_ms
+                    current_timestamp += steps * interval_ms
+                    continue
 
-            # v1.5 P0修复：尝试成交待入场订单（限价单模型）
-            filled_entries = []
-            expired_entries = []
+            klines_cache: Dict[str, List[Dict]] = {}
+            for signal in pending_entries + active_positions:
+                if signal.symbol not in klines_cache:
+                    klines_cache[signal.symbol] = self._last_closed_bar(
+                        preloaded_data.get(signal.symbol, []),
+                        open_times.get(signal.symbol, []),
+                        current_timestamp
+                    )
 
+            # 1. 尝试成交待入场订单（与run()相同：仅处理到达入场时间的订单）
+            finished = []
             for pending in pending_entries:
-                # 检查是否到达入场尝试时间
                 if current_timestamp < pending.entry_attempt_time:
-                    continue  # 尚未到达入场时间
-
-                # 尝试成交限价单（使用缓存的K线）
+                    continue
                 filled, expired = self._try_fill_pending_entry(
-                    pending, current_timestamp, interval_ms, current_klines_cache
+                    pending, current_timestamp, interval_ms, klines_cache
                 )
-
                 if filled:
-                    # 成交成功：添加到活跃头寸
                     active_positions.append(pending)
-                    filled_entries.append(pending)
+                    finished.append(pending)
                     logger.info(
                         f"✅ 限价单成交: {pending.symbol} {pending.side.upper()} @ {pending.entry_price_actual:.4f} "
                         f"(delay={(current_timestamp - pending.timestamp) / 3600000:.1f}h)"
                     )
                 elif expired:
-                    # 超时未成交：标记为ENTRY_NOT_FILLED
-                    expired_entries.append(pending)
+                    finished.append(pending)
                     logger.info(
                         f"⏱️ 限价单超时: {pending.symbol} {pending.side.upper()} "
                         f"(waited={(current_timestamp - pending.entry_attempt_time) / 3600000:.1f}h)"
                     )
-
-            # 移除已成交和已超时的订单
-            for entry in filled_entries + expired_entries:
+            for entry in finished:
                 pending_entries.remove(entry)
 
-            # 遍历所有符号
-            for symbol in symbols:
-                try:
-                    # 检查冷却期（Anti-Jitter）
-                    if self.enable_anti_jitter:
-                        last_signal_time = last_signal_time_by_symbol.get(symbol, 0)
-                        cooldown_ms = self.signal_cooldown_hours * 3600 * 1000
-                        if current_timestamp - last_signal_time < cooldown_ms:
-                            # 仍在冷却期，跳过
-                            continue
-
-                    # P0 Bugfix: 使用缓存的K线（避免重复API调用）
-                    klines_1h = current_klines_cache.get(symbol, [])
-
-                    if len(klines_1h) < 100:
-                        # K线不足，跳过（避免噪声信号）
-                        continue
-
-                    # v1.5 P0 Bugfix: 直接传递字典格式（四步系统期望字典格式）
-                    # data_loader.load_klines()已返回字典格式，不需要转换
-                    # 移除_convert_to_binance_format()调用，避免Step2崩溃
-
-                    # P0 Bugfix: 传递BTC K线（用于Step1 BTC对齐检测）
-                    # v7.4.4修复：加载OI和资金费率数据（修复C和B因子为0的问题）
-
-                    # 获取当前symbol的OI数据切片
-                    symbol_oi_all = oi_data_all.get(symbol, [])
-                    oi_data = self.data_loader.get_oi_slice(
-                        symbol_oi_all,
-                        current_timestamp,
-                        lookback_bars=300
-                    )
-
-                    # 获取当前时间点的资金费率
-                    symbol_funding_all = funding_data_all.get(symbol, [])
-                    funding_rate = self.data_loader.get_funding_at_timestamp(
-                        symbol_funding_all,
+            # 2. 本时间步生成的信号加入待入场队列
+            while next_index < len(ordered) and ordered[next_index].timestamp <= current_timestamp:
+                pending_entries.append(ordered[next_index])
+                next_index += 1
+
+            # 3. 监控活跃头寸（新加入的信号需要K线时补充）
+            for position in active_positions:
+                if position.symbol not in klines_cache:
+                    klines_cache[position.symbol] = self._last_closed_bar(
+                        preloaded_data.get(position.symbol, []),
+                        open_times.get(position.symbol, []),
                         current_timestamp
                     )
+            active_positions = self._monitor_active_positions(
+                active_positions, current_timestamp, interval_ms, klines_cache
+            )
 
-                    # 计算mark_price和spot_price（使用最新K线收盘价近似）
-                    mark_price = None
-                    spot_price = None
-                    if klines_1h:
-                        latest_kline = klines_1h[-1]
-                        mark_price = float(latest_kline.get("close", 0))
-                        # spot_price近似为mark_price（实际应该从现货数据获取）
-                        spot_price = mark_price
-
-                    # 调用四步系统分析
-                    analysis_result = analyze_symbol_with_preloaded_klines(
-                        symbol=symbol,
-                        k1h=klines_1h,  # 直接传递字典格式（从缓存读取）
-                        k4h=[],  # 暂时不用4h K线（v1.0简化）
-                        oi_data=oi_data,  # v7.4.4修复：传递OI数据
-                        spot_k1h=None,
-                        orderbook=None,
-                        mark_price=mark_price,  # v7.4.4修复：传递标记价格
-                        funding_rate=funding_rate,  # v7.4.4修复：传递资金费率
-                        spot_price=spot_price,  # v7.4.4修复：传递现货价格
-                        btc_klines=btc_klines,  # P0 Bugfix: 传递BTC K线
-                        eth_klines=None
-                    )
-
-                    # v7.4.4 修复：检查分析结果是否有效（防止NoneType错误）
-                    if analysis_result is None:
-                        logger.warning(f"分析返回None: {symbol} at {current_timestamp}")
-                        continue
+            current_timestamp += interval_ms
 
-                    # 检查是否生成信号
-                    is_signal = analysis_result.get("is_prime", False)
+        # 回测结束：强制平掉所有未平仓头寸（与run()一致）
+        for position in active_positions:
+            if position.exit_time == 0:
+                self._close_position(
+                    position,
+                    exit_time=end_time,
+                    exit_price=position.entry_price_actual,
+                    exit_reason=self.exit_classification["manual_close"]["label"]
+                )
 
-                    # v7.4.4 调试：追踪is_prime值
-                    if not is_signal:
-                        logger.info(f"📝 分析结果: {symbol} is_prime=False, 准备记录REJECT")
+        return signals
 
-                    # v1.1增强：记录REJECT分析结果
-                    if not is_signal and self.record_reject_analyses:
-                        four_step = analysis_result.get("four_step_decision", {}) or {}
-                        logger.info(f"📝 记录REJECT: {symbol}, four_step exists: {bool(four_step)}")
-
-                        # v7.4.4 修复：正确获取四步系统各步骤结果（键名修正）
-                        # 使用 or {} 处理值为None的情况
-                        step1_result = four_step.get("step1_direction", {}) or {}
-                        step2_result = four_step.get("step2_timing", {}) or {}
-                        step3_result = four_step.get("step3_risk", {}) or {}
-                        step4_result = four_step.get("step4_quality", {}) or {}
-
-                        # 判断各步骤是否通过（字段名是"pass"而非"passed"）
-                        step1_passed = step1_result.get("pass", False)
-                        step2_passed = step2_result.get("pass", False)
-                        step3_passed = step3_result.get("pass", False)
-                        # step4使用"all_gates_pass"
-                        step4_passed = step4_result.get("all_gates_pass", False)
-
-                        # 确定拒绝步骤和原因（字段名是"reject_reason"而非"reason"）
-                        rejection_step = 0
-                        rejection_reason = ""
-                        if not step1_passed:
-                            rejection_step = 1
-                            rejection_reason = step1_result.get("reject_reason", "Step1 REJECT")
-                        elif not step2_passed:
-                            rejection_step = 2
-                            rejection_reason = step2_result.get("reject_reason", "Step2 REJECT")
-                        elif not step3_passed:
-                            rejection_step = 3
-                            rejection_reason = step3_result.get("reject_reason", "Step3 REJECT")
-                        elif not step4_passed:
-                            rejection_step = 4
-                            rejection_reason = step4_result.get("reject_reason", "Step4 REJECT")
-                        else:
-                            # 未知原因（可能是数据不足等）
-                            rejection_step = 0
-                            rejection_reason = "Unknown (possibly insufficient data)"
-
-                        # 创建RejectedAnalysis记录
-                        rejected = RejectedAnalysis(
-                            symbol=symbol,
-                            timestamp=current_timestamp,
-                            rejection_step=rejection_step,
-                            rejection_reason=rejection_reason if self.reject_record_rejection_reason else "",
-                            step1_passed=step1_passed,
-                            step2_passed=step2_passed,
-                            step3_passed=step3_passed,
-                            step4_passed=step4_passed,
-                            step1_result=step1_result if self.reject_record_step_results else {},
-                            step2_result=step2_result if self.reject_record_step_results else {},
-                            step3_result=step3_result if self.reject_record_step_results else {},
-                            step4_result=step4_result if self.reject_record_step_results else {},
-                            factor_scores=analysis_result.get("scores", {}) if self.reject_record_factor_scores else {}
-                        )
-                        rejected_analyses.append(rejected)
+    def _simulate_execution_intrabar(
+        self,
+        signals: List[SimulatedSignal],
+        intrabar_klines: Dict[str, Any],
+        start_time: int,
+        end_time: int,
+        interval_ms: int
+    ) -> List[SimulatedSignal]:
+        """
+        低周期路径解析撮合（v1.9新增）
 
-                    if not is_signal:
-                        continue
+        每个信号独立解析（引擎无组合级约束，信号之间互不影响）:
+        1. 入场：限价单有效期内第一根覆盖推荐价的低周期K线
+        2. 离场：从成交K线起，SL/TP/超时三者的首次触达取最早者
+           同一根低周期K线内SL与TP同时触达时仍按悲观假设优先SL
+        3. 截止end_time仍未离场：以入场价强制平仓（与主循环一致）
 
-                    # 提取信号信息
-                    side_long = analysis_result.get("side_long", None)
-                    if side_long is None:
-                        continue
+        时间语义与主循环一致：
+        - 限价单覆盖主周期 [signal.timestamp, +max_entry_bars) 内的K线
+        - 成交/离场时间取该低周期K线的收盘时间
+        - 超时：首根收盘时间超过 signal.timestamp + max_holding_hours 的K线，按其中间价平仓
 
-                    side = "long" if side_long else "short"
+        Args:
+            signals: 候选信号列表（entry_attempt_time已设置）
+            intrabar_klines: {symbol: 低周期K线列表或KlineArray}
+            start_time: 回测开始时间（毫秒）
+            end_time: 回测结束时间（毫秒）
+            interval_ms: 主周期（毫秒）
 
-                    # ==================== P0修复：正确提取价格（融合模式 vs 旧系统） ====================
-                    # 检查是否启用了融合模式（四步系统决策结果存在）
-                    four_step = analysis_result.get("four_step_decision", {})
-                    fusion_mode_enabled = (
-                        four_step and
-                        four_step.get("decision") == "ACCEPT"
-                    )
+        Returns:
+            原信号列表（执行结果已写入各信号字段）
+        """
+        intrabar_ms = self._interval_to_ms(self.intrabar_interval)
+        series_by_symbol: Dict[str, IntrabarSeries] = {}
+        max_holding_ms = self.max_holding_hours * 3600 * 1000
+
+        # 按生成时间顺序解析（滑点随机数消耗顺序确定）
+        for signal in sorted(signals, key=lambda s: s.timestamp):
+            if signal.symbol not in series_by_symbol:
+                series_by_symbol[signal.symbol] = IntrabarSeries(
+                    intrabar_klines.get(signal.symbol, []), intrabar_ms
+                )
+            series = series_by_symbol[signal.symbol]
+            end_index = series.end_index(end_time)
+
+            # 1. 入场：主周期第k次尝试使用开盘于 entry_attempt_time - interval + k*interval 的bar
+            window_start = signal.entry_attempt_time - interval_ms
+            window_end = window_start + self.max_entry_bars * interval_ms
+            fill_index = series.first_in_range(
+                signal.entry_price_recommended,
+                series.index_at(window_start),
+                min(series.index_at(window_end), end_index)
+            )
 
-                    if fusion_mode_enabled:
-                        # 融合模式：四步系统直接提供浮点数价格
-                        entry_price_rec = analysis_result.get("entry_price", 0.0)
-                        stop_loss_rec = analysis_result.get("stop_loss", 0.0)
-                        take_profit_1_rec = analysis_result.get("take_profit", 0.0)  # 注意：字段名是take_profit
-                        take_profit_2_rec = 0.0  # 四步系统暂不支持TP2
+            if fill_index < 0:
+                expire_time = signal.entry_attempt_time + self.max_entry_bars * interval_ms
+                if expire_time <= end_time:
+                    signal.exit_reason = self.exit_classification["entry_not_filled"]["label"]
+                    signal.exit_time = expire_time
+                continue
 
-                        logger.debug(
-                            f"[融合模式] {symbol} Entry={entry_price_rec:.4f}, "
-                            f"SL={stop_loss_rec:.4f}, TP={take_profit_1_rec:.4f}"
-                        )
-                    else:
-                        # 旧系统：从字典结构提取价格
-                        stop_loss_dict = analysis_result.get("stop_loss", {})
-                        take_profit_dict = analysis_result.get("take_profit", {})
-
-                        # 提取止损价格（从字典）
-                        if isinstance(stop_loss_dict, dict):
-                            stop_loss_rec = stop_loss_dict.get("stop_price", 0.0)
-                        else:
-                            logger.warning(f"{symbol} stop_loss格式异常: {type(stop_loss_dict)}")
-                            stop_loss_rec = float(stop_loss_dict) if stop_loss_dict else 0.0
-
-                        # 提取止盈价格（从字典）
-                        if isinstance(take_profit_dict, dict):
-                            take_profit_1_rec = take_profit_dict.get("price", 0.0)
-                        else:
-                            logger.warning(f"{symbol} take_profit格式异常: {type(take_profit_dict)}")
-                            take_profit_1_rec = float(take_profit_dict) if take_profit_dict else 0.0
-
-                        take_profit_2_rec = 0.0  # 旧系统也不支持TP2
-
-                        # 入场价格：使用当前K线最后一根的收盘价
-                        if klines_1h and len(klines_1h) > 0:
-                            last_kline = klines_1h[-1]
-                            if isinstance(last_kline, dict):
-                                entry_price_rec = last_kline.get("close", 0.0)
-                            else:
-                                entry_price_rec = last_kline[4] if len(last_kline) > 4 else 0.0
-                        else:
-                            entry_price_rec = 0.0
-
-                        logger.debug(
-                            f"[旧系统] {symbol} Entry={entry_price_rec:.4f}(K线close), "
-                            f"SL={stop_loss_rec:.4f}, TP={take_profit_1_rec:.4f}"
-                        )
+            self._simulate_order_execution(signal)
+            signal.entry_filled = True
+            signal.entry_filled_time = series.close_time(fill_index)
+            signal.fees_paid += self._calculate_fees(signal.entry_price_actual, self.position_size_usdt)
 
-                    # 验证价格有效性
-                    if entry_price_rec <= 0 or stop_loss_rec <= 0:
-                        logger.warning(
-                            f"信号价格无效: {symbol} entry={entry_price_rec} sl={stop_loss_rec}"
-                        )
-                        continue
+            # 2. 离场：SL/TP/超时首次触达（成交K线本身也参与检查，与主循环一致）
+            if signal.side == "long":
+                sl_index = series.first_at_or_below(signal.stop_loss_actual, fill_index, end_index)
+                tp_search = series.first_at_or_above
+            else:
+                sl_index = series.first_at_or_above(signal.stop_loss_actual, fill_index, end_index)
+                tp_search = series.first_at_or_below
+            tp1_index = (
+                tp_search(signal.take_profit_1_actual, fill_index, end_index)
+                if signal.take_profit_1_actual > 0 else -1
+            )
+            tp2_index = (
+                tp_search(signal.take_profit_2_actual, fill_index, end_index)
+                if signal.take_profit_2_actual > 0 else -1
+            )
+            tp_index = earliest([tp1_index, tp2_index])
+            timeout_index = max(
+                fill_index,
+                series.end_index(signal.timestamp + max_holding_ms)
+            )
+            if timeout_index >= end_index:
+                timeout_index = -1
 
-                    # 验证止盈价格（允许为0，但记录警告并计算默认TP）
-                    if take_profit_1_rec <= 0:
-                        logger.warning(
-                            f"止盈价格无效: {symbol} tp1={take_profit_1_rec}，使用2R作为默认TP"
-                        )
-                        # 计算默认TP（2倍风险回报）
-                        risk_distance = abs(entry_price_rec - stop_loss_rec)
-                        if side == "long":
-                            take_profit_1_rec = entry_price_rec + (risk_distance * 2)
-                        else:
-                            take_profit_1_rec = entry_price_rec - (risk_distance * 2)
-                    # =============================================================================
-
-                    # 创建模拟信号
-                    # v7.4.4 修复：正确获取四步系统各步骤结果（键名修正）
-                    four_step_decision = analysis_result.get("four_step_decision", {})
-                    signal = SimulatedSignal(
-                        symbol=symbol,
-                        timestamp=current_timestamp,
-                        side=side,
-                        entry_price_recommended=entry_price_rec,
-                        stop_loss_recommended=stop_loss_rec,
-                        take_profit_1_recommended=take_profit_1_rec,
-                        take_profit_2_recommended=take_profit_2_rec,
-                        factor_scores=analysis_result.get("scores", {}),
-                        step1_result=four_step_decision.get("step1_direction", {}),
-                        step2_result=four_step_decision.get("step2_timing", {}),
-                        step3_result=four_step_decision.get("step3_risk", {}),
-                        step4_result=four_step_decision.get("step4_quality", {})
-                    )
+            exit_index = earliest([sl_index, tp_index, timeout_index])
+            if exit_index < 0:
+                # 3. 回测结束仍未离场：以入场价平仓（无盈亏）
+                self._close_position(
+                    signal,
+                    exit_time=end_time,
+                    exit_price=signal.entry_price_actual,
+                    exit_reason=self.exit_classification["manual_close"]["label"]
+                )
+                continue
 
-                    # v1.5 P0修复：不立即执行，加入待入场队列（限价单模型）
-                    signal.entry_attempt_time = current_timestamp + interval_ms  # 下一个bar开始尝试
-                    pending_entries.append(signal)
-                    all_signals.append(signal)  # 记录信号（无论是否最终成交）
+            exit_time = series.close_time(exit_index)
+            if exit_index == sl_index:
+                # 悲观假设：同一根K线内SL与TP同时触达时优先SL
+                self._close_position(
+                    signal,
+                    exit_time=exit_time,
+                    exit_price=signal.stop_loss_actual,
+                    exit_reason=self.exit_classification["sl_hit"]["label"]
+                )
+            elif exit_index == tp_index:
+                tp_level = 2 if tp2_index == tp_index else 1
+                self._close_position(
+                    signal,
+                    exit_time=exit_time,
+                    exit_price=(
+                        signal.take_profit_2_actual if tp_level == 2 else signal.take_profit_1_actual
+                    ),
+                    exit_reason=self.exit_classification[f"tp{tp_level}_hit"]["label"]
+                )
+            else:
+                self._close_position(
+                    signal,
+                    exit_time=exit_time,
+                    exit_price=series.mid_price(exit_index),
+                    exit_reason=self.exit_classification["max_holding_exceeded"]["label"]
+                )
 
-                    # 更新最后信号时间（Anti-Jitter）
-                    last_signal_time_by_symbol[symbol] = current_timestamp
+        return signals
 
-                    logger.info(
-                        f"📊 信号生成: {symbol} {side.upper()} @ {entry_price_rec:.4f} "
-                        f"(SL={stop_loss_rec:.4f}, TP1={take_profit_1_rec:.4f}) "
-                        f"[pending entry attempt at {self._format_timestamp(signal.entry_attempt_time)}]"
-                    )
+    def _last_closed_bar(
+        self,
+        klines: List[Dict],
+        open_times: Any,
+        current_timestamp: int
+    ) -> List[Dict]:
+        """
+        二分查找current_timestamp之前最后一根K线（等价于get_klines_slice(...)[-1:]）
 
-                except Exception as e:
-                    logger.error(f"分析失败: {symbol} at {current_timestamp} - {e}")
+        Returns:
+            [kline] 或 []（无数据）
+        """
+        idx = bisect.bisect_left(open_times, current_timestamp)
+        return [klines[idx - 1]] if idx > 0 else []
 
-            # 监控活跃头寸（检查SL/TP触发，使用缓存的K线）
-            active_positions = self._monitor_active_positions(
-                active_positions, current_timestamp, interval_ms, current_klines_cache
-            )
+    def _build_rejected_analysis(
+        self,
+        symbol: str,
+        timestamp: int,
+        analysis_result: Dict
+    ) -> RejectedAnalysis:
+        """
+        根据分析结果构建REJECT记录（v1.1增强）
 
-            # 移动到下一个时间步
-            current_timestamp += interval_ms
+        Args:
+            symbol: 交易对
+            timestamp: 分析时间（毫秒）
+            analysis_result: analyze_symbol_with_preloaded_klines()返回结果
 
-        # 回测结束：强制平掉所有未平仓头寸
-        for position in active_positions:
-            if position.exit_time == 0:
-                self._close_position(
-                    position,
-                    exit_time=end_time,
-                    exit_price=position.entry_price_actual,  # 以入场价平仓（无盈亏）
-                    exit_reason=self.exit_classification["manual_close"]["label"]
-                )
+        Returns:
+            RejectedAnalysis记录
+        """
+        four_step = analysis_result.get("four_step_decision", {}) or {}
+        logger.info(f"📝 记录REJECT: {symbol}, four_step exists: {bool(four_step)}")
+
+        # v7.4.4 修复：正确获取四步系统各步骤结果（键名修正）
+        # 使用 or {} 处理值为None的情况
+        step1_result = four_step.get("step1_direction", {}) or {}
+        step2_result = four_step.get("step2_timing", {}) or {}
+        step3_result = four_step.get("step3_risk", {}) or {}
+        step4_result = four_step.get("step4_quality", {}) or {}
+
+        # 判断各步骤是否通过（字段名是"pass"而非"passed"）
+        step1_passed = step1_result.get("pass", False)
+        step2_passed = step2_result.get("pass", False)
+        step3_passed = step3_result.get("pass", False)
+        # step4使用"all_gates_pass"
+        step4_passed = step4_result.get("all_gates_pass", False)
+
+        # 确定拒绝步骤和原因（字段名是"reject_reason"而非"reason"）
+        if not step1_passed:
+            rejection_step = 1
+            rejection_reason = step1_result.get("reject_reason", "Step1 REJECT")
+        elif not step2_passed:
+            rejection_step = 2
+            rejection_reason = step2_result.get("reject_reason", "Step2 REJECT")
+        elif not step3_passed:
+            rejection_step = 3
+            rejection_reason = step3_result.get("reject_reason", "Step3 REJECT")
+        elif not step4_passed:
+            rejection_step = 4
+            rejection_reason = step4_result.get("reject_reason", "Step4 REJECT")
+        else:
+            # 未知原因（可能是数据不足等）
+            rejection_step = 0
+            rejection_reason = "Unknown (possibly insufficient data)"
+
+        return RejectedAnalysis(
+            symbol=symbol,
+            timestamp=timestamp,
+            rejection_step=rejection_step,
+            rejection_reason=rejection_reason if self.reject_record_rejection_reason else "",
+            step1_passed=step1_passed,
+            step2_passed=step2_passed,
+            step3_passed=step3_passed,
+            step4_passed=step4_passed,
+            step1_result=step1_result if self.reject_record_step_results else {},
+            step2_result=step2_result if self.reject_record_step_results else {},
+            step3_result=step3_result if self.reject_record_step_results else {},
+            step4_result=step4_result if self.reject_record_step_results else {},
+            factor_scores=analysis_result.get("scores", {}) if self.reject_record_factor_scores else {}
+        )
 
-        # 计算执行时长
-        backtest_duration = time.time() - backtest_start_time
+    def _build_signal(
+        self,
+        symbol: str,
+        timestamp: int,
+        analysis_result: Dict,
+        klines_1h: List[Dict]
+    ) -> Optional[SimulatedSignal]:
+        """
+        根据ACCEPT分析结果构建模拟信号（价格提取 + 校验）
 
-        # 构建元数据
-        metadata = {
-            "start_time": start_time,
-            "end_time": end_time,
-            "symbols": symbols,
-            "interval": interval,
-            "total_iterations": total_iterations,
-            "execution_time_seconds": round(backtest_duration, 2),
-            "config_snapshot": self.config,
-            "total_signals": len(all_signals),
-            "total_rejected_analyses": len(rejected_analyses),  # v1.1新增
-            "signals_by_symbol": {
-                symbol: sum(1 for s in all_signals if s.symbol == symbol)
-                for symbol in symbols
-            },
-            "rejected_by_symbol": {  # v1.1新增
-                symbol: sum(1 for r in rejected_analyses if r.symbol == symbol)
-                for symbol in symbols
-            }
-        }
+        Args:
+            symbol: 交易对
+            timestamp: 信号生成时间（毫秒）
+            analysis_result: analyze_symbol_with_preloaded_klines()返回结果
+            klines_1h: 当前K线切片（旧系统入场价使用最后一根收盘价）
 
-        logger.info(
-            f"✅ 回测完成: "
-            f"{total_iterations} iterations, "
-            f"{len(all_signals)} signals, "
-            f"{len(rejected_analyses)} rejects, "
-            f"{backtest_duration:.1f}秒"
+        Returns:
+            SimulatedSignal，价格无效时返回None
+        """
+        side_long = analysis_result.get("side_long", None)
+        if side_long is None:
+            return None
+
+        side = "long" if side_long else "short"
+
+        # ==================== P0修复：正确提取价格（融合模式 vs 旧系统） ====================
+        # 检查是否启用了融合模式（四步系统决策结果存在）
+        four_step = analysis_result.get("four_step_decision", {})
+        fusion_mode_enabled = (
+            four_step and
+            four_step.get("decision") == "ACCEPT"
         )
 
-        return BacktestResult(
-            signals=all_signals,
-            metadata=metadata,
-            rejected_analyses=rejected_analyses  # v1.1新增
+        if fusion_mode_enabled:
+            # 融合模式：四步系统直接提供浮点数价格
+            entry_price_rec = analysis_result.get("entry_price", 0.0)
+            stop_loss_rec = analysis_result.get("stop_loss", 0.0)
+            take_profit_1_rec = analysis_result.get("take_profit", 0.0)  # 注意：字段名是take_profit
+            take_profit_2_rec = 0.0  # 四步系统暂不支持TP2
+
+            logger.debug(
+                f"[融合模式] {symbol} Entry={entry_price_rec:.4f}, "
+                f"SL={stop_loss_rec:.4f}, TP={take_profit_1_rec:.4f}"
+            )
+        else:
+            # 旧系统：从字典结构提取价格
+            stop_loss_dict = analysis_result.get("stop_loss", {})
+            take_profit_dict = analysis_result.get("take_profit", {})
+
+            # 提取止损价格（从字典）
+            if isinstance(stop_loss_dict, dict):
+                stop_loss_rec = stop_loss_dict.get("stop_price", 0.0)
+            else:
+                logger.warning(f"{symbol} stop_loss格式异常: {type(stop_loss_dict)}")
+                stop_loss_rec = float(stop_loss_dict) if stop_loss_dict else 0.0
+
+            # 提取止盈价格（从字典）
+            if isinstance(take_profit_dict, dict):
+                take_profit_1_rec = take_profit_dict.get("price", 0.0)
+            else:
+                logger.warning(f"{symbol} take_profit格式异常: {type(take_profit_dict)}")
+                take_profit_1_rec = float(take_profit_dict) if take_profit_dict else 0.0
+
+            take_profit_2_rec = 0.0  # 旧系统也不支持TP2
+
+            # 入场价格：使用当前K线最后一根的收盘价
+            if klines_1h and len(klines_1h) > 0:
+                last_kline = klines_1h[-1]
+                if isinstance(last_kline, dict):
+                    entry_price_rec = last_kline.get("close", 0.0)
+                else:
+                    entry_price_rec = last_kline[4] if len(last_kline) > 4 else 0.0
+            else:
+                entry_price_rec = 0.0
+
+            logger.debug(
+                f"[旧系统] {symbol} Entry={entry_price_rec:.4f}(K线close), "
+                f"SL={stop_loss_rec:.4f}, TP={take_profit_1_rec:.4f}"
+            )
+
+        # 验证价格有效性
+        if entry_price_rec <= 0 or stop_loss_rec <= 0:
+            logger.warning(
+                f"信号价格无效: {symbol} entry={entry_price_rec} sl={stop_loss_rec}"
+            )
+            return None
+
+        # 验证止盈价格（允许为0，但记录警告并计算默认TP）
+        if take_profit_1_rec <= 0:
+            logger.warning(
+                f"止盈价格无效: {symbol} tp1={take_profit_1_rec}，使用2R作为默认TP"
+            )
+            # 计算默认TP（2倍风险回报）
+            risk_distance = abs(entry_price_rec - stop_loss_rec)
+            if side == "long":
+                take_profit_1_rec = entry_price_rec + (risk_distance * 2)
+            else:
+                take_profit_1_rec = entry_price_rec - (risk_distance * 2)
+        # =============================================================================
+
+        # 创建模拟信号
+        # v7.4.4 修复：正确获取四步系统各步骤结果（键名修正）
+        four_step_decision = analysis_result.get("four_step_decision", {})
+        return SimulatedSignal(
+            symbol=symbol,
+            timestamp=timestamp,
+            side=side,
+            entry_price_recommended=entry_price_rec,
+            stop_loss_recommended=stop_loss_rec,
+            take_profit_1_recommended=take_profit_1_rec,
+            take_profit_2_recommended=take_profit_2_rec,
+            factor_scores=analysis_result.get("scores", {}),
+            step1_result=four_step_decision.get("step1_direction", {}),
+            step2_result=four_step_decision.get("step2_timing", {}),
+            step3_result=four_step_decision.get("step3_risk", {}),
+            step4_result=four_step_decision.get("step4_quality", {})
         )
 
     def _try_fill_pending_entry(
@@ -1121,3 +1710,23 @@ class BacktestEngine:
         from datetime import datetime
         dt = datetime.fromtimestamp(timestamp_ms / 1000)
         return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ==================== v1.7: 信号生成工作进程 ====================
+
+_SYMBOL_WORKER_ENGINE: Optional[BacktestEngine] = None
+
+
+def _init_symbol_worker(config: Dict, data_loader: HistoricalDataLoader) -> None:
+    """工作进程初始化：每个进程构建一次引擎（避免每个symbol重复CFG.reload）"""
+    global _SYMBOL_WORKER_ENGINE
+    _SYMBOL_WORKER_ENGINE = BacktestEngine(config, data_loader)
+
+
+def _generate_symbol_signals_worker(task: tuple) -> SymbolProgress:
+    """工作进程：生成单个symbol的候选信号（从progress.next_time继续，返回更新后的进度）"""
+    symbol, symbol_data, start_time, end_time, interval, progress = task
+    _SYMBOL_WORKER_ENGINE._generate_symbol_signals(
+        symbol, symbol_data, start_time, end_time, interval, progress=progress
+    )
+    return progress
@@ -0,0 +1,282 @@
+# coding: utf-8
+"""
+Backtest Framework v2.0 - Event-Driven Multi-Interval Core
+回测框架 - 事件驱动多周期内核（优先队列）
+
+功能：
+1. 多路归并：K线收盘（15m/1h/4h/1d、BTC）、资金费率、OI事件按时间进入同一个最小堆
+2. 每个数据流维护游标，事件出堆时游标前移（O(1)），对齐视图为游标前lookback条切片
+3. 主周期K线收盘时触发分析事件（同一时刻的所有数据事件先生效）
+4. 空闲时刻不产生事件，无需逐小时轮询
+
+时间语义（与BacktestEngine原时间网格一致，且无未来信息）:
+- K线事件时间 = 开盘时间 + 周期（收盘后才可见；4h/1d未收盘的K线不会出现在视图中）
+- 资金费率事件时间 = fundingTime（fundingTime <= t 可见）
+- OI事件时间 = timestamp，在同一时刻的分析之后生效（timestamp < t 可见）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import itertools
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# 同一时刻的事件处理顺序（数值越小越先处理）
+PRIORITY_DATA = 0       # K线收盘、资金费率
+PRIORITY_ANALYZE = 1    # 主周期收盘 → 分析
+PRIORITY_LATE_DATA = 2  # OI（严格早于分析时刻才可见）
+
+# 与OptimizedBatchScanner一致的各周期回看长度
+DEFAULT_MTF_LOOKBACK = {"15m": 200, "1h": 300, "4h": 200, "1d": 100}
+
+
+class EventStream:
+    """
+    单一数据流（按事件时间升序）
+
+    Attributes:
+        records: 原始记录列表（K线/资金费率/OI）
+        times: 每条记录的事件时间（毫秒）
+        cursor: 已生效的记录数（records[:cursor]对当前时刻可见）
+    """
+
+    def __init__(self, records: Any, times: List[int], priority: int):
+        self.records = records
+        self.times = times
+        self.priority = priority
+        self.cursor = 0
+
+    def seek(self, timestamp: int) -> None:
+        """快进：事件时间早于timestamp的记录全部生效（不经过堆）"""
+        self.cursor = bisect.bisect_left(self.times, timestamp)
+
+    def next_time(self) -> Optional[int]:
+        """下一条待生效记录的事件时间（无则None）"""
+        return self.times[self.cursor] if self.cursor < len(self.times) else None
+
+    def view(self, lookback: int) -> Any:
+        """最近lookback条已生效记录"""
+        return self.records[max(0, self.cursor - lookback):self.cursor]
+
+    def latest(self) -> Optional[Any]:
+        """最近一条已生效记录"""
+        return self.records[self.cursor - 1] if self.cursor > 0 else None
+
+
+class EventQueue:
+    """
+    事件优先队列（heapq）
+
+    元素: (timestamp, priority, seq, key)
+    - seq保证同时刻同优先级按入队顺序出队（结果确定）
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, int, str]] = []
+        self._seq = itertools.count()
+
+    def push(self, timestamp: int, priority: int, key: str) -> None:
+        heapq.heappush(self._heap, (timestamp, priority, next(self._seq), key))
+
+    def pop(self) -> Tuple[int, int, str]:
+        timestamp, priority, _, key = heapq.heappop(self._heap)
+        return timestamp, priority, key
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class SymbolEventFeed:
+    """
+    单个symbol的多周期事件源
+
+    用法:
+        feed = SymbolEventFeed(symbol, "1h", interval_to_ms, klines_by_interval, ...)
+        for ts in feed.analysis_times(start_time, end_time):
+            k1h = feed.klines("1h")
+            k4h = feed.klines("4h")
+            ...
+    """
+
+    def __init__(
+        self,
+        symbol: str,
+        primary_interval: str,
+        interval_to_ms: Callable[[str], int],
+        klines_by_interval: Dict[str, Any],
+        btc_klines: Optional[Any] = None,
+        oi_data: Optional[List[Dict]] = None,
+        funding_data: Optional[List[Dict]] = None,
+        lookback_bars: Optional[Dict[str, int]] = None
+    ):
+        """
+        Args:
+            symbol: 交易对
+            primary_interval: 主周期（收盘触发分析，如 "1h"）
+            interval_to_ms: 周期 → 毫秒转换函数
+            klines_by_interval: {interval: K线列表}（必须包含主周期）
+            btc_klines: BTC主周期K线（Step1 BTC对齐）
+            oi_data: OI历史（按timestamp升序）
+            funding_data: 资金费率历史（按fundingTime升序）
+            lookback_bars: {interval: 回看长度}（默认DEFAULT_MTF_LOOKBACK）
+        """
+        self.symbol = symbol
+        self.primary_interval = primary_interval
+        self.lookback_bars = dict(DEFAULT_MTF_LOOKBACK, **(lookback_bars or {}))
+        self.streams: Dict[str, EventStream] = {}
+
+        for interval, klines in klines_by_interval.items():
+            self.streams[interval] = self._kline_stream(klines, interval_to_ms(interval))
+        if btc_klines is not None:
+            self.streams["_btc"] = self._kline_stream(btc_klines, interval_to_ms(primary_interval))
+        if oi_data:
+            oi_sorted = sorted(oi_data, key=lambda x: x.get("timestamp", 0))
+            self.streams["_oi"] = EventStream(
+                oi_sorted, [oi.get("timestamp", 0) for oi in oi_sorted], PRIORITY_LATE_DATA
+            )
+        if funding_data:
+            funding_sorted = sorted(funding_data, key=lambda x: x.get("fundingTime", 0))
+            self.streams["_funding"] = EventStream(
+                funding_sorted, [f.get("fundingTime", 0) for f in funding_sorted], PRIORITY_DATA
+            )
+
+    def analysis_times(self, start_time: int, end_time: int) -> Iterator[int]:
+        """
+        按时间顺序处理事件，在主周期每根K线收盘时产出分析时刻
+
+        Args:
+            start_time: 第一个可分析时刻（毫秒，含）
+            end_time: 最后一个可分析时刻（毫秒，含）
+
+        Yields:
+            分析时刻（产出时所有可见数据已生效，可直接读取视图）
+        """
+        queue = EventQueue()
+        for key, stream in self.streams.items():
+            stream.seek(start_time)
+            next_time = stream.next_time()
+            if next_time is not None and next_time <= end_time:
+                queue.push(next_time, stream.priority, key)
+
+        while queue:
+            timestamp, priority, key = queue.pop()
+
+            if priority == PRIORITY_ANALYZE:
+                yield timestamp
+                continue
+
+            stream = self.streams[key]
+            stream.cursor += 1
+            if key == self.primary_interval:
+                queue.push(timestamp, PRIORITY_ANALYZE, key)
+
+            next_time = stream.next_time()
+            if next_time is not None and next_time <= end_time:
+                queue.push(next_time, stream.priority, key)
+
+    def klines(self, interval: str) -> Any:
+        """已收盘K线视图（该周期未加载时返回[]）"""
+        stream = self.streams.get(interval)
+        return stream.view(self.lookback_bars.get(interval, 300)) if stream else []
+
+    def kline_bounds(self, interval: str) -> Tuple[int, int]:
+        """已收盘K线视图在原始列表中的[start, end)索引"""
+        stream = self.streams.get(interval)
+        if stream is None:
+            return 0, 0
+        return max(0, stream.cursor - self.lookback_bars.get(interval, 300)), stream.cursor
+
+    def btc_klines(self) -> Any:
+        """BTC主周期已收盘K线视图"""
+        stream = self.streams.get("_btc")
+        return stream.view(self.lookback_bars.get(self.primary_interval, 300)) if stream else []
+
+    def oi_data(self) -> List[Dict]:
+        """OI视图（timestamp早于当前分析时刻）"""
+        stream = self.streams.get("_oi")
+        return stream.view(self.lookback_bars.get(self.primary_interval, 300)) if stream else []
+
+    def funding_rate(self) -> Optional[float]:
+        """当前生效的资金费率（无数据返回None）"""
+        stream = self.streams.get("_funding")
+        latest = stream.latest() if stream else None
+        if latest is None:
+            return None
+        try:
+            return float(latest.get("fundingRate", 0))
+        except (ValueError, TypeError):
+            return None
+
+    def _kline_stream(self, klines: Any, interval_ms: int) -> EventStream:
+        """K线流：事件时间 = 开盘时间 + 周期"""
+        timestamps = getattr(klines, "timestamps", None)  # KlineArray（内存映射）直接提供
+        if timestamps is None:
+            timestamps = [k["timestamp"] for k in klines]
+        return EventStream(klines, [int(t) + interval_ms for t in timestamps], PRIORITY_DATA)
+
+
+def load_mtf_klines(
+    data_loader: Any,
+    symbols: List[str],
+    start_time: int,
+    end_time: int,
+    intervals: List[str],
+    lookback_bars: Optional[Dict[str, int]] = None
+) -> Dict[str, Dict[str, List[Dict]]]:
+    """
+    预加载附加周期K线（含回看窗口）
+
+    Args:
+        data_loader: HistoricalDataLoader实例
+        symbols: 交易对列表
+        start_time: 回测开始时间（毫秒）
+        end_time: 回测结束时间（毫秒）
+        intervals: 附加周期列表（如 ["4h", "15m", "1d"]）
+        lookback_bars: {interval: 回看长度}
+
+    Returns:
+        {interval: {symbol: K线列表}}
+    """
+    lookbacks = dict(DEFAULT_MTF_LOOKBACK, **(lookback_bars or {}))
+    mtf_klines: Dict[str, Dict[str, List[Dict]]] = {}
+    for interval in intervals:
+        interval_ms = data_loader._interval_to_ms(interval)
+        lookback_start = start_time - lookbacks.get(interval, 300) * interval_ms
+        mtf_klines[interval] = {
+            symbol: data_loader.load_klines(symbol, lookback_start, end_time, interval)
+            for symbol in symbols
+        }
+    return mtf_klines
+
+
+def interleave_steps(
+    steps: List[Iterator[int]],
+    before_step: Optional[Callable[[int, int], Any]] = None
+) -> None:
+    """
+    按时间交错推进多个symbol的步进生成器（同一时刻按列表顺序，与实盘逐轮扫描一致）
+
+    每个生成器在处理分析时刻t之前产出t；推进（next）即处理t并停在下一个分析时刻
+
+    Args:
+        steps: 步进生成器列表（各自按时间升序产出分析时刻）
+        before_step: 推进前回调(timestamp, index)（bar边界，用于保存检查点）
+    """
+    heap: List[Tuple[int, int]] = []
+    for index, step in enumerate(steps):
+        timestamp = next(step, None)
+        if timestamp is not None:
+            heap.append((timestamp, index))
+    heapq.heapify(heap)
+
+    while heap:
+        timestamp, index = heapq.heappop(heap)
+        if before_step is not None:
+            before_step(timestamp, index)
+        timestamp = next(steps[index], None)
+        if timestamp is not None:
+            heapq.heappush(heap, (timestamp, index))
@@ -0,0 +1,498 @@
+# coding: utf-8
+"""
+Backtest Framework v1.8 - Factor Snapshot Cache
+回测框架 - 因子快照缓存（参数扫描复用）
+
+功能：
+1. 按回测时间网格逐点计算一次因子（analyze_symbol_with_preloaded_klines）
+2. 保存四步系统所需的全部输入（因子得分、历史序列、S/L元数据、BTC因子）
+3. 候选参数只需重跑四步决策层，无需重复计算因子
+4. 支持落盘（pickle）以便多次扫描/多进程共享
+5. v1.8: 内存映射布局（save_mmap/open_mmap），多进程只读共享K线与快照，
+   按时间窗口加载（walk-forward各fold无需复制全量历史）
+
+设计原则:
+- 快照与参数无关：四步系统参数（four_step_system.*）只影响决策，不影响因子
+- K线不重复存储：快照只记录预加载K线的索引区间，按需切片
+
+内存映射目录布局:
+    meta.json              元数据（symbols/时间范围/周期/配置）
+    klines_<SYMBOL>.npy    K线结构化数组（np.load(mmap_mode="r")）
+    snapshots.bin          逐个pickle的DecisionSnapshot（按时间排序）
+    snapshot_index.npy     [timestamp, byte_offset]索引（末行为结束偏移）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import mmap
+import pickle
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ats_core.backtest.data_loader import HistoricalDataLoader
+from ats_core.backtest.event_core import SymbolEventFeed, interleave_steps, load_mtf_klines
+from ats_core.cfg import CFG
+
+logger = logging.getLogger(__name__)
+
+# K线结构化数组字段（与HistoricalDataLoader._parse_klines字典格式一一对应）
+KLINE_DTYPE = np.dtype([
+    ("timestamp", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+    ("close_time", "i8"),
+    ("quote_volume", "f8"),
+    ("trades", "i8"),
+    ("taker_buy_base", "f8"),
+    ("taker_buy_quote", "f8"),
+])
+
+
+class KlineArray:
+    """
+    K线只读序列（底层为结构化numpy数组，可为内存映射）
+
+    对四步系统/撮合逻辑表现为List[Dict]：
+    - len() / 迭代 / 整数索引（返回字典）/ 切片（返回视图，不复制）
+    - timestamps属性：开盘时间数组（二分查找用）
+    """
+
+    __slots__ = ("_array",)
+
+    def __init__(self, array: np.ndarray):
+        self._array = array
+
+    @classmethod
+    def from_dicts(cls, klines: List[Dict]) -> "KlineArray":
+        """从字典格式K线构建"""
+        array = np.empty(len(klines), dtype=KLINE_DTYPE)
+        for name in KLINE_DTYPE.names:
+            array[name] = [k.get(name, 0) for k in klines]
+        return cls(array)
+
+    @property
+    def array(self) -> np.ndarray:
+        return self._array
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._array["timestamp"]
+
+    def __len__(self) -> int:
+        return len(self._array)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return KlineArray(self._array[index])
+        row = self._array[index]
+        return {name: row[name].item() for name in KLINE_DTYPE.names}
+
+    def __iter__(self):
+        for i in range(len(self._array)):
+            yield self[i]
+
+    def __bool__(self) -> bool:
+        return len(self._array) > 0
+
+
+@dataclass
+class DecisionSnapshot:
+    """
+    单个(symbol, timestamp)的四步系统输入快照
+
+    设计原则（§6.2 函数签名演进）:
+    - 所有可选字段初始化有默认值
+    - 新增字段向后兼容
+    """
+    symbol: str
+    timestamp: int  # 决策时刻（bar close，毫秒）
+
+    # 预加载K线索引区间：klines = preloaded[symbol][kline_start:kline_end]
+    kline_start: int
+    kline_end: int
+
+    # 四步系统输入
+    factor_scores: Dict[str, Any] = field(default_factory=dict)
+    factor_scores_series: List[Dict[str, float]] = field(default_factory=list)
+    btc_factor_scores: Dict[str, Any] = field(default_factory=dict)
+    s_factor_meta: Dict[str, Any] = field(default_factory=dict)
+    l_factor_meta: Dict[str, Any] = field(default_factory=dict)
+    l_score: float = 0.0
+
+
+class FactorCache:
+    """
+    因子快照缓存
+
+    职责:
+    - 预加载回测数据（一次）
+    - 按时间网格为每个symbol生成DecisionSnapshot
+    - 提供K线切片与候选信号撮合所需的预加载数据
+
+    配置驱动（config/params.json -> backtest.sweep）:
+    - lookback_bars: 回看窗口（与引擎一致，默认300）
+    - min_klines: 最少K线数（与引擎一致，默认100）
+    - factor_series_window_hours: Step2历史因子序列窗口（默认7）
+    - chain_mode: 标准化链模式（默认同backtest.engine.chain_mode）
+    """
+
+    def __init__(self, config: Dict, data_loader: Optional[HistoricalDataLoader] = None):
+        """
+        初始化因子快照缓存
+
+        Args:
+            config: 配置字典（从params.json的backtest.sweep读取）
+            data_loader: 历史数据加载器（仅build()需要，load()可为None）
+        """
+        self.config = config
+        self.data_loader = data_loader
+
+        # §6.2 函数签名演进：所有参数都有默认值（向后兼容）
+        self.lookback_bars = config.get("lookback_bars", 300)
+        self.min_klines = config.get("min_klines", 100)
+        self.factor_series_window_hours = config.get("factor_series_window_hours", 7)
+
+        # v2.0: 多周期输入默认与引擎配置一致（backtest.engine.mtf_intervals）
+        engine_config = CFG.params.get("backtest", {}).get("engine", {})
+        self.mtf_intervals = config.get("mtf_intervals", engine_config.get("mtf_intervals", []))
+        self.mtf_lookback_bars = config.get(
+            "mtf_lookback_bars", engine_config.get("mtf_lookback_bars", {})
+        )
+        # v2.4: 标准化链模式默认与引擎配置一致（backtest.engine.chain_mode）
+        self.chain_mode = config.get("chain_mode", engine_config.get("chain_mode", "shared"))
+
+        # 缓存内容
+        self.snapshots: List[DecisionSnapshot] = []
+        self.preloaded_data: Dict[str, Any] = {}
+        self.symbols: List[str] = []
+        self.start_time: int = 0
+        self.end_time: int = 0
+        self.interval: str = "1h"
+
+    def build(
+        self,
+        symbols: List[str],
+        start_time: int,
+        end_time: int,
+        interval: Optional[str] = None
+    ) -> "FactorCache":
+        """
+        计算全部因子快照（与BacktestEngine.run相同的时间网格与输入）
+
+        Args:
+            symbols: 交易对列表
+            start_time: 开始时间（毫秒）
+            end_time: 结束时间（毫秒）
+            interval: K线周期（默认使用data_loader配置）
+
+        Returns:
+            self（便于链式调用）
+
+        Note:
+            不应用冷却期：冷却期取决于决策结果，由扫描器按候选参数重放时处理
+        """
+        # 延迟导入：避免仅加载缓存（load()）的工作进程导入完整因子管道
+        from ats_core.backtest.checkpoint import isolated_chain_states
+        from ats_core.pipeline.analyze_symbol import analyze_symbol_with_preloaded_klines
+        from ats_core.utils.factor_history import get_factor_scores_series
+
+        if self.data_loader is None:
+            raise ValueError("FactorCache.build()需要data_loader")
+
+        interval = interval or self.data_loader.default_interval
+
+        self.symbols = list(symbols)
+        self.start_time = start_time
+        self.end_time = end_time
+        self.interval = interval
+        self.snapshots = []
+
+        self.preloaded_data = self.data_loader.preload_backtest_data(
+            symbols=symbols,
+            start_time=start_time,
+            end_time=end_time,
+            interval=interval,
+            lookback_bars=self.lookback_bars
+        )
+        if self.mtf_intervals:
+            self.preloaded_data["_mtf_klines"] = load_mtf_klines(
+                self.data_loader, symbols, start_time, end_time,
+                self.mtf_intervals, self.mtf_lookback_bars
+            )
+        params = CFG.params
+
+        build_start = time.time()
+
+        # v2.0: 与BacktestEngine相同的事件源（主周期收盘时刻 + 已收盘的多周期对齐视图）
+        def snapshot_steps(symbol: str):
+            """单个symbol的快照步进生成器（处理每个分析时刻之前产出该时刻）"""
+            feed = self._build_event_feed(symbol, interval)
+
+            for current_timestamp in feed.analysis_times(start_time, end_time):
+                yield current_timestamp
+                kline_start, kline_end = feed.kline_bounds(interval)
+                klines_1h = self.preloaded_data.get(symbol, [])[kline_start:kline_end]
+
+                if len(klines_1h) < self.min_klines:
+                    continue
+
+                try:
+                    mark_price = float(klines_1h[-1].get("close", 0))
+
+                    analysis_result = analyze_symbol_with_preloaded_klines(
+                        symbol=symbol,
+                        k1h=klines_1h,
+                        k4h=feed.klines("4h"),
+                        oi_data=feed.oi_data(),
+                        spot_k1h=None,
+                        k15m=feed.klines("15m") or None,
+                        k1d=feed.klines("1d") or None,
+                        orderbook=None,
+                        mark_price=mark_price,
+                        funding_rate=feed.funding_rate(),
+                        spot_price=mark_price,
+                        btc_klines=feed.btc_klines(),
+                        eth_klines=None
+                    )
+                    if analysis_result is None:
+                        continue
+
+                    scores = analysis_result.get("scores", {})
+                    scores_meta = analysis_result.get("scores_meta", {})
+                    btc_factor_scores = (
+                        analysis_result.get("metadata", {}).get("btc_factor_scores")
+                        or {"T": 0}
+                    )
+
+                    self.snapshots.append(DecisionSnapshot(
+                        symbol=symbol,
+                        timestamp=current_timestamp,
+                        kline_start=kline_start,
+                        kline_end=kline_end,
+                        factor_scores=scores,
+                        factor_scores_series=get_factor_scores_series(
+                            klines_1h=klines_1h,
+                            window_hours=self.factor_series_window_hours,
+                            current_factor_scores=scores,
+                            params=params
+                        ),
+                        btc_factor_scores=btc_factor_scores,
+                        s_factor_meta=scores_meta.get("S", {}) or {},
+                        l_factor_meta=scores_meta.get("L", {}) or {},
+                        l_score=scores.get("L", 0.0)
+                    ))
+                except Exception as e:
+                    logger.error(f"因子快照失败: {symbol} at {current_timestamp} - {e}")
+
+        # v2.4: 标准化链模式与BacktestEngine一致（shared=按时间交错共享链，per_symbol=按symbol隔离）
+        if self.chain_mode == "per_symbol":
+            for symbol in symbols:
+                with isolated_chain_states():
+                    for _ in snapshot_steps(symbol):
+                        pass
+        else:
+            with isolated_chain_states():
+                interleave_steps([snapshot_steps(symbol) for symbol in symbols])
+
+        # 稳定排序：同一时刻保持symbols顺序（与引擎信号合并顺序一致）
+        self.snapshots.sort(key=lambda snap: snap.timestamp)
+
+        logger.info(
+            f"✅ 因子快照完成: {len(self.snapshots)}个快照, "
+            f"{len(symbols)}个交易对, 耗时{time.time() - build_start:.1f}秒"
+        )
+        return self
+
+    def _build_event_feed(self, symbol: str, interval: str) -> SymbolEventFeed:
+        """构建单个symbol的事件源（主周期回看长度使用lookback_bars）"""
+        klines_by_interval = {interval: self.preloaded_data.get(symbol, [])}
+        for mtf_interval, klines_by_symbol in self.preloaded_data.get("_mtf_klines", {}).items():
+            if mtf_interval != interval:
+                klines_by_interval[mtf_interval] = klines_by_symbol.get(symbol, [])
+
+        return SymbolEventFeed(
+            symbol=symbol,
+            primary_interval=interval,
+            interval_to_ms=self.data_loader._interval_to_ms,
+            klines_by_interval=klines_by_interval,
+            btc_klines=self.preloaded_data.get("BTCUSDT", []),
+            oi_data=self.preloaded_data.get("_oi_data", {}).get(symbol, []),
+            funding_data=self.preloaded_data.get("_funding_data", {}).get(symbol, []),
+            lookback_bars=dict(self.mtf_lookback_bars, **{interval: self.lookback_bars})
+        )
+
+    def get_klines(self, snapshot: DecisionSnapshot) -> List[Dict]:
+        """获取快照对应的K线切片（与引擎传入四步系统的K线一致）"""
+        return self.preloaded_data.get(snapshot.symbol, [])[snapshot.kline_start:snapshot.kline_end]
+
+    def save(self, path: str) -> None:
+        """
+        保存缓存到文件（gzip + pickle）
+
+        Args:
+            path: 文件路径（如 data/backtest_cache/factor_cache_eth.pkl.gz）
+        """
+        cache_file = Path(path)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "config": self.config,
+            "symbols": self.symbols,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "interval": self.interval,
+            "preloaded_data": self.preloaded_data,
+            "snapshots": self.snapshots,
+        }
+        with gzip.open(cache_file, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        logger.info(f"因子快照已保存: {cache_file} ({len(self.snapshots)}个快照)")
+
+    @classmethod
+    def load(cls, path: str) -> "FactorCache":
+        """
+        从文件加载缓存
+
+        Args:
+            path: save()写出的文件路径
+
+        Returns:
+            FactorCache实例
+        """
+        with gzip.open(path, "rb") as f:
+            payload = pickle.load(f)
+
+        cache = cls(payload.get("config", {}))
+        cache.symbols = payload["symbols"]
+        cache.start_time = payload["start_time"]
+        cache.end_time = payload["end_time"]
+        cache.interval = payload["interval"]
+        cache.preloaded_data = payload["preloaded_data"]
+        cache.snapshots = payload["snapshots"]
+        return cache
+
+    def window(self, start_time: int, end_time: int) -> "FactorCache":
+        """
+        时间窗口视图（共享K线数据，只筛选快照）
+
+        Args:
+            start_time: 窗口开始（毫秒，含）
+            end_time: 窗口结束（毫秒，含）
+
+        Returns:
+            新FactorCache，snapshots限定在[start_time, end_time]，撮合时间范围同窗口
+        """
+        view = FactorCache(self.config)
+        view.symbols = self.symbols
+        view.interval = self.interval
+        view.preloaded_data = self.preloaded_data
+        view.start_time = start_time
+        view.end_time = end_time
+        view.snapshots = [s for s in self.snapshots if start_time <= s.timestamp <= end_time]
+        return view
+
+    def save_mmap(self, directory: str) -> None:
+        """
+        保存为内存映射布局（供多进程只读共享）
+
+        Args:
+            directory: 输出目录
+        """
+        out_dir = Path(directory)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        for symbol in self._kline_symbols():
+            klines = self.preloaded_data.get(symbol, [])
+            array = klines.array if isinstance(klines, KlineArray) else KlineArray.from_dicts(klines).array
+            np.save(out_dir / f"klines_{symbol}.npy", array)
+
+        ordered = sorted(self.snapshots, key=lambda s: s.timestamp)  # 稳定排序，保持symbol顺序
+        index = np.empty((len(ordered) + 1, 2), dtype=np.int64)
+        offset = 0
+        with open(out_dir / "snapshots.bin", "wb") as f:
+            for i, snapshot in enumerate(ordered):
+                blob = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+                index[i] = (snapshot.timestamp, offset)
+                f.write(blob)
+                offset += len(blob)
+        index[len(ordered)] = (np.iinfo(np.int64).max, offset)
+        np.save(out_dir / "snapshot_index.npy", index)
+
+        with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "config": self.config,
+                "symbols": self.symbols,
+                "kline_symbols": self._kline_symbols(),
+                "start_time": self.start_time,
+                "end_time": self.end_time,
+                "interval": self.interval,
+                "total_snapshots": len(ordered),
+            }, f, indent=2, ensure_ascii=False)
+
+        logger.info(f"因子快照已保存（内存映射布局）: {out_dir} ({len(ordered)}个快照)")
+
+    @classmethod
+    def open_mmap(
+        cls,
+        directory: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> "FactorCache":
+        """
+        以内存映射方式打开（K线只读共享，快照按时间窗口反序列化）
+
+        Args:
+            directory: save_mmap()输出目录
+            start_time: 可选，只加载该时间（含）之后的快照
+            end_time: 可选，只加载该时间（含）之前的快照
+
+        Returns:
+            FactorCache实例（start_time/end_time为请求窗口）
+        """
+        in_dir = Path(directory)
+        with open(in_dir / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        cache = cls(meta.get("config", {}))
+        cache.symbols = meta["symbols"]
+        cache.interval = meta["interval"]
+        cache.start_time = meta["start_time"] if start_time is None else start_time
+        cache.end_time = meta["end_time"] if end_time is None else end_time
+
+        for symbol in meta.get("kline_symbols", cache.symbols):
+            array = np.load(in_dir / f"klines_{symbol}.npy", mmap_mode="r")
+            cache.preloaded_data[symbol] = KlineArray(array)
+
+        index = np.load(in_dir / "snapshot_index.npy", mmap_mode="r")
+        timestamps = index[:-1, 0]
+        first = int(np.searchsorted(timestamps, cache.start_time, side="left"))
+        last = int(np.searchsorted(timestamps, cache.end_time, side="right"))
+
+        if last > first:
+            with open(in_dir / "snapshots.bin", "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as blob:
+                    cache.snapshots = [
+                        pickle.loads(blob[int(index[i, 1]):int(index[i + 1, 1])])
+                        for i in range(first, last)
+                    ]
+        return cache
+
+    def _kline_symbols(self) -> List[str]:
+        """需要保存K线的symbol（回测symbol + BTCUSDT对齐基准）"""
+        return [
+            key for key, value in self.preloaded_data.items()
+            if not key.startswith("_") and isinstance(value, (list, KlineArray))
+        ]
+
@@ -0,0 +1,103 @@
+# coding: utf-8
+"""
+Backtest Framework v1.9 - Intra-bar Path Resolution
+回测框架 - 低周期K线路径解析（SL/TP首次触达定位）
+
+功能：
+1. 低周期K线（1m/5m等）转换为numpy数组（开盘时间/最高价/最低价）
+2. 向量化首次触达查找：价格区间内第一根触及入场价/SL/TP的K线
+3. 时间区间 → K线索引区间（二分查找）
+
+用途：
+- BacktestEngine在配置intrabar_interval后，每个信号直接从入场定位到离场事件，
+  不再逐小时轮询持仓；同一小时内SL/TP同时触发的情况按真实先后顺序解析
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+from __future__ import annotations
+
+from typing import Any, List
+
+import numpy as np
+
+
+class IntrabarSeries:
+    """
+    单个symbol的低周期K线数组（只保留路径解析所需字段）
+
+    Attributes:
+        interval_ms: K线周期（毫秒）
+        open_times: 开盘时间（int64，升序）
+        highs: 最高价（float64）
+        lows: 最低价（float64）
+    """
+
+    def __init__(self, klines: Any, interval_ms: int):
+        """
+        Args:
+            klines: K线字典列表，或带有结构化数组的KlineArray（.array）
+            interval_ms: K线周期（毫秒）
+        """
+        self.interval_ms = interval_ms
+
+        array = getattr(klines, "array", None)
+        if array is not None:
+            self.open_times = np.asarray(array["timestamp"], dtype=np.int64)
+            self.highs = np.asarray(array["high"], dtype=np.float64)
+            self.lows = np.asarray(array["low"], dtype=np.float64)
+        else:
+            self.open_times = np.fromiter((k["timestamp"] for k in klines), dtype=np.int64, count=len(klines))
+            self.highs = np.fromiter((k["high"] for k in klines), dtype=np.float64, count=len(klines))
+            self.lows = np.fromiter((k["low"] for k in klines), dtype=np.float64, count=len(klines))
+
+    def __len__(self) -> int:
+        return len(self.open_times)
+
+    def index_at(self, open_time: int) -> int:
+        """第一根开盘时间 >= open_time 的K线索引"""
+        return int(np.searchsorted(self.open_times, open_time, side="left"))
+
+    def end_index(self, close_time: int) -> int:
+        """收盘时间 <= close_time 的K线数量（用作区间右端，不含）"""
+        return int(np.searchsorted(self.open_times, close_time - self.interval_ms, side="right"))
+
+    def close_time(self, index: int) -> int:
+        """K线收盘时间（毫秒，与回测主循环的时间步对齐方式一致）"""
+        return int(self.open_times[index]) + self.interval_ms
+
+    def mid_price(self, index: int) -> float:
+        """K线中间价 (high + low) / 2"""
+        return float((self.highs[index] + self.lows[index]) / 2)
+
+    def first_in_range(self, price: float, start: int, end: int) -> int:
+        """[start, end)内第一根 low <= price <= high 的K线索引，未找到返回-1"""
+        if start >= end:
+            return -1
+        mask = (self.lows[start:end] <= price) & (self.highs[start:end] >= price)
+        return _first_true(mask, start)
+
+    def first_at_or_below(self, price: float, start: int, end: int) -> int:
+        """[start, end)内第一根 low <= price 的K线索引，未找到返回-1"""
+        if start >= end:
+            return -1
+        return _first_true(self.lows[start:end] <= price, start)
+
+    def first_at_or_above(self, price: float, start: int, end: int) -> int:
+        """[start, end)内第一根 high >= price 的K线索引，未找到返回-1"""
+        if start >= end:
+            return -1
+        return _first_true(self.highs[start:end] >= price, start)
+
+
+def earliest(candidates: List[int]) -> int:
+    """多个首次触达索引中最早的一个（忽略-1），全部未触达返回-1"""
+    hits = [i for i in candidates if i >= 0]
+    return min(hits) if hits else -1
+
+
+def _first_true(mask: np.ndarray, offset: int) -> int:
+    """布尔数组第一个True的位置（加上偏移），全False返回-1"""
+    idx = int(np.argmax(mask))
+    return offset + idx if mask[idx] else -1
@@ -9,6 +9,7 @@ Backtest Framework v1.0 - Performance Metrics
 3. 组合级指标（Sharpe、Sortino、最大回撤）
 4. 分布分析（PnL直方图、持仓时长分布）
 5. 报告生成（JSON/Markdown/CSV格式）
+6. 流式/向量化计算（create_accumulator / calculate_all_metrics_vectorized）[v2.1新增]
 
 Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
 Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
@@ -174,6 +175,33 @@ class BacktestMetrics:
         logger.info("✅ 指标计算完成")
         return report
 
+    def calculate_all_metrics_vectorized(self, backtest_result: BacktestResult) -> MetricsReport:
+        """
+        计算所有指标（v2.1 NumPy批量路径，结果与calculate_all_metrics一致）
+
+        适用于大规模交易集（参数扫描、事后报告）
+
+        Args:
+            backtest_result: 回测结果
+
+        Returns:
+            完整指标报告
+        """
+        accumulator = self.create_accumulator()
+        accumulator.update_batch(backtest_result.signals)
+        accumulator.update_rejected_batch(backtest_result.rejected_analyses)
+        return accumulator.report()
+
+    def create_accumulator(self) -> "MetricsAccumulator":
+        """
+        创建流式指标累加器（v2.1新增：逐笔O(1)更新，report()与calculate_all_metrics一致）
+
+        Returns:
+            MetricsAccumulator
+        """
+        from ats_core.backtest.metrics_accumulator import MetricsAccumulator
+        return MetricsAccumulator(self)
+
     def calculate_signal_metrics(self, signals: List[SimulatedSignal]) -> SignalMetrics:
         """
         计算信号级指标
@@ -309,25 +337,28 @@ class BacktestMetrics:
 
         # 统计各步骤的通过数量
         # Step1通过 = ACCEPT + 在Step2/3/4被拒绝的REJECT
-        step1_pass_count = accept_count + sum(
-            1 for r in rejected_analyses if r.step1_passed
-        )
-
         # Step2通过 = ACCEPT + 在Step3/4被拒绝的REJECT
-        step2_pass_count = accept_count + sum(
-            1 for r in rejected_analyses if r.step2_passed
-        )
-
         # Step3通过 = ACCEPT + 在Step4被拒绝的REJECT
-        step3_pass_count = accept_count + sum(
-            1 for r in rejected_analyses if r.step3_passed
-        )
-
         # Step4通过 = ACCEPT
-        step4_pass_count = accept_count + sum(
-            1 for r in rejected_analyses if r.step4_passed
+        return self._step_metrics_from_counts(
+            total_analyses,
+            accept_count,
+            accept_count + sum(1 for r in rejected_analyses if r.step1_passed),
+            accept_count + sum(1 for r in rejected_analyses if r.step2_passed),
+            accept_count + sum(1 for r in rejected_analyses if r.step3_passed),
+            accept_count + sum(1 for r in rejected_analyses if r.step4_passed)
         )
 
+    def _step_metrics_from_counts(
+        self,
+        total_analyses: int,
+        accept_count: int,
+        step1_pass_count: int,
+        step2_pass_count: int,
+        step3_pass_count: int,
+        step4_pass_count: int
+    ) -> StepMetrics:
+        """由各步骤通过数量计算通过率（条件概率）与瓶颈步骤"""
         # 计算通过率（条件概率）
         step1_rate = (step1_pass_count / total_analyses * 100) if total_analyses > 0 else 0.0
         step2_rate = (step2_pass_count / step1_pass_count * 100) if step1_pass_count > 0 else 0.0
@@ -532,8 +563,12 @@ class BacktestMetrics:
         if not pnl_list or len(pnl_list) < 2:
             return 0.0
 
-        mean_return = mean(pnl_list) / 100  # 转换为小数
-        std_return = stdev(pnl_list) / 100
+        return self._sharpe_from_moments(mean(pnl_list), stdev(pnl_list))
+
+    def _sharpe_from_moments(self, mean_pnl: float, std_pnl: float) -> float:
+        """由PnL百分比均值/标准差计算年化Sharpe（流式累加器共用）"""
+        mean_return = mean_pnl / 100  # 转换为小数
+        std_return = std_pnl / 100
 
         if std_return == 0:
             return 0.0
@@ -559,17 +594,20 @@ class BacktestMetrics:
         if not pnl_list or len(pnl_list) < 2:
             return 0.0
 
-        mean_return = mean(pnl_list) / 100
         downside_returns = [p / 100 for p in pnl_list if p < 0]
 
         if not downside_returns:
             return 0.0
 
         downside_std = stdev(downside_returns) if len(downside_returns) > 1 else 0.0
+        return self._sortino_from_moments(mean(pnl_list), downside_std)
 
+    def _sortino_from_moments(self, mean_pnl: float, downside_std: float) -> float:
+        """由PnL百分比均值与下行收益（小数）标准差计算年化Sortino（流式累加器共用）"""
         if downside_std == 0:
             return 0.0
 
+        mean_return = mean_pnl / 100
         sortino = (mean_return - self.risk_free_rate / 252) / downside_std * math.sqrt(252)
         return sortino
 
@@ -674,7 +712,10 @@ class BacktestMetrics:
         """
         gross_profit = sum(p for p in pnl_list if p > 0)
         gross_loss = abs(sum(p for p in pnl_list if p < 0))
+        return self._profit_factor_from_sums(gross_profit, gross_loss)
 
+    def _profit_factor_from_sums(self, gross_profit: float, gross_loss: float) -> float:
+        """由总盈利/总亏损（绝对值）计算盈亏因子（流式累加器共用）"""
         if gross_loss == 0:
             return 0.0 if gross_profit == 0 else float('inf')
 
@@ -0,0 +1,579 @@
+# coding: utf-8
+"""
+Backtest Framework v2.1 - Streaming / Vectorized Metrics Accumulator
+回测框架 - 流式/向量化指标累加器
+
+功能：
+1. 流式累加：update(signal)每笔交易O(1)（运行矩、运行峰值与回撤、流式直方图）
+2. 向量化批量：update_batch(signals)以NumPy数组一次性折叠整批交易
+3. report()输出与BacktestMetrics.calculate_all_metrics逐位一致的MetricsReport
+
+一致性保证:
+- 均值/标准差：与statistics.mean/stdev相同的精确有理数部分和（按分母分组），最终正确舍入
+- 总盈亏/总盈利/资金曲线：与原实现相同的从左到右浮点累加（np.cumsum为顺序累加）
+- 最大并发头寸：事件按时间稳定排序（与list.sort相同的同时刻次序）
+- 中位数：保存紧凑float64数组，结束时排序取中位（与statistics.median相同的取值方式）
+
+使用约束:
+- 交易须按BacktestResult.signals的顺序输入（连续盈亏、回撤与顺序有关）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import operator
+import sys
+import time
+from array import array
+from collections import defaultdict
+from fractions import Fraction
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ats_core.backtest.engine import RejectedAnalysis, SimulatedSignal
+from ats_core.backtest.metrics import (
+    DistributionMetrics,
+    MetricsReport,
+    PortfolioMetrics,
+    SignalMetrics,
+    StepMetrics,
+)
+
+if TYPE_CHECKING:
+    from ats_core.backtest.metrics import BacktestMetrics
+
+logger = logging.getLogger(__name__)
+
+_SQRT_BIT_WIDTH = 2 * sys.float_info.mant_dig + 3
+_INITIAL_CAPITAL = 1000.0  # 与BacktestMetrics._calculate_max_drawdown一致
+
+
+class ExactMoments:
+    """
+    精确一阶/二阶矩（与statistics.mean/stdev逐位一致）
+
+    以 {分母: 分子和} 保存Σx与Σx²的精确有理数部分和；浮点数的分母均为2的幂，
+    分组数很少，单次更新O(1)
+    """
+
+    __slots__ = ("count", "_sx", "_sxx")
+
+    def __init__(self):
+        self.count = 0
+        self._sx: Dict[int, int] = defaultdict(int)
+        self._sxx: Dict[int, int] = defaultdict(int)
+
+    def add(self, value: float) -> None:
+        """累加单个值"""
+        n, d = value.as_integer_ratio()
+        self.count += 1
+        self._sx[d] += n
+        self._sxx[d] += n * n
+
+    def add_array(self, values: np.ndarray) -> None:
+        """
+        向量化累加（按二进制指数分组，每组分子用Python整数求和，无溢出）
+
+        Args:
+            values: float64数组（有限值）
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        mantissa, exponent = np.frexp(values)
+        numerators = (mantissa * (1 << 53)).astype(np.int64)
+        exponent = exponent.astype(np.int64) - 53
+
+        self.count += int(values.size)
+        for exp in np.unique(exponent):
+            group = numerators[exponent == exp].tolist()
+            if exp >= 0:
+                scale = 1 << int(exp)
+                self._sx[1] += sum(group) * scale
+                self._sxx[1] += sum(map(operator.mul, group, group)) * scale * scale
+            else:
+                denominator = 1 << int(-exp)
+                self._sx[denominator] += sum(group)
+                self._sxx[denominator] += sum(map(operator.mul, group, group))
+
+    def mean(self) -> float:
+        """均值（等价于statistics.mean）"""
+        return float(self._exact_sum() / self.count)
+
+    def stdev(self) -> float:
+        """样本标准差（等价于statistics.stdev，要求count >= 2）"""
+        sx = self._exact_sum()
+        sxx = sum(Fraction(n, d * d) for d, n in self._sxx.items())
+        ssd = (self.count * sxx - sx * sx) / self.count
+        mss = ssd / (self.count - 1)
+        return _float_sqrt_of_frac(mss.numerator, mss.denominator)
+
+    def _exact_sum(self) -> Fraction:
+        return sum((Fraction(n, d) for d, n in self._sx.items()), Fraction(0))
+
+
+class MetricsAccumulator:
+    """
+    回测指标累加器
+
+    用法:
+        acc = metrics.create_accumulator()
+        for signal in result.signals:         # 流式（O(1)/笔）
+            acc.update(signal)
+        acc.update_batch(more_signals)        # 或向量化批量
+        report = acc.report()                 # == metrics.calculate_all_metrics(result)
+    """
+
+    def __init__(self, metrics: "BacktestMetrics"):
+        """
+        Args:
+            metrics: BacktestMetrics实例（提供分箱配置与Sharpe/Sortino/盈亏因子公式）
+        """
+        self.metrics = metrics
+        self.pnl_bins = list(metrics.pnl_histogram_bins)
+        self.holding_bins = list(metrics.holding_time_bins)
+        self._pnl_labels = [_bin_label(i, self.pnl_bins, "%") for i in range(len(self.pnl_bins) + 1)]
+        self._holding_labels = [
+            _bin_label(i, self.holding_bins, "h") for i in range(len(self.holding_bins) + 1)
+        ]
+
+        # 信号级
+        self.total_signals = 0
+        self.win_count = 0
+        self.loss_count = 0
+        self.pnl_moments = ExactMoments()
+        self.pnl_values = array("d")
+        self.max_pnl = -math.inf
+        self.min_pnl = math.inf
+        self.rr_moments = ExactMoments()
+        self.current_wins = 0
+        self.max_consecutive_wins = 0
+        self.current_losses = 0
+        self.max_consecutive_losses = 0
+        self.holding_moments = ExactMoments()
+        self.holding_values = array("d")
+
+        # 组合级
+        self.total_pnl_usdt = 0
+        self.gross_profit = 0
+        self.gross_loss = 0
+        self.downside_moments = ExactMoments()
+        self.equity = _INITIAL_CAPITAL
+        self.equity_peak = _INITIAL_CAPITAL
+        self.max_drawdown = 0.0
+        self.event_times = array("q")
+        self.event_deltas = array("b")
+        self.min_timestamp: Optional[int] = None
+        self.max_timestamp: Optional[int] = None
+
+        # 分布
+        self.pnl_histogram: Dict[str, int] = {}
+        self.holding_histogram: Dict[str, int] = {}
+        self.direction_count = {"long": 0, "short": 0}
+        self.direction_wins = {"long": 0, "short": 0}
+        self.direction_moments = {"long": ExactMoments(), "short": ExactMoments()}
+
+        # 步骤级
+        self.rejected_count = 0
+        self.rejected_step_passes = [0, 0, 0, 0]
+
+    # ==================== 流式输入 ====================
+
+    def update(self, signal: SimulatedSignal) -> None:
+        """累加单笔交易（按BacktestResult.signals顺序调用）"""
+        pnl = signal.pnl_percent
+        self.total_signals += 1
+
+        self.pnl_moments.add(pnl)
+        self.pnl_values.append(pnl)
+        if pnl > self.max_pnl:
+            self.max_pnl = pnl
+        if pnl < self.min_pnl:
+            self.min_pnl = pnl
+
+        if pnl > 0:
+            self.win_count += 1
+            self.gross_profit += pnl
+            self.current_wins += 1
+            self.max_consecutive_wins = max(self.max_consecutive_wins, self.current_wins)
+        else:
+            self.current_wins = 0
+        if pnl < 0:
+            self.loss_count += 1
+            self.gross_loss += pnl
+            self.downside_moments.add(pnl / 100)
+            self.current_losses += 1
+            self.max_consecutive_losses = max(self.max_consecutive_losses, self.current_losses)
+        else:
+            self.current_losses = 0
+
+        risk = abs(signal.entry_price_actual - signal.stop_loss_actual)
+        if risk > 0 and pnl > 0:
+            self.rr_moments.add(abs(signal.exit_price - signal.entry_price_actual) / risk)
+
+        if signal.holding_hours > 0:
+            self.holding_moments.add(signal.holding_hours)
+            self.holding_values.append(signal.holding_hours)
+            _bump(self.holding_histogram, self._holding_labels[bisect.bisect_right(self.holding_bins, signal.holding_hours)])
+        _bump(self.pnl_histogram, self._pnl_labels[bisect.bisect_right(self.pnl_bins, pnl)])
+
+        # 资金曲线（运行峰值与回撤）
+        self.total_pnl_usdt += signal.pnl_usdt
+        self.equity = self.equity + signal.pnl_usdt
+        if self.equity > self.equity_peak:
+            self.equity_peak = self.equity
+        drawdown = (
+            (self.equity_peak - self.equity) / self.equity_peak * 100
+            if self.equity_peak > 0 else 0.0
+        )
+        self.max_drawdown = max(self.max_drawdown, drawdown)
+
+        # 并发头寸事件与时间范围
+        self.event_times.append(signal.timestamp)
+        self.event_deltas.append(1)
+        if signal.exit_time > 0:
+            self.event_times.append(signal.exit_time)
+            self.event_deltas.append(-1)
+        if self.min_timestamp is None or signal.timestamp < self.min_timestamp:
+            self.min_timestamp = signal.timestamp
+        if self.max_timestamp is None or signal.timestamp > self.max_timestamp:
+            self.max_timestamp = signal.timestamp
+
+        if signal.side in self.direction_count:
+            self.direction_count[signal.side] += 1
+            self.direction_wins[signal.side] += pnl > 0
+            self.direction_moments[signal.side].add(pnl)
+
+    def update_rejected(self, rejected: RejectedAnalysis) -> None:
+        """累加单条REJECT分析（步骤通过率）"""
+        self.rejected_count += 1
+        for i, passed in enumerate(
+            (rejected.step1_passed, rejected.step2_passed, rejected.step3_passed, rejected.step4_passed)
+        ):
+            self.rejected_step_passes[i] += bool(passed)
+
+    # ==================== 向量化输入 ====================
+
+    def update_batch(self, signals: Sequence[SimulatedSignal]) -> None:
+        """
+        向量化累加一批交易（结果与逐笔update()相同）
+
+        Args:
+            signals: 交易列表（按BacktestResult.signals顺序）
+        """
+        n = len(signals)
+        if n == 0:
+            return
+
+        pnl = np.fromiter((s.pnl_percent for s in signals), dtype=np.float64, count=n)
+        pnl_usdt = np.fromiter((s.pnl_usdt for s in signals), dtype=np.float64, count=n)
+        holding = np.fromiter((s.holding_hours for s in signals), dtype=np.float64, count=n)
+        entry = np.fromiter((s.entry_price_actual for s in signals), dtype=np.float64, count=n)
+        stop = np.fromiter((s.stop_loss_actual for s in signals), dtype=np.float64, count=n)
+        exit_price = np.fromiter((s.exit_price for s in signals), dtype=np.float64, count=n)
+        timestamps = np.fromiter((s.timestamp for s in signals), dtype=np.int64, count=n)
+        exit_times = np.fromiter((s.exit_time for s in signals), dtype=np.int64, count=n)
+        sides = np.array([s.side for s in signals], dtype=object)
+
+        wins = pnl > 0
+        losses = pnl < 0
+        self.total_signals += n
+        self.win_count += int(wins.sum())
+        self.loss_count += int(losses.sum())
+
+        self.pnl_moments.add_array(pnl)
+        self.pnl_values.frombytes(pnl.tobytes())
+        # 相等时保留先出现的值（与内置max/min一致，区分±0.0）
+        batch_max = float(pnl[np.argmax(pnl)])
+        batch_min = float(pnl[np.argmin(pnl)])
+        if batch_max > self.max_pnl:
+            self.max_pnl = batch_max
+        if batch_min < self.min_pnl:
+            self.min_pnl = batch_min
+
+        self.current_wins, self.max_consecutive_wins = _fold_runs(
+            wins, self.current_wins, self.max_consecutive_wins
+        )
+        self.current_losses, self.max_consecutive_losses = _fold_runs(
+            losses, self.current_losses, self.max_consecutive_losses
+        )
+
+        # 顺序累加（np.cumsum逐元素从左到右，与sum()/循环累加结果一致）
+        self.gross_profit = _sequential_sum(self.gross_profit, pnl[wins])
+        self.gross_loss = _sequential_sum(self.gross_loss, pnl[losses])
+        self.downside_moments.add_array(pnl[losses] / 100)
+
+        risk = np.abs(entry - stop)
+        rr_mask = (risk > 0) & wins
+        self.rr_moments.add_array(np.abs(exit_price[rr_mask] - entry[rr_mask]) / risk[rr_mask])
+
+        held = holding[holding > 0]
+        self.holding_moments.add_array(held)
+        self.holding_values.frombytes(held.tobytes())
+        _merge_histogram(self.holding_histogram, held, self.holding_bins, "h")
+        _merge_histogram(self.pnl_histogram, pnl, self.pnl_bins, "%")
+
+        # 资金曲线
+        self.total_pnl_usdt = _sequential_sum(self.total_pnl_usdt, pnl_usdt)
+        equity = np.cumsum(np.concatenate(([self.equity], pnl_usdt)))[1:]
+        peaks = np.maximum.accumulate(np.concatenate(([self.equity_peak], equity)))[1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdowns = np.where(peaks > 0, (peaks - equity) / peaks * 100, 0.0)
+        self.max_drawdown = max(self.max_drawdown, float(drawdowns.max()))
+        self.equity = float(equity[-1])
+        self.equity_peak = float(peaks[-1])
+
+        # 并发头寸事件（每笔：入场，[离场]）
+        has_exit = exit_times > 0
+        events = np.stack([timestamps, exit_times], axis=1).ravel()
+        deltas = np.tile(np.array([1, -1], dtype=np.int8), n)
+        keep = np.stack([np.ones(n, dtype=bool), has_exit], axis=1).ravel()
+        self.event_times.frombytes(events[keep].astype(np.int64).tobytes())
+        self.event_deltas.frombytes(deltas[keep].tobytes())
+        batch_min, batch_max = int(timestamps.min()), int(timestamps.max())
+        self.min_timestamp = batch_min if self.min_timestamp is None else min(self.min_timestamp, batch_min)
+        self.max_timestamp = batch_max if self.max_timestamp is None else max(self.max_timestamp, batch_max)
+
+        for side in ("long", "short"):
+            side_mask = sides == side
+            self.direction_count[side] += int(side_mask.sum())
+            self.direction_wins[side] += int((wins & side_mask).sum())
+            self.direction_moments[side].add_array(pnl[side_mask])
+
+    def update_rejected_batch(self, rejected_analyses: Iterable[RejectedAnalysis]) -> None:
+        """批量累加REJECT分析"""
+        for rejected in rejected_analyses:
+            self.update_rejected(rejected)
+
+    # ==================== 输出 ====================
+
+    def report(self) -> MetricsReport:
+        """生成指标报告（与BacktestMetrics.calculate_all_metrics一致）"""
+        if self.total_signals < self.metrics.min_signals_for_stats:
+            logger.warning(
+                f"信号数量不足（{self.total_signals} < {self.metrics.min_signals_for_stats}），"
+                f"统计指标可能不可靠"
+            )
+
+        report = MetricsReport(
+            signal_metrics=self.signal_metrics(),
+            step_metrics=self.step_metrics(),
+            portfolio_metrics=self.portfolio_metrics(),
+            distribution_metrics=self.distribution_metrics(),
+            timestamp_generated=int(time.time() * 1000)
+        )
+
+        logger.info("✅ 指标计算完成")
+        return report
+
+    def signal_metrics(self) -> SignalMetrics:
+        """信号级指标"""
+        n = self.total_signals
+        if n == 0:
+            return SignalMetrics(
+                total_signals=0, win_count=0, loss_count=0, win_rate=0.0,
+                avg_pnl_percent=0.0, median_pnl_percent=0.0, max_pnl_percent=0.0,
+                min_pnl_percent=0.0, std_pnl_percent=0.0, avg_rr_ratio=0.0,
+                max_consecutive_wins=0, max_consecutive_losses=0,
+                avg_holding_hours=0.0, median_holding_hours=0.0
+            )
+
+        holding_count = self.holding_moments.count
+        return SignalMetrics(
+            total_signals=n,
+            win_count=self.win_count,
+            loss_count=self.loss_count,
+            win_rate=round(self.win_count / n * 100, 2),
+            avg_pnl_percent=round(self.pnl_moments.mean(), 2),
+            median_pnl_percent=round(_median(self.pnl_values), 2),
+            max_pnl_percent=round(self.max_pnl, 2),
+            min_pnl_percent=round(self.min_pnl, 2),
+            std_pnl_percent=round(self.pnl_moments.stdev() if n > 1 else 0.0, 2),
+            avg_rr_ratio=round(self.rr_moments.mean() if self.rr_moments.count else 0.0, 2),
+            max_consecutive_wins=self.max_consecutive_wins,
+            max_consecutive_losses=self.max_consecutive_losses,
+            avg_holding_hours=round(self.holding_moments.mean() if holding_count else 0.0, 2),
+            median_holding_hours=round(_median(self.holding_values) if holding_count else 0.0, 2)
+        )
+
+    def step_metrics(self) -> StepMetrics:
+        """步骤级指标"""
+        accept_count = self.total_signals
+        total_analyses = accept_count + self.rejected_count
+
+        if total_analyses == 0:
+            return StepMetrics(0.0, 0.0, 0.0, 0.0, 0.0, 1)
+
+        if self.rejected_count == 0:
+            logger.info(
+                "Step metrics: 无REJECT分析记录，使用v1.0模式（所有通过率100%）"
+            )
+            return StepMetrics(100.0, 100.0, 100.0, 100.0, 100.0, 1)
+
+        return self.metrics._step_metrics_from_counts(
+            total_analyses,
+            accept_count,
+            *(accept_count + passes for passes in self.rejected_step_passes)
+        )
+
+    def portfolio_metrics(self) -> PortfolioMetrics:
+        """组合级指标"""
+        n = self.total_signals
+        if n == 0:
+            return PortfolioMetrics(
+                sharpe_ratio=0.0, sortino_ratio=0.0, max_drawdown_percent=0.0,
+                max_concurrent_positions=0, avg_trades_per_day=0.0, profit_factor=0.0,
+                total_pnl_usdt=0.0, total_pnl_percent=0.0
+            )
+
+        mean_pnl = self.pnl_moments.mean()
+        sharpe = self.metrics._sharpe_from_moments(mean_pnl, self.pnl_moments.stdev()) if n >= 2 else 0.0
+
+        sortino = 0.0
+        if n >= 2 and self.downside_moments.count:
+            downside_std = self.downside_moments.stdev() if self.downside_moments.count > 1 else 0.0
+            sortino = self.metrics._sortino_from_moments(mean_pnl, downside_std)
+
+        duration_days = (self.max_timestamp - self.min_timestamp) / (1000 * 3600 * 24)
+        if duration_days < 1:
+            duration_days = 1  # 至少1天
+
+        return PortfolioMetrics(
+            sharpe_ratio=round(sharpe, 2),
+            sortino_ratio=round(sortino, 2),
+            max_drawdown_percent=round(self.max_drawdown, 2),
+            max_concurrent_positions=self._max_concurrent_positions(),
+            avg_trades_per_day=round(n / duration_days, 2),
+            profit_factor=round(
+                self.metrics._profit_factor_from_sums(self.gross_profit, abs(self.gross_loss)), 2
+            ),
+            total_pnl_usdt=round(self.total_pnl_usdt, 2),
+            total_pnl_percent=round(mean_pnl, 2)
+        )
+
+    def distribution_metrics(self) -> DistributionMetrics:
+        """分布分析指标"""
+        if self.total_signals == 0:
+            return DistributionMetrics(
+                pnl_histogram={}, holding_time_histogram={},
+                win_rate_by_direction={}, avg_pnl_by_direction={}
+            )
+
+        win_rate_by_dir = {}
+        avg_pnl_by_dir = {}
+        for side in ("long", "short"):
+            count = self.direction_count[side]
+            win_rate_by_dir[side] = self.direction_wins[side] / count * 100 if count else 0.0
+            avg_pnl_by_dir[side] = self.direction_moments[side].mean() if count else 0.0
+
+        return DistributionMetrics(
+            pnl_histogram=dict(self.pnl_histogram),
+            holding_time_histogram=dict(self.holding_histogram),
+            win_rate_by_direction={k: round(v, 2) for k, v in win_rate_by_dir.items()},
+            avg_pnl_by_direction={k: round(v, 2) for k, v in avg_pnl_by_dir.items()}
+        )
+
+    # ==================== Private Methods ====================
+
+    def _max_concurrent_positions(self) -> int:
+        """事件按时间稳定排序后累加（同时刻保持输入次序，与list.sort一致）"""
+        if not self.event_times:
+            return 0
+        times = np.frombuffer(self.event_times, dtype=np.int64)
+        deltas = np.frombuffer(self.event_deltas, dtype=np.int8).astype(np.int64)
+        order = np.argsort(times, kind="stable")
+        return max(0, int(np.cumsum(deltas[order]).max()))
+
+
+# ==================== 工具函数 ====================
+
+def _bump(histogram: Dict[str, int], label: str) -> None:
+    histogram[label] = histogram.get(label, 0) + 1
+
+
+def _bin_label(index: int, bins: List[float], unit: str) -> str:
+    """分箱标签（与BacktestMetrics._find_bin_label一致：index为第一个 value < edge 的位置）"""
+    if index == 0:
+        return f"<{bins[0]}{unit}"
+    if index < len(bins):
+        return f"{bins[index - 1]}-{bins[index]}{unit}"
+    return f">{bins[-1]}{unit}"
+
+
+def _merge_histogram(histogram: Dict[str, int], values: np.ndarray, bins: List[float], unit: str) -> None:
+    """向量化分箱并按首次出现顺序合并（保持与逐笔插入相同的键顺序）"""
+    if values.size == 0:
+        return
+    indices = np.searchsorted(np.asarray(bins, dtype=np.float64), values, side="right")
+    unique, first_seen, counts = np.unique(indices, return_index=True, return_counts=True)
+    for pos in np.argsort(first_seen, kind="stable"):
+        _bump_by(histogram, _bin_label(int(unique[pos]), bins, unit), int(counts[pos]))
+
+
+def _bump_by(histogram: Dict[str, int], label: str, count: int) -> None:
+    histogram[label] = histogram.get(label, 0) + count
+
+
+def _fold_runs(mask: np.ndarray, current: int, best: int) -> tuple[int, int]:
+    """
+    向量化最长连续True（承接上一批末尾的连续计数）
+
+    Returns:
+        (current, best): 本批结束时的连续计数、迄今最长连续
+    """
+    if mask.size == 0:
+        return current, best
+
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+
+    if lengths.size:
+        if starts[0] == 0:
+            lengths[0] += current  # 与上一批末尾相连
+        best = max(best, int(lengths.max()))
+    current = int(lengths[-1]) if lengths.size and ends[-1] == mask.size else 0
+    return current, best
+
+
+def _sequential_sum(start: float, values: np.ndarray) -> float:
+    """从左到右顺序累加（与Python逐个相加相同的舍入）"""
+    if values.size == 0:
+        return start
+    return float(np.cumsum(np.concatenate(([start], values)))[-1])
+
+
+def _median(values: array) -> float:
+    """中位数（与statistics.median相同：偶数个时取中间两数平均）"""
+    data = np.sort(np.frombuffer(values, dtype=np.float64))
+    n = data.size
+    i = n // 2
+    if n % 2 == 1:
+        return float(data[i])
+    return (float(data[i - 1]) + float(data[i])) / 2
+
+
+def _integer_sqrt_of_frac_rto(n: int, m: int) -> int:
+    """平方根整数部分（向奇数舍入，供正确舍入使用）"""
+    a = math.isqrt(n // m)
+    return a | (a * a * m != n)
+
+
+def _float_sqrt_of_frac(n: int, m: int) -> float:
+    """分数n/m的正确舍入平方根（与statistics.stdev相同的算法）"""
+    q = (n.bit_length() - m.bit_length() - _SQRT_BIT_WIDTH) // 2
+    if q >= 0:
+        numerator = _integer_sqrt_of_frac_rto(n, m << 2 * q) << q
+        denominator = 1
+    else:
+        numerator = _integer_sqrt_of_frac_rto(n << -2 * q, m)
+        denominator = 1 << -q
+    return numerator / denominator
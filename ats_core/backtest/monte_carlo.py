@@ -0,0 +1,362 @@
+# coding: utf-8
+"""
+Backtest Framework v2.2 - Monte Carlo Robustness Analysis
+回测框架 - 蒙特卡洛稳健性分析（交易序列重抽样）
+
+功能：
+1. 向量化重抽样：一次生成 (路径数 × 交易数) 的二维索引矩阵，按块处理控制内存
+2. 三种重抽样方式：
+   - bootstrap: 独立同分布有放回抽样（交易数不变）
+   - block: 循环块自助法（保留相邻交易的相关性，如连续止损）
+   - shuffle: 交易顺序随机置换（总收益/Sharpe不变，只检验路径依赖的回撤）
+3. 每条路径计算：总收益、最大回撤、Sharpe、是否破产
+4. 输出置信区间（分位数）与破产概率（Wilson区间）
+
+口径（与BacktestMetrics一致）:
+- 资金曲线：初始资本1000 USDT + 逐笔pnl_usdt累加（固定仓位）
+- 回撤：(峰值 - 权益) / 峰值 × 100，峰值包含初始资本
+- Sharpe：按pnl_percent逐笔计算，年化因子sqrt(252)，扣除risk_free_rate/252
+- 破产：权益曾跌至初始资本 × (1 - ruin_threshold_percent / 100) 及以下
+- 只使用已成交交易（entry_filled=True）
+
+性能：10000路径 × 5000笔交易 ≈ 数秒（单进程，块大小chunk_paths）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from dataclasses import dataclass, asdict
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ats_core.backtest.engine import BacktestResult, SimulatedSignal
+
+logger = logging.getLogger(__name__)
+
+RESAMPLING_METHODS = ("bootstrap", "block", "shuffle")
+
+
+@dataclass
+class ConfidenceInterval:
+    """
+    单个指标的蒙特卡洛分布摘要
+
+    Attributes:
+        observed: 原始交易顺序下的取值
+        lower: 下分位（(1 - confidence_level) / 2）
+        median: 中位数
+        upper: 上分位（(1 + confidence_level) / 2）
+        mean: 均值
+    """
+    observed: float
+    lower: float
+    median: float
+    upper: float
+    mean: float
+
+
+@dataclass
+class MonteCarloReport:
+    """
+    蒙特卡洛分析报告
+
+    包含:
+    - total_return_percent: 总收益（占初始资本%）区间
+    - max_drawdown_percent: 最大回撤（%）区间
+    - sharpe_ratio: 年化Sharpe区间
+    - risk_of_ruin: 破产概率（median为点估计，lower/upper为Wilson区间）
+    """
+    method: str
+    n_paths: int
+    n_trades: int
+    block_size: int
+    confidence_level: float
+    ruin_threshold_percent: float
+    total_return_percent: ConfidenceInterval
+    max_drawdown_percent: ConfidenceInterval
+    sharpe_ratio: ConfidenceInterval
+    risk_of_ruin: ConfidenceInterval
+    execution_time_seconds: float = 0.0
+
+    def to_dict(self) -> Dict:
+        """转换为字典（用于JSON序列化）"""
+        return asdict(self)
+
+
+class MonteCarloAnalyzer:
+    """
+    交易序列蒙特卡洛分析器
+
+    配置驱动（config/params.json -> backtest.monte_carlo）:
+    - n_paths: 重抽样路径数（默认10000）
+    - method: "bootstrap" | "block" | "shuffle"
+    - block_size: block模式块长度（0=自动，交易数的立方根）
+    - confidence_level: 置信水平（默认沿用metrics.confidence_level）
+    - initial_capital: 初始资本（USDT，与BacktestMetrics回撤口径一致）
+    - ruin_threshold_percent: 破产阈值（相对初始资本的亏损%）
+    - chunk_paths: 每块路径数（控制内存：chunk_paths × 交易数 × 8字节 × 约4个数组）
+    - random_seed: 随机种子（可复现）
+    """
+
+    def __init__(self, config: Dict, metrics_config: Optional[Dict] = None):
+        """
+        初始化蒙特卡洛分析器
+
+        Args:
+            config: 配置字典（从params.json的backtest.monte_carlo读取）
+            metrics_config: 指标配置（backtest.metrics，提供risk_free_rate/confidence_level）
+        """
+        self.config = config
+        metrics_config = metrics_config or {}
+
+        # §6.2 函数签名演进：所有参数都有默认值（向后兼容）
+        self.n_paths = config.get("n_paths", 10000)
+        self.method = config.get("method", "bootstrap")
+        self.block_size = config.get("block_size", 0)
+        self.confidence_level = config.get(
+            "confidence_level", metrics_config.get("confidence_level", 0.95)
+        )
+        self.initial_capital = config.get("initial_capital", 1000.0)
+        self.ruin_threshold_percent = config.get("ruin_threshold_percent", 50.0)
+        self.chunk_paths = config.get("chunk_paths", 1000)
+        self.random_seed = config.get("random_seed", 42)
+        self.risk_free_rate = metrics_config.get("risk_free_rate", 0.03)
+
+        if self.method not in RESAMPLING_METHODS:
+            raise ValueError(f"不支持的重抽样方式: {self.method}")
+
+        logger.info(
+            f"MonteCarloAnalyzer initialized: paths={self.n_paths}, method={self.method}, "
+            f"confidence={self.confidence_level}, ruin={self.ruin_threshold_percent}%"
+        )
+
+    def analyze(
+        self,
+        backtest_result: BacktestResult,
+        method: Optional[str] = None,
+        seed: Optional[Any] = None
+    ) -> MonteCarloReport:
+        """
+        对回测结果的已成交交易做蒙特卡洛分析
+
+        Args:
+            backtest_result: 回测结果
+            method: 覆盖配置中的重抽样方式
+            seed: 覆盖配置中的随机种子（int或int序列）
+
+        Returns:
+            MonteCarloReport
+        """
+        return self.analyze_signals(backtest_result.signals, method=method, seed=seed)
+
+    def analyze_signals(
+        self,
+        signals: List[SimulatedSignal],
+        method: Optional[str] = None,
+        seed: Optional[Any] = None
+    ) -> MonteCarloReport:
+        """
+        对信号列表的已成交交易做蒙特卡洛分析（按成交时间排序）
+
+        Args:
+            signals: 信号列表
+            method: 覆盖配置中的重抽样方式
+            seed: 覆盖配置中的随机种子
+
+        Returns:
+            MonteCarloReport
+        """
+        trades = sorted(
+            (s for s in signals if s.entry_filled),
+            key=lambda s: (s.entry_filled_time, s.timestamp)
+        )
+        pnl_percent = np.fromiter((s.pnl_percent for s in trades), dtype=np.float64, count=len(trades))
+        pnl_usdt = np.fromiter((s.pnl_usdt for s in trades), dtype=np.float64, count=len(trades))
+        return self.analyze_arrays(pnl_percent, pnl_usdt, method=method, seed=seed)
+
+    def analyze_arrays(
+        self,
+        pnl_percent: np.ndarray,
+        pnl_usdt: np.ndarray,
+        method: Optional[str] = None,
+        seed: Optional[Any] = None
+    ) -> MonteCarloReport:
+        """
+        对逐笔PnL数组做蒙特卡洛分析
+
+        Args:
+            pnl_percent: 逐笔PnL百分比（交易顺序）
+            pnl_usdt: 逐笔PnL USDT（与pnl_percent一一对应）
+            method: 覆盖配置中的重抽样方式
+            seed: 覆盖配置中的随机种子
+
+        Returns:
+            MonteCarloReport
+        """
+        analyze_start = time.time()
+        method = method or self.method
+        if method not in RESAMPLING_METHODS:
+            raise ValueError(f"不支持的重抽样方式: {method}")
+
+        pnl_percent = np.asarray(pnl_percent, dtype=np.float64)
+        pnl_usdt = np.asarray(pnl_usdt, dtype=np.float64)
+        n_trades = len(pnl_percent)
+        block_size = self._resolve_block_size(n_trades) if method == "block" else 0
+
+        observed = self._path_statistics(pnl_percent[np.newaxis, :], pnl_usdt[np.newaxis, :])
+        if n_trades == 0:
+            samples = tuple(values.repeat(self.n_paths) for values in observed)
+        else:
+            rng = np.random.default_rng(self.random_seed if seed is None else seed)
+            chunks = []
+            for offset in range(0, self.n_paths, self.chunk_paths):
+                n_chunk = min(self.chunk_paths, self.n_paths - offset)
+                indices = self.resample_indices(rng, n_chunk, n_trades, method, block_size)
+                chunks.append(self._path_statistics(pnl_percent[indices], pnl_usdt[indices]))
+            samples = tuple(np.concatenate(parts) for parts in zip(*chunks))
+
+        total_return, max_drawdown, sharpe, ruined = samples
+        report = MonteCarloReport(
+            method=method,
+            n_paths=self.n_paths,
+            n_trades=n_trades,
+            block_size=block_size,
+            confidence_level=self.confidence_level,
+            ruin_threshold_percent=self.ruin_threshold_percent,
+            total_return_percent=self._interval(total_return, observed[0][0]),
+            max_drawdown_percent=self._interval(max_drawdown, observed[1][0]),
+            sharpe_ratio=self._interval(sharpe, observed[2][0]),
+            risk_of_ruin=self._ruin_interval(ruined, observed[3][0]),
+            execution_time_seconds=round(time.time() - analyze_start, 3)
+        )
+
+        logger.debug(
+            f"蒙特卡洛分析完成: {n_trades}笔 × {self.n_paths}路径 ({method}), "
+            f"{report.execution_time_seconds}秒"
+        )
+        return report
+
+    def resample_indices(
+        self,
+        rng: np.random.Generator,
+        n_paths: int,
+        n_trades: int,
+        method: str,
+        block_size: int = 0
+    ) -> np.ndarray:
+        """
+        生成重抽样索引矩阵
+
+        Args:
+            rng: numpy随机数生成器
+            n_paths: 路径数
+            n_trades: 交易数（每条路径长度）
+            method: "bootstrap" | "block" | "shuffle"
+            block_size: block模式块长度
+
+        Returns:
+            (n_paths, n_trades) int64索引矩阵
+        """
+        if method == "bootstrap":
+            return rng.integers(0, n_trades, size=(n_paths, n_trades))
+
+        if method == "shuffle":
+            return rng.permuted(np.broadcast_to(np.arange(n_trades), (n_paths, n_trades)), axis=1)
+
+        # 循环块自助法：随机起点 + 连续block_size笔，越界回绕到序列开头
+        n_blocks = -(-n_trades // block_size)
+        starts = rng.integers(0, n_trades, size=(n_paths, n_blocks, 1))
+        indices = (starts + np.arange(block_size)) % n_trades
+        return indices.reshape(n_paths, n_blocks * block_size)[:, :n_trades]
+
+    # ==================== Private Methods ====================
+
+    def _resolve_block_size(self, n_trades: int) -> int:
+        """block模式块长度（0=自动：交易数的立方根，至少1）"""
+        if self.block_size and self.block_size > 0:
+            return max(1, min(int(self.block_size), max(n_trades, 1)))
+        return max(1, int(round(n_trades ** (1 / 3))))
+
+    def _path_statistics(
+        self,
+        pnl_percent: np.ndarray,
+        pnl_usdt: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        逐路径计算指标（每行一条路径）
+
+        Returns:
+            (总收益%, 最大回撤%, Sharpe, 是否破产)
+        """
+        n_paths, n_trades = pnl_usdt.shape
+        if n_trades == 0:
+            zeros = np.zeros(n_paths)
+            return zeros, zeros, zeros, np.zeros(n_paths, dtype=bool)
+
+        equity = np.cumsum(pnl_usdt, axis=1)
+        equity += self.initial_capital
+        total_return = (equity[:, -1] - self.initial_capital) / self.initial_capital * 100
+
+        # 回撤（峰值包含初始资本）
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, self.initial_capital, out=peak)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown = np.where(peak > 0, (peak - equity) / peak * 100, 0.0)
+        max_drawdown = np.maximum(drawdown.max(axis=1), 0.0)
+
+        # 破产：权益触及阈值
+        ruin_level = self.initial_capital * (1 - self.ruin_threshold_percent / 100)
+        ruined = equity.min(axis=1) <= ruin_level
+
+        # Sharpe（与BacktestMetrics._sharpe_from_moments同一公式，少于2笔为0）
+        if n_trades < 2:
+            sharpe = np.zeros(n_paths)
+        else:
+            mean_return = pnl_percent.mean(axis=1) / 100
+            std_return = pnl_percent.std(axis=1, ddof=1) / 100
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sharpe = np.where(
+                    std_return > 0,
+                    (mean_return - self.risk_free_rate / 252) / std_return * math.sqrt(252),
+                    0.0
+                )
+
+        return total_return, max_drawdown, sharpe, ruined
+
+    def _interval(self, samples: np.ndarray, observed: float) -> ConfidenceInterval:
+        """分位数置信区间"""
+        alpha = (1 - self.confidence_level) / 2
+        lower, median, upper = np.quantile(samples, [alpha, 0.5, 1 - alpha])
+        return ConfidenceInterval(
+            observed=round(float(observed), 4),
+            lower=round(float(lower), 4),
+            median=round(float(median), 4),
+            upper=round(float(upper), 4),
+            mean=round(float(samples.mean()), 4)
+        )
+
+    def _ruin_interval(self, ruined: np.ndarray, observed: bool) -> ConfidenceInterval:
+        """破产概率：点估计 + Wilson得分区间（路径数有限带来的估计误差）"""
+        n = len(ruined)
+        p = float(ruined.mean()) if n else 0.0
+        z = NormalDist().inv_cdf(1 - (1 - self.confidence_level) / 2)
+        if n:
+            denom = 1 + z * z / n
+            center = (p + z * z / (2 * n)) / denom
+            half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+        else:
+            center, half = 0.0, 0.0
+        return ConfidenceInterval(
+            observed=1.0 if observed else 0.0,
+            lower=round(max(0.0, center - half), 6),
+            median=round(p, 6),
+            upper=round(min(1.0, center + half), 6),
+            mean=round(p, 6)
+        )
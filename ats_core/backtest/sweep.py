@@ -0,0 +1,590 @@
+# coding: utf-8
+"""
+Backtest Framework v1.7 - Parameter Sweep Engine
+回测框架 - 四步系统参数扫描器
+
+功能：
+1. 候选参数生成：网格（grid）/ 随机（random）/ 拉丁超立方（lhs）
+2. 复用FactorCache中预计算的因子快照，每个候选只重跑四步决策层
+3. 候选在进程池中并行评估（每个工作进程只加载一次缓存）
+4. 结果表（胜率、盈亏因子、Sharpe、最大回撤等，来自BacktestMetrics）排序并导出CSV/JSON
+
+参数路径约定:
+    相对four_step_system的点分路径，例如：
+    - "step1_direction.min_final_strength"
+    - "step2_timing.enhanced_f.min_threshold"
+    - "step3_risk.take_profit.min_risk_reward_ratio"
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+from __future__ import annotations
+
+import contextlib
+import copy
+import csv
+import io
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ats_core.backtest.engine import (
+    BacktestEngine,
+    BacktestResult,
+    RejectedAnalysis,
+    SimulatedSignal
+)
+from ats_core.backtest.factor_cache import FactorCache
+from ats_core.backtest.metrics import BacktestMetrics
+from ats_core.backtest.monte_carlo import MonteCarloAnalyzer
+from ats_core.cfg import CFG
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SweepCandidateResult:
+    """单个候选参数的评估结果（结果表的一行）"""
+    candidate_id: int
+    params: Dict[str, Any]
+    total_signals: int = 0
+    filled_trades: int = 0
+    win_rate: float = 0.0  # %
+    avg_pnl_percent: float = 0.0
+    profit_factor: float = 0.0
+    sharpe_ratio: float = 0.0
+    sortino_ratio: float = 0.0
+    max_drawdown_percent: float = 0.0
+    total_pnl_usdt: float = 0.0
+    # v2.2蒙特卡洛稳健性（backtest.monte_carlo.run_after_sweep_candidate启用时填充）
+    mc_return_lower: float = 0.0  # 总收益%置信下界
+    mc_max_drawdown_upper: float = 0.0  # 最大回撤%置信上界
+    mc_sharpe_lower: float = 0.0  # Sharpe置信下界
+    mc_risk_of_ruin: float = 0.0  # 破产概率
+    evaluation_seconds: float = 0.0
+    error: str = ""
+
+
+@dataclass
+class SweepResult:
+    """
+    参数扫描结果
+
+    包含:
+    - rows: 排序后的候选结果表
+    - metadata: 扫描元数据（时间范围、候选数、耗时等）
+    """
+    rows: List[SweepCandidateResult]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        """转换为字典（用于JSON序列化）"""
+        return {
+            "rows": [asdict(r) for r in self.rows],
+            "metadata": self.metadata
+        }
+
+
+class ParameterSweep:
+    """
+    四步系统参数扫描器
+
+    职责:
+    - 生成候选参数集（grid/random/lhs）
+    - 并行评估候选（复用因子快照，仅重跑决策层 + 撮合）
+    - 排序与导出结果表
+
+    配置驱动（config/params.json -> backtest.sweep）:
+    - max_workers: 进程池大小（0=CPU核数）
+    - random_seed: 采样与滑点随机种子（保证可复现）
+    - rank_by: 排序指标（默认sharpe_ratio）
+    - rank_ascending: 是否升序（默认false）
+    - min_trades_for_rank: 成交笔数不足的候选排在末尾
+    - suppress_decision_logs: 评估时屏蔽四步系统stdout/stderr日志
+    - record_reject_analyses: 是否记录REJECT（用于Step通过率，默认false）
+
+    蒙特卡洛（backtest.monte_carlo，v2.2新增）:
+    - run_after_sweep_candidate=true时，每个候选评估后对其交易序列做重抽样，
+      置信界写入mc_*列（可作为rank_by，如 "mc_sharpe_lower"）
+    """
+
+    def __init__(
+        self,
+        config: Dict,
+        engine_config: Optional[Dict] = None,
+        metrics_config: Optional[Dict] = None,
+        monte_carlo_config: Optional[Dict] = None
+    ):
+        """
+        初始化参数扫描器
+
+        Args:
+            config: 配置字典（从params.json的backtest.sweep读取）
+            engine_config: 引擎配置（backtest.engine，撮合参数）
+            metrics_config: 指标配置（backtest.metrics）
+            monte_carlo_config: 蒙特卡洛配置（backtest.monte_carlo，v2.2新增）
+        """
+        self.config = config
+        self.engine_config = engine_config or {}
+        self.metrics_config = metrics_config or {}
+        self.monte_carlo_config = monte_carlo_config or {}
+
+        # §6.2 函数签名演进：所有参数都有默认值（向后兼容）
+        self.max_workers = config.get("max_workers", 0) or os.cpu_count() or 1
+        self.random_seed = config.get("random_seed", 42)
+        self.rank_by = config.get("rank_by", "sharpe_ratio")
+        self.rank_ascending = config.get("rank_ascending", False)
+        self.min_trades_for_rank = config.get("min_trades_for_rank", 10)
+        self.suppress_decision_logs = config.get("suppress_decision_logs", True)
+        self.record_reject_analyses = config.get("record_reject_analyses", False)
+
+        logger.info(
+            f"ParameterSweep initialized: workers={self.max_workers}, "
+            f"rank_by={self.rank_by}, seed={self.random_seed}"
+        )
+
+    # ==================== 候选生成 ====================
+
+    def generate_grid(self, space: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+        """
+        网格搜索：笛卡尔积
+
+        Args:
+            space: {param_path: [v1, v2, ...]}
+
+        Returns:
+            候选列表 [{param_path: value, ...}, ...]
+        """
+        keys = list(space.keys())
+        return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+    def generate_random(self, space: Dict[str, Any], n_samples: int) -> List[Dict[str, Any]]:
+        """
+        随机采样
+
+        Args:
+            space: {param_path: {"low": x, "high": y, "type": "float"|"int"} 或 [choices]}
+            n_samples: 采样数量
+
+        Returns:
+            候选列表
+        """
+        rng = random.Random(self.random_seed)
+        return [
+            {key: self._sample_value(spec, rng.random()) for key, spec in space.items()}
+            for _ in range(n_samples)
+        ]
+
+    def generate_latin_hypercube(self, space: Dict[str, Any], n_samples: int) -> List[Dict[str, Any]]:
+        """
+        拉丁超立方采样（每个维度的n_samples个分层各取一次）
+
+        Args:
+            space: 同generate_random
+            n_samples: 采样数量
+
+        Returns:
+            候选列表
+        """
+        rng = random.Random(self.random_seed)
+        columns: Dict[str, List[Any]] = {}
+        for key, spec in space.items():
+            strata = list(range(n_samples))
+            rng.shuffle(strata)
+            columns[key] = [
+                self._sample_value(spec, (s + rng.random()) / n_samples)
+                for s in strata
+            ]
+        return [{key: columns[key][i] for key in space} for i in range(n_samples)]
+
+    def generate_candidates(
+        self,
+        space: Dict[str, Any],
+        mode: str = "grid",
+        n_samples: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        按模式生成候选
+
+        Args:
+            space: 参数空间
+            mode: "grid" | "random" | "lhs"
+            n_samples: random/lhs采样数量
+
+        Returns:
+            候选列表
+        """
+        if mode == "grid":
+            return self.generate_grid(space)
+        elif mode == "random":
+            return self.generate_random(space, n_samples)
+        elif mode == "lhs":
+            return self.generate_latin_hypercube(space, n_samples)
+        else:
+            raise ValueError(f"不支持的采样模式: {mode}")
+
+    # ==================== 执行 ====================
+
+    def run(
+        self,
+        factor_cache: FactorCache,
+        candidates: List[Dict[str, Any]],
+        cache_path: Optional[str] = None
+    ) -> SweepResult:
+        """
+        并行评估所有候选
+
+        Args:
+            factor_cache: 已构建的因子快照缓存
+            candidates: 候选参数列表
+            cache_path: 可选，缓存文件路径（工作进程从文件加载，避免大对象经管道传输）
+
+        Returns:
+            SweepResult（已排序）
+        """
+        sweep_start = time.time()
+        base_params = copy.deepcopy(CFG.params)
+        worker_args = (
+            cache_path if cache_path else factor_cache,
+            base_params,
+            self.engine_config,
+            self.metrics_config,
+            self.config,
+            self.monte_carlo_config
+        )
+
+        logger.info(
+            f"开始参数扫描: {len(candidates)}个候选, "
+            f"{len(factor_cache.snapshots)}个因子快照, workers={self.max_workers}"
+        )
+
+        rows: List[SweepCandidateResult] = []
+        if self.max_workers <= 1:
+            _init_worker(*worker_args)
+            for i, overrides in enumerate(candidates):
+                rows.append(_evaluate_candidate(i, overrides))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=worker_args
+            ) as pool:
+                futures = [
+                    pool.submit(_evaluate_candidate, i, overrides)
+                    for i, overrides in enumerate(candidates)
+                ]
+                for done, future in enumerate(as_completed(futures), 1):
+                    rows.append(future.result())
+                    if done % 100 == 0:
+                        logger.info(f"扫描进度: {done}/{len(candidates)}")
+
+        rows = self.rank(rows)
+        duration = time.time() - sweep_start
+
+        logger.info(
+            f"✅ 参数扫描完成: {len(rows)}个候选, {duration:.1f}秒 "
+            f"({len(rows) / duration if duration > 0 else 0:.1f} 候选/秒)"
+        )
+
+        return SweepResult(
+            rows=rows,
+            metadata={
+                "symbols": factor_cache.symbols,
+                "start_time": factor_cache.start_time,
+                "end_time": factor_cache.end_time,
+                "interval": factor_cache.interval,
+                "total_candidates": len(rows),
+                "total_snapshots": len(factor_cache.snapshots),
+                "execution_time_seconds": round(duration, 2),
+                "rank_by": self.rank_by,
+                "config_snapshot": self.config
+            }
+        )
+
+    def rank(self, rows: List[SweepCandidateResult]) -> List[SweepCandidateResult]:
+        """
+        排序：成交笔数达标的候选按rank_by排序，其余（含出错）排在末尾
+
+        Args:
+            rows: 结果行
+
+        Returns:
+            排序后的结果行
+        """
+        def sort_key(row: SweepCandidateResult):
+            qualified = not row.error and row.filled_trades >= self.min_trades_for_rank
+            value = getattr(row, self.rank_by, 0.0)
+            return (0 if qualified else 1, value if self.rank_ascending else -value, row.candidate_id)
+
+        return sorted(rows, key=sort_key)
+
+    def export(self, result: SweepResult, path: str, output_format: str = "csv") -> None:
+        """
+        导出结果表
+
+        Args:
+            result: 扫描结果
+            path: 输出文件路径
+            output_format: "csv" | "json"
+        """
+        output_file = Path(path)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        if output_format == "json":
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(result.to_dict(), f, indent=2, ensure_ascii=False)
+        elif output_format == "csv":
+            param_keys = sorted({k for row in result.rows for k in row.params})
+            metric_keys = [k for k in asdict(result.rows[0]) if k != "params"] if result.rows else []
+            with open(output_file, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["rank"] + metric_keys + param_keys)
+                for rank, row in enumerate(result.rows, 1):
+                    row_dict = asdict(row)
+                    writer.writerow(
+                        [rank]
+                        + [row_dict[k] for k in metric_keys]
+                        + [row.params.get(k, "") for k in param_keys]
+                    )
+        else:
+            raise ValueError(f"不支持的输出格式: {output_format}")
+
+        logger.info(f"扫描结果已导出: {output_file}")
+
+    # ==================== Private Methods ====================
+
+    def _sample_value(self, spec: Any, u: float) -> Any:
+        """
+        将[0,1)均匀分位u映射到参数取值
+
+        Args:
+            spec: {"low", "high", "type"} 范围定义，或候选值列表
+            u: 分位值
+        """
+        if isinstance(spec, (list, tuple)):
+            return spec[min(int(u * len(spec)), len(spec) - 1)]
+
+        low = spec["low"]
+        high = spec["high"]
+        value = low + u * (high - low)
+        if spec.get("type", "float") == "int":
+            return min(int(value), int(high))
+        return round(value, spec.get("round", 6))
+
+
+# ==================== 工作进程 ====================
+# 模块级状态：每个工作进程初始化一次（进程池initializer），之后所有候选共享
+
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def _init_worker(
+    cache_or_path: Any,
+    base_params: Dict,
+    engine_config: Dict,
+    metrics_config: Dict,
+    sweep_config: Dict,
+    monte_carlo_config: Optional[Dict] = None
+) -> None:
+    """工作进程初始化：加载因子缓存、构建撮合引擎、指标计算器与蒙特卡洛分析器"""
+    cache = FactorCache.load(cache_or_path) if isinstance(cache_or_path, str) else cache_or_path
+
+    # 撮合日志（每笔成交/平仓INFO）在扫描中没有意义，只保留警告
+    logging.getLogger("ats_core.backtest.engine").setLevel(logging.WARNING)
+    logging.getLogger("ats_core.backtest.metrics").setLevel(logging.WARNING)
+    logging.getLogger("ats_core.backtest.monte_carlo").setLevel(logging.WARNING)
+
+    monte_carlo_config = monte_carlo_config or {}
+    monte_carlo = None
+    if monte_carlo_config.get("run_after_sweep_candidate", False):
+        monte_carlo = MonteCarloAnalyzer(monte_carlo_config, metrics_config)
+
+    engine = BacktestEngine(engine_config, data_loader=None)
+    engine.record_reject_analyses = sweep_config.get("record_reject_analyses", False)
+
+    _WORKER_STATE.clear()
+    _WORKER_STATE.update({
+        "cache": cache,
+        "base_params": base_params,
+        "engine": engine,
+        "metrics": BacktestMetrics(metrics_config),
+        "monte_carlo": monte_carlo,
+        "interval_ms": engine._interval_to_ms(cache.interval),
+        "random_seed": sweep_config.get("random_seed", 42),
+        "suppress_decision_logs": sweep_config.get("suppress_decision_logs", True),
+    })
+
+
+def _apply_overrides(base_params: Dict, overrides: Dict[str, Any]) -> Dict:
+    """
+    将候选参数写入four_step_system配置（只复制four_step_system子树）
+
+    Args:
+        base_params: 完整配置（CFG.params快照）
+        overrides: {dotted_path: value}
+
+    Returns:
+        新配置字典（其余子树与base_params共享引用）
+    """
+    params = dict(base_params)
+    four_step = copy.deepcopy(base_params.get("four_step_system", {}))
+    for path, value in overrides.items():
+        node = four_step
+        keys = path.split(".")
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = value
+    params["four_step_system"] = four_step
+    return params
+
+
+def _replay_candidate(
+    candidate_id: int,
+    overrides: Dict[str, Any]
+) -> tuple[List[SimulatedSignal], List[RejectedAnalysis]]:
+    """
+    重放单个候选：四步决策（应用冷却期）→ 撮合
+
+    与BacktestEngine.run保持一致：
+    - 快照顺序 = 时间步 × symbol顺序
+    - 冷却期从上一个有效信号起算
+    - 信号构建/撮合复用引擎方法
+
+    Returns:
+        (signals, rejected_analyses)
+    """
+    from ats_core.decision.four_step_system import run_four_step_decision
+
+    state = _WORKER_STATE
+    cache: FactorCache = state["cache"]
+    engine: BacktestEngine = state["engine"]
+    interval_ms = state["interval_ms"]
+
+    params = _apply_overrides(state["base_params"], overrides)
+    cooldown_ms = engine.signal_cooldown_hours * 3600 * 1000
+    signals: List[SimulatedSignal] = []
+    rejected: List[RejectedAnalysis] = []
+    last_signal_time_by_symbol: Dict[str, int] = {}
+
+    sink = io.StringIO()
+    silence = state["suppress_decision_logs"]
+
+    for snapshot in cache.snapshots:
+        if engine.enable_anti_jitter:
+            last_signal_time = last_signal_time_by_symbol.get(snapshot.symbol, 0)
+            if snapshot.timestamp - last_signal_time < cooldown_ms:
+                continue
+
+        klines_1h = cache.get_klines(snapshot)
+
+        with contextlib.ExitStack() as stack:
+            if silence:
+                stack.enter_context(contextlib.redirect_stdout(sink))
+                stack.enter_context(contextlib.redirect_stderr(sink))
+            decision = run_four_step_decision(
+                symbol=snapshot.symbol,
+                klines=klines_1h,
+                factor_scores=snapshot.factor_scores,
+                factor_scores_series=snapshot.factor_scores_series,
+                btc_factor_scores=snapshot.btc_factor_scores,
+                s_factor_meta=snapshot.s_factor_meta,
+                l_factor_meta=snapshot.l_factor_meta,
+                l_score=snapshot.l_score,
+                params=params
+            )
+        if silence:
+            sink.seek(0)
+            sink.truncate()
+
+        # 融合模式语义：四步系统决策即最终决策
+        accepted = decision.get("decision") == "ACCEPT"
+        analysis_result = {
+            "is_prime": accepted,
+            "side_long": (decision.get("action") == "LONG") if accepted else None,
+            "entry_price": decision.get("entry_price"),
+            "stop_loss": decision.get("stop_loss"),
+            "take_profit": decision.get("take_profit"),
+            "scores": snapshot.factor_scores,
+            "four_step_decision": decision,
+        }
+
+        if not accepted:
+            if engine.record_reject_analyses:
+                rejected.append(
+                    engine._build_rejected_analysis(snapshot.symbol, snapshot.timestamp, analysis_result)
+                )
+            continue
+
+        signal = engine._build_signal(snapshot.symbol, snapshot.timestamp, analysis_result, klines_1h)
+        if signal is None:
+            continue
+
+        signal.entry_attempt_time = snapshot.timestamp + interval_ms
+        signals.append(signal)
+        last_signal_time_by_symbol[snapshot.symbol] = snapshot.timestamp
+
+    # 滑点随机数按候选固定种子，结果与进程调度无关
+    random.seed(state["random_seed"] + candidate_id)
+    engine.simulate_execution(
+        signals, cache.preloaded_data, cache.start_time, cache.end_time, cache.interval
+    )
+    return signals, rejected
+
+
+def _summarize_candidate(
+    row: SweepCandidateResult,
+    signals: List[SimulatedSignal],
+    rejected: List[RejectedAnalysis]
+) -> SweepCandidateResult:
+    """用BacktestMetrics计算指标并填充结果行（启用时附加蒙特卡洛置信界）"""
+    report = _WORKER_STATE["metrics"].calculate_all_metrics_vectorized(
+        BacktestResult(signals=signals, metadata={}, rejected_analyses=rejected)
+    )
+    sm = report.signal_metrics
+    pm = report.portfolio_metrics
+
+    row.total_signals = sm.total_signals
+    row.filled_trades = sum(1 for s in signals if s.entry_filled)
+    row.win_rate = sm.win_rate
+    row.avg_pnl_percent = sm.avg_pnl_percent
+    row.profit_factor = pm.profit_factor
+    row.sharpe_ratio = pm.sharpe_ratio
+    row.sortino_ratio = pm.sortino_ratio
+    row.max_drawdown_percent = pm.max_drawdown_percent
+    row.total_pnl_usdt = pm.total_pnl_usdt
+
+    monte_carlo = _WORKER_STATE.get("monte_carlo")
+    if monte_carlo is not None:
+        # 种子 = (扫描种子, 候选ID)：结果与进程调度无关
+        mc = monte_carlo.analyze_signals(
+            signals, seed=(_WORKER_STATE["random_seed"], row.candidate_id)
+        )
+        row.mc_return_lower = mc.total_return_percent.lower
+        row.mc_max_drawdown_upper = mc.max_drawdown_percent.upper
+        row.mc_sharpe_lower = mc.sharpe_ratio.lower
+        row.mc_risk_of_ruin = mc.risk_of_ruin.median
+    return row
+
+
+def _evaluate_candidate(candidate_id: int, overrides: Dict[str, Any]) -> SweepCandidateResult:
+    """评估单个候选：重放 → 指标（异常记录在结果行，不中断扫描）"""
+    eval_start = time.time()
+    row = SweepCandidateResult(candidate_id=candidate_id, params=overrides)
+
+    try:
+        signals, rejected = _replay_candidate(candidate_id, overrides)
+        _summarize_candidate(row, signals, rejected)
+    except Exception as e:
+        logger.error(f"候选评估失败: #{candidate_id} {overrides} - {e}")
+        row.error = str(e)
+
+    row.evaluation_seconds = round(time.time() - eval_start, 3)
+    return row
@@ -0,0 +1,409 @@
+# coding: utf-8
+"""
+Backtest Framework v1.8 - Walk-Forward Optimization Runner
+回测框架 - 滚动前推优化与样本外评估
+
+功能：
+1. 生成训练/测试窗口：anchored（训练起点固定）或 rolling（固定长度滑动）
+2. 每个fold在训练窗口上复用参数扫描（ParameterSweep候选 + 因子快照）选出最优参数
+3. 用最优参数在紧随其后的测试窗口上评估（样本外，OOS）
+4. 汇总所有测试窗口的交易，计算整体OOS指标（BacktestMetrics）
+5. 各fold相互独立，进程池并行
+
+内存模型:
+- 历史数据只加载一次（FactorCache），以内存映射布局落盘（save_mmap）
+- 各工作进程open_mmap()只读映射K线，并只反序列化本fold时间窗口内的快照
+- 内存占用与fold数量无关（多进程共享同一份页缓存）
+- 每次run()写入mmap_dir下独立的run_*子目录（结束后删除），并发运行互不覆盖
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+from ats_core.backtest import sweep as sweep_worker
+from ats_core.backtest.engine import BacktestEngine, BacktestResult, SimulatedSignal
+from ats_core.backtest.factor_cache import FactorCache
+from ats_core.backtest.metrics import BacktestMetrics, MetricsReport
+from ats_core.backtest.sweep import ParameterSweep, SweepCandidateResult
+from ats_core.cfg import CFG
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WalkForwardFold:
+    """单个fold的时间窗口（毫秒，闭区间）"""
+    fold_id: int
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+@dataclass
+class FoldResult:
+    """
+    单个fold的结果
+
+    - best_params: 训练窗口上排名第一的候选参数
+    - train_row: 最优候选在训练窗口的指标（样本内）
+    - test_row: 最优候选在测试窗口的指标（样本外）
+    - test_signals: 测试窗口的全部模拟信号（用于汇总OOS指标）
+    """
+    fold: WalkForwardFold
+    best_params: Dict[str, Any] = field(default_factory=dict)
+    train_row: Optional[SweepCandidateResult] = None
+    test_row: Optional[SweepCandidateResult] = None
+    test_signals: List[SimulatedSignal] = field(default_factory=list)
+    candidates_evaluated: int = 0
+    execution_time_seconds: float = 0.0
+    error: str = ""
+
+    def to_dict(self) -> Dict:
+        """转换为字典（用于JSON序列化，省略逐笔信号）"""
+        return {
+            "fold": asdict(self.fold),
+            "best_params": self.best_params,
+            "train": asdict(self.train_row) if self.train_row else None,
+            "test": asdict(self.test_row) if self.test_row else None,
+            "test_signal_count": len(self.test_signals),
+            "candidates_evaluated": self.candidates_evaluated,
+            "execution_time_seconds": self.execution_time_seconds,
+            "error": self.error
+        }
+
+
+@dataclass
+class WalkForwardResult:
+    """
+    滚动前推结果
+
+    包含:
+    - folds: 各fold结果（按fold_id排序）
+    - oos_report: 全部测试窗口交易合并后的OOS指标报告
+    - metadata: 执行元数据（窗口配置、耗时、WFE等）
+    """
+    folds: List[FoldResult]
+    oos_report: Optional[MetricsReport]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        """转换为字典（用于JSON序列化）"""
+        return {
+            "folds": [f.to_dict() for f in self.folds],
+            "oos_report": asdict(self.oos_report) if self.oos_report else None,
+            "metadata": self.metadata
+        }
+
+
+class WalkForwardRunner:
+    """
+    滚动前推优化器
+
+    职责:
+    - 切分训练/测试窗口
+    - 并行执行各fold（训练窗口参数扫描 → 测试窗口评估）
+    - 汇总样本外指标
+
+    配置驱动（config/params.json -> backtest.walk_forward）:
+    - mode: "anchored" | "rolling"
+    - train_days: 训练窗口长度（天，anchored模式为首个训练窗口长度）
+    - test_days: 测试窗口长度（天）
+    - step_days: 窗口前进步长（天，默认=test_days）
+    - max_workers: fold级进程池大小（0=CPU核数）
+    - mmap_dir: 内存映射布局的父目录（每次运行在其下创建独立子目录；默认系统临时目录）
+    - efficiency_metric: 计算walk-forward效率（OOS/IS）使用的指标
+    """
+
+    def __init__(
+        self,
+        config: Dict,
+        sweep: ParameterSweep,
+        metrics_config: Optional[Dict] = None
+    ):
+        """
+        初始化滚动前推优化器
+
+        Args:
+            config: 配置字典（从params.json的backtest.walk_forward读取）
+            sweep: 参数扫描器（提供候选排序规则与引擎/指标配置）
+            metrics_config: 指标配置（backtest.metrics，用于OOS汇总）
+        """
+        self.config = config
+        self.sweep = sweep
+        self.metrics_config = metrics_config if metrics_config is not None else sweep.metrics_config
+
+        # §6.2 函数签名演进：所有参数都有默认值（向后兼容）
+        self.mode = config.get("mode", "rolling")
+        self.train_days = config.get("train_days", 60)
+        self.test_days = config.get("test_days", 15)
+        self.step_days = config.get("step_days", 0) or self.test_days
+        self.max_workers = config.get("max_workers", 0) or os.cpu_count() or 1
+        self.mmap_dir = config.get("mmap_dir") or None
+        self.efficiency_metric = config.get("efficiency_metric", "total_pnl_usdt")
+
+        if self.mode not in ("anchored", "rolling"):
+            raise ValueError(f"不支持的walk-forward模式: {self.mode}")
+        if self.train_days <= 0 or self.test_days <= 0 or self.step_days <= 0:
+            raise ValueError(
+                f"train_days/test_days/step_days必须为正数: "
+                f"train={self.train_days}, test={self.test_days}, step={self.step_days}"
+            )
+
+        logger.info(
+            f"WalkForwardRunner initialized: mode={self.mode}, "
+            f"train={self.train_days}d, test={self.test_days}d, step={self.step_days}d, "
+            f"workers={self.max_workers}"
+        )
+
+    def generate_folds(
+        self,
+        start_time: int,
+        end_time: int,
+        interval_ms: int = 3600 * 1000
+    ) -> List[WalkForwardFold]:
+        """
+        切分训练/测试窗口（边界对齐到K线网格）
+
+        Args:
+            start_time: 数据开始时间（毫秒）
+            end_time: 数据结束时间（毫秒）
+            interval_ms: K线周期（毫秒）
+
+        Returns:
+            fold列表（最后一个不完整的测试窗口会被截断到end_time）
+        """
+        day_ms = 24 * 3600 * 1000
+        train_ms = self._align(self.train_days * day_ms, interval_ms)
+        test_ms = self._align(self.test_days * day_ms, interval_ms)
+        step_ms = self._align(self.step_days * day_ms, interval_ms)
+
+        folds = []
+        offset = 0
+        while True:
+            train_start = start_time if self.mode == "anchored" else start_time + offset
+            train_end = start_time + offset + train_ms - interval_ms
+            test_start = train_end + interval_ms
+            test_end = min(test_start + test_ms - interval_ms, end_time)
+            if test_start > end_time:
+                break
+            folds.append(WalkForwardFold(
+                fold_id=len(folds),
+                train_start=train_start,
+                train_end=train_end,
+                test_start=test_start,
+                test_end=test_end
+            ))
+            offset += step_ms
+
+        return folds
+
+    def run(
+        self,
+        factor_cache: FactorCache,
+        candidates: List[Dict[str, Any]],
+        mmap_dir: Optional[str] = None
+    ) -> WalkForwardResult:
+        """
+        执行滚动前推
+
+        Args:
+            factor_cache: 覆盖全部fold时间范围的因子快照缓存
+            candidates: 候选参数列表（每个fold训练窗口均评估全部候选）
+            mmap_dir: 内存映射布局目录（factor_cache写出到此处，供各fold进程映射；
+                      由调用方管理。未指定时在配置的父目录下创建本次运行专用的临时目录，结束后删除）
+
+        Returns:
+            WalkForwardResult
+        """
+        if mmap_dir:
+            return self._run(factor_cache, candidates, mmap_dir)
+
+        if self.mmap_dir:
+            os.makedirs(self.mmap_dir, exist_ok=True)
+        run_dir = tempfile.mkdtemp(prefix="run_", dir=self.mmap_dir)
+        try:
+            return self._run(factor_cache, candidates, run_dir)
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    def _run(
+        self,
+        factor_cache: FactorCache,
+        candidates: List[Dict[str, Any]],
+        mmap_dir: str
+    ) -> WalkForwardResult:
+        """run()的实现（mmap_dir已确定）"""
+        run_start = time.time()
+        factor_cache.save_mmap(mmap_dir)
+
+        engine = BacktestEngine(self.sweep.engine_config, data_loader=None)
+        interval_ms = engine._interval_to_ms(factor_cache.interval or "1h")
+
+        folds = self.generate_folds(factor_cache.start_time, factor_cache.end_time, interval_ms)
+        if not folds:
+            raise ValueError(
+                f"时间范围不足以切分fold: train={self.train_days}d, test={self.test_days}d"
+            )
+
+        logger.info(
+            f"开始walk-forward: {len(folds)}个fold × {len(candidates)}个候选, "
+            f"mode={self.mode}, workers={self.max_workers}"
+        )
+
+        fold_args = [
+            (
+                mmap_dir,
+                fold,
+                candidates,
+                CFG.params,
+                self.sweep.engine_config,
+                self.sweep.metrics_config,
+                self.sweep.config,
+                self.sweep.monte_carlo_config
+            )
+            for fold in folds
+        ]
+
+        if self.max_workers <= 1 or len(folds) == 1:
+            fold_results = [_run_fold(*args) for args in fold_args]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(folds))) as pool:
+                fold_results = list(pool.map(_run_fold, *zip(*fold_args)))
+
+        fold_results.sort(key=lambda r: r.fold.fold_id)
+        oos_report = self._aggregate_oos(fold_results)
+        duration = time.time() - run_start
+
+        metadata = {
+            "mode": self.mode,
+            "train_days": self.train_days,
+            "test_days": self.test_days,
+            "step_days": self.step_days,
+            "total_folds": len(fold_results),
+            "failed_folds": sum(1 for r in fold_results if r.error),
+            "total_candidates": len(candidates),
+            "walk_forward_efficiency": self._efficiency(fold_results),
+            "efficiency_metric": self.efficiency_metric,
+            "execution_time_seconds": round(duration, 2),
+            "config_snapshot": self.config
+        }
+
+        logger.info(
+            f"✅ walk-forward完成: {len(fold_results)}个fold, "
+            f"OOS交易={sum(len(r.test_signals) for r in fold_results)}, "
+            f"WFE={metadata['walk_forward_efficiency']}, {duration:.1f}秒"
+        )
+
+        return WalkForwardResult(folds=fold_results, oos_report=oos_report, metadata=metadata)
+
+    # ==================== Private Methods ====================
+
+    def _align(self, duration_ms: int, interval_ms: int) -> int:
+        """时长向下对齐到K线周期（至少1根K线）"""
+        return max(interval_ms, int(duration_ms) // interval_ms * interval_ms)
+
+    def _aggregate_oos(self, fold_results: List[FoldResult]) -> Optional[MetricsReport]:
+        """合并全部测试窗口信号，计算整体样本外指标"""
+        oos_signals = sorted(
+            (s for r in fold_results for s in r.test_signals),
+            key=lambda s: s.timestamp
+        )
+        if not oos_signals:
+            return None
+        metrics = BacktestMetrics(self.metrics_config)
+        return metrics.calculate_all_metrics_vectorized(BacktestResult(signals=oos_signals, metadata={}))
+
+    def _efficiency(self, fold_results: List[FoldResult]) -> Optional[float]:
+        """
+        Walk-forward效率 = 样本外指标之和 / 样本内指标之和（按天数归一）
+
+        Returns:
+            效率值（无有效fold或样本内为0时返回None）
+        """
+        is_total = 0.0
+        oos_total = 0.0
+        for r in fold_results:
+            if r.error or r.train_row is None or r.test_row is None:
+                continue
+            train_days = (r.fold.train_end - r.fold.train_start) / 86400000 or 1
+            test_days = (r.fold.test_end - r.fold.test_start) / 86400000 or 1
+            is_total += getattr(r.train_row, self.efficiency_metric, 0.0) / train_days
+            oos_total += getattr(r.test_row, self.efficiency_metric, 0.0) / test_days
+        if is_total == 0:
+            return None
+        return round(oos_total / is_total, 4)
+
+
+# ==================== 工作进程 ====================
+
+def _run_fold(
+    mmap_dir: str,
+    fold: WalkForwardFold,
+    candidates: List[Dict[str, Any]],
+    base_params: Dict,
+    engine_config: Dict,
+    metrics_config: Dict,
+    sweep_config: Dict,
+    monte_carlo_config: Optional[Dict] = None
+) -> FoldResult:
+    """
+    执行单个fold：训练窗口评估全部候选 → 选最优 → 测试窗口评估
+
+    fold内部串行执行候选（fold级已并行，避免嵌套进程池）
+    """
+    fold_start = time.time()
+    result = FoldResult(fold=fold)
+
+    try:
+        cache = FactorCache.open_mmap(mmap_dir, fold.train_start, fold.test_end)
+        ranker = ParameterSweep(
+            dict(sweep_config, max_workers=1), engine_config, metrics_config, monte_carlo_config
+        )
+
+        # 1. 训练窗口：全部候选
+        sweep_worker._init_worker(
+            cache.window(fold.train_start, fold.train_end),
+            base_params, engine_config, metrics_config, sweep_config, monte_carlo_config
+        )
+        train_rows = ranker.rank([
+            sweep_worker._evaluate_candidate(i, overrides)
+            for i, overrides in enumerate(candidates)
+        ])
+        result.candidates_evaluated = len(train_rows)
+        best = train_rows[0]
+        if best.error:
+            raise RuntimeError(f"训练窗口全部候选失败: {best.error}")
+        result.best_params = best.params
+        result.train_row = best
+
+        # 2. 测试窗口：最优候选（保留逐笔信号用于OOS汇总）
+        sweep_worker._init_worker(
+            cache.window(fold.test_start, fold.test_end),
+            base_params, engine_config, metrics_config, sweep_config, monte_carlo_config
+        )
+        signals, rejected = sweep_worker._replay_candidate(best.candidate_id, best.params)
+        result.test_row = sweep_worker._summarize_candidate(
+            SweepCandidateResult(candidate_id=best.candidate_id, params=best.params),
+            signals,
+            rejected
+        )
+        result.test_signals = signals
+
+    except Exception as e:
+        logger.error(f"fold执行失败: #{fold.fold_id} - {e}")
+        result.error = str(e)
+
+    result.execution_time_seconds = round(time.time() - fold_start, 2)
+    return result
@@ -0,0 +1,43 @@
+# coding: utf-8
+"""
+Benchmark Suite v1.0 - Module Initialization
+基准测试套件 - 模块初始化（扫描/回测吞吐量，离线可复现）
+
+Public API:
+- SyntheticUniverse: 合成行情数据集（GBM + 牛/熊/震荡/高波动状态切换，50-1000个symbol）
+- UniverseMarket: 将SyntheticUniverse接入币安替身服务的行情适配器
+- UniverseDataLoader: 从SyntheticUniverse提供回测数据的HistoricalDataLoader
+- BenchmarkSuite: 基准测试（analyze/scan/backtest/cache_warmup/db_writes）
+- BenchmarkReport / BenchmarkResult: 机器可读结果
+- compare_reports: 与基线对比，标记吞吐回归
+
+Usage:
+    python scripts/benchmark_suite.py --symbols 200 --output reports/benchmark/latest.json \\
+        --baseline reports/benchmark/baseline.json
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from ats_core.benchmark.suite import (
+    BENCHMARKS,
+    BenchmarkReport,
+    BenchmarkResult,
+    BenchmarkSuite,
+    UniverseDataLoader,
+    compare_reports,
+)
+from ats_core.benchmark.universe import SymbolSeries, SyntheticUniverse, UniverseMarket
+
+__all__ = [
+    "SyntheticUniverse",
+    "SymbolSeries",
+    "UniverseMarket",
+    "UniverseDataLoader",
+    "BenchmarkSuite",
+    "BenchmarkReport",
+    "BenchmarkResult",
+    "BENCHMARKS",
+    "compare_reports",
+]
+
+__version__ = "1.0.0"
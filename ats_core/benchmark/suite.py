@@ -0,0 +1,622 @@
+# coding: utf-8
+"""
+Benchmark Suite v1.0 - Scan / Backtest Throughput Benchmarks
+基准测试套件 - 扫描与回测吞吐量基准
+
+基准项（BENCHMARKS）：
+1. analyze: analyze_symbol_with_preloaded_klines 单symbol耗时 + 各因子耗时（结果中的perf字典），
+   以及perf未覆盖部分（含分析流程内部的REST请求）
+2. scan: OptimizedBatchScanner.scan 全流程（publish_reports=False，不写报告/数据库/Telegram）
+3. backtest: BacktestEngine.run 吞吐量（bars/秒 = symbol × 主周期bar数 / 耗时）
+4. cache_warmup: RealtimeKlineCache.initialize_batch 经BinanceFuturesClient从替身服务预热
+5. db_writes: AnalysisDB.write_complete_signal / write_scan_batch / write_scan_statistics 写入吞吐
+
+数据：SyntheticUniverse（GBM + 状态切换），经本地币安替身服务（ats_core.sources.standin）
+提供给仍直接请求REST的代码路径，整个基准测试不访问外网，同一配置结果可复现。
+
+输出：BenchmarkReport（JSON，含环境信息/配置/各基准结果），compare_reports()对比两次结果，
+吞吐下降超过阈值的基准项标记为回归。
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from ats_core.backtest.data_loader import HistoricalDataLoader
+from ats_core.benchmark.universe import INTERVAL_MS, SyntheticUniverse, UniverseMarket
+
+logger = logging.getLogger(__name__)
+
+SUITE_VERSION = "1.0.0"
+BENCHMARKS = ("analyze", "scan", "backtest", "cache_warmup", "db_writes")
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    单个基准项结果
+
+    Attributes:
+        name: 基准名称（BENCHMARKS之一）
+        n_items: 处理条目数（symbol数 / bar数 / 写入行数）
+        total_seconds: 总耗时（秒）
+        throughput: 吞吐量（n_items / total_seconds）
+        unit: 吞吐单位（如 "symbols/s"）
+        latency_ms: 单条目耗时分布（mean/p50/p95/p99/max，毫秒；不可逐条计时时为空）
+        extra: 基准专属指标（因子耗时、API调用数、信号数等）
+    """
+    name: str
+    n_items: int
+    total_seconds: float
+    throughput: float
+    unit: str
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class BenchmarkReport:
+    """
+    基准测试报告（机器可读，供版本间回归对比）
+
+    Attributes:
+        suite_version: 套件版本
+        created_at: 生成时间（毫秒）
+        environment: 运行环境（python/平台/CPU/numpy/git commit）
+        config: 本次运行配置
+        universe: 数据集概况
+        results: {基准名称: BenchmarkResult}
+        errors: {基准名称: 错误信息}（失败的基准项）
+    """
+    suite_version: str
+    created_at: int
+    environment: Dict[str, Any]
+    config: Dict[str, Any]
+    universe: Dict[str, Any]
+    results: Dict[str, BenchmarkResult] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return {
+            "suite_version": self.suite_version,
+            "created_at": self.created_at,
+            "environment": self.environment,
+            "config": self.config,
+            "universe": self.universe,
+            "results": {name: result.to_dict() for name, result in self.results.items()},
+            "errors": self.errors,
+        }
+
+    def save(self, path: str) -> None:
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False, default=str)
+
+
+def compare_reports(baseline: Dict, current: Dict, tolerance: float = 0.10) -> List[Dict[str, Any]]:
+    """
+    对比两次基准结果（吞吐下降超过tolerance视为回归）
+
+    Args:
+        baseline: 基线报告（BenchmarkReport.to_dict()或其JSON）
+        current: 当前报告
+        tolerance: 允许的吞吐下降比例（0.10 = 10%）
+
+    Returns:
+        [{name, baseline, current, change, regression}]，按基准名称排序
+    """
+    comparisons = []
+    base_results = baseline.get("results", {})
+    for name, result in sorted(current.get("results", {}).items()):
+        if name not in base_results:
+            continue
+        base_tp = base_results[name].get("throughput", 0.0)
+        curr_tp = result.get("throughput", 0.0)
+        change = (curr_tp / base_tp - 1.0) if base_tp > 0 else 0.0
+        comparisons.append({
+            "name": name,
+            "unit": result.get("unit", ""),
+            "baseline": base_tp,
+            "current": curr_tp,
+            "change": round(change, 4),
+            "regression": change < -tolerance,
+        })
+    return comparisons
+
+
+class UniverseDataLoader(HistoricalDataLoader):
+    """
+    从SyntheticUniverse提供回测数据的HistoricalDataLoader（不访问API，不写缓存）
+    """
+
+    def __init__(self, universe: SyntheticUniverse, config: Optional[Dict] = None):
+        super().__init__({**(config or {}), "cache_enabled": False})
+        self.universe = universe
+
+    def load_klines(self, symbol: str, start_time: int, end_time: int, interval: Optional[str] = None) -> List[Dict]:
+        return self.universe.kline_dicts(symbol, interval or self.default_interval, start_time, end_time)
+
+    def load_funding_rate_history(self, symbol: str, start_time: int, end_time: int) -> List[Dict]:
+        return self.universe.funding_history(symbol, start_time, end_time)
+
+    def load_oi_history(self, symbol: str, start_time: int, end_time: int, period: str = "1h") -> List[Dict]:
+        return self.universe.oi_history(symbol, period, start_time, end_time)
+
+
+class BenchmarkSuite:
+    """
+    扫描与回测吞吐量基准测试套件
+
+    配置驱动（config/params.json -> benchmark）:
+    - universe: SyntheticUniverse配置（n_symbols/seed/history_days/...）
+    - standin: 替身服务配置覆盖（默认不限权重、随机端口）
+    - analyze.max_symbols: analyze基准的symbol数
+    - scan.max_symbols: scan基准的symbol数（null=全部）
+    - backtest: {n_symbols, days, interval, symbol_workers}
+    - cache_warmup: {max_symbols, intervals}
+    - db_writes: {rows}
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Args:
+            config: 基准测试配置（所有参数有默认值）
+        """
+        config = config or {}
+        self.config = config
+
+        # §6.2 配置化：所有参数从配置读取，提供默认值
+        self.universe_config = config.get("universe", {})
+        self.standin_config = {"port": 0, "weight_limit_1m": 10 ** 9, **config.get("standin", {})}
+        self.analyze_config = config.get("analyze", {})
+        self.scan_config = config.get("scan", {})
+        self.backtest_config = config.get("backtest", {})
+        self.cache_warmup_config = config.get("cache_warmup", {})
+        self.db_writes_config = config.get("db_writes", {})
+
+        self.universe = SyntheticUniverse(self.universe_config)
+        self._server = None
+
+    # ==================== 运行 ====================
+
+    def run(self, benchmarks: Optional[List[str]] = None) -> BenchmarkReport:
+        """
+        运行基准测试
+
+        Args:
+            benchmarks: 要运行的基准项（None=全部BENCHMARKS）
+
+        Returns:
+            BenchmarkReport（单项失败记录在errors中，不中断其余基准）
+        """
+        selected = list(benchmarks or BENCHMARKS)
+        unknown = [name for name in selected if name not in BENCHMARKS]
+        if unknown:
+            raise ValueError(f"未知基准项: {unknown}（可选: {list(BENCHMARKS)}）")
+
+        report = BenchmarkReport(
+            suite_version=SUITE_VERSION,
+            created_at=int(time.time() * 1000),
+            environment=_environment(),
+            config=copy.deepcopy(self.config),
+            universe={},
+        )
+
+        runners: Dict[str, Callable[[], BenchmarkResult]] = {
+            "analyze": self.bench_analyze,
+            "scan": self.bench_scan,
+            "backtest": self.bench_backtest,
+            "cache_warmup": self.bench_cache_warmup,
+            "db_writes": self.bench_db_writes,
+        }
+        with self._standin():
+            for name in selected:
+                logger.info(f"▶️  基准测试: {name}")
+                try:
+                    result = runners[name]()
+                    report.results[name] = result
+                    logger.info(
+                        f"   {name}: {result.throughput:.2f} {result.unit} "
+                        f"({result.n_items} items, {result.total_seconds:.2f}s)"
+                    )
+                except Exception as e:
+                    logger.error(f"基准测试失败: {name} - {e}", exc_info=True)
+                    report.errors[name] = f"{type(e).__name__}: {e}"
+
+        report.universe = {
+            "n_symbols": self.universe.n_symbols,
+            "generated_symbols": len(self.universe._series),
+            "history_days": self.universe.history_days,
+            "anchor_time_ms": self.universe.anchor_time_ms,
+            "seed": self.universe.seed,
+            "regime_share": self.universe.regime_summary(),
+        }
+        return report
+
+    def _standin(self):
+        """启动替身服务并把sources.binance/binance_safe指向它（退出时恢复）"""
+        suite = self
+
+        class _Session:
+            def __enter__(self):
+                from ats_core.sources import binance, binance_safe
+                from ats_core.sources.standin import BinanceStandinServer
+
+                standin_config = {**suite.standin_config, "replay_start_ms": suite.universe.anchor_time_ms}
+                suite._server = BinanceStandinServer(standin_config, market=UniverseMarket(suite.universe))
+                url = suite._server.start_in_thread()
+                self._saved = (binance.BASE, binance.SPOT_BASE, binance_safe.BASE)
+                binance.BASE = binance.SPOT_BASE = binance_safe.BASE = url
+                return suite._server
+
+            def __exit__(self, *exc):
+                from ats_core.sources import binance, binance_safe
+
+                binance.BASE, binance.SPOT_BASE, binance_safe.BASE = self._saved
+                suite._server.stop_thread()
+                suite._server = None
+                return False
+
+        return _Session()
+
+    def _api_requests(self) -> int:
+        return self._server.stats["requests"] if self._server is not None else 0
+
+    # ==================== 输入数据 ====================
+
+    def _analysis_inputs(self, symbol: str) -> Dict[str, Any]:
+        """与OptimizedBatchScanner.scan相同的analyze输入（K线条数/附加数据一致）"""
+        u = self.universe
+        prices = u.latest_prices(symbol)
+        return {
+            "symbol": symbol,
+            "k1h": u.klines(symbol, "1h", limit=300),
+            "k4h": u.klines(symbol, "4h", limit=200),
+            "k15m": u.klines(symbol, "15m", limit=200),
+            "k1d": u.klines(symbol, "1d", limit=100),
+            "orderbook": u.orderbook(symbol, limit=100),
+            "mark_price": prices["mark_price"],
+            "funding_rate": prices["funding_rate"],
+            "spot_price": prices["spot_price"],
+            "oi_data": u.oi_history(symbol, "1h", limit=300),
+            "btc_klines": u.klines("BTCUSDT", "1h", limit=48),
+            "eth_klines": u.klines("ETHUSDT", "1h", limit=48),
+        }
+
+    def _symbols(self, limit: Optional[int]) -> List[str]:
+        return self.universe.symbols[:limit] if limit else list(self.universe.symbols)
+
+    # ==================== 基准项 ====================
+
+    def bench_analyze(self) -> BenchmarkResult:
+        """analyze_symbol_with_preloaded_klines：单symbol耗时与各因子耗时分布"""
+        from ats_core.pipeline.analyze_symbol import analyze_symbol_with_preloaded_klines
+
+        symbols = self._symbols(self.analyze_config.get("max_symbols", 50))
+        warmup = self.analyze_config.get("warmup_symbols", 1)
+
+        # 预热（首次调用含配置加载/模块导入，不计入）
+        for symbol in symbols[:warmup]:
+            analyze_symbol_with_preloaded_klines(**self._analysis_inputs(symbol))
+
+        durations: List[float] = []
+        factor_times: Dict[str, List[float]] = {}
+        requests_before = self._api_requests()
+        for symbol in symbols:
+            inputs = self._analysis_inputs(symbol)
+            start = time.perf_counter()
+            result = analyze_symbol_with_preloaded_klines(**inputs)
+            durations.append(time.perf_counter() - start)
+            for step, seconds in (result.get("perf") or {}).items():
+                factor_times.setdefault(step, []).append(seconds)
+        api_requests = self._api_requests() - requests_before
+
+        total = float(sum(durations))
+        factor_total = {step: float(sum(values)) for step, values in factor_times.items()}
+        factors = {
+            step: {**_latency_stats(values), "share": round(factor_total[step] / total, 4) if total else 0.0}
+            for step, values in factor_times.items()
+        }
+        uninstrumented = total - sum(factor_total.values())
+        return BenchmarkResult(
+            name="analyze",
+            n_items=len(symbols),
+            total_seconds=round(total, 4),
+            throughput=_rate(len(symbols), total),
+            unit="symbols/s",
+            latency_ms=_latency_stats(durations),
+            extra={
+                "factors": factors,
+                "uninstrumented_seconds": round(uninstrumented, 4),
+                "uninstrumented_share": round(uninstrumented / total, 4) if total else 0.0,
+                "api_requests": api_requests,
+                "api_requests_per_symbol": round(api_requests / len(symbols), 2) if symbols else 0.0,
+            },
+        )
+
+    def bench_scan(self) -> BenchmarkResult:
+        """OptimizedBatchScanner.scan 全流程（缓存已就绪，不含预热）"""
+        from ats_core.data.realtime_kline_cache import RealtimeKlineCache
+        from ats_core.pipeline.batch_scan_optimized import OptimizedBatchScanner
+
+        u = self.universe
+        symbols = self._symbols(self.scan_config.get("max_symbols"))
+
+        scanner = OptimizedBatchScanner()
+        scanner.kline_cache = RealtimeKlineCache(max_klines=300)
+        for symbol in symbols:
+            scanner.kline_cache.cache[symbol] = {
+                interval: deque(u.klines(symbol, interval, limit=300), maxlen=300)
+                for interval in ("1h", "4h", "15m", "1d")
+            }
+            scanner.kline_cache.initialized[symbol] = True
+            scanner.kline_cache.last_update[symbol] = time.time()
+            prices = u.latest_prices(symbol)
+            scanner.mark_price_cache[symbol] = prices["mark_price"]
+            scanner.funding_rate_cache[symbol] = prices["funding_rate"]
+            scanner.spot_price_cache[symbol] = prices["spot_price"]
+            scanner.orderbook_cache[symbol] = u.orderbook(symbol, limit=100)
+            scanner.oi_cache[symbol] = u.oi_history(symbol, "1h", limit=300)
+        scanner.btc_klines = u.klines("BTCUSDT", "1h", limit=48)
+        scanner.eth_klines = u.klines("ETHUSDT", "1h", limit=48)
+        scanner.symbols = list(symbols)
+        scanner.symbols_active = list(symbols)
+        scanner.initialized = True  # client=None：三层数据更新跳过，只测扫描分析
+
+        requests_before = self._api_requests()
+        start = time.perf_counter()
+        scan_result = asyncio.run(scanner.scan(publish_reports=False))
+        total = time.perf_counter() - start
+        api_requests = self._api_requests() - requests_before
+
+        return BenchmarkResult(
+            name="scan",
+            n_items=len(symbols),
+            total_seconds=round(total, 4),
+            throughput=_rate(len(symbols), total),
+            unit="symbols/s",
+            extra={
+                "signals_found": scan_result.get("signals_found", 0),
+                "skipped": scan_result.get("skipped", 0),
+                "errors": scan_result.get("errors", 0),
+                "api_requests": api_requests,
+                "api_requests_per_symbol": round(api_requests / len(symbols), 2) if symbols else 0.0,
+            },
+        )
+
+    def bench_backtest(self) -> BenchmarkResult:
+        """BacktestEngine.run：bars/秒（symbol × 主周期bar）"""
+        from ats_core.backtest.engine import BacktestEngine
+        from ats_core.cfg import CFG
+
+        n_symbols = self.backtest_config.get("n_symbols", 3)
+        days = self.backtest_config.get("days", 7)
+        interval = self.backtest_config.get("interval", "1h")
+        interval_ms = INTERVAL_MS[interval]
+
+        u = self.universe
+        end_time = u.anchor_time_ms - interval_ms
+        start_time = end_time - days * 86_400_000
+        lookback_start = start_time - 300 * interval_ms
+        if lookback_start < u.start_time_ms:
+            raise ValueError(
+                f"universe.history_days不足: 回测{days}天 + 300根回看需要"
+                f"{(u.anchor_time_ms - lookback_start) / 86_400_000:.1f}天"
+            )
+
+        backtest_params = CFG.params.get("backtest", {})
+        engine_config = copy.deepcopy(backtest_params.get("engine", {}))
+        engine_config["checkpoint"] = {"path": None}
+        engine_config["symbol_workers"] = self.backtest_config.get("symbol_workers", 1)
+        loader = UniverseDataLoader(u, backtest_params.get("data_loader", {}))
+        engine = BacktestEngine(engine_config, loader)
+
+        symbols = self._symbols(n_symbols)
+        start = time.perf_counter()
+        result = engine.run(symbols=symbols, start_time=start_time, end_time=end_time, interval=interval)
+        total = time.perf_counter() - start
+
+        iterations = result.metadata.get("total_iterations", 0)
+        bars = iterations * len(symbols)
+        return BenchmarkResult(
+            name="backtest",
+            n_items=bars,
+            total_seconds=round(total, 4),
+            throughput=_rate(bars, total),
+            unit="bars/s",
+            extra={
+                "symbols": len(symbols),
+                "days": days,
+                "interval": interval,
+                "engine_seconds": result.metadata.get("execution_time_seconds", 0.0),
+                "signals": len(result.signals),
+                "rejected_analyses": len(result.rejected_analyses),
+                "symbol_workers": engine_config["symbol_workers"],
+            },
+        )
+
+    def bench_cache_warmup(self) -> BenchmarkResult:
+        """RealtimeKlineCache.initialize_batch（BinanceFuturesClient经HTTP请求替身服务）"""
+        from ats_core.data.realtime_kline_cache import RealtimeKlineCache
+        from ats_core.execution.binance_futures_client import BinanceFuturesClient
+
+        symbols = self._symbols(self.cache_warmup_config.get("max_symbols", 50))
+        intervals = self.cache_warmup_config.get("intervals", ["1h", "4h", "15m", "1d"])
+
+        async def _warmup() -> Dict[str, Any]:
+            client = BinanceFuturesClient("", "", base_url=self._server.base_url)
+            await client.initialize()
+            try:
+                cache = RealtimeKlineCache(max_klines=300)
+                start = time.perf_counter()
+                await cache.initialize_batch(symbols=symbols, intervals=intervals, client=client)
+                return {"seconds": time.perf_counter() - start, "stats": cache.get_stats()}
+            finally:
+                await client.close()
+
+        requests_before = self._api_requests()
+        outcome = asyncio.run(_warmup())
+        total = outcome["seconds"]
+        return BenchmarkResult(
+            name="cache_warmup",
+            n_items=len(symbols),
+            total_seconds=round(total, 4),
+            throughput=_rate(len(symbols), total),
+            unit="symbols/s",
+            extra={
+                "intervals": intervals,
+                "api_requests": self._api_requests() - requests_before,
+                "total_klines": outcome["stats"]["total_klines"],
+                "memory_estimate_mb": round(outcome["stats"]["memory_estimate_mb"], 2),
+            },
+        )
+
+    def bench_db_writes(self) -> BenchmarkResult:
+        """AnalysisDB写入吞吐（临时数据库，逐条计时）"""
+        from ats_core.data.analysis_db import AnalysisDB
+
+        rows = self.db_writes_config.get("rows", 1000)
+        scan_rows = self.db_writes_config.get("scan_statistics_rows", 50)
+        u = self.universe
+        symbols = self._symbols(min(rows, u.n_symbols))
+        rng = np.random.default_rng(u.seed)
+
+        with tempfile.TemporaryDirectory(prefix="ats_bench_db_") as tmp:
+            db = AnalysisDB(os.path.join(tmp, "analysis.db"))
+            records = [
+                _signal_record(symbols[i % len(symbols)], u, i, rng)
+                for i in range(rows)
+            ]
+
+            durations: List[float] = []
+            for record in records:
+                start = time.perf_counter()
+                db.write_complete_signal(record)
+                durations.append(time.perf_counter() - start)
+
+            scan_durations: List[float] = []
+            for i in range(scan_rows):
+                summary = {
+                    "timestamp": f"2024-01-01T00:{i % 60:02d}:00Z",
+                    "scan_info": {"total_symbols": len(symbols), "signals_found": i % 7},
+                    "performance": {"total_time_sec": 1.0},
+                }
+                start = time.perf_counter()
+                db.write_scan_statistics(summary)
+                scan_durations.append(time.perf_counter() - start)
+            db.close()
+            db_size = os.path.getsize(db.db_path)
+
+            # 整轮扫描批量写入（每批=一轮扫描的symbol数，单事务）
+            batch_db = AnalysisDB(os.path.join(tmp, "analysis_batch.db"))
+            batch_size = len(symbols)
+            batch_durations: List[float] = []
+            for offset in range(0, rows, batch_size):
+                start = time.perf_counter()
+                batch_db.write_scan_batch(records[offset:offset + batch_size])
+                batch_durations.append(time.perf_counter() - start)
+            batch_db.close()
+
+        total = float(sum(durations))
+        return BenchmarkResult(
+            name="db_writes",
+            n_items=rows,
+            total_seconds=round(total, 4),
+            throughput=_rate(rows, total),
+            unit="signals/s",
+            latency_ms=_latency_stats(durations),
+            extra={
+                "scan_statistics": {
+                    "rows": scan_rows,
+                    "throughput": _rate(scan_rows, float(sum(scan_durations))),
+                    "latency_ms": _latency_stats(scan_durations),
+                },
+                "scan_batch": {
+                    "batch_size": batch_size,
+                    "throughput": _rate(rows, float(sum(batch_durations))),
+                    "latency_ms": _latency_stats(batch_durations),
+                },
+                "db_size_mb": round(db_size / 1024 / 1024, 3),
+            },
+        )
+
+
+# ==================== 工具函数 ====================
+
+def _rate(n_items: int, seconds: float) -> float:
+    return round(n_items / seconds, 3) if seconds > 0 else 0.0
+
+
+def _latency_stats(samples: List[float]) -> Dict[str, float]:
+    """耗时分布（秒 → 毫秒）"""
+    if not samples:
+        return {}
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    return {
+        "mean": round(float(values.mean()), 4),
+        "p50": round(float(np.percentile(values, 50)), 4),
+        "p95": round(float(np.percentile(values, 95)), 4),
+        "p99": round(float(np.percentile(values, 99)), 4),
+        "max": round(float(values.max()), 4),
+    }
+
+
+def _signal_record(symbol: str, universe: SyntheticUniverse, i: int, rng: np.random.Generator) -> Dict[str, Any]:
+    """write_complete_signal输入（字段与analyze_with_v72_enhancements输出一致的子集）"""
+    series = universe.series(symbol)
+    bar = len(series.close) - 1 - (i % len(series.close))
+    scores = {k: float(v) for k, v in zip("TMCVOBF", rng.uniform(-100, 100, 7))}
+    scores["I"] = float(rng.uniform(0, 100))
+    return {
+        "symbol": symbol,
+        "timestamp": int(series.open_time[bar]) + i,
+        "price": float(series.close[bar]),
+        "scores": scores,
+        "side": "long" if scores["T"] >= 0 else "short",
+        "side_long": scores["T"] >= 0,
+        "weighted_score": float(np.mean(list(scores.values()))),
+        "probability": float(rng.uniform(0.4, 0.8)),
+        "expected_value": float(rng.normal(0.005, 0.01)),
+        "v72_enhancements": {},
+    }
+
+
+def _environment() -> Dict[str, Any]:
+    """运行环境（用于判断两次结果是否可比）"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=10,
+            cwd=str(Path(__file__).resolve().parent.parent.parent)
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "git_commit": commit,
+    }
@@ -0,0 +1,459 @@
+# coding: utf-8
+"""
+Benchmark Suite v1.0 - Synthetic Market Universe
+基准测试套件 - 合成市场数据集（GBM + 状态切换）
+
+功能：
+1. 按symbol生成确定性的15m基础价格路径：几何布朗运动，漂移/波动率由马尔可夫状态链切换
+   （bull / bear / range / volatile），状态持续期与切换概率可配置
+2. 由15m基础路径聚合1h/4h/1d K线（同一symbol各周期严格一致），输出Binance原始12列格式
+3. 派生OI历史（随趋势累积 + 噪声）、资金费率（随状态漂移）、订单簿（深度随波动率变化）、
+   标记/现货价格
+4. 规模可配置（50 ~ 1000+ symbols），数据按symbol惰性生成并缓存
+
+用途：
+- 扫描/回测/缓存预热/数据库写入的吞吐基准测试（ats_core.benchmark.suite）
+- 不访问网络，不依赖真实行情
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ats_core.sources.standin.market import SyntheticMarket
+
+logger = logging.getLogger(__name__)
+
+BASE_INTERVAL = "15m"
+BASE_INTERVAL_MS = 15 * 60 * 1000
+INTERVAL_MS = {
+    "15m": BASE_INTERVAL_MS,
+    "1h": 3_600_000,
+    "4h": 4 * 3_600_000,
+    "1d": 86_400_000,
+}
+FUNDING_INTERVAL_MS = 8 * 3_600_000
+
+# 状态：(年化漂移, 年化波动率)，按15m步长换算
+REGIMES = ("bull", "bear", "range", "volatile")
+DEFAULT_REGIME_PARAMS = {
+    "bull": [1.5, 0.55],
+    "bear": [-1.5, 0.65],
+    "range": [0.0, 0.35],
+    "volatile": [0.0, 1.20],
+}
+_STEPS_PER_YEAR = 365 * 96
+
+
+@dataclass
+class SymbolSeries:
+    """
+    单个symbol的15m基础序列（numpy数组，按时间升序）
+
+    Attributes:
+        open_time: 开盘时间（毫秒）
+        open/high/low/close: 价格
+        volume: 成交量（币）
+        taker_buy: 主动买入量（币）
+        trades: 成交笔数
+        regime: 状态索引（REGIMES）
+        open_interest: 持仓量（币，K线收盘时刻）
+        funding_rate: 资金费率（K线收盘时刻的预测费率）
+    """
+    open_time: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    taker_buy: np.ndarray
+    trades: np.ndarray
+    regime: np.ndarray
+    open_interest: np.ndarray
+    funding_rate: np.ndarray
+
+
+class SyntheticUniverse:
+    """
+    合成市场数据集
+
+    配置驱动（config/params.json -> benchmark.universe）:
+    - n_symbols: symbol数量（BTCUSDT/ETHUSDT固定包含，其余为SYN0001USDT...）
+    - seed: 随机种子（同一seed + symbol生成逐位相同的数据）
+    - anchor_time_ms: 数据结束时刻（固定锚点，保证跨版本可比）
+    - history_days: 历史长度（需覆盖1d×100根 + 回测区间）
+    - regime_params: {状态: [年化漂移, 年化波动率]}
+    - regime_mean_duration_hours: 状态平均持续时长（几何分布）
+    - beta_range: 对BTC收益的beta范围（symbol间相关性）
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Args:
+            config: 数据集配置（所有参数有默认值）
+        """
+        config = config or {}
+
+        # §6.2 配置化：所有参数从配置读取，提供默认值
+        self.n_symbols = max(2, config.get("n_symbols", 200))
+        self.seed = config.get("seed", 42)
+        self.anchor_time_ms = config.get("anchor_time_ms", 1704067200000)  # 2024-01-01 00:00 UTC
+        self.history_days = config.get("history_days", 120)
+        self.regime_params = config.get("regime_params", DEFAULT_REGIME_PARAMS)
+        self.regime_mean_duration_hours = config.get("regime_mean_duration_hours", 72)
+        self.beta_range = config.get("beta_range", [0.6, 1.6])
+        self.cache_series = config.get("cache_series", True)
+
+        self.anchor_time_ms -= self.anchor_time_ms % INTERVAL_MS["1d"]
+        self.n_steps = self.history_days * 96
+        self.start_time_ms = self.anchor_time_ms - self.n_steps * BASE_INTERVAL_MS
+
+        self.symbols = ["BTCUSDT", "ETHUSDT"] + [f"SYN{i:04d}USDT" for i in range(1, self.n_symbols - 1)]
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._series: Dict[str, SymbolSeries] = {}
+        self._btc_returns: Optional[np.ndarray] = None
+
+        logger.info(
+            f"SyntheticUniverse: {self.n_symbols} symbols, {self.history_days}d history, "
+            f"anchor={self.anchor_time_ms}, seed={self.seed}"
+        )
+
+    # ==================== 基础序列 ====================
+
+    def _rng(self, symbol: str, stream: str) -> np.random.Generator:
+        key = zlib.crc32(f"{symbol}:{stream}".encode("utf-8"))
+        return np.random.default_rng([self.seed, key])
+
+    def _regime_path(self, rng: np.random.Generator) -> np.ndarray:
+        """马尔可夫状态链（15m步长，几何持续期，切换到其余状态等概率）"""
+        switch_prob = 1.0 / max(self.regime_mean_duration_hours * 4, 1)
+        switches = rng.random(self.n_steps) < switch_prob
+        jumps = rng.integers(1, len(REGIMES), size=self.n_steps)
+        offsets = np.cumsum(np.where(switches, jumps, 0))
+        return (int(rng.integers(len(REGIMES))) + offsets) % len(REGIMES)
+
+    def _log_returns(self, symbol: str, regime: np.ndarray) -> np.ndarray:
+        """状态相关GBM对数收益（非BTC的symbol叠加beta × BTC收益，形成横截面相关）"""
+        rng = self._rng(symbol, "returns")
+        params = np.array([self.regime_params[name] for name in REGIMES], dtype=np.float64)
+        mu = params[regime, 0] / _STEPS_PER_YEAR
+        sigma = params[regime, 1] / np.sqrt(_STEPS_PER_YEAR)
+        shocks = rng.standard_t(df=5, size=self.n_steps) * np.sqrt(3.0 / 5.0)  # 厚尾，方差归一
+        returns = mu - 0.5 * sigma ** 2 + sigma * shocks
+
+        if symbol != "BTCUSDT":
+            if self._btc_returns is None:
+                self._btc_returns = self.series("BTCUSDT").close
+                self._btc_returns = np.diff(np.log(self._btc_returns), prepend=np.log(self._btc_returns[0]))
+            beta = rng.uniform(*self.beta_range)
+            returns = 0.6 * returns + beta * 0.4 * self._btc_returns
+        return returns
+
+    def series(self, symbol: str) -> SymbolSeries:
+        """
+        获取（或生成）symbol的15m基础序列
+
+        Args:
+            symbol: 交易对（须在self.symbols中，或任意名称按同样规则生成）
+
+        Returns:
+            SymbolSeries
+        """
+        cached = self._series.get(symbol)
+        if cached is not None:
+            return cached
+
+        rng = self._rng(symbol, "path")
+        regime = self._regime_path(rng)
+        returns = self._log_returns(symbol, regime)
+
+        index = self._index.get(symbol, len(self.symbols))
+        start_price = {"BTCUSDT": 42000.0, "ETHUSDT": 2300.0}.get(symbol, float(10 ** rng.uniform(-2, 2.5)))
+        close = start_price * np.exp(np.cumsum(returns))
+        open_ = np.concatenate([[start_price], close[:-1]])
+
+        params = np.array([self.regime_params[name] for name in REGIMES], dtype=np.float64)
+        step_sigma = params[regime, 1] / np.sqrt(_STEPS_PER_YEAR)
+        wick_up = np.abs(rng.normal(0, 0.6, self.n_steps)) * step_sigma
+        wick_down = np.abs(rng.normal(0, 0.6, self.n_steps)) * step_sigma
+        high = np.maximum(open_, close) * np.exp(wick_up)
+        low = np.minimum(open_, close) * np.exp(-wick_down)
+
+        # 成交量：流动性分层（头部symbol量大）× 波动放大 × 对数正态噪声
+        liquidity = 2e7 / (1 + index) ** 0.8 + 5e5
+        activity = 1 + 0.5 * np.abs(returns) / np.maximum(step_sigma, 1e-12)
+        quote_volume = liquidity / 96 * activity * rng.lognormal(0, 0.35, self.n_steps)
+        volume = quote_volume / close
+        taker_ratio = np.clip(0.5 + 0.25 * np.tanh(returns / np.maximum(step_sigma, 1e-12)) + rng.normal(0, 0.03, self.n_steps), 0.05, 0.95)
+        trades = np.maximum(1, quote_volume / 2000).astype(np.int64)
+
+        # OI：随趋势方向累积，波动状态去杠杆
+        oi_drift = 0.002 * np.tanh(np.convolve(returns, np.ones(16) / 16, mode="same") * 400)
+        oi_drift -= np.where(regime == REGIMES.index("volatile"), 0.0015, 0.0)
+        oi_log = np.cumsum(oi_drift + rng.normal(0, 0.002, self.n_steps))
+        open_interest = liquidity * 0.6 / start_price * np.exp(oi_log - oi_log.mean())
+
+        # 资金费率：基准万一，bull抬升、bear压低，随OI变化
+        regime_bias = np.array([3e-4, -2e-4, 0.0, 1e-4])[regime]
+        funding_noise = np.convolve(rng.normal(0, 1e-4, self.n_steps), np.ones(32) / 32, mode="same")
+        funding_rate = np.clip(1e-4 + 0.5 * regime_bias + funding_noise * 4, -0.0075, 0.0075)
+
+        result = SymbolSeries(
+            open_time=self.start_time_ms + np.arange(self.n_steps, dtype=np.int64) * BASE_INTERVAL_MS,
+            open=open_, high=high, low=low, close=close,
+            volume=volume, taker_buy=volume * taker_ratio, trades=trades,
+            regime=regime, open_interest=open_interest, funding_rate=funding_rate,
+        )
+        if self.cache_series:
+            self._series[symbol] = result
+        return result
+
+    # ==================== K线 ====================
+
+    def _window(self, interval: str, start_time: Optional[int], end_time: Optional[int], limit: Optional[int]) -> slice:
+        """计算目标周期K线的索引范围（按开盘时间，包含start/end所在范围内的完整K线）"""
+        step = INTERVAL_MS[interval]
+        n_bars = self.n_steps * BASE_INTERVAL_MS // step
+        first = 0 if start_time is None else max(0, -(-(start_time - self.start_time_ms) // step))
+        last = n_bars if end_time is None else min(n_bars, (end_time - self.start_time_ms) // step + 1)
+        if limit:
+            if start_time is None:
+                first = max(first, last - limit)
+            else:
+                last = min(last, first + limit)
+        return slice(first, max(first, last))
+
+    def ohlcv(
+        self,
+        symbol: str,
+        interval: str = "1h",
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        聚合后的OHLCV数组
+
+        Returns:
+            {"open_time", "open", "high", "low", "close", "volume", "taker_buy", "trades"}
+        """
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"不支持的周期: {interval}（支持: {list(INTERVAL_MS)}）")
+        s = self.series(symbol)
+        factor = INTERVAL_MS[interval] // BASE_INTERVAL_MS
+        window = self._window(interval, start_time, end_time, limit)
+        lo, hi = window.start * factor, window.stop * factor
+        shape = (-1, factor)
+        return {
+            "open_time": s.open_time[lo:hi:factor],
+            "open": s.open[lo:hi:factor],
+            "high": s.high[lo:hi].reshape(shape).max(axis=1),
+            "low": s.low[lo:hi].reshape(shape).min(axis=1),
+            "close": s.close[lo + factor - 1:hi:factor],
+            "volume": s.volume[lo:hi].reshape(shape).sum(axis=1),
+            "taker_buy": s.taker_buy[lo:hi].reshape(shape).sum(axis=1),
+            "trades": s.trades[lo:hi].reshape(shape).sum(axis=1),
+        }
+
+    def klines(
+        self,
+        symbol: str,
+        interval: str = "1h",
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[list]:
+        """
+        Binance /fapi/v1/klines 原始格式（12列，数值字段为字符串）
+
+        Args:
+            symbol: 交易对
+            interval: 15m / 1h / 4h / 1d
+            start_time: 开盘时间下界（毫秒，含）
+            end_time: 开盘时间上界（毫秒，含）
+            limit: 最多返回条数（未指定start_time时取最近limit根）
+        """
+        bars = self.ohlcv(symbol, interval, start_time, end_time, limit)
+        step = INTERVAL_MS[interval]
+        quote = bars["volume"] * (bars["high"] + bars["low"] + bars["close"]) / 3
+        taker_quote = bars["taker_buy"] * bars["close"]
+        return [
+            [
+                int(t), f"{o:.8g}", f"{h:.8g}", f"{l:.8g}", f"{c:.8g}", f"{v:.6f}",
+                int(t) + step - 1, f"{q:.4f}", int(n), f"{tb:.6f}", f"{tq:.4f}", "0"
+            ]
+            for t, o, h, l, c, v, q, n, tb, tq in zip(
+                bars["open_time"], bars["open"], bars["high"], bars["low"], bars["close"],
+                bars["volume"], quote, bars["trades"], bars["taker_buy"], taker_quote
+            )
+        ]
+
+    def kline_dicts(
+        self,
+        symbol: str,
+        interval: str = "1h",
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """HistoricalDataLoader.load_klines()字典格式（回测引擎使用）"""
+        bars = self.ohlcv(symbol, interval, start_time, end_time)
+        step = INTERVAL_MS[interval]
+        return [
+            {
+                "timestamp": int(t), "open": float(o), "high": float(h), "low": float(l),
+                "close": float(c), "volume": float(v), "close_time": int(t) + step - 1,
+                "quote_volume": float(v * c), "trades": int(n),
+                "taker_buy_base": float(tb), "taker_buy_quote": float(tb * c),
+            }
+            for t, o, h, l, c, v, n, tb in zip(
+                bars["open_time"], bars["open"], bars["high"], bars["low"], bars["close"],
+                bars["volume"], bars["trades"], bars["taker_buy"]
+            )
+        ]
+
+    # ==================== OI / 资金费率 / 价格 / 订单簿 ====================
+
+    def oi_history(
+        self,
+        symbol: str,
+        period: str = "1h",
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """/futures/data/openInterestHist 格式（timestamp为周期收盘时刻）"""
+        s = self.series(symbol)
+        factor = INTERVAL_MS[period] // BASE_INTERVAL_MS
+        window = self._window(period, start_time, end_time, limit)
+        idx = np.arange(window.start, window.stop) * factor + factor - 1
+        return [
+            {
+                "symbol": symbol,
+                "sumOpenInterest": f"{s.open_interest[i]:.4f}",
+                "sumOpenInterestValue": f"{s.open_interest[i] * s.close[i]:.4f}",
+                "timestamp": int(s.open_time[i]) + BASE_INTERVAL_MS,
+            }
+            for i in idx
+        ]
+
+    def funding_history(
+        self,
+        symbol: str,
+        start_time: Optional[int] = None,
+        end_time: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """/fapi/v1/fundingRate 格式（每8小时结算）"""
+        s = self.series(symbol)
+        step = FUNDING_INTERVAL_MS // BASE_INTERVAL_MS
+        idx = np.arange(step - 1, self.n_steps, step)
+        times = s.open_time[idx] + BASE_INTERVAL_MS
+        mask = np.ones(len(idx), dtype=bool)
+        if start_time is not None:
+            mask &= times >= start_time
+        if end_time is not None:
+            mask &= times <= end_time
+        return [
+            {"symbol": symbol, "fundingTime": int(t), "fundingRate": f"{s.funding_rate[i]:.8f}",
+             "markPrice": f"{s.close[i]:.8g}"}
+            for t, i in zip(times[mask], idx[mask])
+        ]
+
+    def latest_prices(self, symbol: str) -> Dict[str, float]:
+        """最新标记价格/现货价格/资金费率（锚点时刻）"""
+        s = self.series(symbol)
+        last = float(s.close[-1])
+        basis = float(s.funding_rate[-1]) * 3  # 资金费率与基差同向
+        return {
+            "mark_price": last * (1 + basis),
+            "spot_price": last,
+            "funding_rate": float(s.funding_rate[-1]),
+        }
+
+    def orderbook(self, symbol: str, limit: int = 100) -> Dict[str, Any]:
+        """
+        /fapi/v1/depth 格式订单簿（价差与深度随最近波动率变化）
+        """
+        s = self.series(symbol)
+        rng = self._rng(symbol, "book")
+        mid = float(s.close[-1])
+        recent_vol = float(np.std(np.diff(np.log(s.close[-97:])))) or 1e-4
+        tick = 10 ** np.floor(np.log10(mid * 1e-5))
+        half_spread = max(tick, mid * recent_vol * 0.05)
+        level_qty = float(np.mean(s.volume[-96:])) / 50 / (1 + recent_vol * 200)
+
+        offsets = np.arange(limit) * max(tick, mid * 1e-4)
+        bid_qty = level_qty * rng.lognormal(0, 0.5, limit) * (1 + np.arange(limit) / 20)
+        ask_qty = level_qty * rng.lognormal(0, 0.5, limit) * (1 + np.arange(limit) / 20)
+        return {
+            "lastUpdateId": int(s.open_time[-1] // 100),
+            "bids": [[f"{mid - half_spread - o:.8g}", f"{q:.4f}"] for o, q in zip(offsets, bid_qty)],
+            "asks": [[f"{mid + half_spread + o:.8g}", f"{q:.4f}"] for o, q in zip(offsets, ask_qty)],
+        }
+
+    def ticker_24h(self, symbol: str) -> Dict[str, Any]:
+        """/fapi/v1/ticker/24hr 格式（锚点前24小时）"""
+        bars = self.ohlcv(symbol, "1h", limit=24)
+        last, first = float(bars["close"][-1]), float(bars["open"][0])
+        return {
+            "symbol": symbol,
+            "lastPrice": f"{last:.8g}",
+            "openPrice": f"{first:.8g}",
+            "priceChangePercent": f"{(last / first - 1) * 100:.3f}",
+            "quoteVolume": f"{float(np.sum(bars['volume'] * bars['close'])):.2f}",
+            "volume": f"{float(np.sum(bars['volume'])):.4f}",
+        }
+
+    def regime_summary(self) -> Dict[str, float]:
+        """已生成序列的状态占比（用于报告数据集特征）"""
+        counts = np.zeros(len(REGIMES))
+        for s in self._series.values():
+            counts += np.bincount(s.regime, minlength=len(REGIMES))
+        total = counts.sum() or 1.0
+        return {name: round(float(c / total), 4) for name, c in zip(REGIMES, counts)}
+
+
+# ==================== 替身服务适配 ====================
+
+
+class UniverseMarket(SyntheticMarket):
+    """
+    将SyntheticUniverse接入币安替身服务（ats_core.sources.standin）
+
+    分析流程中仍直接请求REST的路径（如市场状态的BTC/ETH K线、15m微确认）由替身服务
+    返回与数据集一致的数据；15m/1h/4h/1d以外的周期与订单簿/成交围绕数据集价格合成
+    """
+
+    def __init__(self, universe: SyntheticUniverse):
+        super().__init__(seed=universe.seed, symbols=universe.symbols)
+        self.universe = universe
+
+    def base_price(self, symbol: str) -> float:
+        return float(self.universe.series(symbol).open[0])
+
+    def price_at(self, symbol: str, times_ms: Any) -> np.ndarray:
+        s = self.universe.series(symbol)
+        return np.interp(np.asarray(times_ms, dtype=np.float64), s.open_time + BASE_INTERVAL_MS, s.close)
+
+    def klines(self, symbol, interval, start_time, end_time, limit, now_ms):
+        if interval not in INTERVAL_MS:
+            return super().klines(symbol, interval, start_time, end_time, limit, now_ms)
+        upper = min(end_time, now_ms) if end_time is not None else now_ms
+        return self.universe.klines(symbol, interval, start_time, upper, limit)
+
+    def funding_history(self, symbol, start_time, end_time, limit, now_ms):
+        upper = min(end_time, now_ms) if end_time is not None else now_ms
+        rows = self.universe.funding_history(symbol, start_time, upper)
+        return rows[:limit] if start_time is not None else rows[-limit:]
+
+    def open_interest_hist(self, symbol, period, start_time, end_time, limit, now_ms):
+        if period not in INTERVAL_MS:
+            return super().open_interest_hist(symbol, period, start_time, end_time, limit, now_ms)
+        upper = min(end_time, now_ms) if end_time is not None else now_ms
+        return self.universe.oi_history(symbol, period, start_time, upper, limit)
@@ -7,6 +7,8 @@ Broker Module - 统一的订单和持仓管理
 - BacktestBroker: 回测模拟执行（未来迁入）
 - LiveBroker: 实盘执行（未来实现）
 
+TriggerBook: 按价格索引的触发簿（PaperBroker/BacktestBroker的Entry/SL/TP/过期匹配）
+
 Version: v1.0.0
 Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
 """
@@ -21,6 +23,7 @@ from ats_core.broker.base import (
     AccountState,
     Broker,
 )
+from ats_core.broker.trigger_book import TriggerBook
 from ats_core.broker.paper_broker import PaperBroker
 from ats_core.broker.backtest_broker import BacktestBroker
 
@@ -33,6 +36,7 @@ __all__ = [
     "Position",
     "AccountState",
     "Broker",
+    "TriggerBook",
     "PaperBroker",
     "BacktestBroker",
 ]
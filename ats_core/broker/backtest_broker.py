@@ -11,7 +11,9 @@ Backtest Broker - 回测模拟执行
 - 共享相同的执行契约（订单成交、SL/TP监控、滑点/手续费）
 - BacktestBroker = PaperBroker + 历史数据驱动
 
-Version: v1.0.0
+v1.1: 价格事件按时间点索引（每个时间点只推送有K线的symbol），成交/SL/TP/过期由PaperBroker触发簿处理
+
+Version: v1.1.0
 Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
 """
 
@@ -97,14 +99,6 @@ class BacktestBroker(PaperBroker):
         # 按时间排序信号
         sorted_signals = sorted(signals, key=lambda s: s["timestamp"])
 
-        # 构建时间线（所有K线时间点）
-        all_timestamps = set()
-        for symbol, klines in klines_by_symbol.items():
-            for kline in klines:
-                all_timestamps.add(kline["close_time"])
-
-        timeline = sorted(all_timestamps)
-
         # 信号队列（按timestamp索引）
         signal_queue = {}
         for sig in sorted_signals:
@@ -113,12 +107,14 @@ class BacktestBroker(PaperBroker):
                 signal_queue[ts] = []
             signal_queue[ts].append(sig)
 
-        # 价格缓存（用于时间循环）
-        price_cache: Dict[str, Dict[int, float]] = {}
+        # 价格事件（按时间点索引，只包含该时间点有K线的symbol）
+        price_events: Dict[int, Dict[str, float]] = {}
         for symbol, klines in klines_by_symbol.items():
-            price_cache[symbol] = {}
             for kline in klines:
-                price_cache[symbol][kline["close_time"]] = kline["close"]
+                price_events.setdefault(kline["close_time"], {})[symbol] = kline["close"]
+
+        # 时间线（所有K线时间点）
+        timeline = sorted(price_events)
 
         # 时间循环
         for ts in timeline:
@@ -128,9 +124,8 @@ class BacktestBroker(PaperBroker):
                     self._process_signal(sig, ts)
 
             # 2. 更新价格
-            for symbol, prices in price_cache.items():
-                if ts in prices:
-                    self.on_price_update(symbol, prices[ts], ts)
+            for symbol, price in price_events[ts].items():
+                self.on_price_update(symbol, price, ts)
 
             # 3. 更新时间（检查过期）
             self.on_time(ts)
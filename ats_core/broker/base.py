@@ -101,6 +101,26 @@ class Order:
             "metadata": self.metadata,
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Order":
+        """从to_dict()结果恢复"""
+        return cls(
+            id=data["id"],
+            symbol=data["symbol"],
+            side=OrderSide(data["side"]),
+            type=OrderType(data["type"]),
+            price=data["price"],
+            quantity=data["quantity"],
+            created_at=data["created_at"],
+            expire_at=data.get("expire_at"),
+            status=OrderStatus(data.get("status", OrderStatus.NEW.value)),
+            filled_quantity=data.get("filled_quantity", 0.0),
+            avg_fill_price=data.get("avg_fill_price", 0.0),
+            parent_position_id=data.get("parent_position_id"),
+            tag=data.get("tag"),
+            metadata=data.get("metadata") or {},
+        )
+
 
 @dataclass
 class Position:
@@ -165,6 +185,34 @@ class Position:
             "factor_scores": self.factor_scores,
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Position":
+        """从to_dict()结果恢复"""
+        exit_reason = data.get("exit_reason")
+        return cls(
+            id=data["id"],
+            symbol=data["symbol"],
+            direction=data["direction"],
+            entry_price=data["entry_price"],
+            stop_loss=data["stop_loss"],
+            take_profit=data["take_profit"],
+            quantity=data["quantity"],
+            open_time=data["open_time"],
+            close_time=data.get("close_time"),
+            exit_price=data.get("exit_price"),
+            exit_reason=ExitReason(exit_reason) if exit_reason else None,
+            realized_pnl=data.get("realized_pnl"),
+            realized_pnl_pct=data.get("realized_pnl_pct"),
+            fees_paid=data.get("fees_paid", 0.0),
+            max_favorable_excursion=data.get("max_favorable_excursion", 0.0),
+            max_adverse_excursion=data.get("max_adverse_excursion", 0.0),
+            step1_result=data.get("step1_result") or {},
+            step2_result=data.get("step2_result") or {},
+            step3_result=data.get("step3_result") or {},
+            step4_result=data.get("step4_result") or {},
+            factor_scores=data.get("factor_scores") or {},
+        )
+
     @property
     def is_open(self) -> bool:
         """是否为开仓状态"""
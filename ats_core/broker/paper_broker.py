@@ -13,15 +13,28 @@ Paper Broker - Paper Trading模拟执行
 - SL/TP：Entry成交后自动创建子单
 - 悲观假设：同时触发SL和TP时优先止损
 
-Version: v1.0.0
+v1.1 触发簿（TriggerBook）:
+- Entry限价、SL、TP按symbol登记到价格堆，每个tick只处理被穿越的触发项
+- Entry过期、持仓超时登记到时间堆，on_time只处理到期项
+- 成交/平仓顺序与逐一遍历订单、持仓时相同（按登记序号）
+- 持仓SL/TP修改须经update_position_exits()，以便重新登记触发价
+
+v1.2 状态日志（journal）:
+- set_journal()注册回调后，订单提交/状态变化、成交、平仓、SL/TP修改各产生一条事件
+- mark_state()返回随行情变化的轻量状态（最新价格、开仓持仓MFE/MAE）
+- load_state()完整恢复订单/持仓及触发簿，apply_journal_event()重放快照之后的事件
+  （持久化见ats_core.realtime.state_manager.StateManager）
+
+Version: v1.2.0
 Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
 """
 
 from __future__ import annotations
 
+import itertools
 import logging
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from ats_core.broker.base import (
     Broker,
@@ -33,6 +46,7 @@ from ats_core.broker.base import (
     AccountState,
     ExitReason,
 )
+from ats_core.broker.trigger_book import TriggerBook
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +86,18 @@ class PaperBroker(Broker):
         # 最新价格缓存
         self.last_prices: Dict[str, float] = {}
 
+        # v1.1: 触发簿与索引（避免每个tick遍历全部订单/持仓）
+        self._triggers = TriggerBook(self._trigger_is_live)
+        self._seq = itertools.count()
+        self._order_seq: Dict[str, int] = {}
+        self._position_seq: Dict[str, int] = {}
+        self._open_positions: Dict[str, Position] = {}
+        self._open_by_symbol: Dict[str, Dict[str, Position]] = {}
+        self._child_orders: Dict[str, List[str]] = {}
+
+        # v1.2: 状态日志回调 (event_type, data) -> None
+        self._journal: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
         logger.info(
             f"PaperBroker初始化: "
             f"equity={initial_equity}, "
@@ -85,7 +111,7 @@ class PaperBroker(Broker):
         unrealized_pnl = self._calculate_unrealized_pnl()
 
         # 获取开仓持仓和订单
-        open_positions = [p for p in self.positions.values() if p.is_open]
+        open_positions = list(self._open_positions.values())
         open_orders = [o for o in self.orders.values() if o.status == OrderStatus.NEW]
 
         return AccountState(
@@ -106,6 +132,8 @@ class PaperBroker(Broker):
             return
 
         self.orders[order.id] = order
+        self._index_order(order)
+        self._emit("order", order.to_dict())
         logger.info(
             f"订单提交: {order.id} {order.symbol} {order.side.value} "
             f"{order.quantity}@{order.price} tag={order.tag}"
@@ -121,6 +149,9 @@ class PaperBroker(Broker):
             return False
 
         order.status = OrderStatus.CANCELED
+        if order.tag == "ENTRY":
+            self._triggers.mark_stale(order.symbol)
+        self._emit("order_status", self._order_status(order))
         logger.info(f"订单取消: {order_id}")
         return True
 
@@ -131,14 +162,19 @@ class PaperBroker(Broker):
         检查：
         1. 待成交的Entry订单
         2. 活跃持仓的SL/TP
+
+        v1.1: 只处理触发簿中被price穿越的触发项
         """
         self.last_prices[symbol] = price
 
+        crossed = self._triggers.pop_crossed(symbol, price)
+
         # 1. 检查Entry订单成交
-        self._check_entry_orders(symbol, price, timestamp)
+        self._check_entry_orders(symbol, price, timestamp, [t for t in crossed if t[1][0] == "ENTRY"])
 
-        # 2. 检查持仓SL/TP
-        self._check_position_exits(symbol, price, timestamp)
+        # 2. 检查持仓SL/TP（含本tick刚成交、已被price穿越的新持仓）
+        crossed.extend(self._triggers.pop_crossed(symbol, price))
+        self._check_position_exits(symbol, price, timestamp, [t for t in crossed if t[1][0] != "ENTRY"])
 
         # 3. 更新持仓MFE/MAE
         self._update_position_excursions(symbol, price)
@@ -150,21 +186,32 @@ class PaperBroker(Broker):
         处理：
         1. Entry订单过期
         2. 持仓超时强制平仓
+
+        v1.1: 只处理时间堆中到期的订单/持仓
         """
         # 1. 检查订单过期
-        for order in list(self.orders.values()):
-            if order.status != OrderStatus.NEW:
+        for seq, order_id, _ in self._triggers.pop_due("expiry", lambda expire_at: now_ts > expire_at):
+            order = self.orders.get(order_id)
+            if order is None or order.status != OrderStatus.NEW:
                 continue
-            if order.tag != "ENTRY":
+            if order.tag != "ENTRY" or not order.expire_at:
                 continue
-            if order.expire_at and now_ts > order.expire_at:
+            if now_ts > order.expire_at:
                 order.status = OrderStatus.EXPIRED
+                self._triggers.mark_stale(order.symbol)
+                self._emit("order_status", self._order_status(order))
                 logger.info(f"订单过期: {order.id} {order.symbol}")
+            else:
+                # expire_at被延后：按新时间重新登记
+                self._triggers.add_deadline("expiry", order.expire_at, seq, order.id)
 
         # 2. 检查持仓超时
         max_holding_ms = self.max_holding_minutes * 60 * 1000
-        for position in list(self.positions.values()):
-            if not position.is_open:
+        for _, position_id, _ in self._triggers.pop_due(
+            "holding", lambda open_time: now_ts - open_time > max_holding_ms
+        ):
+            position = self._open_positions.get(position_id)
+            if position is None:
                 continue
             if now_ts - position.open_time > max_holding_ms:
                 price = self.last_prices.get(position.symbol, position.entry_price)
@@ -210,10 +257,13 @@ class PaperBroker(Broker):
 
         # 移到已平仓列表
         self.closed_positions.append(position)
+        self._unindex_position(position)
 
         # 取消相关的SL/TP子单
         self._cancel_child_orders(position_id)
 
+        self._emit("close", {"position": position.to_dict(), "account": self._account_fields()})
+
         logger.info(
             f"平仓: {position.symbol} {position.direction} "
             f"PnL={position.realized_pnl:.2f} ({pnl_pct:+.2f}%) "
@@ -222,6 +272,42 @@ class PaperBroker(Broker):
 
         return True
 
+    def update_position_exits(
+        self,
+        position_id: str,
+        stop_loss: Optional[float] = None,
+        take_profit: Optional[float] = None
+    ) -> bool:
+        """
+        修改持仓SL/TP（v1.1新增，直接修改字段不会更新触发簿）
+
+        Args:
+            position_id: 持仓ID
+            stop_loss: 新止损价（None=不变）
+            take_profit: 新止盈价（None=不变）
+
+        Returns:
+            是否修改成功（持仓不存在或已平仓时False）
+        """
+        position = self._open_positions.get(position_id)
+        if position is None:
+            return False
+
+        seq = self._position_seq[position_id]
+        is_long = position.direction == "LONG"
+        if stop_loss is not None and stop_loss != position.stop_loss:
+            position.stop_loss = stop_loss
+            self._triggers.add_price(position.symbol, stop_loss, is_long, seq, ("SL", position_id))
+            self._triggers.mark_stale(position.symbol)
+        if take_profit is not None and take_profit != position.take_profit:
+            position.take_profit = take_profit
+            self._triggers.add_price(position.symbol, take_profit, not is_long, seq, ("TP", position_id))
+            self._triggers.mark_stale(position.symbol)
+        self._emit("exits", {
+            "id": position_id, "stop_loss": position.stop_loss, "take_profit": position.take_profit,
+        })
+        return True
+
     def get_position(self, position_id: str) -> Optional[Position]:
         """获取持仓"""
         return self.positions.get(position_id)
@@ -232,10 +318,11 @@ class PaperBroker(Broker):
 
     # ==================== 私有方法 ====================
 
-    def _check_entry_orders(self, symbol: str, price: float, timestamp: int) -> None:
-        """检查Entry订单是否成交"""
-        for order in list(self.orders.values()):
-            if order.status != OrderStatus.NEW:
+    def _check_entry_orders(self, symbol: str, price: float, timestamp: int, triggers: List) -> None:
+        """检查Entry订单是否成交（triggers：被穿越的Entry触发项，按提交顺序）"""
+        for _, (_, order_id), _ in triggers:
+            order = self.orders.get(order_id)
+            if order is None or order.status != OrderStatus.NEW:
                 continue
             if order.tag != "ENTRY":
                 continue
@@ -292,20 +379,30 @@ class PaperBroker(Broker):
             factor_scores=order.metadata.get("factor_scores", {}),
         )
         self.positions[position_id] = position
+        self._index_position(position)
         order.parent_position_id = position_id
 
+        self._emit("fill", {
+            "order": self._order_status(order),
+            "position": position.to_dict(),
+            "account": self._account_fields(),
+        })
+
         logger.info(
             f"Entry成交: {order.symbol} {direction} "
             f"{order.quantity}@{fill_price:.4f} "
             f"SL={position.stop_loss:.4f} TP={position.take_profit:.4f}"
         )
 
-    def _check_position_exits(self, symbol: str, price: float, timestamp: int) -> None:
-        """检查持仓SL/TP"""
-        for position in list(self.positions.values()):
-            if not position.is_open:
+    def _check_position_exits(self, symbol: str, price: float, timestamp: int, triggers: List) -> None:
+        """检查持仓SL/TP（triggers：被穿越的SL/TP触发项）"""
+        checked = set()
+        for _, (_, position_id), _ in sorted(triggers, key=lambda t: t[0]):  # 按开仓顺序
+            if position_id in checked:
                 continue
-            if position.symbol != symbol:
+            checked.add(position_id)
+            position = self._open_positions.get(position_id)
+            if position is None:
                 continue
 
             # 检查SL和TP
@@ -329,11 +426,7 @@ class PaperBroker(Broker):
 
     def _update_position_excursions(self, symbol: str, price: float) -> None:
         """更新持仓MFE/MAE"""
-        for position in self.positions.values():
-            if not position.is_open:
-                continue
-            if position.symbol != symbol:
-                continue
+        for position in self._open_by_symbol.get(symbol, {}).values():
 
             # 计算当前盈亏%
             if position.direction == "LONG":
@@ -383,9 +476,7 @@ class PaperBroker(Broker):
     def _calculate_unrealized_pnl(self) -> float:
         """计算未实现盈亏"""
         total_pnl = 0.0
-        for position in self.positions.values():
-            if not position.is_open:
-                continue
+        for position in self._open_positions.values():
             price = self.last_prices.get(position.symbol, position.entry_price)
             if position.direction == "LONG":
                 pnl = (price - position.entry_price) * position.quantity
@@ -396,9 +487,62 @@ class PaperBroker(Broker):
 
     def _cancel_child_orders(self, position_id: str) -> None:
         """取消持仓相关的子单"""
-        for order in self.orders.values():
+        for order_id in self._child_orders.pop(position_id, []):
+            order = self.orders.get(order_id)
+            if order is None:
+                continue
             if order.parent_position_id == position_id and order.status == OrderStatus.NEW:
                 order.status = OrderStatus.CANCELED
+                if order.tag == "ENTRY":
+                    self._triggers.mark_stale(order.symbol)
+
+    # ==================== 触发簿索引（v1.1新增） ====================
+
+    def _index_order(self, order: Order) -> None:
+        """登记订单触发项（Entry限价 + 过期时间）和子单索引"""
+        seq = self._order_seq.setdefault(order.id, next(self._seq))  # 与self.orders插入顺序一致
+        if order.parent_position_id:
+            self._child_orders.setdefault(order.parent_position_id, []).append(order.id)
+        if order.status != OrderStatus.NEW or order.tag != "ENTRY":
+            return
+        self._triggers.add_price(order.symbol, order.price, order.side == OrderSide.BUY, seq, ("ENTRY", order.id))
+        if order.expire_at:
+            self._triggers.add_deadline("expiry", order.expire_at, seq, order.id)
+
+    def _index_position(self, position: Position) -> None:
+        """登记持仓触发项（SL/TP + 持仓超时）"""
+        seq = self._position_seq.setdefault(position.id, next(self._seq))  # 与self.positions插入顺序一致
+        if not position.is_open:
+            return
+        self._open_positions[position.id] = position
+        self._open_by_symbol.setdefault(position.symbol, {})[position.id] = position
+
+        is_long = position.direction == "LONG"
+        self._triggers.add_price(position.symbol, position.stop_loss, is_long, seq, ("SL", position.id))
+        self._triggers.add_price(position.symbol, position.take_profit, not is_long, seq, ("TP", position.id))
+        self._triggers.add_deadline("holding", position.open_time, seq, position.id)
+
+    def _unindex_position(self, position: Position) -> None:
+        """平仓后移出开仓索引（SL/TP触发项惰性清理）"""
+        self._open_positions.pop(position.id, None)
+        by_symbol = self._open_by_symbol.get(position.symbol)
+        if by_symbol is not None:
+            by_symbol.pop(position.id, None)
+        self._triggers.mark_stale(position.symbol, 2)
+
+    def _trigger_is_live(self, key, level: float) -> bool:
+        """触发项是否仍有效（TriggerBook重建堆时调用）"""
+        kind, ident = key
+        if kind == "ENTRY":
+            order = self.orders.get(ident)
+            return (
+                order is not None and order.status == OrderStatus.NEW
+                and order.tag == "ENTRY" and order.price == level
+            )
+        position = self._open_positions.get(ident)
+        if position is None:
+            return False
+        return level == (position.stop_loss if kind == "SL" else position.take_profit)
 
     def _generate_id(self) -> str:
         """生成唯一ID"""
@@ -421,13 +565,152 @@ class PaperBroker(Broker):
             "positions": {k: v.to_dict() for k, v in self.positions.items()},
             "closed_positions": [p.to_dict() for p in self.closed_positions],
             "last_prices": self.last_prices,
+            # v1.2: 触发簿登记序号（恢复后成交/平仓顺序不变）
+            "order_seq": self._order_seq,
+            "position_seq": self._position_seq,
         }
 
     def load_state(self, state: Dict[str, Any]) -> None:
-        """恢复状态"""
+        """恢复状态（v1.2：完整恢复订单、持仓和触发簿索引）"""
         self.balance = state.get("balance", self.initial_equity)
         self.realized_pnl = state.get("realized_pnl", 0.0)
         self.fees_paid = state.get("fees_paid", 0.0)
-        self.last_prices = state.get("last_prices", {})
-        # TODO: 恢复orders和positions需要反序列化
-        logger.info(f"PaperBroker状态恢复: balance={self.balance}")
+        self.last_prices = dict(state.get("last_prices", {}))
+
+        self.orders = {k: Order.from_dict(v) for k, v in state.get("orders", {}).items()}
+        self.positions = {k: Position.from_dict(v) for k, v in state.get("positions", {}).items()}
+        self.closed_positions = [
+            self.positions.get(p["id"]) or Position.from_dict(p)
+            for p in state.get("closed_positions", [])
+        ]
+
+        # 重建索引：按原登记序号（旧状态文件没有序号时按字典顺序）
+        self._triggers = TriggerBook(self._trigger_is_live)
+        self._order_seq = {}
+        self._position_seq = {}
+        self._open_positions = {}
+        self._open_by_symbol = {}
+        self._child_orders = {}
+        order_seq = state.get("order_seq", {})
+        position_seq = state.get("position_seq", {})
+        items = [(order_seq.get(k, i), 0, o) for i, (k, o) in enumerate(self.orders.items())]
+        items += [
+            (position_seq.get(k, len(self.orders) + i), 1, p)
+            for i, (k, p) in enumerate(self.positions.items())
+        ]
+        items.sort(key=lambda t: t[0])
+        for seq, kind, obj in items:
+            if kind == 0:
+                self._order_seq[obj.id] = seq
+                self._index_order(obj)
+            else:
+                self._position_seq[obj.id] = seq
+                self._index_position(obj)
+        self._seq = itertools.count(items[-1][0] + 1 if items else 0)
+
+        logger.info(
+            f"PaperBroker状态恢复: balance={self.balance}, "
+            f"orders={len(self.orders)}, open_positions={len(self._open_positions)}"
+        )
+
+    # ==================== 状态日志（v1.2新增） ====================
+
+    def set_journal(self, callback: Optional[Callable[[str, Dict[str, Any]], None]]) -> None:
+        """
+        注册状态日志回调（None=取消）
+
+        事件类型：order / order_status / fill / close / exits（见apply_journal_event）
+        """
+        self._journal = callback
+
+    def mark_state(self) -> Dict[str, Any]:
+        """随行情变化、不产生事件的状态（最新价格、开仓持仓MFE/MAE）"""
+        return {
+            "last_prices": dict(self.last_prices),
+            "excursions": {
+                pid: [p.max_favorable_excursion, p.max_adverse_excursion]
+                for pid, p in self._open_positions.items()
+            },
+        }
+
+    def apply_journal_event(self, event_type: str, data: Dict[str, Any]) -> None:
+        """
+        重放一条状态日志事件（恢复时在load_state之后按顺序调用，重放期间应取消journal回调）
+
+        Args:
+            event_type: order / order_status / fill / close / exits / marks
+            data: 事件数据
+        """
+        if event_type == "order":
+            if data["id"] not in self.orders:
+                order = Order.from_dict(data)
+                self.orders[order.id] = order
+                self._index_order(order)
+        elif event_type == "order_status":
+            self._apply_order_status(data)
+        elif event_type == "fill":
+            self._apply_order_status(data["order"])
+            position = Position.from_dict(data["position"])
+            if position.id not in self.positions:
+                self.positions[position.id] = position
+                self._index_position(position)
+            self._apply_account_fields(data["account"])
+        elif event_type == "close":
+            closed = Position.from_dict(data["position"])
+            position = self.positions.get(closed.id)
+            if position is not None and position.is_open:
+                for name in (
+                    "close_time", "exit_price", "exit_reason", "realized_pnl", "realized_pnl_pct",
+                    "fees_paid", "max_favorable_excursion", "max_adverse_excursion",
+                ):
+                    setattr(position, name, getattr(closed, name))
+                self.closed_positions.append(position)
+                self._unindex_position(position)
+                self._cancel_child_orders(position.id)
+            self._apply_account_fields(data["account"])
+        elif event_type == "exits":
+            self.update_position_exits(data["id"], data.get("stop_loss"), data.get("take_profit"))
+        elif event_type == "marks":
+            self.last_prices.update(data.get("last_prices", {}))
+            for pid, (mfe, mae) in data.get("excursions", {}).items():
+                position = self._open_positions.get(pid)
+                if position is not None:
+                    position.max_favorable_excursion = mfe
+                    position.max_adverse_excursion = mae
+        else:
+            logger.warning(f"未知的状态日志事件: {event_type}")
+
+    def _emit(self, event_type: str, data: Dict[str, Any]) -> None:
+        if self._journal is not None:
+            try:
+                self._journal(event_type, data)
+            except Exception as e:
+                logger.error(f"状态日志写入失败 {event_type}: {e}")
+
+    def _order_status(self, order: Order) -> Dict[str, Any]:
+        return {
+            "id": order.id,
+            "status": order.status.value,
+            "filled_quantity": order.filled_quantity,
+            "avg_fill_price": order.avg_fill_price,
+            "parent_position_id": order.parent_position_id,
+        }
+
+    def _apply_order_status(self, data: Dict[str, Any]) -> None:
+        order = self.orders.get(data["id"])
+        if order is None:
+            return
+        order.status = OrderStatus(data["status"])
+        order.filled_quantity = data.get("filled_quantity", order.filled_quantity)
+        order.avg_fill_price = data.get("avg_fill_price", order.avg_fill_price)
+        order.parent_position_id = data.get("parent_position_id", order.parent_position_id)
+        if order.status != OrderStatus.NEW and order.tag == "ENTRY":
+            self._triggers.mark_stale(order.symbol)
+
+    def _account_fields(self) -> Dict[str, float]:
+        return {"balance": self.balance, "realized_pnl": self.realized_pnl, "fees_paid": self.fees_paid}
+
+    def _apply_account_fields(self, data: Dict[str, float]) -> None:
+        self.balance = data["balance"]
+        self.realized_pnl = data["realized_pnl"]
+        self.fees_paid = data["fees_paid"]
@@ -0,0 +1,167 @@
+# coding: utf-8
+"""
+Trigger Book - 按价格索引的触发簿
+
+职责：
+- 每个symbol维护两个价格堆：
+  - below：价格 <= 触发价时触发（多头Entry、多头SL、空头TP），最大堆
+  - above：价格 >= 触发价时触发（空头Entry、空头SL、多头TP），最小堆
+- 命名的时间堆（Entry过期、持仓超时），按时间键升序弹出
+
+每个tick只弹出被穿越的触发项（O(k log n)），不再遍历全部订单/持仓。
+
+删除采用惰性方式：订单取消、持仓平仓后触发项留在堆中，弹出时由调用方校验；
+失效项累积过多时按is_live回调重建该symbol的堆。
+
+返回结果按登记序号（seq）排序，调用方可据此保持与按字典插入顺序遍历相同的处理顺序。
+
+Version: v1.0.0
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+# 触发项：(seq, key, level)
+Trigger = Tuple[int, Hashable, float]
+
+
+class TriggerBook:
+    """
+    按价格索引的触发簿（每symbol双堆 + 命名时间堆）
+    """
+
+    # 失效项超过该数量且超过堆大小一半时重建
+    COMPACT_MIN_STALE = 64
+
+    def __init__(self, is_live: Callable[[Hashable, float], bool]):
+        """
+        初始化TriggerBook
+
+        Args:
+            is_live: 触发项是否仍有效（key, level）→ bool，用于重建堆时过滤失效项
+        """
+        self._is_live = is_live
+        self._below: Dict[str, List[Tuple[float, int, Hashable]]] = {}  # (-level, seq, key)
+        self._above: Dict[str, List[Tuple[float, int, Hashable]]] = {}  # (level, seq, key)
+        self._stale: Dict[str, int] = {}
+        self._deadlines: Dict[str, List[Tuple[Any, int, Hashable]]] = {}
+
+    # ==================== 价格触发 ====================
+
+    def add_price(self, symbol: str, level: float, at_or_below: bool, seq: int, key: Hashable) -> None:
+        """
+        登记价格触发项
+
+        Args:
+            symbol: 交易对
+            level: 触发价
+            at_or_below: True=价格 <= level时触发，False=价格 >= level时触发
+            seq: 登记序号（决定同一tick内的处理顺序）
+            key: 触发项标识（调用方解释）
+        """
+        if level != level:  # NaN：比较恒为False，永不触发
+            return
+        if at_or_below:
+            heapq.heappush(self._below.setdefault(symbol, []), (-level, seq, key))
+        else:
+            heapq.heappush(self._above.setdefault(symbol, []), (level, seq, key))
+
+    def pop_crossed(self, symbol: str, price: float) -> List[Trigger]:
+        """
+        弹出被price穿越的全部触发项
+
+        Args:
+            symbol: 交易对
+            price: 最新价格
+
+        Returns:
+            [(seq, key, level)]，按seq升序（可能含失效项，由调用方校验）
+        """
+        crossed: List[Trigger] = []
+
+        below = self._below.get(symbol)
+        while below and price <= -below[0][0]:
+            neg_level, seq, key = heapq.heappop(below)
+            crossed.append((seq, key, -neg_level))
+
+        above = self._above.get(symbol)
+        while above and price >= above[0][0]:
+            level, seq, key = heapq.heappop(above)
+            crossed.append((seq, key, level))
+
+        if len(crossed) > 1:
+            crossed.sort(key=lambda t: t[0])
+        return crossed
+
+    def mark_stale(self, symbol: str, count: int = 1) -> None:
+        """
+        记录symbol的失效触发项数量（取消/平仓后调用），累积过多时重建堆
+
+        Args:
+            symbol: 交易对
+            count: 新增失效项数量
+        """
+        stale = self._stale.get(symbol, 0) + count
+        size = len(self._below.get(symbol, ())) + len(self._above.get(symbol, ()))
+        if stale > self.COMPACT_MIN_STALE and stale * 2 > size:
+            self._compact(symbol)
+            stale = 0
+        self._stale[symbol] = stale
+
+    def price_trigger_count(self, symbol: str) -> int:
+        """symbol堆中的触发项数量（含未清理的失效项）"""
+        return len(self._below.get(symbol, ())) + len(self._above.get(symbol, ()))
+
+    def _compact(self, symbol: str) -> None:
+        """按is_live重建symbol的价格堆"""
+        for heaps, sign in ((self._below, -1.0), (self._above, 1.0)):
+            heap = heaps.get(symbol)
+            if not heap:
+                continue
+            live = [entry for entry in heap if self._is_live(entry[2], sign * entry[0])]
+            heapq.heapify(live)
+            heaps[symbol] = live
+
+    # ==================== 时间触发 ====================
+
+    def add_deadline(self, name: str, when: Any, seq: int, key: Hashable) -> None:
+        """
+        登记时间触发项
+
+        Args:
+            name: 时间堆名称（如 "expiry" / "holding"）
+            when: 时间键（越小越早到期）
+            seq: 登记序号
+            key: 触发项标识
+        """
+        heapq.heappush(self._deadlines.setdefault(name, []), (when, seq, key))
+
+    def pop_due(self, name: str, is_due: Callable[[Any], bool]) -> List[Trigger]:
+        """
+        弹出到期的时间触发项
+
+        Args:
+            name: 时间堆名称
+            is_due: 时间键是否到期（须对时间键单调：较小的键先到期）
+
+        Returns:
+            [(seq, key, when)]，按seq升序（可能含失效项，由调用方校验）
+        """
+        heap = self._deadlines.get(name)
+        due: List[Trigger] = []
+        while heap and is_due(heap[0][0]):
+            when, seq, key = heapq.heappop(heap)
+            due.append((seq, key, when))
+        if len(due) > 1:
+            due.sort(key=lambda t: t[0])
+        return due
+
+    def clear(self) -> None:
+        """清空全部触发项"""
+        self._below.clear()
+        self._above.clear()
+        self._stale.clear()
+        self._deadlines.clear()
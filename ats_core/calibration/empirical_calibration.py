@@ -52,27 +52,36 @@ class EmpiricalCalibrator:
         初始化校准器
 
         Args:
-            storage_path: 历史记录存储路径
+            storage_path: 历史记录存储路径（v7.4.3起实际写入同名.jsonl追加日志，
+                          旧版JSON数组文件在首次启动时自动迁移）
             silent: 是否静默模式（不打印初始化日志）
             recorder: TradeRecorder实例（用于获取未平仓信号）
         """
         self.storage_path = storage_path
-        self.history = self._load_history()
+        self.log_path = os.path.splitext(storage_path)[0] + ".jsonl"
+        self.table_path = storage_path.replace('.json', '_table.json')
         self.calibration_table = {}
         self._silent = silent
         self.recorder = recorder
 
+        # v7.4.3：增量分桶计数（替代全量history列表）
+        self.buckets: Dict[int, Dict[str, float]] = {}
+        self.total_signals = 0
+        self.total_wins = 0
+        self._log_offset = 0
+
         # v7.3.44 P0修复：加载配置
         self._load_config()
 
+        self._load_state()
         self._update_table()
 
         # v7.3.41：只在初始化时打印一次状态信息
         if not self._silent:
-            if len(self.history) < 30:
-                print(f"[Calibration] 初始化完成：数据不足({len(self.history)}/30)，使用启发式规则")
+            if self.total_signals < 30:
+                print(f"[Calibration] 初始化完成：数据不足({self.total_signals}/30)，使用启发式规则")
             else:
-                print(f"[Calibration] 初始化完成：已加载 {len(self.history)} 条历史记录，使用统计校准")
+                print(f"[Calibration] 初始化完成：已加载 {self.total_signals} 条历史记录，使用统计校准")
                 # v7.3.44：打印P0修复配置状态
                 if self.include_mtm_unrealized:
                     print(f"[Calibration] P0修复已启用：时间衰减={self.decay_period_days}天，MTM权重={self.mtm_weight_factor}")
@@ -106,8 +115,16 @@ class EmpiricalCalibrator:
             self.include_mtm_unrealized = False
             self.mtm_weight_factor = 0.5
 
+    # ==================== 持久化（v7.4.3：追加日志 + 分桶快照） ====================
+    #
+    # - 每条结果追加一行到 <storage>.jsonl（O(1)，不再整体重写JSON）
+    # - 分桶计数与校准表快照写入 <storage>_table.json，记录已计入的日志字节偏移
+    # - 启动时读取快照，只重放偏移之后的日志尾部（无需解析全部历史）
+    # - 时间衰减权重按桶增量维护：decayed = decayed × exp(-Δt/τ) + 1，
+    #   与逐条计算 Σexp(-age/τ) 等价
+
     def _load_history(self) -> List[Dict[str, Any]]:
-        """加载历史记录"""
+        """加载旧版JSON数组历史记录（仅用于迁移）"""
         if os.path.exists(self.storage_path):
             try:
                 with open(self.storage_path, 'r') as f:
@@ -116,19 +133,128 @@ class EmpiricalCalibrator:
                 return []
         return []
 
-    def _save_history(self):
-        """保存历史记录"""
+    def iter_history(self):
+        """逐条读取全部历史记录（按记录顺序）"""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'r') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def _load_state(self):
+        """读取分桶快照并重放快照之后的日志尾部"""
+        if not os.path.exists(self.log_path):
+            legacy = self._load_history()
+            if legacy:
+                self._migrate_legacy(legacy)
+                return
+
+        snapshot = None
+        if os.path.exists(self.table_path):
+            try:
+                with open(self.table_path, 'r') as f:
+                    snapshot = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                snapshot = None
+
+        # 快照缺失/旧格式/衰减周期已变化/日志被截断时，从日志全量重建
+        log_size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        if (snapshot and "buckets" in snapshot
+                and snapshot.get("decay_period_days") == self.decay_period_days
+                and snapshot.get("log_offset", 0) <= log_size):
+            self.buckets = {int(b): dict(s) for b, s in snapshot["buckets"].items()}
+            self.total_signals = snapshot.get("total_signals", 0)
+            self.total_wins = snapshot.get("total_wins", 0)
+            self._log_offset = snapshot.get("log_offset", 0)
+        else:
+            self.buckets = {}
+            self.total_signals = 0
+            self.total_wins = 0
+            self._log_offset = 0
+
+        self._replay_log_tail()
+
+    def _replay_log_tail(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 写入中断的半行
+                try:
+                    record = json.loads(line)
+                    self._accumulate(record['confidence'], record['result'], record.get('timestamp'))
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    pass
+                self._log_offset += len(line)
+
+    def _migrate_legacy(self, legacy: List[Dict[str, Any]]):
+        """把旧版JSON数组历史转为追加日志（旧文件保留不动）"""
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, 'w') as f:
+            for record in legacy:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._replay_log_tail()
+        if not self._silent:
+            print(f"[Calibration] 已将 {len(legacy)} 条历史记录迁移到 {self.log_path}")
+
+    def _accumulate(self, confidence: float, result: str, timestamp: Optional[float]):
+        """把一条结果计入分桶计数（O(1)）"""
+        bucket = int(confidence // 10) * 10
+        ts = timestamp if timestamp is not None else time.time()
+        tau = self.decay_period_days * 86400.0
+        stats = self.buckets.get(bucket)
+        if stats is None:
+            stats = self.buckets[bucket] = {
+                "count": 0, "wins": 0, "decayed_total": 0.0, "decayed_wins": 0.0, "t_ref": ts,
+            }
+        win = result == "win"
+        if ts >= stats["t_ref"]:
+            factor = math.exp(-(ts - stats["t_ref"]) / tau)
+            stats["decayed_total"] = stats["decayed_total"] * factor + 1.0
+            stats["decayed_wins"] = stats["decayed_wins"] * factor + (1.0 if win else 0.0)
+            stats["t_ref"] = ts
+        else:
+            # 时间戳早于参考时刻（乱序记录）：直接按其相对衰减计入
+            weight = math.exp(-(stats["t_ref"] - ts) / tau)
+            stats["decayed_total"] += weight
+            if win:
+                stats["decayed_wins"] += weight
+        stats["count"] += 1
+        self.total_signals += 1
+        if win:
+            stats["wins"] += 1
+            self.total_wins += 1
+
+    def _save_snapshot(self):
+        """原子写入分桶快照与校准表（O(桶数)）"""
         try:
-            os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
-            with open(self.storage_path, 'w') as f:
-                json.dump(self.history, f, indent=2)
+            os.makedirs(os.path.dirname(self.table_path) or ".", exist_ok=True)
+            tmp_path = self.table_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    "calibration_table": self.calibration_table,
+                    "total_signals": self.total_signals,
+                    "total_wins": self.total_wins,
+                    "last_update": time.time(),
+                    "decay_period_days": self.decay_period_days,
+                    "log_offset": self._log_offset,
+                    "buckets": self.buckets,
+                }, f, indent=2)
+            os.replace(tmp_path, self.table_path)
         except Exception as e:
-            print(f"[Calibration] 保存历史记录失败: {e}")
+            print(f"[Calibration] 保存校准表失败: {e}")
 
     def record_signal_result(self, confidence: float, result: str, metadata: Dict[str, Any] = None):
         """
         记录信号结果
 
+        v7.4.3：追加一行日志并增量更新分桶计数（O(1)）
+
         Args:
             confidence: 信号置信度 (0-100)
             result: "win" 或 "loss"
@@ -143,13 +269,21 @@ class EmpiricalCalibrator:
         if metadata:
             record["metadata"] = metadata
 
-        self.history.append(record)
-        self._save_history()
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, 'ab') as f:
+                f.write(line)
+            self._log_offset += len(line)
+        except Exception as e:
+            print(f"[Calibration] 保存历史记录失败: {e}")
+
+        self._accumulate(confidence, result, record["timestamp"])
 
         # 每100个新记录重新计算校准表
-        if len(self.history) % 100 == 0:
+        if self.total_signals % 100 == 0:
             self._update_table()
-            print(f"[Calibration] 已累积 {len(self.history)} 个信号，重新校准")
+            print(f"[Calibration] 已累积 {self.total_signals} 个信号，重新校准")
 
     def _update_table(self):
         """
@@ -160,35 +294,28 @@ class EmpiricalCalibrator:
         v7.3.44 P0修复：
         - 时间衰减：旧数据权重降低（exp(-age/decay_period)）
         - MTM估值：包含未平仓信号（权重=mtm_weight_factor）
+
+        v7.4.3：从增量维护的分桶计数计算（O(桶数)），并保存快照
         """
         # P0.3修复：降低启用阈值从50→30，加快冷启动
         # v7.3.41修复：移除重复日志，只在初始化时打印一次
-        if len(self.history) < 30:  # 至少30个样本
+        if self.total_signals < 30:  # 至少30个样本
             return
 
         # 当前时间（用于计算age）
         current_time = time.time()
+        tau = self.decay_period_days * 86400.0
 
         # 分桶统计（使用加权统计）
         buckets = defaultdict(lambda: {"weighted_wins": 0.0, "weighted_total": 0.0, "count": 0})
 
-        # 1. 处理已平仓信号（权重=1.0，带时间衰减）
-        for record in self.history:
-            conf = record['confidence']
-            bucket = int(conf // 10) * 10  # 10分一档：0-10, 10-20, ..., 90-100
-
-            # v7.3.44：计算时间衰减权重
-            age_seconds = current_time - record.get('timestamp', current_time)
-            age_days = age_seconds / 86400.0
-            decay_weight = math.exp(-age_days / self.decay_period_days) if self.decay_period_days > 0 else 1.0
-
-            # 已平仓信号权重=1.0（基础权重）* decay_weight（时间衰减）
-            signal_weight = 1.0 * decay_weight
-
-            buckets[bucket]["weighted_total"] += signal_weight
-            buckets[bucket]["count"] += 1
-            if record['result'] == "win":
-                buckets[bucket]["weighted_wins"] += signal_weight
+        # 1. 已平仓信号（权重=1.0，带时间衰减，衰减到当前时刻）
+        for bucket, stats in self.buckets.items():
+            age = max(0.0, current_time - stats["t_ref"])
+            factor = math.exp(-age / tau)
+            buckets[bucket]["weighted_total"] += stats["decayed_total"] * factor
+            buckets[bucket]["weighted_wins"] += stats["decayed_wins"] * factor
+            buckets[bucket]["count"] += stats["count"]
 
         # 2. v7.3.44 P0修复：包含未平仓信号MTM估值（如果启用）
         if self.include_mtm_unrealized and self.recorder is not None:
@@ -218,17 +345,8 @@ class EmpiricalCalibrator:
 
         self.calibration_table = new_table
 
-        # 保存校准表到文件
-        table_path = self.storage_path.replace('.json', '_table.json')
-        try:
-            with open(table_path, 'w') as f:
-                json.dump({
-                    "calibration_table": self.calibration_table,
-                    "total_signals": len(self.history),
-                    "last_update": time.time()
-                }, f, indent=2)
-        except Exception as e:
-            print(f"[Calibration] 保存校准表失败: {e}")
+        # 保存校准表与分桶快照
+        self._save_snapshot()
 
     def get_calibrated_probability(self, confidence: float) -> float:
         """
@@ -377,14 +495,14 @@ class EmpiricalCalibrator:
         Returns:
             统计字典
         """
-        if not self.history:
+        if not self.total_signals:
             return {
                 "total_signals": 0,
                 "status": "no_data"
             }
 
-        total = len(self.history)
-        wins = sum(1 for r in self.history if r['result'] == 'win')
+        total = self.total_signals
+        wins = self.total_wins
         winrate = wins / total if total > 0 else 0
 
         return {
@@ -399,9 +517,17 @@ class EmpiricalCalibrator:
 
     def reset_history(self):
         """清空历史记录（慎用！）"""
-        self.history = []
+        self.buckets = {}
+        self.total_signals = 0
+        self.total_wins = 0
         self.calibration_table = {}
-        self._save_history()
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            open(self.log_path, 'w').close()
+        except Exception as e:
+            print(f"[Calibration] 保存历史记录失败: {e}")
+        self._log_offset = 0
+        self._save_snapshot()
         print("[Calibration] 历史记录已清空")
 
     def _get_open_signals_mtm(self) -> List[Dict[str, Any]]:
@@ -507,7 +633,7 @@ if __name__ == "__main__":
     # 清理测试文件
     import os
     try:
-        os.remove("test_calibration.json")
+        os.remove("test_calibration.jsonl")
         os.remove("test_calibration_table.json")
         print("\n测试文件已清理")
     except:
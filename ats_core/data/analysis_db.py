@@ -16,28 +16,143 @@
 5. modulator_effects - 调制器影响效果
 6. signal_outcomes - 信号实际结果（需人工或自动跟踪）
 7. scan_statistics - 扫描统计数据（历史扫描记录）
+
+写入性能（v7.2.1新增）:
+- 持有一个长连接（WAL模式 + synchronous=NORMAL + 大页缓存），不再每次写入都connect/commit/close
+- write_complete_signal 的五张表写入合并为一个事务
+- write_scan_batch(results) 用 executemany 在一个事务内写入整轮扫描（每轮扫描一次提交）
+
+查询性能（v7.2.2新增）:
+- (symbol, timestamp) 复合/覆盖索引，按币种+时间范围查询一次索引扫描
+- hour/day 汇总表（闸门通过率、因子均值与分位数、调制器影响）在写入事务内增量维护，
+  统计查询只读汇总表；rebuild_rollups 从原始表重算（压实任务）
+
+数据保留（v7.2.3新增，见analysis_retention）:
+- 主库只保留最近N天完整行（按表配置），超期行按月归档到 analysis_archive/analysis_YYYYMM.db
+- market_data 清理前降采样到 market_data_hourly；hour汇总超期删除，day汇总永久保留
+- retention.run_once() 分块短事务在线执行，不阻塞扫描写入；start_retention() 启动后台线程
 """
 
+import logging
 import sqlite3
 import json
+import threading
 import time
-from typing import Dict, Any, Optional, List
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional, List, Tuple
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 
+from ats_core.data.analysis_retention import AnalysisRetention, create_retention_tables
+from ats_core.data.analysis_rollups import (
+    ROLLUP_BUCKETS,
+    ROLLUP_FACTORS,
+    RollupAccumulator,
+    create_rollup_tables,
+    histogram_quantiles,
+    rebuild_rollups,
+)
+
+logger = logging.getLogger(__name__)
+
+# 数据库结构版本（PRAGMA user_version）
+# 1: v7.2.2 汇总表 + 覆盖索引
+SCHEMA_VERSION = 1
+
 # UTC+8时区（北京时间）
 TZ_UTC8 = timezone(timedelta(hours=8))
 
+# ========================================
+# 写入语句（单条写入与批量写入共用）
+# ========================================
+
+_MARKET_DATA_SQL = """
+INSERT OR REPLACE INTO market_data (
+    timestamp, symbol,
+    price, price_24h_change_pct,
+    volume_24h, volume_7d_avg, volume_30d_avg,
+    inflow_24h, outflow_24h, net_flow_24h,
+    atr, atr_pct, volatility_7d,
+    bid_depth, ask_depth, spread_bps,
+    btc_price, btc_24h_change_pct,
+    eth_price, eth_24h_change_pct
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_FACTOR_SCORES_SQL = """
+INSERT OR REPLACE INTO factor_scores (
+    timestamp, symbol,
+    mvrv_score, prime_score, trend_score,
+    fund_score, independence_score,
+    governance_score, health_score,
+    direction_score, quality_score, weighted_score,
+    side, side_long,
+    f_price_momentum, f_fund_momentum, f_divergence,
+    i_beta_btc, i_beta_eth, i_beta_sum, i_alpha, i_r_squared,
+    market_regime
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SIGNAL_ANALYSIS_SQL = """
+INSERT OR REPLACE INTO signal_analysis (
+    signal_id, timestamp, symbol, side,
+    raw_probability, raw_ev,
+    teff_total, teff_f, teff_i,
+    cost_eff_total, cost_eff_f, cost_eff_i,
+    calibrated_probability, calibrated_ev,
+    tp_pct, sl_pct, base_cost_bps, adjusted_cost_bps,
+    confidence, signal_strength,
+    all_gates_passed, reject_reason,
+    full_data
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_GATE_EVALUATION_SQL = """
+INSERT INTO gate_evaluation (
+    signal_id, timestamp,
+    gate1_passed, gate1_reason,
+    gate2_passed, gate2_reason, gate2_f_score, gate2_f_directional,
+    gate3_passed, gate3_reason, gate3_independence, gate3_market_regime,
+    gate4_passed, gate4_reason, gate4_ev_net, gate4_cost_bps,
+    all_passed, first_reject_gate
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_MODULATOR_EFFECTS_SQL = """
+INSERT INTO modulator_effects (
+    signal_id, timestamp,
+    f_score, f_teff_before, f_teff_after, f_teff_change_pct,
+    f_cost_before, f_cost_after, f_cost_change_bps, f_p_impact_pct,
+    i_score, i_teff_before, i_teff_after, i_teff_change_pct,
+    i_cost_before, i_cost_after, i_cost_change_bps, i_p_impact_pct,
+    total_teff, total_p_change_pct, total_ev_change
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
 
 class AnalysisDB:
     """完善的分析数据库"""
 
-    def __init__(self, db_path: str = None):
+    # 连接参数默认值（§6.2 可由config覆盖，见config/params.json -> analysis_db）
+    DEFAULT_CONFIG = {
+        "synchronous": "NORMAL",   # WAL下NORMAL：只在检查点fsync，掉电最多丢失最近一次提交
+        "cache_size_kb": 16384,    # 页缓存大小
+        "busy_timeout_ms": 5000,   # 其他进程持有写锁时的等待时间
+    }
+
+    def __init__(self, db_path: str = None, config: Optional[Dict[str, Any]] = None):
         """
         初始化分析数据库
 
         Args:
             db_path: SQLite数据库路径（默认为项目根目录下的data/analysis.db）
+            config: 连接参数（synchronous / cache_size_kb / busy_timeout_ms），缺省使用DEFAULT_CONFIG
         """
         if db_path is None:
             # 自动检测项目根目录（从当前文件向上3级）
@@ -46,6 +161,17 @@ class AnalysisDB:
             db_path = os.path.join(str(project_root), "data", "analysis.db")
 
         self.db_path = db_path
+        self.config = {**self.DEFAULT_CONFIG, **(config or {})}
+
+        synchronous = str(self.config.get("synchronous", "NORMAL")).upper()
+        if synchronous not in _SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous必须是{_SYNCHRONOUS_MODES}之一: {synchronous}")
+        self._synchronous = synchronous
+        self.retention = AnalysisRetention(self, self.config.get("retention", {}))
+
+        # 长连接（惰性打开），写入通过_lock串行化
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
 
         # 确保data目录存在
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
@@ -53,10 +179,64 @@ class AnalysisDB:
         # 初始化数据库
         self._init_database()
 
+    # ========================================
+    # 连接管理
+    # ========================================
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取长连接（首次调用时打开并设置WAL等参数）"""
+        if self._conn is None:
+            busy_timeout_ms = int(self.config.get("busy_timeout_ms", 5000))
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=busy_timeout_ms / 1000.0,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # 仅对新建库生效（retention清理后归还空闲页）
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self._synchronous}")
+            conn.execute(f"PRAGMA cache_size={-int(self.config.get('cache_size_kb', 16384))}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """在长连接上执行一个事务（成功提交，异常回滚）"""
+        with self._lock:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def close(self):
+        """关闭长连接（之后的写入会自动重新打开）"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("PRAGMA optimize")
+                self._conn.close()
+                self._conn = None
+
     def _init_database(self):
-        """初始化数据库表结构"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """初始化数据库表结构（旧库升级时回填汇总表）"""
+        with self._transaction() as cursor:
+            self._create_tables(cursor)
+
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                if version < 1:
+                    rebuild_rollups(cursor)
+                cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _create_tables(self, cursor: sqlite3.Cursor):
+        """创建所有表和索引"""
 
         # ========================================
         # 表1: 市场原始数据
@@ -103,7 +283,9 @@ class AnalysisDB:
         """)
 
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_market_timestamp ON market_data(timestamp)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_market_symbol ON market_data(symbol)")
+        # v7.2.2: (symbol, timestamp)复合索引替代单列symbol索引（"币种X最近N天"一次索引范围扫描）
+        cursor.execute("DROP INDEX IF EXISTS idx_market_symbol")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_market_symbol_ts ON market_data(symbol, timestamp)")
 
         # ========================================
         # 表2: 因子计算结果
@@ -157,7 +339,14 @@ class AnalysisDB:
         """)
 
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_factor_timestamp ON factor_scores(timestamp)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_factor_symbol ON factor_scores(symbol)")
+        # v7.2.2: 覆盖索引（get_factor_analysis只读索引，不回表）
+        cursor.execute("DROP INDEX IF EXISTS idx_factor_symbol")
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_factor_symbol_ts ON factor_scores(
+            symbol, timestamp,
+            mvrv_score, prime_score, trend_score, fund_score, independence_score, weighted_score, side
+        )
+        """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_factor_side ON factor_scores(side)")
 
         # ========================================
@@ -208,8 +397,16 @@ class AnalysisDB:
         )
         """)
 
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_signal_timestamp ON signal_analysis(timestamp)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_signal_symbol ON signal_analysis(symbol)")
+        # v7.2.2: 覆盖索引（get_signals_by_timerange只读索引，不回表）
+        cursor.execute("DROP INDEX IF EXISTS idx_signal_timestamp")
+        cursor.execute("DROP INDEX IF EXISTS idx_signal_symbol")
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_signal_ts_cover ON signal_analysis(
+            timestamp, all_gates_passed,
+            signal_id, symbol, side, confidence, calibrated_probability, calibrated_ev
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_signal_symbol_ts ON signal_analysis(symbol, timestamp)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_signal_side ON signal_analysis(side)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_signal_gates ON signal_analysis(all_gates_passed)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_signal_confidence ON signal_analysis(confidence)")
@@ -302,6 +499,7 @@ class AnalysisDB:
         """)
 
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_mod_signal_id ON modulator_effects(signal_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mod_timestamp ON modulator_effects(timestamp)")
 
         # ========================================
         # 表6: 信号实际结果（需跟踪）
@@ -398,11 +596,229 @@ class AnalysisDB:
         )
         """)
 
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_scan_timestamp ON scan_statistics(timestamp)")
+        # v7.2.2: 覆盖索引（get_scan_history只读索引，不回表）
+        cursor.execute("DROP INDEX IF EXISTS idx_scan_timestamp")
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_scan_ts_cover ON scan_statistics(
+            timestamp, scan_date, total_symbols, signals_found, filtered,
+            avg_edge, avg_confidence, scan_duration_sec, scan_speed_coins_per_sec
+        )
+        """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_scan_date ON scan_statistics(scan_date)")
 
-        conn.commit()
-        conn.close()
+        # ========================================
+        # 汇总表（v7.2.2新增，见analysis_rollups）
+        # ========================================
+        create_rollup_tables(cursor)
+        create_retention_tables(cursor)
+
+    # ========================================
+    # 行构造（单条写入与批量写入共用）
+    # ========================================
+
+    def _market_data_row(self, data: Dict[str, Any], now_ms: int) -> Tuple:
+        """market_data行"""
+        return (
+            data.get('timestamp', now_ms),
+            data['symbol'],
+            data['price'],
+            data.get('price_24h_change_pct', 0),
+            data.get('volume_24h', 0),
+            data.get('volume_7d_avg', 0),
+            data.get('volume_30d_avg', 0),
+            data.get('inflow_24h', 0),
+            data.get('outflow_24h', 0),
+            data.get('net_flow_24h', 0),
+            data.get('atr', 0),
+            data.get('atr_pct', 0),
+            data.get('volatility_7d', 0),
+            data.get('bid_depth', 0),
+            data.get('ask_depth', 0),
+            data.get('spread_bps', 0),
+            data.get('btc_price', 0),
+            data.get('btc_24h_change_pct', 0),
+            data.get('eth_price', 0),
+            data.get('eth_24h_change_pct', 0)
+        )
+
+    def _factor_scores_row(self, data: Dict[str, Any], now_ms: int) -> Tuple:
+        """factor_scores行"""
+        scores = data.get('scores', {})
+
+        return (
+            data.get('timestamp', now_ms),
+            data['symbol'],
+            scores.get('MVRV', 0),
+            scores.get('Prime', 0),
+            scores.get('T', 0),
+            scores.get('F', 0),
+            scores.get('I', 50),
+            scores.get('G', 0),
+            scores.get('H', 0),
+            data.get('direction_score', 0),
+            data.get('quality_score', 0),
+            data.get('weighted_score', 0),
+            data.get('side', 'unknown'),
+            1 if data.get('side_long', True) else 0,
+            data.get('F_components', {}).get('price_momentum', 0),
+            data.get('F_components', {}).get('fund_momentum', 0),
+            data.get('F_components', {}).get('divergence', 0),
+            data.get('I_components', {}).get('beta_BTC', 0),
+            data.get('I_components', {}).get('beta_ETH', 0),
+            data.get('I_components', {}).get('beta_sum', 0),
+            data.get('I_components', {}).get('alpha', 0),
+            data.get('I_components', {}).get('R_squared', 0),
+            data.get('market_regime', 0)
+        )
+
+    def _signal_analysis_row(self, data: Dict[str, Any], now_ms: int) -> Tuple[str, Tuple]:
+        """signal_analysis行，返回 (signal_id, row)"""
+        timestamp = data.get('timestamp', now_ms)
+        symbol = data['symbol']
+        signal_id = f"{symbol}_{timestamp}"
+
+        v72 = data.get('v72_enhancements', {})
+        modulators = v72.get('modulators', {})
+
+        # 提取调制器效果
+        f_mod = modulators.get('F', {})
+        i_mod = modulators.get('I', {})
+
+        return signal_id, (
+            signal_id,
+            timestamp,
+            symbol,
+            data.get('side', 'unknown'),
+            data.get('probability', 0.5),
+            data.get('expected_value', 0),
+            v72.get('Teff_total', 1.0),
+            f_mod.get('Teff', 1.0),
+            i_mod.get('Teff', 1.0),
+            v72.get('cost_eff_total', 0),
+            f_mod.get('cost_eff', 0),
+            i_mod.get('cost_eff', 0),
+            v72.get('P_calibrated', 0.5),
+            v72.get('EV_net', 0),
+            data.get('tp_pct', 0.03),
+            data.get('sl_pct', 0.015),
+            data.get('base_cost_bps', 5.0),
+            v72.get('adjusted_cost_bps', 5.0),
+            data.get('weighted_score', 0),
+            data.get('signal_strength', 'NORMAL'),
+            1 if v72.get('all_gates_passed', False) else 0,
+            v72.get('reject_reason', ''),
+            json.dumps(data)
+        )
+
+    def _gate_evaluation_row(self, signal_id: str, data: Dict[str, Any], now_ms: int) -> Tuple:
+        """gate_evaluation行"""
+        v72 = data.get('v72_enhancements', {})
+        gate_results = v72.get('gate_results', {})
+
+        # 提取各闸门结果
+        g1 = gate_results.get('gate1_data_quality', {})
+        g2 = gate_results.get('gate2_fund_support', {})
+        g3 = gate_results.get('gate3_market_risk', {})
+        g4 = gate_results.get('gate4_execution_cost', {})
+
+        return (
+            signal_id,
+            data.get('timestamp', now_ms),
+            1 if g1.get('passed', False) else 0,
+            g1.get('reason', ''),
+            1 if g2.get('passed', False) else 0,
+            g2.get('reason', ''),
+            data.get('scores', {}).get('F', 0),
+            g2.get('F_directional', 0),
+            1 if g3.get('passed', False) else 0,
+            g3.get('reason', ''),
+            data.get('scores', {}).get('I', 50),
+            data.get('market_regime', 0),
+            1 if g4.get('passed', False) else 0,
+            g4.get('reason', ''),
+            v72.get('EV_net', 0),
+            v72.get('adjusted_cost_bps', 5.0),
+            1 if v72.get('all_gates_passed', False) else 0,
+            self._find_first_reject_gate(gate_results)
+        )
+
+    def _modulator_effects_row(self, signal_id: str, data: Dict[str, Any], now_ms: int) -> Tuple:
+        """modulator_effects行"""
+        v72 = data.get('v72_enhancements', {})
+        modulators = v72.get('modulators', {})
+        f_mod = modulators.get('F', {})
+        i_mod = modulators.get('I', {})
+
+        # 计算F的影响
+        f_teff = f_mod.get('Teff', 1.0)
+        f_p_impact = (f_teff - 1.0) * 100  # Teff=1.2 → +20%
+
+        # 计算I的影响
+        i_teff = i_mod.get('Teff', 1.0)
+        i_p_impact = (i_teff - 1.0) * 100
+
+        # 总影响
+        total_teff = v72.get('Teff_total', 1.0)
+        raw_p = data.get('probability', 0.5)
+        cal_p = v72.get('P_calibrated', 0.5)
+        total_p_change = (cal_p - raw_p) / raw_p * 100 if raw_p > 0 else 0
+
+        raw_ev = data.get('expected_value', 0)
+        cal_ev = v72.get('EV_net', 0)
+        total_ev_change = cal_ev - raw_ev
+
+        return (
+            signal_id,
+            data.get('timestamp', now_ms),
+            data.get('scores', {}).get('F', 0),
+            1.0, f_teff, (f_teff - 1.0) * 100,
+            data.get('base_cost_bps', 5.0),
+            data.get('base_cost_bps', 5.0) + f_mod.get('cost_eff', 0),
+            f_mod.get('cost_eff', 0),
+            f_p_impact,
+            data.get('scores', {}).get('I', 50),
+            1.0, i_teff, (i_teff - 1.0) * 100,
+            data.get('base_cost_bps', 5.0),
+            data.get('base_cost_bps', 5.0) + i_mod.get('cost_eff', 0),
+            i_mod.get('cost_eff', 0),
+            i_p_impact,
+            total_teff,
+            total_p_change,
+            total_ev_change
+        )
+
+    def _signal_rows(self, data: Dict[str, Any], now_ms: int) -> Tuple[str, Tuple, Tuple, Tuple, Tuple, Tuple]:
+        """一个信号的五张表的行：(signal_id, market, factor, signal, gate, modulator)"""
+        signal_id, signal_row = self._signal_analysis_row(data, now_ms)
+        return (
+            signal_id,
+            self._market_data_row(data, now_ms),
+            self._factor_scores_row(data, now_ms),
+            signal_row,
+            self._gate_evaluation_row(signal_id, data, now_ms),
+            self._modulator_effects_row(signal_id, data, now_ms),
+        )
+
+    @staticmethod
+    def _accumulate_rollups(acc: RollupAccumulator,
+                            factor_row: Optional[Tuple] = None,
+                            gate_row: Optional[Tuple] = None,
+                            modulator_row: Optional[Tuple] = None):
+        """把待写入的行计入汇总增量（列位置见_*_SQL）"""
+        if factor_row is not None:
+            acc.add_factors(factor_row[0], {
+                "T": factor_row[4],
+                "Prime": factor_row[3],
+                "F": factor_row[5],
+                "I": factor_row[6],
+                "weighted": factor_row[11],
+            })
+        if gate_row is not None:
+            acc.add_gate(gate_row[1], (gate_row[2], gate_row[4], gate_row[8], gate_row[12]),
+                         gate_row[16], gate_row[17])
+        if modulator_row is not None:
+            acc.add_modulator(modulator_row[1], modulator_row[9], modulator_row[17],
+                              modulator_row[19], modulator_row[20])
 
     # ========================================
     # 写入方法
@@ -418,50 +834,10 @@ class AnalysisDB:
         Returns:
             record_id: 记录ID
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute("""
-            INSERT OR REPLACE INTO market_data (
-                timestamp, symbol,
-                price, price_24h_change_pct,
-                volume_24h, volume_7d_avg, volume_30d_avg,
-                inflow_24h, outflow_24h, net_flow_24h,
-                atr, atr_pct, volatility_7d,
-                bid_depth, ask_depth, spread_bps,
-                btc_price, btc_24h_change_pct,
-                eth_price, eth_24h_change_pct
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                data.get('timestamp', int(time.time() * 1000)),
-                data['symbol'],
-                data['price'],
-                data.get('price_24h_change_pct', 0),
-                data.get('volume_24h', 0),
-                data.get('volume_7d_avg', 0),
-                data.get('volume_30d_avg', 0),
-                data.get('inflow_24h', 0),
-                data.get('outflow_24h', 0),
-                data.get('net_flow_24h', 0),
-                data.get('atr', 0),
-                data.get('atr_pct', 0),
-                data.get('volatility_7d', 0),
-                data.get('bid_depth', 0),
-                data.get('ask_depth', 0),
-                data.get('spread_bps', 0),
-                data.get('btc_price', 0),
-                data.get('btc_24h_change_pct', 0),
-                data.get('eth_price', 0),
-                data.get('eth_24h_change_pct', 0)
-            ))
-
-            record_id = cursor.lastrowid
-            conn.commit()
-            return record_id
-
-        finally:
-            conn.close()
+        row = self._market_data_row(data, _now_ms())
+        with self._transaction() as cursor:
+            cursor.execute(_MARKET_DATA_SQL, row)
+            return cursor.lastrowid
 
     def write_factor_scores(self, data: Dict[str, Any]) -> int:
         """
@@ -473,57 +849,14 @@ class AnalysisDB:
         Returns:
             record_id: 记录ID
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        scores = data.get('scores', {})
-        v72 = data.get('v72_enhancements', {})
-
-        try:
-            cursor.execute("""
-            INSERT OR REPLACE INTO factor_scores (
-                timestamp, symbol,
-                mvrv_score, prime_score, trend_score,
-                fund_score, independence_score,
-                governance_score, health_score,
-                direction_score, quality_score, weighted_score,
-                side, side_long,
-                f_price_momentum, f_fund_momentum, f_divergence,
-                i_beta_btc, i_beta_eth, i_beta_sum, i_alpha, i_r_squared,
-                market_regime
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                data.get('timestamp', int(time.time() * 1000)),
-                data['symbol'],
-                scores.get('MVRV', 0),
-                scores.get('Prime', 0),
-                scores.get('T', 0),
-                scores.get('F', 0),
-                scores.get('I', 50),
-                scores.get('G', 0),
-                scores.get('H', 0),
-                data.get('direction_score', 0),
-                data.get('quality_score', 0),
-                data.get('weighted_score', 0),
-                data.get('side', 'unknown'),
-                1 if data.get('side_long', True) else 0,
-                data.get('F_components', {}).get('price_momentum', 0),
-                data.get('F_components', {}).get('fund_momentum', 0),
-                data.get('F_components', {}).get('divergence', 0),
-                data.get('I_components', {}).get('beta_BTC', 0),
-                data.get('I_components', {}).get('beta_ETH', 0),
-                data.get('I_components', {}).get('beta_sum', 0),
-                data.get('I_components', {}).get('alpha', 0),
-                data.get('I_components', {}).get('R_squared', 0),
-                data.get('market_regime', 0)
-            ))
-
+        row = self._factor_scores_row(data, _now_ms())
+        acc = RollupAccumulator()
+        self._accumulate_rollups(acc, factor_row=row)
+        with self._transaction() as cursor:
+            cursor.execute(_FACTOR_SCORES_SQL, row)
             record_id = cursor.lastrowid
-            conn.commit()
-            return record_id
-
-        finally:
-            conn.close()
+            acc.flush(cursor)
+        return record_id
 
     def write_signal_analysis(self, data: Dict[str, Any]) -> str:
         """
@@ -535,64 +868,10 @@ class AnalysisDB:
         Returns:
             signal_id: 信号ID
         """
-        timestamp = data.get('timestamp', int(time.time() * 1000))
-        symbol = data['symbol']
-        signal_id = f"{symbol}_{timestamp}"
-
-        v72 = data.get('v72_enhancements', {})
-        modulators = v72.get('modulators', {})
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        try:
-            # 提取调制器效果
-            f_mod = modulators.get('F', {})
-            i_mod = modulators.get('I', {})
-
-            cursor.execute("""
-            INSERT OR REPLACE INTO signal_analysis (
-                signal_id, timestamp, symbol, side,
-                raw_probability, raw_ev,
-                teff_total, teff_f, teff_i,
-                cost_eff_total, cost_eff_f, cost_eff_i,
-                calibrated_probability, calibrated_ev,
-                tp_pct, sl_pct, base_cost_bps, adjusted_cost_bps,
-                confidence, signal_strength,
-                all_gates_passed, reject_reason,
-                full_data
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                signal_id,
-                timestamp,
-                symbol,
-                data.get('side', 'unknown'),
-                data.get('probability', 0.5),
-                data.get('expected_value', 0),
-                v72.get('Teff_total', 1.0),
-                f_mod.get('Teff', 1.0),
-                i_mod.get('Teff', 1.0),
-                v72.get('cost_eff_total', 0),
-                f_mod.get('cost_eff', 0),
-                i_mod.get('cost_eff', 0),
-                v72.get('P_calibrated', 0.5),
-                v72.get('EV_net', 0),
-                data.get('tp_pct', 0.03),
-                data.get('sl_pct', 0.015),
-                data.get('base_cost_bps', 5.0),
-                v72.get('adjusted_cost_bps', 5.0),
-                data.get('weighted_score', 0),
-                data.get('signal_strength', 'NORMAL'),
-                1 if v72.get('all_gates_passed', False) else 0,
-                v72.get('reject_reason', ''),
-                json.dumps(data)
-            ))
-
-            conn.commit()
-            return signal_id
-
-        finally:
-            conn.close()
+        signal_id, row = self._signal_analysis_row(data, _now_ms())
+        with self._transaction() as cursor:
+            cursor.execute(_SIGNAL_ANALYSIS_SQL, row)
+        return signal_id
 
     def write_gate_evaluation(self, signal_id: str, data: Dict[str, Any]):
         """
@@ -602,53 +881,12 @@ class AnalysisDB:
             signal_id: 信号ID
             data: 信号数据（包含gate_results）
         """
-        v72 = data.get('v72_enhancements', {})
-        gate_results = v72.get('gate_results', {})
-
-        # 提取各闸门结果
-        g1 = gate_results.get('gate1_data_quality', {})
-        g2 = gate_results.get('gate2_fund_support', {})
-        g3 = gate_results.get('gate3_market_risk', {})
-        g4 = gate_results.get('gate4_execution_cost', {})
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute("""
-            INSERT INTO gate_evaluation (
-                signal_id, timestamp,
-                gate1_passed, gate1_reason,
-                gate2_passed, gate2_reason, gate2_f_score, gate2_f_directional,
-                gate3_passed, gate3_reason, gate3_independence, gate3_market_regime,
-                gate4_passed, gate4_reason, gate4_ev_net, gate4_cost_bps,
-                all_passed, first_reject_gate
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                signal_id,
-                data.get('timestamp', int(time.time() * 1000)),
-                1 if g1.get('passed', False) else 0,
-                g1.get('reason', ''),
-                1 if g2.get('passed', False) else 0,
-                g2.get('reason', ''),
-                data.get('scores', {}).get('F', 0),
-                g2.get('F_directional', 0),
-                1 if g3.get('passed', False) else 0,
-                g3.get('reason', ''),
-                data.get('scores', {}).get('I', 50),
-                data.get('market_regime', 0),
-                1 if g4.get('passed', False) else 0,
-                g4.get('reason', ''),
-                v72.get('EV_net', 0),
-                v72.get('adjusted_cost_bps', 5.0),
-                1 if v72.get('all_gates_passed', False) else 0,
-                self._find_first_reject_gate(gate_results)
-            ))
-
-            conn.commit()
-
-        finally:
-            conn.close()
+        row = self._gate_evaluation_row(signal_id, data, _now_ms())
+        acc = RollupAccumulator()
+        self._accumulate_rollups(acc, gate_row=row)
+        with self._transaction() as cursor:
+            cursor.execute(_GATE_EVALUATION_SQL, row)
+            acc.flush(cursor)
 
     def write_modulator_effects(self, signal_id: str, data: Dict[str, Any]):
         """
@@ -658,72 +896,18 @@ class AnalysisDB:
             signal_id: 信号ID
             data: 信号数据（包含modulator效果）
         """
-        v72 = data.get('v72_enhancements', {})
-        modulators = v72.get('modulators', {})
-        f_mod = modulators.get('F', {})
-        i_mod = modulators.get('I', {})
-
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        try:
-            # 计算F的影响
-            f_teff = f_mod.get('Teff', 1.0)
-            f_p_impact = (f_teff - 1.0) * 100  # Teff=1.2 → +20%
-
-            # 计算I的影响
-            i_teff = i_mod.get('Teff', 1.0)
-            i_p_impact = (i_teff - 1.0) * 100
-
-            # 总影响
-            total_teff = v72.get('Teff_total', 1.0)
-            raw_p = data.get('probability', 0.5)
-            cal_p = v72.get('P_calibrated', 0.5)
-            total_p_change = (cal_p - raw_p) / raw_p * 100 if raw_p > 0 else 0
-
-            raw_ev = data.get('expected_value', 0)
-            cal_ev = v72.get('EV_net', 0)
-            total_ev_change = cal_ev - raw_ev
-
-            cursor.execute("""
-            INSERT INTO modulator_effects (
-                signal_id, timestamp,
-                f_score, f_teff_before, f_teff_after, f_teff_change_pct,
-                f_cost_before, f_cost_after, f_cost_change_bps, f_p_impact_pct,
-                i_score, i_teff_before, i_teff_after, i_teff_change_pct,
-                i_cost_before, i_cost_after, i_cost_change_bps, i_p_impact_pct,
-                total_teff, total_p_change_pct, total_ev_change
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                signal_id,
-                data.get('timestamp', int(time.time() * 1000)),
-                data.get('scores', {}).get('F', 0),
-                1.0, f_teff, (f_teff - 1.0) * 100,
-                data.get('base_cost_bps', 5.0),
-                data.get('base_cost_bps', 5.0) + f_mod.get('cost_eff', 0),
-                f_mod.get('cost_eff', 0),
-                f_p_impact,
-                data.get('scores', {}).get('I', 50),
-                1.0, i_teff, (i_teff - 1.0) * 100,
-                data.get('base_cost_bps', 5.0),
-                data.get('base_cost_bps', 5.0) + i_mod.get('cost_eff', 0),
-                i_mod.get('cost_eff', 0),
-                i_p_impact,
-                total_teff,
-                total_p_change,
-                total_ev_change
-            ))
-
-            conn.commit()
-
-        finally:
-            conn.close()
+        row = self._modulator_effects_row(signal_id, data, _now_ms())
+        acc = RollupAccumulator()
+        self._accumulate_rollups(acc, modulator_row=row)
+        with self._transaction() as cursor:
+            cursor.execute(_MODULATOR_EFFECTS_SQL, row)
+            acc.flush(cursor)
 
     def write_complete_signal(self, data: Dict[str, Any]) -> str:
         """
         一次性写入信号的所有数据（市场+因子+信号+闸门+调制器）
 
-        这是最常用的方法 - 分析完成后调用一次即可
+        五张表在同一个事务内写入（一次提交）。整轮扫描请使用write_scan_batch。
 
         Args:
             data: 完整的信号数据（来自analyze_with_v72_enhancements）
@@ -731,22 +915,65 @@ class AnalysisDB:
         Returns:
             signal_id: 信号ID
         """
-        # 1. 写入市场数据
-        self.write_market_data(data)
+        signal_id, market, factor, signal, gate, modulator = self._signal_rows(data, _now_ms())
+        acc = RollupAccumulator()
+        self._accumulate_rollups(acc, factor, gate, modulator)
+
+        with self._transaction() as cursor:
+            cursor.execute(_MARKET_DATA_SQL, market)
+            cursor.execute(_FACTOR_SCORES_SQL, factor)
+            cursor.execute(_SIGNAL_ANALYSIS_SQL, signal)
+            cursor.execute(_GATE_EVALUATION_SQL, gate)
+            cursor.execute(_MODULATOR_EFFECTS_SQL, modulator)
+            acc.flush(cursor)
 
-        # 2. 写入因子分数
-        self.write_factor_scores(data)
+        return signal_id
 
-        # 3. 写入信号分析
-        signal_id = self.write_signal_analysis(data)
+    def write_scan_batch(self, results: List[Dict[str, Any]]) -> List[str]:
+        """
+        批量写入一轮扫描的全部信号（五张表，executemany，单个事务）
 
-        # 4. 写入闸门评估
-        self.write_gate_evaluation(signal_id, data)
+        字段缺失（如无symbol/price）的结果记录警告后跳过，不影响同批其他结果；
+        数据库错误则整批回滚并抛出。
 
-        # 5. 写入调制器效果
-        self.write_modulator_effects(signal_id, data)
+        Args:
+            results: 扫描结果列表（每项同write_complete_signal的输入）
 
-        return signal_id
+        Returns:
+            signal_ids: 已写入信号的ID列表（按输入顺序）
+        """
+        now_ms = _now_ms()
+        signal_ids: List[str] = []
+        tables: Tuple[List[Tuple], ...] = ([], [], [], [], [])
+
+        for data in results:
+            try:
+                signal_id, *rows = self._signal_rows(data, now_ms)
+            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                symbol = data.get('symbol') if isinstance(data, dict) else None
+                logger.warning(f"跳过无效扫描结果 {symbol}: {e}")
+                continue
+            signal_ids.append(signal_id)
+            for table, row in zip(tables, rows):
+                table.append(row)
+
+        if not signal_ids:
+            return signal_ids
+
+        market_rows, factor_rows, signal_rows, gate_rows, modulator_rows = tables
+        acc = RollupAccumulator()
+        for factor, gate, modulator in zip(factor_rows, gate_rows, modulator_rows):
+            self._accumulate_rollups(acc, factor, gate, modulator)
+
+        with self._transaction() as cursor:
+            cursor.executemany(_MARKET_DATA_SQL, market_rows)
+            cursor.executemany(_FACTOR_SCORES_SQL, factor_rows)
+            cursor.executemany(_SIGNAL_ANALYSIS_SQL, signal_rows)
+            cursor.executemany(_GATE_EVALUATION_SQL, gate_rows)
+            cursor.executemany(_MODULATOR_EFFECTS_SQL, modulator_rows)
+            acc.flush(cursor)
+
+        return signal_ids
 
     def update_signal_outcome(self, signal_id: str, outcome_data: Dict[str, Any]):
         """
@@ -756,10 +983,7 @@ class AnalysisDB:
             signal_id: 信号ID
             outcome_data: 结果数据
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        try:
+        with self._transaction() as cursor:
             cursor.execute("""
             INSERT OR REPLACE INTO signal_outcomes (
                 signal_id, timestamp,
@@ -794,20 +1018,12 @@ class AnalysisDB:
                 outcome_data.get('notes', '')
             ))
 
-            conn.commit()
-
-        finally:
-            conn.close()
-
     # ========================================
     # 查询方法
     # ========================================
 
     def get_signals_by_timerange(self, start_ts: int, end_ts: int, gates_passed_only: bool = False) -> List[Dict]:
-        """查询时间范围内的信号"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
+        """查询时间范围内的信号（范围早于保留期时包含月分区归档）"""
         query = """
         SELECT signal_id, timestamp, symbol, side, confidence,
                calibrated_probability, calibrated_ev, all_gates_passed
@@ -820,9 +1036,17 @@ class AnalysisDB:
 
         query += " ORDER BY timestamp DESC"
 
-        cursor.execute(query, (start_ts, end_ts))
-        rows = cursor.fetchall()
-        conn.close()
+        paths = [self.db_path]
+        if start_ts < self.retention.cutoff("signal_analysis"):
+            paths = self.retention.partition_paths(start_ts, end_ts) + paths
+
+        rows = []
+        for path in paths:
+            conn = sqlite3.connect(path)
+            rows.extend(conn.execute(query, (start_ts, end_ts)).fetchall())
+            conn.close()
+        if len(paths) > 1:
+            rows.sort(key=lambda r: r[1], reverse=True)
 
         return [
             {
@@ -833,8 +1057,15 @@ class AnalysisDB:
             for r in rows
         ]
 
-    def get_factor_analysis(self, symbol: str, limit: int = 30) -> List[Dict]:
-        """获取币种的因子分析历史"""
+    def get_factor_analysis(self, symbol: str, limit: int = 30, start_ts: Optional[int] = None) -> List[Dict]:
+        """
+        获取币种的因子分析历史（idx_factor_symbol_ts覆盖索引）
+
+        Args:
+            symbol: 币种
+            limit: 最多返回条数（按时间倒序）
+            start_ts: 起始时间（ms，可选，"最近N天"查询）
+        """
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
@@ -842,10 +1073,10 @@ class AnalysisDB:
         SELECT timestamp, mvrv_score, prime_score, trend_score,
                fund_score, independence_score, weighted_score, side
         FROM factor_scores
-        WHERE symbol = ?
+        WHERE symbol = ? AND timestamp >= ?
         ORDER BY timestamp DESC
         LIMIT ?
-        """, (symbol, limit))
+        """, (symbol, start_ts if start_ts is not None else 0, limit))
 
         rows = cursor.fetchall()
         conn.close()
@@ -858,66 +1089,244 @@ class AnalysisDB:
             for r in rows
         ]
 
-    def get_gate_statistics(self) -> Dict[str, Any]:
-        """获取闸门统计信息"""
+    @staticmethod
+    def _rollup_range(start_ts: Optional[int], end_ts: Optional[int],
+                      bucket_type: Optional[str] = None) -> Tuple[str, str, List[Any]]:
+        """
+        汇总表查询条件
+
+        未指定时间范围时读day桶；指定范围时读hour桶（按桶对齐：包含start_ts与end_ts所在的桶）。
+
+        Returns:
+            (bucket_type, WHERE子句, 参数)
+        """
+        if bucket_type is None:
+            bucket_type = "day" if start_ts is None and end_ts is None else "hour"
+        if bucket_type not in ROLLUP_BUCKETS:
+            raise ValueError(f"bucket_type必须是{tuple(ROLLUP_BUCKETS)}之一: {bucket_type}")
+
+        width = ROLLUP_BUCKETS[bucket_type]
+        where = "bucket_type = ?"
+        params: List[Any] = [bucket_type]
+        if start_ts is not None:
+            where += " AND bucket_start >= ?"
+            params.append(start_ts - start_ts % width)
+        if end_ts is not None:
+            where += " AND bucket_start <= ?"
+            params.append(end_ts)
+        return bucket_type, where, params
+
+    def get_gate_statistics(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> Dict[str, Any]:
+        """
+        获取闸门统计信息（读gate_rollup汇总表）
+
+        Args:
+            start_ts / end_ts: 时间范围（ms，可选，按小时对齐）
+        """
+        _, where, params = self._rollup_range(start_ts, end_ts)
+
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        row = conn.execute(f"""
+        SELECT TOTAL(total),
+               TOTAL(gate1_passed), TOTAL(gate2_passed), TOTAL(gate3_passed), TOTAL(gate4_passed),
+               TOTAL(all_passed),
+               TOTAL(reject_gate1), TOTAL(reject_gate2), TOTAL(reject_gate3), TOTAL(reject_gate4),
+               TOTAL(reject_none)
+        FROM gate_rollup
+        WHERE {where}
+        """, params).fetchone()
+        conn.close()
 
-        # 总信号数
-        cursor.execute("SELECT COUNT(*) FROM gate_evaluation")
-        total = cursor.fetchone()[0]
+        total = int(row[0])
 
         # 各闸门通过率
         stats = {'total_signals': total}
-
         for i in range(1, 5):
-            cursor.execute(f"SELECT COUNT(*) FROM gate_evaluation WHERE gate{i}_passed = 1")
-            passed = cursor.fetchone()[0]
-            stats[f'gate{i}_pass_rate'] = passed / total if total > 0 else 0
+            stats[f'gate{i}_pass_rate'] = row[i] / total if total > 0 else 0
 
         # 全部通过率
-        cursor.execute("SELECT COUNT(*) FROM gate_evaluation WHERE all_passed = 1")
-        all_passed = cursor.fetchone()[0]
-        stats['all_gates_pass_rate'] = all_passed / total if total > 0 else 0
+        stats['all_gates_pass_rate'] = row[5] / total if total > 0 else 0
 
-        # 最常拒绝的闸门
-        cursor.execute("""
-        SELECT first_reject_gate, COUNT(*) as cnt
-        FROM gate_evaluation
-        WHERE all_passed = 0
-        GROUP BY first_reject_gate
-        ORDER BY cnt DESC
-        """)
-        reject_dist = {row[0]: row[1] for row in cursor.fetchall()}
-        stats['reject_distribution'] = reject_dist
+        # 最常拒绝的闸门（None=未记录拒绝闸门）
+        rejects = {gate: int(count) for gate, count in zip((1, 2, 3, 4, None), row[6:11]) if count > 0}
+        stats['reject_distribution'] = dict(sorted(rejects.items(), key=lambda kv: kv[1], reverse=True))
 
-        conn.close()
         return stats
 
-    def get_modulator_impact_stats(self) -> Dict[str, Any]:
-        """获取调制器影响统计"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_modulator_impact_stats(self, start_ts: Optional[int] = None,
+                                   end_ts: Optional[int] = None) -> Dict[str, Any]:
+        """
+        获取调制器影响统计（读modulator_rollup汇总表）
 
-        cursor.execute("""
-        SELECT
-            AVG(f_p_impact_pct) as avg_f_impact,
-            AVG(i_p_impact_pct) as avg_i_impact,
-            AVG(total_p_change_pct) as avg_total_p_change,
-            AVG(total_ev_change) as avg_total_ev_change
-        FROM modulator_effects
-        """)
+        Args:
+            start_ts / end_ts: 时间范围（ms，可选，按小时对齐）
+        """
+        _, where, params = self._rollup_range(start_ts, end_ts)
 
-        row = cursor.fetchone()
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute(f"""
+        SELECT TOTAL(n), TOTAL(sum_f_p_impact), TOTAL(sum_i_p_impact),
+               TOTAL(sum_total_p_change), TOTAL(sum_total_ev_change)
+        FROM modulator_rollup
+        WHERE {where}
+        """, params).fetchone()
         conn.close()
 
+        n = row[0]
         return {
-            'avg_f_impact_pct': row[0] or 0,
-            'avg_i_impact_pct': row[1] or 0,
-            'avg_total_p_change_pct': row[2] or 0,
-            'avg_total_ev_change': row[3] or 0
+            'avg_f_impact_pct': row[1] / n if n > 0 else 0,
+            'avg_i_impact_pct': row[2] / n if n > 0 else 0,
+            'avg_total_p_change_pct': row[3] / n if n > 0 else 0,
+            'avg_total_ev_change': row[4] / n if n > 0 else 0
         }
 
+    def get_gate_rollup(self, bucket_type: str = "hour", start_ts: Optional[int] = None,
+                        end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        按时间桶的闸门通过率（仪表盘时间序列）
+
+        Args:
+            bucket_type: hour / day
+            start_ts / end_ts: 时间范围（ms，可选）
+
+        Returns:
+            [{bucket_start, total, gate1_pass_rate..gate4_pass_rate, all_gates_pass_rate}]，按时间升序
+        """
+        _, where, params = self._rollup_range(start_ts, end_ts, bucket_type)
+
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(f"""
+        SELECT bucket_start, total, gate1_passed, gate2_passed, gate3_passed, gate4_passed, all_passed
+        FROM gate_rollup
+        WHERE {where}
+        ORDER BY bucket_start
+        """, params).fetchall()
+        conn.close()
+
+        result = []
+        for r in rows:
+            total = r[1]
+            item = {'bucket_start': r[0], 'total': total}
+            for i in range(1, 5):
+                item[f'gate{i}_pass_rate'] = r[1 + i] / total if total > 0 else 0
+            item['all_gates_pass_rate'] = r[6] / total if total > 0 else 0
+            result.append(item)
+        return result
+
+    def get_factor_rollup(self, factor: str, bucket_type: str = "hour",
+                          start_ts: Optional[int] = None, end_ts: Optional[int] = None,
+                          quantiles: Tuple[float, ...] = (0.1, 0.5, 0.9)) -> List[Dict[str, Any]]:
+        """
+        按时间桶的因子分布（均值/标准差/最值/分位数）
+
+        Args:
+            factor: 因子（T / Prime / F / I / weighted）
+            bucket_type: hour / day
+            start_ts / end_ts: 时间范围（ms，可选）
+            quantiles: 分位点（直方图估计，误差不超过一个直方图桶宽）
+
+        Returns:
+            [{bucket_start, n, mean, std, min, max, p10, p50, p90}]，按时间升序
+        """
+        if factor not in ROLLUP_FACTORS:
+            raise ValueError(f"factor必须是{tuple(ROLLUP_FACTORS)}之一: {factor}")
+        _, where, params = self._rollup_range(start_ts, end_ts, bucket_type)
+
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(f"""
+        SELECT bucket_start, n, sum_value, sum_sq, min_value, max_value
+        FROM factor_rollup
+        WHERE {where} AND factor = ?
+        ORDER BY bucket_start
+        """, params + [factor]).fetchall()
+
+        histograms: Dict[int, Dict[int, int]] = {}
+        for bucket_start, b, count in conn.execute(f"""
+        SELECT bucket_start, bin, count
+        FROM factor_histogram
+        WHERE {where} AND factor = ?
+        """, params + [factor]):
+            histograms.setdefault(bucket_start, {})[b] = count
+        conn.close()
+
+        result = []
+        for bucket_start, n, total, total_sq, min_value, max_value in rows:
+            mean = total / n if n > 0 else 0
+            variance = max(total_sq / n - mean * mean, 0.0) if n > 0 else 0
+            item = {
+                'bucket_start': bucket_start,
+                'n': n,
+                'mean': mean,
+                'std': variance ** 0.5,
+                'min': min_value,
+                'max': max_value,
+            }
+            estimates = histogram_quantiles(histograms.get(bucket_start, {}), quantiles, min_value, max_value)
+            for q, value in estimates.items():
+                item[f'p{round(q * 100):g}'] = value
+            result.append(item)
+        return result
+
+    def rebuild_rollups(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None):
+        """
+        压实任务：从原始表重算汇总表（与时间范围相交的day桶，缺省全部）
+
+        用于修复INSERT OR REPLACE重复写入造成的重复计数、或批量删除原始数据之后。
+        完成后执行ANALYZE刷新查询规划统计（让时间范围查询选用覆盖索引）。
+
+        已按保留策略清理的范围无法重算，start_ts会被限制在retention.rollup_floor()之后。
+
+        Args:
+            start_ts / end_ts: 时间范围（ms，可选）
+        """
+        floor = self.retention.rollup_floor()
+        if start_ts is None or start_ts < floor:
+            start_ts = floor
+        if end_ts is not None and end_ts <= start_ts:
+            return
+        with self._transaction() as cursor:
+            rebuild_rollups(cursor, start_ts, end_ts)
+        with self._lock:
+            self._get_connection().execute("ANALYZE")
+
+    def get_market_data_hourly(self, symbol: str, start_ts: Optional[int] = None,
+                               end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        获取已降采样的市场数据（保留期之外的market_data，每小时一条）
+
+        Args:
+            symbol: 币种
+            start_ts / end_ts: 时间范围（ms，可选）
+
+        Returns:
+            [{bucket_start, n, open, high, low, close, avg_price, avg_volume_24h, ...}]，按时间升序
+        """
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute("""
+        SELECT bucket_start, n, price_open, price_high, price_low, price_close,
+               sum_price, sum_volume_24h, sum_net_flow_24h, sum_atr_pct, sum_spread_bps
+        FROM market_data_hourly
+        WHERE symbol = ? AND bucket_start >= ? AND bucket_start <= ?
+        ORDER BY bucket_start
+        """, (symbol, start_ts if start_ts is not None else 0,
+              end_ts if end_ts is not None else 2 ** 62)).fetchall()
+        conn.close()
+
+        return [
+            {
+                'bucket_start': r[0], 'n': r[1],
+                'open': r[2], 'high': r[3], 'low': r[4], 'close': r[5],
+                'avg_price': r[6] / r[1], 'avg_volume_24h': r[7] / r[1],
+                'avg_net_flow_24h': r[8] / r[1], 'avg_atr_pct': r[9] / r[1],
+                'avg_spread_bps': r[10] / r[1]
+            }
+            for r in rows
+        ]
+
+    def start_retention(self):
+        """启动后台数据保留线程（retention.enabled=false时不启动）"""
+        self.retention.start()
+
     def write_scan_statistics(self, summary_data: Dict[str, Any]) -> int:
         """
         写入扫描统计数据
@@ -928,9 +1337,6 @@ class AnalysisDB:
         Returns:
             record_id: 记录ID
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
         try:
             # 提取数据
             scan_info = summary_data.get('scan_info', {})
@@ -952,46 +1358,43 @@ class AnalysisDB:
                 timestamp = int(time.time() * 1000)
                 scan_date = datetime.now(TZ_UTC8).strftime('%Y-%m-%d')
 
-            cursor.execute("""
-            INSERT INTO scan_statistics (
-                timestamp, scan_date,
-                total_symbols, signals_found, filtered,
-                avg_edge, avg_confidence, new_coins_count, new_coins_pct,
-                scan_duration_sec, scan_speed_coins_per_sec, cache_hit_rate, memory_mb,
-                rejection_reasons, factor_distribution, close_to_threshold,
-                threshold_recommendations, signals_list, notes
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                timestamp,
-                scan_date,
-                scan_info.get('total_symbols', 0),
-                scan_info.get('signals_found', 0),
-                scan_info.get('filtered', 0),
-                market_stats.get('avg_edge', 0),
-                market_stats.get('avg_confidence', 0),
-                market_stats.get('new_coins_count', 0),
-                market_stats.get('new_coins_pct', 0),
-                performance.get('total_time_sec', 0),
-                performance.get('speed_coins_per_sec', 0),
-                performance.get('cache_hit_rate', 0),
-                performance.get('memory_mb', 0),
-                json.dumps(summary_data.get('rejection_reasons', {})),
-                json.dumps(summary_data.get('factor_distribution', {})),
-                json.dumps(summary_data.get('close_to_threshold', [])),
-                json.dumps(summary_data.get('threshold_recommendations', [])),
-                json.dumps(summary_data.get('signals', [])),
-                None
-            ))
+            with self._transaction() as cursor:
+                cursor.execute("""
+                INSERT INTO scan_statistics (
+                    timestamp, scan_date,
+                    total_symbols, signals_found, filtered,
+                    avg_edge, avg_confidence, new_coins_count, new_coins_pct,
+                    scan_duration_sec, scan_speed_coins_per_sec, cache_hit_rate, memory_mb,
+                    rejection_reasons, factor_distribution, close_to_threshold,
+                    threshold_recommendations, signals_list, notes
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    timestamp,
+                    scan_date,
+                    scan_info.get('total_symbols', 0),
+                    scan_info.get('signals_found', 0),
+                    scan_info.get('filtered', 0),
+                    market_stats.get('avg_edge', 0),
+                    market_stats.get('avg_confidence', 0),
+                    market_stats.get('new_coins_count', 0),
+                    market_stats.get('new_coins_pct', 0),
+                    performance.get('total_time_sec', 0),
+                    performance.get('speed_coins_per_sec', 0),
+                    performance.get('cache_hit_rate', 0),
+                    performance.get('memory_mb', 0),
+                    json.dumps(summary_data.get('rejection_reasons', {})),
+                    json.dumps(summary_data.get('factor_distribution', {})),
+                    json.dumps(summary_data.get('close_to_threshold', [])),
+                    json.dumps(summary_data.get('threshold_recommendations', [])),
+                    json.dumps(summary_data.get('signals', [])),
+                    None
+                ))
+                record_id = cursor.lastrowid
 
-            record_id = cursor.lastrowid
-            conn.commit()
             return record_id
 
         except Exception as e:
-            conn.rollback()
             raise Exception(f"写入扫描统计失败: {e}")
-        finally:
-            conn.close()
 
     def get_scan_history(self, days: int = 7) -> List[Dict[str, Any]]:
         """
@@ -1055,8 +1458,9 @@ _analysis_db_instance = None
 
 
 def get_analysis_db(db_path: str = None) -> AnalysisDB:
-    """获取AnalysisDB单例"""
+    """获取AnalysisDB单例（连接参数读取config/params.json -> analysis_db）"""
     global _analysis_db_instance
     if _analysis_db_instance is None:
-        _analysis_db_instance = AnalysisDB(db_path)
+        from ats_core.cfg import CFG
+        _analysis_db_instance = AnalysisDB(db_path, config=CFG.params.get("analysis_db", {}))
     return _analysis_db_instance
@@ -0,0 +1,399 @@
+# coding: utf-8
+"""
+AnalysisDB 数据保留：按月分区归档 + 降采样 + 在线清理
+
+分区与保留:
+- 主库（data/analysis.db）只保留最近N天的完整行（按表配置 full_rows_days）
+- 超过保留期的行按月搬入分区文件 <archive_dir>/analysis_YYYYMM.db（与主库同结构，可直接用AnalysisDB打开）
+- 分区文件超过 archive_months 个月整体删除（删除文件即清理，无需DELETE/VACUUM）
+- archive=false 时超期行直接删除
+
+降采样:
+- gate/factor/modulator 的 hour/day 汇总表在写入时已增量维护（analysis_rollups），清理原始行不影响
+- market_data 在清理前聚合到 market_data_hourly（每symbol每小时：开/高/低/收、均值）
+- hour 粒度的汇总超过 hourly_days 删除，day 汇总永久保留
+
+在线执行:
+- 使用独立连接，每个分块（chunk_rows行）一个短事务，分块之间暂停 chunk_pause_sec
+- 扫描写入最多等待一个分块的提交时间（WAL + busy_timeout），不会被整个清理任务阻塞
+- 先提交分区插入（INSERT OR IGNORE，可重放）再删除主库行，中断后重跑结果一致
+- 清理后执行 incremental_vacuum 归还空闲页（新建库为 auto_vacuum=INCREMENTAL）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ats_core.data.analysis_rollups import ROLLUP_TABLES
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 24 * 3600 * 1000
+HOUR_MS = 3600 * 1000
+
+# 默认完整行保留天数（signal_outcomes为跟踪结果，不参与清理）
+DEFAULT_FULL_ROWS_DAYS: Dict[str, int] = {
+    "market_data": 30,
+    "factor_scores": 90,
+    "signal_analysis": 90,
+    "gate_evaluation": 90,
+    "modulator_effects": 90,
+    "scan_statistics": 365,
+}
+
+# 汇总表的数据来源（rebuild_rollups不能重算已清理的范围）
+ROLLUP_SOURCE_TABLES = ("factor_scores", "gate_evaluation", "modulator_effects")
+
+_PARTITION_RE = re.compile(r"^analysis_(\d{4})(\d{2})\.db$")
+
+
+def create_retention_tables(cursor: sqlite3.Cursor):
+    """创建降采样表"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS market_data_hourly (
+        symbol TEXT NOT NULL,
+        bucket_start INTEGER NOT NULL,    -- 小时起始时间（ms，UTC对齐）
+        n INTEGER NOT NULL,
+        first_ts INTEGER NOT NULL,
+        last_ts INTEGER NOT NULL,
+        price_open REAL,
+        price_high REAL,
+        price_low REAL,
+        price_close REAL,
+        sum_price REAL NOT NULL DEFAULT 0,
+        sum_volume_24h REAL NOT NULL DEFAULT 0,
+        sum_net_flow_24h REAL NOT NULL DEFAULT 0,
+        sum_atr_pct REAL NOT NULL DEFAULT 0,
+        sum_spread_bps REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (symbol, bucket_start)
+    ) WITHOUT ROWID
+    """)
+
+
+_MARKET_HOURLY_UPSERT_SQL = """
+INSERT INTO market_data_hourly (
+    symbol, bucket_start, n, first_ts, last_ts,
+    price_open, price_high, price_low, price_close,
+    sum_price, sum_volume_24h, sum_net_flow_24h, sum_atr_pct, sum_spread_bps
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (symbol, bucket_start) DO UPDATE SET
+    n = n + excluded.n,
+    price_open = CASE WHEN excluded.first_ts < first_ts THEN excluded.price_open ELSE price_open END,
+    first_ts = MIN(first_ts, excluded.first_ts),
+    price_close = CASE WHEN excluded.last_ts >= last_ts THEN excluded.price_close ELSE price_close END,
+    last_ts = MAX(last_ts, excluded.last_ts),
+    price_high = MAX(price_high, excluded.price_high),
+    price_low = MIN(price_low, excluded.price_low),
+    sum_price = sum_price + excluded.sum_price,
+    sum_volume_24h = sum_volume_24h + excluded.sum_volume_24h,
+    sum_net_flow_24h = sum_net_flow_24h + excluded.sum_net_flow_24h,
+    sum_atr_pct = sum_atr_pct + excluded.sum_atr_pct,
+    sum_spread_bps = sum_spread_bps + excluded.sum_spread_bps
+"""
+
+
+def month_bounds(timestamp: int) -> Tuple[int, int]:
+    """timestamp所在UTC自然月的 [起始, 结束) 毫秒时间戳"""
+    dt = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+    start = datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+    end = datetime(dt.year + (dt.month == 12), dt.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+
+def partition_name(timestamp: int) -> str:
+    """timestamp所属的月分区文件名"""
+    dt = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+    return f"analysis_{dt.year:04d}{dt.month:02d}.db"
+
+
+class AnalysisRetention:
+    """
+    AnalysisDB 保留任务（按月归档 + 降采样 + 清理）
+    """
+
+    def __init__(self, db, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化保留任务
+
+        Args:
+            db: AnalysisDB实例
+            config: 保留配置（见config/params.json -> analysis_db.retention）
+        """
+        config = config or {}
+        self.db = db
+
+        # §6.2 配置读取（带默认值）
+        self.enabled = config.get("enabled", True)
+        self.full_rows_days = {**DEFAULT_FULL_ROWS_DAYS, **config.get("full_rows_days", {})}
+        self.archive = config.get("archive", True)
+        self.archive_months = int(config.get("archive_months", 12))
+        self.hourly_days = int(config.get("hourly_days", 365))
+        self.chunk_rows = max(1, int(config.get("chunk_rows", 5000)))
+        self.chunk_pause_sec = float(config.get("chunk_pause_sec", 0.05))
+        self.vacuum_pages = int(config.get("vacuum_pages", 2000))
+        self.interval_hours = float(config.get("interval_hours", 6))
+
+        archive_dir = config.get("archive_dir")
+        if archive_dir is None:
+            archive_dir = os.path.join(str(Path(db.db_path).parent), "analysis_archive")
+        self.archive_dir = archive_dir
+
+        unknown = set(self.full_rows_days) - set(DEFAULT_FULL_ROWS_DAYS)
+        if unknown:
+            raise ValueError(f"full_rows_days包含未知表: {sorted(unknown)}")
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._run_lock = threading.Lock()
+
+    # ==================== 时间边界 ====================
+
+    def cutoff(self, table: str, now_ms: Optional[int] = None) -> int:
+        """表的完整行保留下界（早于该时间的行被归档/删除）"""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        return now_ms - int(self.full_rows_days[table]) * DAY_MS
+
+    def rollup_floor(self, now_ms: Optional[int] = None) -> int:
+        """汇总表可由原始表重算的最早时间（向上对齐到day桶）"""
+        floor = max(self.cutoff(t, now_ms) for t in ROLLUP_SOURCE_TABLES)
+        return floor - floor % DAY_MS + (DAY_MS if floor % DAY_MS else 0)
+
+    # ==================== 分区 ====================
+
+    def partition_paths(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[str]:
+        """与 [start_ts, end_ts] 相交的月分区文件（按月份升序）"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        paths = []
+        for name in sorted(os.listdir(self.archive_dir)):
+            match = _PARTITION_RE.match(name)
+            if not match:
+                continue
+            year, month = int(match.group(1)), int(match.group(2))
+            lo, hi = month_bounds(int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp() * 1000))
+            if (start_ts is None or hi > start_ts) and (end_ts is None or lo <= end_ts):
+                paths.append(os.path.join(self.archive_dir, name))
+        return paths
+
+    def _ensure_partition(self, path: str):
+        """创建月分区文件（与主库同结构）"""
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path)
+        try:
+            self.db._create_tables(conn.cursor())
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ==================== 执行 ====================
+
+    def run_once(self, now_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        执行一轮保留任务
+
+        Args:
+            now_ms: 当前时间（ms，默认系统时间）
+
+        Returns:
+            统计 {archived: {表: 行数}, deleted: {表: 行数}, dropped_partitions, pruned_hourly, elapsed_sec}
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        start = time.perf_counter()
+        summary: Dict[str, Any] = {"archived": {}, "deleted": {}, "dropped_partitions": [], "pruned_hourly": 0}
+
+        with self._run_lock:
+            conn = sqlite3.connect(self.db.db_path, timeout=self.db.config.get("busy_timeout_ms", 5000) / 1000.0)
+            try:
+                conn.execute(f"PRAGMA busy_timeout={int(self.db.config.get('busy_timeout_ms', 5000))}")
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS retention_ids (id INTEGER PRIMARY KEY)")
+
+                oldest_kept = self._oldest_kept_partition(now_ms)
+                for table in DEFAULT_FULL_ROWS_DAYS:
+                    if self._stop.is_set():
+                        break
+                    archived, deleted = self._prune_table(conn, table, self.cutoff(table, now_ms), oldest_kept)
+                    if archived:
+                        summary["archived"][table] = archived
+                    if deleted:
+                        summary["deleted"][table] = deleted
+
+                summary["pruned_hourly"] = self._prune_hourly(conn, now_ms)
+                self._incremental_vacuum(conn)
+            finally:
+                conn.close()
+
+            summary["dropped_partitions"] = self._drop_expired_partitions(now_ms)
+
+        summary["elapsed_sec"] = round(time.perf_counter() - start, 3)
+        if summary["deleted"] or summary["dropped_partitions"] or summary["pruned_hourly"]:
+            logger.info(f"AnalysisDB保留任务完成: {summary}")
+        return summary
+
+    def _prune_table(self, conn: sqlite3.Connection, table: str, cutoff: int,
+                     oldest_kept: Optional[int]) -> Tuple[int, int]:
+        """分块归档并删除表中早于cutoff的行（所在月份早于oldest_kept的不归档）"""
+        archived = deleted = 0
+        attached: Optional[str] = None
+
+        try:
+            while not self._stop.is_set():
+                oldest = conn.execute(f"SELECT MIN(timestamp) FROM {table} WHERE timestamp < ?", (cutoff,)).fetchone()[0]
+                if oldest is None:
+                    break
+                month_start, month_end = month_bounds(int(oldest))
+                hi = min(cutoff, month_end)
+
+                ids = [r[0] for r in conn.execute(
+                    f"SELECT rowid FROM {table} WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp LIMIT ?",
+                    (month_start, hi, self.chunk_rows))]
+                if not ids:
+                    break
+                with conn:
+                    conn.execute("DELETE FROM temp.retention_ids")
+                    conn.executemany("INSERT INTO temp.retention_ids (id) VALUES (?)", ((i,) for i in ids))
+                chunk_filter = "rowid IN (SELECT id FROM temp.retention_ids)"
+
+                # 1) 归档到月分区（独立提交，INSERT OR IGNORE可重放）
+                if oldest_kept is not None and month_start >= oldest_kept:
+                    path = os.path.join(self.archive_dir, partition_name(int(oldest)))
+                    if attached != path:
+                        if attached is not None:
+                            conn.execute("DETACH DATABASE partition_db")
+                        self._ensure_partition(path)
+                        conn.execute("ATTACH DATABASE ? AS partition_db", (path,))
+                        attached = path
+                    with conn:
+                        cur = conn.execute(
+                            f"INSERT OR IGNORE INTO partition_db.{table} SELECT * FROM main.{table} WHERE {chunk_filter}")
+                    archived += max(cur.rowcount, 0)
+
+                # 2) 降采样 + 删除主库行（同一事务）
+                with conn:
+                    if table == "market_data":
+                        self._downsample_market(conn, chunk_filter)
+                    cur = conn.execute(f"DELETE FROM main.{table} WHERE {chunk_filter}")
+                deleted += max(cur.rowcount, 0)
+
+                if self.chunk_pause_sec > 0:
+                    self._stop.wait(self.chunk_pause_sec)
+        finally:
+            if attached is not None:
+                conn.execute("DETACH DATABASE partition_db")
+
+        return archived, deleted
+
+    @staticmethod
+    def _downsample_market(conn: sqlite3.Connection, chunk_filter: str):
+        """把一个分块的market_data聚合进market_data_hourly"""
+        buckets: Dict[Tuple[str, int], List[Any]] = {}
+        for symbol, ts, price, volume, net_flow, atr_pct, spread in conn.execute(f"""
+            SELECT symbol, timestamp, price, volume_24h, net_flow_24h, atr_pct, spread_bps
+            FROM main.market_data WHERE {chunk_filter}
+        """):
+            price = price or 0.0
+            key = (symbol, ts - ts % HOUR_MS)
+            acc = buckets.get(key)
+            if acc is None:
+                buckets[key] = [1, ts, ts, price, price, price, price, price,
+                                volume or 0.0, net_flow or 0.0, atr_pct or 0.0, spread or 0.0]
+                continue
+            acc[0] += 1
+            if ts < acc[1]:
+                acc[1], acc[3] = ts, price
+            if ts >= acc[2]:
+                acc[2], acc[6] = ts, price
+            acc[4] = max(acc[4], price)
+            acc[5] = min(acc[5], price)
+            acc[7] += price
+            acc[8] += volume or 0.0
+            acc[9] += net_flow or 0.0
+            acc[10] += atr_pct or 0.0
+            acc[11] += spread or 0.0
+
+        conn.executemany(_MARKET_HOURLY_UPSERT_SQL, [(*k, *v) for k, v in buckets.items()])
+
+    def _prune_hourly(self, conn: sqlite3.Connection, now_ms: int) -> int:
+        """删除超过hourly_days的hour粒度汇总"""
+        if self.hourly_days <= 0:
+            return 0
+        floor = now_ms - self.hourly_days * DAY_MS
+        pruned = 0
+        with conn:
+            for table in ROLLUP_TABLES:
+                pruned += conn.execute(
+                    f"DELETE FROM {table} WHERE bucket_type = 'hour' AND bucket_start < ?", (floor,)).rowcount
+            pruned += conn.execute("DELETE FROM market_data_hourly WHERE bucket_start < ?", (floor,)).rowcount
+        return pruned
+
+    def _incremental_vacuum(self, conn: sqlite3.Connection):
+        """分步归还空闲页（每步vacuum_pages页，步间暂停，不长时间持有写锁）"""
+        if self.vacuum_pages <= 0 or conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        for _ in range(-(-free_pages // self.vacuum_pages)):
+            if self._stop.is_set():
+                break
+            # executescript执行到完成（execute对无结果列的PRAGMA只单步一次，每次只归还1页）
+            conn.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            if self.chunk_pause_sec > 0:
+                self._stop.wait(self.chunk_pause_sec)
+
+    def _oldest_kept_partition(self, now_ms: int) -> Optional[int]:
+        """保留的最早月分区起始时间（不归档时为None）"""
+        if not self.archive or self.archive_months <= 0:
+            return None
+        current_start, _ = month_bounds(now_ms)
+        dt = datetime.fromtimestamp(current_start / 1000, tz=timezone.utc)
+        months = dt.year * 12 + dt.month - 1 - self.archive_months
+        return int(datetime(months // 12, months % 12 + 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+    def _drop_expired_partitions(self, now_ms: int) -> List[str]:
+        """删除超过archive_months的月分区文件"""
+        oldest_kept = self._oldest_kept_partition(now_ms)
+        if oldest_kept is None:
+            return []
+
+        dropped = []
+        for path in self.partition_paths(end_ts=oldest_kept - 1):
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+            dropped.append(os.path.basename(path))
+        return dropped
+
+    # ==================== 后台线程 ====================
+
+    def start(self):
+        """启动后台保留线程（每interval_hours执行一次）"""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="analysis-db-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台线程（当前分块提交后退出）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"AnalysisDB保留任务失败: {e}")
+            self._stop.wait(self.interval_hours * 3600)
@@ -0,0 +1,382 @@
+# coding: utf-8
+"""
+AnalysisDB 时间桶汇总表（hour / day）
+
+汇总表:
+1. gate_rollup - 闸门通过/拒绝计数
+2. modulator_rollup - 调制器影响之和（均值 = sum / n）
+3. factor_rollup - 因子计数/和/平方和/最值（均值、标准差）
+4. factor_histogram - 因子分布直方图（分位数）
+
+维护方式:
+- 写入时增量维护：RollupAccumulator 先在内存按桶聚合，再用 UPSERT 在同一事务内累加
+- 压实任务：rebuild_rollups 从原始表重算指定时间范围的桶（回填、修复、清理后重算）
+
+桶按UTC对齐（bucket_start = timestamp - timestamp % 桶长，单位ms）。
+因子分布使用固定直方图（[-100, 100]，宽5），分位数在桶内线性插值，误差不超过一个桶宽。
+
+注意: factor_scores / market_data 使用 INSERT OR REPLACE，同一 (timestamp, symbol)
+重复写入会在汇总表中重复计数；需要精确值时对相应时间范围执行 rebuild_rollups。
+"""
+
+import math
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 桶类型 → 桶长（ms）
+ROLLUP_BUCKETS: Dict[str, int] = {
+    "hour": 3600 * 1000,
+    "day": 24 * 3600 * 1000,
+}
+
+# 汇总的因子 → factor_scores列
+ROLLUP_FACTORS: Dict[str, str] = {
+    "T": "trend_score",
+    "Prime": "prime_score",
+    "F": "fund_score",
+    "I": "independence_score",
+    "weighted": "weighted_score",
+}
+
+# 直方图：[HIST_MIN, HIST_MIN + HIST_BINS * HIST_WIDTH)，越界值计入首/末桶
+HIST_MIN = -100.0
+HIST_WIDTH = 5.0
+HIST_BINS = 40
+
+ROLLUP_TABLES = ("gate_rollup", "modulator_rollup", "factor_rollup", "factor_histogram")
+
+
+# ========================================
+# 表结构
+# ========================================
+
+def create_rollup_tables(cursor: sqlite3.Cursor):
+    """创建汇总表（WITHOUT ROWID，主键即查询顺序）"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS gate_rollup (
+        bucket_type TEXT NOT NULL,        -- hour / day
+        bucket_start INTEGER NOT NULL,    -- 桶起始时间（ms，UTC对齐）
+        total INTEGER NOT NULL DEFAULT 0,
+        gate1_passed INTEGER NOT NULL DEFAULT 0,
+        gate2_passed INTEGER NOT NULL DEFAULT 0,
+        gate3_passed INTEGER NOT NULL DEFAULT 0,
+        gate4_passed INTEGER NOT NULL DEFAULT 0,
+        all_passed INTEGER NOT NULL DEFAULT 0,
+        reject_gate1 INTEGER NOT NULL DEFAULT 0,
+        reject_gate2 INTEGER NOT NULL DEFAULT 0,
+        reject_gate3 INTEGER NOT NULL DEFAULT 0,
+        reject_gate4 INTEGER NOT NULL DEFAULT 0,
+        reject_none INTEGER NOT NULL DEFAULT 0,   -- 未通过但未记录拒绝闸门
+        PRIMARY KEY (bucket_type, bucket_start)
+    ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS modulator_rollup (
+        bucket_type TEXT NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        n INTEGER NOT NULL DEFAULT 0,
+        sum_f_p_impact REAL NOT NULL DEFAULT 0,
+        sum_i_p_impact REAL NOT NULL DEFAULT 0,
+        sum_total_p_change REAL NOT NULL DEFAULT 0,
+        sum_total_ev_change REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket_type, bucket_start)
+    ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS factor_rollup (
+        bucket_type TEXT NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        factor TEXT NOT NULL,
+        n INTEGER NOT NULL DEFAULT 0,
+        sum_value REAL NOT NULL DEFAULT 0,
+        sum_sq REAL NOT NULL DEFAULT 0,
+        min_value REAL,
+        max_value REAL,
+        PRIMARY KEY (bucket_type, factor, bucket_start)
+    ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS factor_histogram (
+        bucket_type TEXT NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        factor TEXT NOT NULL,
+        bin INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket_type, factor, bucket_start, bin)
+    ) WITHOUT ROWID
+    """)
+
+
+# ========================================
+# 写入时增量维护
+# ========================================
+
+_GATE_UPSERT_SQL = """
+INSERT INTO gate_rollup (
+    bucket_type, bucket_start, total,
+    gate1_passed, gate2_passed, gate3_passed, gate4_passed, all_passed,
+    reject_gate1, reject_gate2, reject_gate3, reject_gate4, reject_none
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (bucket_type, bucket_start) DO UPDATE SET
+    total = total + excluded.total,
+    gate1_passed = gate1_passed + excluded.gate1_passed,
+    gate2_passed = gate2_passed + excluded.gate2_passed,
+    gate3_passed = gate3_passed + excluded.gate3_passed,
+    gate4_passed = gate4_passed + excluded.gate4_passed,
+    all_passed = all_passed + excluded.all_passed,
+    reject_gate1 = reject_gate1 + excluded.reject_gate1,
+    reject_gate2 = reject_gate2 + excluded.reject_gate2,
+    reject_gate3 = reject_gate3 + excluded.reject_gate3,
+    reject_gate4 = reject_gate4 + excluded.reject_gate4,
+    reject_none = reject_none + excluded.reject_none
+"""
+
+_MODULATOR_UPSERT_SQL = """
+INSERT INTO modulator_rollup (
+    bucket_type, bucket_start, n,
+    sum_f_p_impact, sum_i_p_impact, sum_total_p_change, sum_total_ev_change
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (bucket_type, bucket_start) DO UPDATE SET
+    n = n + excluded.n,
+    sum_f_p_impact = sum_f_p_impact + excluded.sum_f_p_impact,
+    sum_i_p_impact = sum_i_p_impact + excluded.sum_i_p_impact,
+    sum_total_p_change = sum_total_p_change + excluded.sum_total_p_change,
+    sum_total_ev_change = sum_total_ev_change + excluded.sum_total_ev_change
+"""
+
+_FACTOR_UPSERT_SQL = """
+INSERT INTO factor_rollup (
+    bucket_type, bucket_start, factor, n, sum_value, sum_sq, min_value, max_value
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (bucket_type, factor, bucket_start) DO UPDATE SET
+    n = n + excluded.n,
+    sum_value = sum_value + excluded.sum_value,
+    sum_sq = sum_sq + excluded.sum_sq,
+    min_value = MIN(min_value, excluded.min_value),
+    max_value = MAX(max_value, excluded.max_value)
+"""
+
+_HISTOGRAM_UPSERT_SQL = """
+INSERT INTO factor_histogram (bucket_type, bucket_start, factor, bin, count)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (bucket_type, factor, bucket_start, bin) DO UPDATE SET
+    count = count + excluded.count
+"""
+
+
+def histogram_bin(value: float) -> int:
+    """因子值所在直方图桶（越界计入首/末桶）"""
+    index = math.floor((value - HIST_MIN) / HIST_WIDTH)
+    return min(max(index, 0), HIST_BINS - 1)
+
+
+class RollupAccumulator:
+    """
+    一次写入事务内的汇总增量（内存按桶聚合，flush时每桶一条UPSERT）
+    """
+
+    def __init__(self):
+        self._gates: Dict[Tuple[str, int], List[int]] = {}
+        self._modulators: Dict[Tuple[str, int], List[float]] = {}
+        self._factors: Dict[Tuple[str, int, str], List[float]] = {}
+        self._histogram: Dict[Tuple[str, int, str, int], int] = {}
+
+    @staticmethod
+    def _buckets(timestamp: int) -> Iterable[Tuple[str, int]]:
+        for bucket_type, width in ROLLUP_BUCKETS.items():
+            yield bucket_type, timestamp - timestamp % width
+
+    def add_gate(self, timestamp: int, gates_passed: Tuple[int, int, int, int],
+                 all_passed: int, first_reject_gate: Optional[int]):
+        """累加一条闸门评估"""
+        reject = [0, 0, 0, 0, 0]
+        if not all_passed:
+            reject[first_reject_gate - 1 if first_reject_gate in (1, 2, 3, 4) else 4] = 1
+        delta = [1, *(1 if g else 0 for g in gates_passed), 1 if all_passed else 0, *reject]
+        for key in self._buckets(int(timestamp)):
+            acc = self._gates.get(key)
+            if acc is None:
+                self._gates[key] = list(delta)
+            else:
+                for i, d in enumerate(delta):
+                    acc[i] += d
+
+    def add_modulator(self, timestamp: int, f_p_impact: float, i_p_impact: float,
+                      total_p_change: float, total_ev_change: float):
+        """累加一条调制器效果"""
+        delta = (1, f_p_impact or 0.0, i_p_impact or 0.0, total_p_change or 0.0, total_ev_change or 0.0)
+        for key in self._buckets(int(timestamp)):
+            acc = self._modulators.get(key)
+            if acc is None:
+                self._modulators[key] = list(delta)
+            else:
+                for i, d in enumerate(delta):
+                    acc[i] += d
+
+    def add_factors(self, timestamp: int, values: Dict[str, Any]):
+        """累加一条因子记录（values: 因子 → 分数，None跳过）"""
+        for bucket_type, bucket_start in self._buckets(int(timestamp)):
+            for factor, value in values.items():
+                if value is None:
+                    continue
+                value = float(value)
+                key = (bucket_type, bucket_start, factor)
+                acc = self._factors.get(key)
+                if acc is None:
+                    self._factors[key] = [1, value, value * value, value, value]
+                else:
+                    acc[0] += 1
+                    acc[1] += value
+                    acc[2] += value * value
+                    acc[3] = min(acc[3], value)
+                    acc[4] = max(acc[4], value)
+                hist_key = (bucket_type, bucket_start, factor, histogram_bin(value))
+                self._histogram[hist_key] = self._histogram.get(hist_key, 0) + 1
+
+    def flush(self, cursor: sqlite3.Cursor):
+        """写入累加的增量并清空"""
+        if self._gates:
+            cursor.executemany(_GATE_UPSERT_SQL, [(*k, *v) for k, v in self._gates.items()])
+        if self._modulators:
+            cursor.executemany(_MODULATOR_UPSERT_SQL, [(*k, *v) for k, v in self._modulators.items()])
+        if self._factors:
+            cursor.executemany(_FACTOR_UPSERT_SQL, [(*k, *v) for k, v in self._factors.items()])
+        if self._histogram:
+            cursor.executemany(_HISTOGRAM_UPSERT_SQL, [(*k, v) for k, v in self._histogram.items()])
+        self.__init__()
+
+
+# ========================================
+# 压实任务：从原始表重算
+# ========================================
+
+def rebuild_rollups(cursor: sqlite3.Cursor, start_ts: Optional[int] = None, end_ts: Optional[int] = None):
+    """
+    从原始表重算汇总（覆盖与[start_ts, end_ts)相交的全部day桶，缺省为全部）
+
+    Args:
+        cursor: 事务内游标
+        start_ts: 起始时间（ms，向下对齐到day桶）
+        end_ts: 结束时间（ms，向上对齐到day桶）
+    """
+    day = ROLLUP_BUCKETS["day"]
+    lo = None if start_ts is None else start_ts - start_ts % day
+    hi = None if end_ts is None else end_ts - end_ts % day + (day if end_ts % day else 0)
+
+    where = []
+    params: List[int] = []
+    if lo is not None:
+        where.append("timestamp >= ?")
+        params.append(lo)
+    if hi is not None:
+        where.append("timestamp < ?")
+        params.append(hi)
+    ts_filter = " AND ".join(where) or "1"
+
+    bucket_filter = ts_filter.replace("timestamp", "bucket_start")
+    for table in ROLLUP_TABLES:
+        cursor.execute(f"DELETE FROM {table} WHERE {bucket_filter}", params)
+
+    for bucket_type, width in ROLLUP_BUCKETS.items():
+        bucket = f"(timestamp - timestamp % {width})"
+
+        cursor.execute(f"""
+        INSERT INTO gate_rollup
+        SELECT '{bucket_type}', {bucket}, COUNT(*),
+               SUM(gate1_passed = 1), SUM(gate2_passed = 1), SUM(gate3_passed = 1), SUM(gate4_passed = 1),
+               SUM(all_passed = 1),
+               SUM(all_passed = 0 AND first_reject_gate = 1),
+               SUM(all_passed = 0 AND first_reject_gate = 2),
+               SUM(all_passed = 0 AND first_reject_gate = 3),
+               SUM(all_passed = 0 AND first_reject_gate = 4),
+               SUM(all_passed = 0 AND (first_reject_gate IS NULL OR first_reject_gate NOT IN (1, 2, 3, 4)))
+        FROM gate_evaluation WHERE {ts_filter}
+        GROUP BY 2
+        """, params)
+
+        cursor.execute(f"""
+        INSERT INTO modulator_rollup
+        SELECT '{bucket_type}', {bucket}, COUNT(*),
+               TOTAL(f_p_impact_pct), TOTAL(i_p_impact_pct),
+               TOTAL(total_p_change_pct), TOTAL(total_ev_change)
+        FROM modulator_effects WHERE {ts_filter}
+        GROUP BY 2
+        """, params)
+
+        for factor, column in ROLLUP_FACTORS.items():
+            cursor.execute(f"""
+            INSERT INTO factor_rollup
+            SELECT '{bucket_type}', {bucket}, '{factor}', COUNT({column}),
+                   TOTAL({column}), TOTAL({column} * {column}), MIN({column}), MAX({column})
+            FROM factor_scores WHERE {ts_filter} AND {column} IS NOT NULL
+            GROUP BY 2
+            """, params)
+
+            # bin = clamp(floor((v - HIST_MIN) / HIST_WIDTH), 0, HIST_BINS - 1)
+            offset = f"(({column}) - ({HIST_MIN})) / {HIST_WIDTH}"
+            bin_expr = (
+                f"MIN(MAX(CAST({offset} AS INTEGER) - ({offset} < CAST({offset} AS INTEGER)), 0), "
+                f"{HIST_BINS - 1})"
+            )
+            cursor.execute(f"""
+            INSERT INTO factor_histogram
+            SELECT '{bucket_type}', {bucket}, '{factor}', {bin_expr}, COUNT(*)
+            FROM factor_scores WHERE {ts_filter} AND {column} IS NOT NULL
+            GROUP BY 2, 4
+            """, params)
+
+
+# ========================================
+# 读取辅助
+# ========================================
+
+def histogram_quantiles(counts: Dict[int, int], quantiles: Iterable[float],
+                        min_value: Optional[float] = None,
+                        max_value: Optional[float] = None) -> Dict[float, Optional[float]]:
+    """
+    由直方图估计分位数（桶内线性插值，结果限制在[min_value, max_value]）
+
+    Args:
+        counts: bin → 计数
+        quantiles: 分位点（0~1）
+        min_value / max_value: 精确最值（用于首/末桶边界）
+
+    Returns:
+        {q: 分位数估计}，无数据时为None
+    """
+    total = sum(counts.values())
+    result: Dict[float, Optional[float]] = {}
+    if total <= 0:
+        return {q: None for q in quantiles}
+
+    bins = sorted(counts)
+    for q in quantiles:
+        target = q * total
+        cumulative = 0
+        estimate = None
+        for b in bins:
+            c = counts[b]
+            if c <= 0:
+                continue
+            if cumulative + c >= target:
+                lower = HIST_MIN + b * HIST_WIDTH
+                upper = lower + HIST_WIDTH
+                if min_value is not None:
+                    lower = max(lower, min_value) if b > 0 else min_value
+                if max_value is not None:
+                    upper = min(upper, max_value) if b < HIST_BINS - 1 else max_value
+                fraction = (target - cumulative) / c
+                estimate = lower + (upper - lower) * fraction
+                break
+            cumulative += c
+        if estimate is None:
+            estimate = max_value
+        if min_value is not None and estimate is not None:
+            estimate = max(estimate, min_value)
+        if max_value is not None and estimate is not None:
+            estimate = min(estimate, max_value)
+        result[q] = estimate
+    return result
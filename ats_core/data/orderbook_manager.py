@@ -0,0 +1,538 @@
+# coding: utf-8
+"""
+本地订单簿管理器（REST快照 + @depth@100ms 差分同步）
+
+背景：
+- OptimizedBatchScanner.initialize 按币种拉取REST depth快照（limit=100，权重5/次），
+  扫描时已是几分钟前的数据，L调制器与Step3订单簿入场评估常用到旧盘口
+
+同步流程（Binance U本位合约官方步骤）：
+1. 订阅 <symbol>@depth@100ms（combined stream，每连接最多streams_per_connection个），缓存事件
+2. 拉取REST快照（/fapi/v1/depth，limit=snapshot_limit），得到 lastUpdateId = L
+3. 丢弃 u < L 的事件；第一条应用的事件必须满足 U <= L <= u
+4. 之后每条事件的 pu 必须等于上一条的 u，否则视为序列缺口 → 重新同步（重新拉快照）
+5. 连接断开时该连接上的所有订单簿标记为未同步，重连后批量重新同步（AIMD并发）
+6. 同步失败（快照请求失败/超时）的币种在reconnect_delay_sec后自动重试，直到同步成功
+7. 币种退订（unsubscribe）：所在连接按剩余币种重建（combined stream的订阅列表在URL中）
+
+存储：
+- 每侧两条按价格升序的 numpy 数组（价格、数量），差分用 searchsorted 批量合并，
+  数量为0的价位删除；每侧最多保留 max_levels 档
+- get_orderbook(symbol, limit) 在锁内生成一致的前N档快照，
+  格式与 /fapi/v1/depth 相同（{'lastUpdateId', 'bids', 'asks'}，bids价格从高到低），
+  可直接交给 calculate_liquidity；未同步或所在连接不健康时返回None
+- 数据新鲜度按连接判断而非按币种：Binance只在盘口变化时推送差分，冷门币种几秒无事件
+  并不代表数据过期；连接超过stale_after_sec/2无消息时主动ping，
+  超过stale_after_sec既无消息也无pong才视为过期
+- 快照默认100档（与扫描读取的档数一致，权重5）；快照深度以外的价位只来自差分，
+  深档可能不完整
+
+配置（config/params.json -> orderbook_manager）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ats_core.logging import log, warn, error
+
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "snapshot_limit": 100,
+    "max_levels": 1000,
+    "update_speed": "100ms",
+    "streams_per_connection": 200,
+    "stale_after_sec": 5.0,
+    "reconnect_delay_sec": 3.0,
+    "sync_timeout_sec": 60.0,
+    "max_buffered_events": 2000,
+}
+
+
+def _default_ws_base() -> str:
+    standin = os.environ.get("ATS_BINANCE_STANDIN", "").rstrip("/")
+    if standin:
+        return standin.replace("http", "ws", 1)
+    return os.environ.get("BINANCE_FSTREAM_BASE", "wss://fstream.binance.com")
+
+
+def _levels(raw: List[list]) -> Tuple[np.ndarray, np.ndarray]:
+    """[[price, qty], ...] → 按价格升序的 (prices, qtys)"""
+    if not raw:
+        return np.empty(0), np.empty(0)
+    arr = np.asarray(raw, dtype=float).reshape(-1, 2)
+    order = np.argsort(arr[:, 0], kind="stable")
+    return arr[order, 0], arr[order, 1]
+
+
+def _merge_side(
+    prices: np.ndarray,
+    qtys: np.ndarray,
+    upd_prices: np.ndarray,
+    upd_qtys: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """把一批价位更新合并进升序数组（数量为0表示删除该价位）"""
+    if len(upd_prices) == 0:
+        return prices, qtys
+    idx = np.searchsorted(prices, upd_prices)
+    hit = idx < len(prices)
+    hit[hit] = prices[idx[hit]] == upd_prices[hit]
+    if hit.any():
+        qtys[idx[hit]] = upd_qtys[hit]
+    new = ~hit & (upd_qtys > 0)
+    if new.any():
+        prices = np.insert(prices, idx[new], upd_prices[new])
+        qtys = np.insert(qtys, idx[new], upd_qtys[new])
+    keep = qtys > 0
+    if not keep.all():
+        prices, qtys = prices[keep], qtys[keep]
+    return prices, qtys
+
+
+class LocalOrderBook:
+    """
+    单个交易对的本地订单簿（线程安全）
+    """
+
+    def __init__(self, symbol: str, max_levels: int = 1000):
+        self.symbol = symbol
+        self.max_levels = max_levels
+        self._lock = threading.Lock()
+        self.bid_prices = np.empty(0)
+        self.bid_qtys = np.empty(0)
+        self.ask_prices = np.empty(0)
+        self.ask_qtys = np.empty(0)
+        self.last_update_id = 0
+        self.event_time_ms = 0
+
+    def load_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        bid_p, bid_q = _levels(snapshot.get("bids", []))
+        ask_p, ask_q = _levels(snapshot.get("asks", []))
+        with self._lock:
+            self.bid_prices, self.bid_qtys = bid_p[-self.max_levels:], bid_q[-self.max_levels:]
+            self.ask_prices, self.ask_qtys = ask_p[:self.max_levels], ask_q[:self.max_levels]
+            self.last_update_id = int(snapshot["lastUpdateId"])
+            self.event_time_ms = int(snapshot.get("E", 0) or 0)
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """应用一条差分事件（调用方负责序列校验）"""
+        upd_bid_p, upd_bid_q = _levels(event.get("b", []))
+        upd_ask_p, upd_ask_q = _levels(event.get("a", []))
+        with self._lock:
+            bid_p, bid_q = _merge_side(self.bid_prices, self.bid_qtys, upd_bid_p, upd_bid_q)
+            ask_p, ask_q = _merge_side(self.ask_prices, self.ask_qtys, upd_ask_p, upd_ask_q)
+            # 买盘保留价格最高的max_levels档，卖盘保留价格最低的max_levels档
+            self.bid_prices, self.bid_qtys = bid_p[-self.max_levels:], bid_q[-self.max_levels:]
+            self.ask_prices, self.ask_qtys = ask_p[:self.max_levels], ask_q[:self.max_levels]
+            self.last_update_id = int(event["u"])
+            self.event_time_ms = int(event.get("E", 0) or 0)
+
+    def top(self, limit: int = 100) -> Dict[str, Any]:
+        """前N档快照（与 /fapi/v1/depth 格式一致，bids从高到低，asks从低到高）"""
+        with self._lock:
+            bids = np.column_stack((self.bid_prices[::-1][:limit], self.bid_qtys[::-1][:limit]))
+            asks = np.column_stack((self.ask_prices[:limit], self.ask_qtys[:limit]))
+            return {
+                "lastUpdateId": self.last_update_id,
+                "E": self.event_time_ms,
+                "bids": bids.tolist(),
+                "asks": asks.tolist(),
+            }
+
+
+class _ConnectionHealth:
+    """单个WebSocket连接的健康状态（收到任意消息或pong即刷新）"""
+
+    __slots__ = ("connected", "last_message_wall")
+
+    def __init__(self):
+        self.connected = False
+        self.last_message_wall = 0.0
+
+
+class _BookState:
+    """同步状态：未同步时缓存事件，等待快照"""
+
+    __slots__ = ("book", "synced", "first_pending", "buffer", "syncing", "retry_handle", "connection")
+
+    def __init__(self, book: LocalOrderBook):
+        self.book = book
+        self.synced = False
+        self.first_pending = False
+        self.buffer: List[Dict[str, Any]] = []
+        self.syncing = False
+        self.retry_handle: Optional[asyncio.TimerHandle] = None
+        self.connection: Optional[_ConnectionHealth] = None
+
+
+class OrderBookManager:
+    """
+    多币种本地订单簿管理器（运行在扫描器的事件循环中）
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, ws_base: Optional[str] = None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+
+        # §6.2 配置读取（带默认值）
+        self.enabled = bool(config.get("enabled", True))
+        self.snapshot_limit = int(config.get("snapshot_limit", 100))
+        self.max_levels = int(config.get("max_levels", 1000))
+        self.update_speed = str(config.get("update_speed", "100ms"))
+        self.streams_per_connection = max(1, int(config.get("streams_per_connection", 200)))
+        self.stale_after_sec = float(config.get("stale_after_sec", 5.0))
+        self.reconnect_delay_sec = float(config.get("reconnect_delay_sec", 3.0))
+        self.sync_timeout_sec = float(config.get("sync_timeout_sec", 60.0))
+        self.max_buffered_events = int(config.get("max_buffered_events", 2000))
+        self.ws_base = (ws_base or _default_ws_base()).rstrip("/")
+
+        self._states: Dict[str, _BookState] = {}
+        self._connections: Dict[asyncio.Task, List[str]] = {}  # 连接任务 → 订阅的币种
+        self._resync_tasks: Set[asyncio.Task] = set()
+        self._running = False
+        self.stats = {
+            "events": 0,
+            "snapshots": 0,
+            "gaps": 0,
+            "resyncs": 0,
+            "dropped_stale_events": 0,
+            "reconnects": 0,
+            "sync_retries": 0,
+            "pings": 0,
+        }
+
+    # ==================== 生命周期 ====================
+
+    async def start(self, symbols: Iterable[str]) -> int:
+        """
+        订阅差分深度并完成首次同步（最多等待sync_timeout_sec）
+
+        已有连接在运行的币种不重复订阅；stop()之后再次start()会重新订阅
+
+        Returns:
+            symbols中已同步的币种数
+        """
+        self._running = True
+        wanted = list(dict.fromkeys(s.upper() for s in symbols))
+        for symbol in wanted:
+            if symbol not in self._states:
+                self._states[symbol] = _BookState(LocalOrderBook(symbol, self.max_levels))
+        subscribed = {s for task, chunk in self._connections.items() if not task.done() for s in chunk}
+        self._subscribe([s for s in wanted if s not in subscribed])
+
+        deadline = time.monotonic() + self.sync_timeout_sec
+        while time.monotonic() < deadline:
+            if all(self.is_synced(s) for s in wanted):
+                break
+            await asyncio.sleep(0.2)
+        synced = sum(1 for s in wanted if self.is_synced(s))
+        log(f"📚 本地订单簿: {synced}/{len(wanted)} 个币种已同步")
+        return synced
+
+    async def unsubscribe(self, symbols: Iterable[str]) -> int:
+        """
+        退订并删除币种的本地订单簿（如扫描币种列表刷新后移除的币种）
+
+        所在连接关闭后按剩余币种重建，剩余币种在新连接上重新同步（期间get_orderbook返回None）
+
+        Returns:
+            删除的币种数
+        """
+        removed = {s.upper() for s in symbols} & set(self._states)
+        if not removed:
+            return 0
+        affected = [task for task, chunk in self._connections.items() if removed.intersection(chunk)]
+        remaining = [s for task in affected for s in self._connections[task] if s not in removed]
+        for task in affected:
+            task.cancel()
+            del self._connections[task]
+        await asyncio.gather(*affected, return_exceptions=True)
+
+        for symbol in removed:
+            state = self._states.pop(symbol)
+            state.synced = False
+            if state.retry_handle is not None:
+                state.retry_handle.cancel()
+        for symbol in remaining:
+            state = self._states[symbol]
+            state.synced = False
+            state.buffer.clear()
+        if self._running:
+            self._subscribe(remaining)
+        log(f"📚 本地订单簿: 退订{len(removed)}个币种，{len(remaining)}个币种重建连接")
+        return len(removed)
+
+    async def stop(self) -> None:
+        self._running = False
+        tasks = list(self._connections) + list(self._resync_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._connections.clear()
+        self._resync_tasks.clear()
+        for state in self._states.values():
+            state.synced = False
+            if state.retry_handle is not None:
+                state.retry_handle.cancel()
+                state.retry_handle = None
+
+    def _subscribe(self, symbols: List[str]) -> None:
+        """按streams_per_connection分组建立连接"""
+        for i in range(0, len(symbols), self.streams_per_connection):
+            chunk = symbols[i:i + self.streams_per_connection]
+            self._connections[asyncio.ensure_future(self._run_connection(chunk))] = chunk
+
+    # ==================== 查询 ====================
+
+    def get_orderbook(self, symbol: str, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """前N档一致快照；未同步或所在连接不健康（见_connection_healthy）时返回None"""
+        state = self._states.get(symbol.upper())
+        if state is None or not state.synced or not self._connection_healthy(state.connection):
+            return None
+        return state.book.top(limit)
+
+    def _connection_healthy(self, health: Optional[_ConnectionHealth]) -> bool:
+        """连接在线，且stale_after_sec内收到过消息或pong"""
+        return bool(
+            health is not None and health.connected
+            and time.time() - health.last_message_wall <= self.stale_after_sec
+        )
+
+    def is_synced(self, symbol: str) -> bool:
+        state = self._states.get(symbol.upper())
+        return bool(state and state.synced)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        healths = {id(s.connection): s.connection for s in self._states.values() if s.connection is not None}
+        silences = [now - h.last_message_wall for h in healths.values() if h.connected]
+        return {
+            **self.stats,
+            "symbols": len(self._states),
+            "synced": sum(1 for s in self._states.values() if s.synced),
+            "connections": len(self._connections),
+            "healthy_connections": sum(1 for h in healths.values() if self._connection_healthy(h)),
+            "max_connection_silence_sec": round(max(silences), 3) if silences else None,
+        }
+
+    # ==================== WebSocket ====================
+
+    async def _run_connection(self, symbols: List[str]) -> None:
+        import websockets
+
+        streams = "/".join(f"{s.lower()}@depth@{self.update_speed}" for s in symbols)
+        url = f"{self.ws_base}/stream?streams={streams}"
+        health = _ConnectionHealth()
+        for symbol in symbols:
+            self._states[symbol].connection = health
+        first = True
+        while self._running:
+            try:
+                async with websockets.connect(url, ping_interval=20, max_size=None) as ws:
+                    if not first:
+                        self.stats["reconnects"] += 1
+                    first = False
+                    health.connected = True
+                    health.last_message_wall = time.time()
+                    # 连接建立后（事件开始缓存）批量拉取快照
+                    sync_task = asyncio.ensure_future(self._sync_many(symbols))
+                    try:
+                        while True:
+                            message = await self._receive(ws, health)
+                            payload = json.loads(message)
+                            data = payload.get("data", payload)
+                            if data.get("e") == "depthUpdate":
+                                self._on_event(data)
+                    finally:
+                        sync_task.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._running:
+                    warn(f"订单簿WebSocket断开（{len(symbols)}个币种）: {type(e).__name__}: {e}")
+            finally:
+                health.connected = False
+            # 断线期间差分丢失：全部标记为未同步
+            for symbol in symbols:
+                state = self._states[symbol]
+                state.synced = False
+                state.buffer.clear()
+            if self._running:
+                await asyncio.sleep(self.reconnect_delay_sec)
+
+    async def _receive(self, ws, health: _ConnectionHealth):
+        """
+        接收下一条消息；静默超过stale_after_sec/2时主动ping确认连接仍然健康
+
+        ping超时（stale_after_sec内无pong）时抛出TimeoutError，由重连逻辑处理
+        """
+        while True:
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=self.stale_after_sec / 2)
+            except asyncio.TimeoutError:
+                self.stats["pings"] += 1
+                pong = await ws.ping()
+                await asyncio.wait_for(pong, timeout=self.stale_after_sec)
+                health.last_message_wall = time.time()
+                continue
+            health.last_message_wall = time.time()
+            return message
+
+    def _on_event(self, event: Dict[str, Any]) -> None:
+        state = self._states.get(event.get("s", ""))
+        if state is None:
+            return
+        self.stats["events"] += 1
+
+        if not state.synced:
+            state.buffer.append(event)
+            if len(state.buffer) > self.max_buffered_events:
+                del state.buffer[:len(state.buffer) - self.max_buffered_events]
+            return
+        self._apply_in_sequence(state, event)
+
+    def _apply_in_sequence(self, state: _BookState, event: Dict[str, Any]) -> bool:
+        """按序列规则应用事件；出现缺口时触发重新同步并返回False"""
+        book = state.book
+        if state.first_pending:
+            last_id = book.last_update_id
+            if int(event["u"]) < last_id:
+                self.stats["dropped_stale_events"] += 1
+                return True
+            if not int(event["U"]) <= last_id <= int(event["u"]):
+                return self._gap(state, event)
+            state.first_pending = False
+        elif int(event["pu"]) != book.last_update_id:
+            return self._gap(state, event)
+        book.apply(event)
+        return True
+
+    def _gap(self, state: _BookState, event: Dict[str, Any]) -> bool:
+        self.stats["gaps"] += 1
+        state.synced = False
+        state.buffer = [event]
+        if not state.syncing:
+            self._schedule_resync(state)
+        return False
+
+    def _schedule_resync(self, state: _BookState) -> None:
+        if not self._running:
+            return
+        self.stats["resyncs"] += 1
+        task = asyncio.ensure_future(self._resync(state.book.symbol))
+        self._resync_tasks.add(task)
+        task.add_done_callback(self._resync_tasks.discard)
+
+    async def _resync(self, symbol: str) -> None:
+        try:
+            await self._sync_one(symbol)
+        except Exception:
+            self._retry_later(symbol)
+
+    def _retry_later(self, symbol: str) -> None:
+        """同步失败：reconnect_delay_sec后重试（不依赖该币种是否有新事件）"""
+        state = self._states.get(symbol)
+        if not self._running or state is None or state.retry_handle is not None:
+            return
+        state.retry_handle = asyncio.get_running_loop().call_later(
+            self.reconnect_delay_sec, self._retry_due, symbol
+        )
+
+    def _retry_due(self, symbol: str) -> None:
+        state = self._states.get(symbol)
+        if state is None:
+            return  # 已退订
+        state.retry_handle = None
+        connection = state.connection
+        if not self._running or state.synced or state.syncing:
+            return
+        if connection is None or not connection.connected:
+            return  # 断线中：重连后由_sync_many统一同步
+        self.stats["sync_retries"] += 1
+        self._schedule_resync(state)
+
+    # ==================== 快照同步 ====================
+
+    async def _sync_many(self, symbols: List[str]) -> None:
+        """批量同步（快照请求经AIMD执行器，权重预算按BACKFILL优先级）"""
+        from ats_core.sources.fanout import AdaptiveFanout
+        from ats_core.sources.weight_budget import Priority, traffic_priority
+
+        # 稍等首批差分事件到达，保证快照之后的事件都在缓存中
+        await asyncio.sleep(0.2)
+        with traffic_priority(Priority.BACKFILL):
+            report = await AdaptiveFanout("orderbook_sync").run(symbols, self._sync_one)
+        for symbol, exc in list(report.errors.items())[:5]:
+            warn(f"订单簿同步失败 {symbol}: {exc}")
+        # 失败的币种稍后重试
+        for symbol in report.errors:
+            self._retry_later(symbol)
+
+    async def _sync_one(self, symbol: str) -> bool:
+        from ats_core.sources.binance import get_orderbook_snapshot
+
+        state = self._states.get(symbol)
+        if state is None:
+            return False  # 已退订
+        if state.syncing:
+            return state.synced
+        state.syncing = True
+        try:
+            loop = asyncio.get_running_loop()
+            for _ in range(3):
+                # 复制上下文：线程内保留请求优先级与预算等待计量
+                context = contextvars.copy_context()
+                snapshot = await loop.run_in_executor(
+                    None, context.run, lambda: get_orderbook_snapshot(symbol, limit=self.snapshot_limit)
+                )
+                self.stats["snapshots"] += 1
+
+                # 快照与缓存事件对齐（同一事件循环线程内完成，期间不会插入新事件）
+                state.book.load_snapshot(snapshot)
+                buffered, state.buffer = state.buffer, []
+                state.first_pending = True
+                state.synced = True
+                for i, event in enumerate(buffered):
+                    if not self._apply_in_sequence(state, event):
+                        # 快照早于缓存事件（U > lastUpdateId）或缓存中有缺口：保留剩余事件，重新拉取快照
+                        state.buffer = buffered[i:] + state.buffer[1:]
+                        self.stats["resyncs"] += 1
+                        break
+                else:
+                    return True
+            raise RuntimeError(f"{symbol} 快照与差分事件无法对齐")
+        except Exception as e:
+            state.synced = False
+            error(f"订单簿快照失败 {symbol}: {e}")
+            raise
+        finally:
+            state.syncing = False
+
+
+# 全局单例
+_orderbook_manager_instance: Optional[OrderBookManager] = None
+
+
+def get_orderbook_manager() -> OrderBookManager:
+    """获取本地订单簿管理器单例（配置读取config/params.json -> orderbook_manager）"""
+    global _orderbook_manager_instance
+
+    if _orderbook_manager_instance is None:
+        try:
+            from ats_core.cfg import CFG
+            config = CFG.params.get("orderbook_manager", {})
+        except Exception as e:
+            warn(f"orderbook_manager配置读取失败，使用默认值: {e}")
+            config = {}
+        _orderbook_manager_instance = OrderBookManager(config)
+
+    return _orderbook_manager_instance
@@ -20,6 +20,9 @@ import time
 from typing import Dict, List, Optional
 from collections import deque
 from ats_core.logging import log, warn, error
+from ats_core.sources.fanout import AdaptiveFanout, check_result
+from ats_core.sources.request_cache import invalidate_klines
+from ats_core.sources.weight_budget import Priority, traffic_priority  # 限流由进程级权重预算负责
 
 
 class RealtimeKlineCache:
@@ -94,47 +97,48 @@ class RealtimeKlineCache:
         success_count = 0
         error_count = 0
 
-        for i, symbol in enumerate(symbols):
+        async def fetch(item):
+            symbol, interval = item
+            # REST获取历史K线
+            return check_result(await client.get_klines(
+                symbol=symbol,
+                interval=interval,
+                limit=self.max_klines
+            ))
+
+        def on_result(item, klines, exc):
+            nonlocal done_calls
+            done_calls += 1
+            # 进度显示（约每20个币种）
+            if done_calls % (20 * len(intervals)) == 0:
+                elapsed = time.time() - start_time
+                done_symbols = done_calls / len(intervals)
+                eta = elapsed / done_calls * (len(pairs) - done_calls)
+                log(f"   进度: {done_symbols:.0f}/{len(symbols)} ({done_calls / len(pairs) * 100:.0f}%), "
+                    f"速度: {done_symbols / elapsed:.1f} 币种/秒, "
+                    f"已用: {elapsed:.0f}s, 剩余: {eta:.0f}s")
+
+        # 自适应并发获取；回填流量按BACKFILL优先级申请权重（让行实时扫描与交易请求）
+        pairs = [(symbol, interval) for symbol in symbols for interval in intervals]
+        done_calls = 0
+        with traffic_priority(Priority.BACKFILL):
+            report = await AdaptiveFanout("kline_init").run(pairs, fetch, on_result=on_result)
+
+        for symbol in symbols:
             self.cache[symbol] = {}
 
             for interval in intervals:
-                try:
-                    # REST获取历史K线
-                    klines = await client.get_klines(
-                        symbol=symbol,
-                        interval=interval,
-                        limit=self.max_klines
-                    )
-
-                    # 检查是否有错误
-                    if isinstance(klines, dict) and 'error' in klines:
-                        error(f"获取K线失败 {symbol} {interval}: {klines['error']}")
-                        error_count += 1
-                        continue
-
-                    # 存入deque（自动限制大小）
-                    self.cache[symbol][interval] = deque(klines, maxlen=self.max_klines)
-
-                    total_calls += 1
-                    success_count += 1
-
-                    # 进度显示（每20个）
-                    if (i + 1) % 20 == 0:
-                        elapsed = time.time() - start_time
-                        progress = (i + 1) / len(symbols) * 100
-                        eta = elapsed / (i + 1) * (len(symbols) - i - 1)
-                        speed = (i + 1) / elapsed
-
-                        log(f"   进度: {i+1}/{len(symbols)} ({progress:.0f}%), "
-                            f"速度: {speed:.1f} 币种/秒, "
-                            f"已用: {elapsed:.0f}s, 剩余: {eta:.0f}s")
+                klines = report.results.get((symbol, interval))
+                if klines is None:
+                    error(f"初始化 {symbol} {interval} 失败: {report.errors.get((symbol, interval))}")
+                    error_count += 1
+                    continue
 
-                    # 小延迟，避免速率限制（1200请求/分钟 = 20请求/秒）
-                    await asyncio.sleep(0.01)
+                # 存入deque（自动限制大小）
+                self.cache[symbol][interval] = deque(klines, maxlen=self.max_klines)
 
-                except Exception as e:
-                    error(f"初始化 {symbol} {interval} 失败: {e}")
-                    error_count += 1
+                total_calls += 1
+                success_count += 1
 
             self.initialized[symbol] = True
             self.last_update[symbol] = time.time()
@@ -237,6 +241,9 @@ class RealtimeKlineCache:
         if not kline.get('x'):
             return
 
+        # K线收盘：失效REST请求缓存中该周期的K线及派生结果
+        invalidate_klines(symbol, interval)
+
         if symbol not in self.cache or interval not in self.cache[symbol]:
             return
 
@@ -471,18 +478,24 @@ class RealtimeKlineCache:
         try:
             log(f"📊 [Layer 2] 开始更新K线: {len(symbols)}个币种 × {len(intervals)}个周期")
 
+            async def fetch(item):
+                symbol, interval = item
+                # 获取最新2根K线（limit=2）
+                return check_result(await client.get_klines(
+                    symbol=symbol,
+                    interval=interval,
+                    limit=2
+                ))
+
+            pairs = [(symbol, interval) for symbol in symbols for interval in intervals]
+            report = await AdaptiveFanout("kline_update").run(pairs, fetch)
+
             for symbol in symbols:
                 for interval in intervals:
                     try:
-                        # 获取最新2根K线（limit=2）
-                        new_klines = await client.get_klines(
-                            symbol=symbol,
-                            interval=interval,
-                            limit=2
-                        )
-
                         # 检查错误
-                        if isinstance(new_klines, dict) and 'error' in new_klines:
+                        new_klines = report.results.get((symbol, interval))
+                        if new_klines is None:
                             error_count += 1
                             continue
 
@@ -531,9 +544,6 @@ class RealtimeKlineCache:
                         # 更新时间戳
                         self.last_update[symbol] = time.time()
 
-                        # 小延迟，避免触发限频
-                        await asyncio.sleep(0.01)
-
                     except Exception as e:
                         error_count += 1
                         # 不打印每个错误，避免刷屏
@@ -601,42 +611,37 @@ class RealtimeKlineCache:
         try:
             log(f"📉 [Layer 3] 开始更新市场数据: {len(symbols)}个币种")
 
-            for symbol in symbols:
-                try:
-                    # 创建币种缓存
-                    if symbol not in self.market_data_cache:
-                        self.market_data_cache[symbol] = {}
-
-                    # 获取资金费率
-                    try:
-                        funding_rate_data = await client.get_funding_rate(symbol)
-                        if funding_rate_data and not isinstance(funding_rate_data, dict):
-                            # 取最新一条
-                            latest = funding_rate_data[0] if isinstance(funding_rate_data, list) else funding_rate_data
-                            funding_rate = float(latest.get('fundingRate', 0))
-                            self.market_data_cache[symbol]['funding_rate'] = funding_rate
-                    except:
-                        pass
-
-                    # 获取持仓量
-                    try:
-                        oi_data = await client.get_open_interest(symbol)
-                        if oi_data:
-                            open_interest = float(oi_data.get('openInterest', 0))
-                            self.market_data_cache[symbol]['open_interest'] = open_interest
-                    except:
-                        pass
-
-                    # 更新时间
-                    self.market_data_cache[symbol]['update_time'] = time.time()
-                    updated_count += 1
+            async def fetch(symbol):
+                # 创建币种缓存
+                if symbol not in self.market_data_cache:
+                    self.market_data_cache[symbol] = {}
 
-                    # 小延迟
-                    await asyncio.sleep(0.05)
-
-                except Exception as e:
-                    error_count += 1
-                    continue
+                # 获取资金费率
+                try:
+                    funding_rate_data = await client.get_funding_rate(symbol)
+                    if funding_rate_data and not isinstance(funding_rate_data, dict):
+                        # 取最新一条
+                        latest = funding_rate_data[0] if isinstance(funding_rate_data, list) else funding_rate_data
+                        funding_rate = float(latest.get('fundingRate', 0))
+                        self.market_data_cache[symbol]['funding_rate'] = funding_rate
+                except:
+                    pass
+
+                # 获取持仓量
+                try:
+                    oi_data = await client.get_open_interest(symbol)
+                    if oi_data:
+                        open_interest = float(oi_data.get('openInterest', 0))
+                        self.market_data_cache[symbol]['open_interest'] = open_interest
+                except:
+                    pass
+
+                # 更新时间
+                self.market_data_cache[symbol]['update_time'] = time.time()
+
+            report = await AdaptiveFanout("market_data").run(symbols, fetch)
+            updated_count = len(report.results)
+            error_count = len(report.errors)
 
             elapsed = time.time() - start_time
 
@@ -0,0 +1,360 @@
+# coding: utf-8
+"""
+写后持久化队列（Write-Behind Queue）
+
+职责：
+- 扫描循环只负责入队，数据库写入/报告落盘/git提交由独立写线程执行
+- 有界内存队列 + 溢出策略（阻塞背压 / 丢弃最新 / 丢弃最旧）
+- 写线程按批次取出记录，同类记录合并为一次处理（如多轮扫描结果一次事务写入）
+- flush()等待队列排空，close()排空后停止写线程（进程退出时自动执行）
+- 事件循环中使用submit_async()：需要背压等待时转到线程池，不阻塞事件循环
+
+处理方式（register时指定）：
+- 逐条（默认）：handler(item)
+- batched：handler([item, ...])，同一批次的同类记录合并为一次调用
+- coalesce_latest：只处理同一批次中最新的一条（如git提交报告，只需最后一次）
+
+同一批次内各类记录按首次出现的顺序处理（coalesce_latest类型按最后一次出现的位置），
+保证先写报告、后提交。
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+
+@dataclass
+class _Handler:
+    func: Callable[[Any], Any]
+    batched: bool = False
+    coalesce_latest: bool = False
+
+
+class WriteBehindQueue:
+    """
+    有界写后队列 + 专用写线程
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, name: str = "write-behind"):
+        """
+        初始化写后队列
+
+        Args:
+            config: 队列配置（见config/params.json -> write_behind）
+            name: 写线程名称
+        """
+        config = config or {}
+        self.name = name
+
+        # §6.2 配置读取（带默认值）
+        self.enabled = config.get("enabled", True)
+        self.max_queue_size = max(1, int(config.get("max_queue_size", 10000)))
+        self.batch_size = max(1, int(config.get("batch_size", 500)))
+        self.flush_interval_sec = float(config.get("flush_interval_sec", 1.0))
+        self.overflow_policy = config.get("overflow_policy", "block")
+        self.block_timeout_sec = float(config.get("block_timeout_sec", 5.0))
+        self.shutdown_timeout_sec = float(config.get("shutdown_timeout_sec", 30.0))
+
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy必须是{OVERFLOW_POLICIES}之一: {self.overflow_policy}")
+
+        self._handlers: Dict[str, _Handler] = {}
+        self._queue: Deque[Tuple[str, Any]] = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._flush_waiters = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "submitted": 0,
+            "processed": 0,
+            "batches": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "failed": 0,
+            "blocked_seconds": 0.0,
+            "max_depth": 0,
+        }
+
+    # ==================== 注册与入队 ====================
+
+    def register(
+        self,
+        kind: str,
+        handler: Callable[[Any], Any],
+        batched: bool = False,
+        coalesce_latest: bool = False,
+    ) -> None:
+        """
+        注册记录类型的处理函数（重复注册覆盖）
+
+        Args:
+            kind: 记录类型
+            handler: 处理函数（batched时接收列表）
+            batched: 同批次同类记录合并为一次调用
+            coalesce_latest: 同批次只处理最新一条
+        """
+        with self._cond:
+            self._handlers[kind] = _Handler(handler, batched, coalesce_latest)
+
+    def submit(self, kind: str, item: Any) -> bool:
+        """
+        入队一条记录（不执行I/O）
+
+        队列已满时按overflow_policy处理：
+        - block：等待最多block_timeout_sec（背压），超时后丢弃该记录
+        - drop_newest：直接丢弃该记录
+        - drop_oldest：丢弃队首最旧的记录
+
+        enabled=false时在调用线程同步执行（与未使用队列时行为一致）。
+
+        Args:
+            kind: 记录类型（须已register）
+            item: 记录
+
+        Returns:
+            是否已入队（或已同步执行）
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"未注册的记录类型: {kind}")
+
+        if not self.enabled:
+            self._process([(kind, item)])
+            return True
+
+        return self._enqueue(kind, item, wait=True)
+
+    async def submit_async(self, kind: str, item: Any) -> bool:
+        """
+        submit()的协程版本（在asyncio事件循环中调用）
+
+        队列未满时直接入队；需要阻塞等待（block策略背压）或同步执行（enabled=false）时
+        转到线程池执行submit()，事件循环不被阻塞
+
+        Returns:
+            是否已入队（或已同步执行）
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"未注册的记录类型: {kind}")
+
+        if self.enabled:
+            accepted = self._enqueue(kind, item, wait=False)
+            if accepted is not None:
+                return accepted
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.submit, kind, item)
+
+    def _enqueue(self, kind: str, item: Any, wait: bool) -> Optional[bool]:
+        """入队（wait=False且需要背压等待时返回None，不入队）"""
+        with self._cond:
+            if self._closed:
+                logger.warning(f"{self.name}已关闭，丢弃记录: {kind}")
+                self.stats["dropped"] += 1
+                return False
+
+            if len(self._queue) >= self.max_queue_size:
+                if self.overflow_policy == "drop_newest":
+                    self.stats["dropped"] += 1
+                    return False
+                if self.overflow_policy == "drop_oldest":
+                    self._queue.popleft()
+                    self.stats["dropped"] += 1
+                else:
+                    if not wait:
+                        return None
+                    start = time.monotonic()
+                    deadline = start + self.block_timeout_sec
+                    while len(self._queue) >= self.max_queue_size and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    self.stats["blocked_seconds"] += time.monotonic() - start
+                    if len(self._queue) >= self.max_queue_size or self._closed:
+                        logger.warning(f"{self.name}队列已满（{self.max_queue_size}），丢弃记录: {kind}")
+                        self.stats["dropped"] += 1
+                        return False
+
+            self._queue.append((kind, item))
+            self.stats["submitted"] += 1
+            self.stats["max_depth"] = max(self.stats["max_depth"], len(self._queue))
+            self._ensure_thread()
+            self._cond.notify_all()
+            return True
+
+    # ==================== 排空与关闭 ====================
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中已有记录全部处理完成
+
+        Args:
+            timeout: 最长等待秒数（None=一直等待）
+
+        Returns:
+            是否已排空
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                return self._wait_drained_locked(deadline)
+            finally:
+                self._flush_waiters -= 1
+
+    def _wait_drained_locked(self, deadline: Optional[float]) -> bool:
+        while self._queue or self._in_flight:
+            if self._thread is None or not self._thread.is_alive():
+                # 写线程未运行（已关闭或异常退出）：在当前线程处理剩余记录
+                batch = self._take_batch_locked(len(self._queue))
+                self._cond.release()
+                try:
+                    self._process(batch)
+                finally:
+                    self._cond.acquire()
+                    self._in_flight = 0
+                continue
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        排空队列并停止写线程（之后的submit被丢弃）
+
+        Args:
+            timeout: 最长等待秒数（默认shutdown_timeout_sec）
+
+        Returns:
+            是否在超时前排空
+        """
+        timeout = self.shutdown_timeout_sec if timeout is None else timeout
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        drained = self.flush(timeout=0 if thread is not None and thread.is_alive() else None)
+        if not drained:
+            with self._cond:
+                pending = len(self._queue) + self._in_flight
+            logger.warning(f"{self.name}关闭超时，{pending}条记录未写入")
+        return drained
+
+    def pending(self) -> int:
+        """队列中及处理中的记录数"""
+        with self._cond:
+            return len(self._queue) + self._in_flight
+
+    def get_stats(self) -> Dict[str, Any]:
+        """队列统计"""
+        with self._cond:
+            return {**self.stats, "depth": len(self._queue), "in_flight": self._in_flight}
+
+    # ==================== 写线程 ====================
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _take_batch_locked(self, limit: int) -> List[Tuple[str, Any]]:
+        n = min(limit, len(self._queue))
+        batch = [self._queue.popleft() for _ in range(n)]
+        self._in_flight = len(batch)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue and self._closed:
+                    self._cond.notify_all()
+                    return
+                # 攒批：最多等待flush_interval_sec凑满batch_size（关闭/flush时立即处理）
+                deadline = time.monotonic() + self.flush_interval_sec
+                while (len(self._queue) < self.batch_size and not self._closed
+                       and not self._flush_waiters):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch_locked(self.batch_size)
+                # 取走记录后唤醒被背压阻塞的submit
+                self._cond.notify_all()
+
+            try:
+                self._process(batch)
+            finally:
+                with self._cond:
+                    self._in_flight = 0
+                    self._cond.notify_all()
+
+    def _process(self, batch: List[Tuple[str, Any]]) -> None:
+        """按类型分组处理一个批次（组顺序见模块说明）"""
+        if not batch:
+            return
+        groups: Dict[str, List[Any]] = {}
+        order: Dict[str, int] = {}
+        for index, (kind, item) in enumerate(batch):
+            groups.setdefault(kind, []).append(item)
+            if kind not in order or self._handlers[kind].coalesce_latest:
+                order[kind] = index
+
+        for kind in sorted(groups, key=order.__getitem__):
+            items = groups[kind]
+            handler = self._handlers[kind]
+            try:
+                if handler.coalesce_latest:
+                    handler.func(items[-1])
+                    self.stats["coalesced"] += len(items) - 1
+                elif handler.batched:
+                    handler.func(items)
+                else:
+                    for item in items:
+                        try:
+                            handler.func(item)
+                        except Exception as e:
+                            self.stats["failed"] += 1
+                            logger.error(f"{self.name}写入失败 {kind}: {e}")
+            except Exception as e:
+                self.stats["failed"] += len(items)
+                logger.error(f"{self.name}写入失败 {kind}（{len(items)}条）: {e}")
+            self.stats["processed"] += len(items)
+        self.stats["batches"] += 1
+
+
+# 全局单例
+_write_behind_instance: Optional[WriteBehindQueue] = None
+_write_behind_lock = threading.Lock()
+
+
+def get_write_behind_queue() -> WriteBehindQueue:
+    """获取写后队列单例（配置读取config/params.json -> write_behind，进程退出时自动排空）"""
+    global _write_behind_instance
+    with _write_behind_lock:
+        if _write_behind_instance is None:
+            from ats_core.cfg import CFG
+            _write_behind_instance = WriteBehindQueue(CFG.params.get("write_behind", {}))
+            atexit.register(_write_behind_instance.close)
+    return _write_behind_instance
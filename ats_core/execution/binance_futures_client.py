@@ -12,6 +12,7 @@
 
 import asyncio
 import json
+import os
 import time
 import hmac
 import hashlib
@@ -22,6 +23,8 @@ import websockets
 from datetime import datetime, timezone
 
 from ats_core.logging import log, warn, error
+from ats_core.sources.http_pool import create_async_session, endpoint_stats
+from ats_core.sources.weight_budget import default_priority_for, endpoint_weight, get_weight_budget
 
 
 class BinanceFuturesClient:
@@ -35,13 +38,24 @@ class BinanceFuturesClient:
     - 精确的时间同步
     """
 
-    def __init__(self, api_key: str, api_secret: str, testnet: bool = False):
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        testnet: bool = False,
+        base_url: Optional[str] = None,
+        ws_base_url: Optional[str] = None
+    ):
         self.api_key = api_key
         self.api_secret = api_secret
         self.testnet = testnet
 
-        # API端点
-        if testnet:
+        # API端点（base_url显式指定或设置ATS_BINANCE_STANDIN时连接本地替身服务）
+        standin = base_url or os.environ.get("ATS_BINANCE_STANDIN", "").rstrip("/")
+        if standin:
+            self.base_url = standin
+            self.ws_base_url = ws_base_url or standin.replace("http", "ws", 1)
+        elif testnet:
             self.base_url = "https://testnet.binancefuture.com"
             self.ws_base_url = "wss://stream.binancefuture.com"
         else:
@@ -65,7 +79,8 @@ class BinanceFuturesClient:
 
     async def initialize(self):
         """初始化客户端（同步服务器时间）"""
-        self.session = aiohttp.ClientSession()
+        # 连接池会话（keep-alive、每主机连接上限、gzip，配置见params.json -> http_pool）
+        self.session = create_async_session()
 
         # 同步服务器时间
         await self._sync_time()
@@ -142,6 +157,8 @@ class BinanceFuturesClient:
             endpoint: API端点
             signed: 是否需要签名
             params: 请求参数
+
+        请求前向进程级权重预算申请（与同步数据源共用），响应头用于对账
         """
         if params is None:
             params = {}
@@ -149,14 +166,25 @@ class BinanceFuturesClient:
         url = f"{self.base_url}{endpoint}"
         headers = {'X-MBX-APIKEY': self.api_key}
 
+        budget = get_weight_budget()
+        await budget.acquire_async(
+            endpoint_weight(endpoint, params), default_priority_for(signed=signed)
+        )
+
         if signed:
             params = self._sign_request(params)
 
+        start = time.perf_counter()
         try:
             async with self.session.request(
                 method, url, params=params, headers=headers
             ) as resp:
+                budget.observe(resp.status, resp.headers)
                 data = await resp.json()
+                endpoint_stats.record(
+                    endpoint, (time.perf_counter() - start) * 1000, resp.status == 200,
+                    resp.content_length or 0,
+                )
 
                 if resp.status != 200:
                     error(f"API请求失败 [{resp.status}]: {data}")
@@ -165,6 +193,7 @@ class BinanceFuturesClient:
                 return data
 
         except Exception as e:
+            endpoint_stats.record(endpoint, (time.perf_counter() - start) * 1000, False)
             error(f"API请求异常: {e}")
             return {'error': str(e)}
 
@@ -6,12 +6,25 @@ A（加速）评分 - 使用方向性软映射
 - 旧版：cvd6 < 0.01 → 0 分（硬阈值）
 - 新版：cvd6 = 0.005 → 约 42 分（软映射）
 """
+from typing import Optional
+
 from ats_core.features.ta_core import ema
 from ats_core.features.scoring_utils import directional_score  # 保留用于内部计算
 from ats_core.scoring.scoring_utils import StandardizationChain
 
-# 模块级StandardizationChain实例
-_accel_chain = StandardizationChain(alpha=0.15, tau=3.0, z0=2.5, zmax=6.0, lam=1.5)
+# 模块级StandardizationChain实例（延迟初始化，与其他因子一致；回测置为None即从空链开始）
+_accel_chain: Optional[StandardizationChain] = None
+
+
+def _get_accel_chain() -> StandardizationChain:
+    """获取StandardizationChain实例（延迟初始化）"""
+    global _accel_chain
+
+    if _accel_chain is None:
+        _accel_chain = StandardizationChain(alpha=0.15, tau=3.0, z0=2.5, zmax=6.0, lam=1.5)
+
+    return _accel_chain
+
 
 def score_accel(c, cvd_series, params=None):
     """
@@ -71,7 +84,7 @@ def score_accel(c, cvd_series, params=None):
     A_raw = p["slope_weight"] * slope_score + p["cvd_weight"] * cvd_score
 
     # v2.0合规：应用StandardizationChain
-    A_pub, diagnostics = _accel_chain.standardize(A_raw)
+    A_pub, diagnostics = _get_accel_chain().standardize(A_raw)
     A = int(round(max(0, min(100, A_pub))))
 
     # weak_gate: 保留原有逻辑（用于其他地方判断）
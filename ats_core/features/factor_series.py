@@ -0,0 +1,478 @@
+# coding: utf-8
+"""
+因子时间序列（向量化、因果）- T/M/C/V 全序列一次计算
+
+用途：
+- 回测框架（Freqtrade等）需要整段K线上每根bar的因子值
+- 逐bar调用score_trend/score_momentum/score_cvd_flow/score_volume为O(bars × 分析)
+- 本模块对整段序列一次计算，第t根bar的值只使用t及之前的数据（因果）
+
+与实时扫描器的一致性：
+- 因子定义、参数来源与analyze_symbol相同（factors_unified.json，params.json同名段覆盖）
+- 第t根bar等价于对"截至t的最近window根K线"（扫描器1h窗口=300）调用原函数：
+  最少数据点、相对历史归一化（历史斜率/加速度均值、P95拥挤度、自适应价格阈值）均按该窗口计算
+- StandardizationChain按bar顺序从首个有效bar冷启动（等价于每个symbol独立的链）
+- 差异（有意简化）：
+  - EMA在全序列上递推（窗口内EMA在数个周期后收敛到相同值；序列长度<=window时完全一致）
+  - C因子不做整窗口的巨量K线降权（cvd_from_klines.filter_outliers），7点回归窗口内的IQR降权保留
+  - 扫描器中StandardizationChain为进程级单例（跨symbol共享状态），此处按symbol独立
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ats_core.config.factor_config import get_factor_config
+
+# 扫描器1h K线窗口（OptimizedBatchScanner: k1h limit=300）
+DEFAULT_WINDOW = 300
+
+# 参与评分的OHLCV因子 → (factors_unified.json名称, params.json覆盖段)
+FACTOR_SOURCES = {
+    "T": ("T", "trend"),
+    "M": ("M", "momentum"),
+    "C": ("C+", "cvd_flow"),
+    "V": ("V+", None),  # analyze_symbol调用score_volume时不传params
+}
+
+# 滑动窗口分块大小（控制内存：块行数 × 窗口长度）
+_CHUNK_ROWS = 8192
+
+
+# ==================== 参数 ====================
+
+def load_factor_params(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    读取T/M/C/V参数（与analyze_symbol相同的来源和优先级）
+
+    Args:
+        overrides: params.json内容（None=从CFG读取）
+
+    Returns:
+        {factor: {"params": {...}, "std": {...}, "min_data_points": int}}
+    """
+    if overrides is None:
+        from ats_core.cfg import CFG
+        overrides = CFG.params or {}
+
+    config = get_factor_config()
+    result = {}
+    for factor, (config_name, section) in FACTOR_SOURCES.items():
+        params = dict(config.get_factor_params(config_name))
+        if section and isinstance(overrides.get(section), dict):
+            params.update(overrides[section])
+        result[factor] = {
+            "params": params,
+            "std": config.get_standardization_params(config_name),
+            "min_data_points": config.get_data_quality_threshold(config_name, "min_data_points"),
+        }
+    return result
+
+
+# ==================== 基础工具 ====================
+
+def _ew(x: np.ndarray, alpha: float) -> np.ndarray:
+    """y_t = alpha·x_t + (1-alpha)·y_{t-1}，y_0 = x_0"""
+    return pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def _ema(x: np.ndarray, period: int) -> np.ndarray:
+    """与ta_core.ema / trend._ema相同的递推EMA"""
+    if period <= 1:
+        return x.astype(float).copy()
+    return _ew(x, 2.0 / (period + 1.0))
+
+
+def _directional_score(value, neutral: float = 0.0, scale: float = 1.0,
+                       max_bonus: float = 50.0, min_score: float = 10.0) -> np.ndarray:
+    """scoring_utils.directional_score的向量化版本（10~100整数分）"""
+    score = 50.0 + max_bonus * np.tanh((np.asarray(value, dtype=float) - neutral) / scale)
+    return np.round(np.clip(score, min_score, 100.0))
+
+
+def _shift(x: np.ndarray, k: int, fill: float = np.nan) -> np.ndarray:
+    out = np.full_like(x, fill, dtype=float)
+    if k < len(x):
+        out[k:] = x[:len(x) - k]
+    return out
+
+
+def _rolling_sum(x: np.ndarray, k: int) -> np.ndarray:
+    """末端对齐的k点滚动和（前k-1个为NaN）"""
+    cs = np.concatenate(([0.0], np.cumsum(x)))
+    out = np.full(len(x), np.nan)
+    if len(x) >= k:
+        out[k - 1:] = cs[k:] - cs[:-k]
+    return out
+
+
+def _range_mean(x: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """mean(x[start..end])（含两端；x中NaN视为0，调用方保证区间内有效）"""
+    cs = np.concatenate(([0.0], np.cumsum(np.nan_to_num(x))))
+    count = end - start + 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, (cs[end + 1] - cs[np.maximum(start, 0)]) / np.maximum(count, 1), np.nan)
+
+
+def _rolling_linreg(y: np.ndarray, k: int):
+    """
+    k点滚动一元线性回归（对索引0..k-1），返回(slope, ss_res, ss_tot)，末端对齐
+    """
+    n = len(y)
+    slope = np.full(n, np.nan)
+    ss_res = np.full(n, np.nan)
+    ss_tot = np.full(n, np.nan)
+    if n < k or k < 2:
+        return slope, ss_res, ss_tot
+    win = sliding_window_view(y, k)
+    xc = np.arange(k) - (k - 1) / 2.0
+    den = float(np.sum(xc ** 2))
+    mean = win.mean(axis=1)
+    centered = win - mean[:, None]
+    b = centered @ xc / den
+    resid = centered - b[:, None] * xc[None, :]
+    slope[k - 1:] = b
+    ss_res[k - 1:] = np.sum(resid ** 2, axis=1)
+    ss_tot[k - 1:] = np.sum(centered ** 2, axis=1)
+    return slope, ss_res, ss_tot
+
+
+def _trailing_reduce(x: np.ndarray, lengths: np.ndarray, reducer: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """
+    对每个t计算reducer(x[t-lengths[t]+1 .. t])（lengths<=0时为NaN）
+
+    定长部分用滑动窗口分块向量化，窗口未满的预热部分逐行计算
+    """
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n == 0:
+        return out
+    full = int(lengths.max())
+    if full <= 0:
+        return out
+    is_full = lengths == full
+    for t in np.nonzero(~is_full & (lengths > 0))[0]:
+        out[t] = reducer(x[t - lengths[t] + 1:t + 1][None, :])[0]
+    rows = np.nonzero(is_full)[0]
+    if len(rows) and n >= full:
+        windows = sliding_window_view(x, full)  # windows[i] = x[i .. i+full-1]
+        for lo in range(0, len(rows), _CHUNK_ROWS):
+            chunk = rows[lo:lo + _CHUNK_ROWS]
+            out[chunk] = reducer(np.array(windows[chunk - full + 1]))
+    return out
+
+
+def standardize_series(raw: np.ndarray, valid: np.ndarray, std: Dict[str, Any]) -> np.ndarray:
+    """
+    StandardizationChain的向量化版本（从首个有效bar冷启动，逐bar更新）
+
+    Args:
+        raw: 原始因子值
+        valid: 有效bar（须为连续后缀：最少数据点条件随t单调）
+        std: 链参数（alpha/tau/z0/zmax/lam/enabled）
+
+    Returns:
+        ±100分数（无效bar为0）
+    """
+    out = np.zeros(len(raw))
+    idx = np.nonzero(valid)[0]
+    if len(idx) == 0:
+        return out
+    first = idx[0]
+    alpha = std.get("alpha", 0.25)
+    tau = std.get("tau", 5.0)
+    z0 = std.get("z0", 3.0)
+    zmax = std.get("zmax", 6.0)
+    lam = std.get("lam", 1.5)
+
+    x = raw[first:].astype(float)
+    smooth = _ew(x, alpha)
+    median = _ew(smooth, alpha)
+    dev = np.abs(smooth - median)
+    dev[0] = 0.01  # 冷启动MAD
+    mad = _ew(dev, alpha)
+    z = (smooth - median) / (1.4826 * np.maximum(mad, 1e-6))
+    z[0] = 0.0
+
+    abs_z = np.abs(z)
+    soft = np.where(
+        abs_z <= z0, z,
+        np.sign(z) * np.where(abs_z >= zmax, zmax, z0 + (zmax - z0) * (1.0 - np.exp(-lam * (abs_z - z0))))
+    )
+    out[first:] = 100.0 * np.tanh(soft / tau)
+    return out
+
+
+# ==================== 因子 ====================
+
+def trend_series(high, low, close, window: int, cfg: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """T因子序列（score_trend逐bar等价）"""
+    p = cfg["params"]
+    n = len(close)
+    bars = np.minimum(np.arange(1, n + 1), window)
+    valid = bars >= cfg["min_data_points"]
+
+    ema_min_bars = int(p.get("ema_order_min_bars", 6))
+    slope_lookback = max(5, int(p.get("slope_lookback", 12)))
+    atr_period = max(1, int(p.get("atr_period", 14)))
+    slope_scale = float(p.get("slope_scale", 0.08))
+    ema_bonus = float(p.get("ema_bonus", 12.5))
+    r2_weight = float(p.get("r2_weight", 0.15))
+
+    # 1. EMA5/20排列（最近ema_order_min_bars根全部满足）
+    ema5, ema20 = _ema(close, 5), _ema(close, 20)
+    ema_up = _rolling_sum((ema5 > ema20).astype(float), ema_min_bars) == ema_min_bars
+    ema_dn = _rolling_sum((ema5 < ema20).astype(float), ema_min_bars) == ema_min_bars
+
+    # 2. 斜率/ATR（ATR=最近atr_period个TR的均值）
+    slope, ss_res, ss_tot = _rolling_linreg(close, slope_lookback)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r2 = np.where(ss_tot != 0, 1.0 - ss_res / ss_tot, 0.0)
+    r2 = np.clip(np.nan_to_num(r2), 0.0, 1.0)
+    tr = np.maximum.reduce([high - low, np.abs(high - _shift(close, 1)), np.abs(low - _shift(close, 1))])
+    atr = np.maximum(1e-9, _rolling_sum(np.nan_to_num(tr), atr_period) / atr_period)
+    slope_per_bar = np.nan_to_num(slope / atr)
+    dir_flag = np.where(slope_per_bar > 0.02, 1, np.where(slope_per_bar < -0.02, -1, 0))
+
+    # 3-5. 软映射 + EMA排列 + R²加权
+    slope_score = (_directional_score(slope_per_bar, 0.0, slope_scale, 50.0) - 50) * 2
+    ema_score = np.where(ema_up, ema_bonus * 2, np.where(ema_dn, -ema_bonus * 2, 0.0))
+    r2_bonus = np.select(
+        [(dir_flag == 1) & ema_up, (dir_flag == -1) & ema_dn, dir_flag == 1, dir_flag == -1],
+        [r2_weight * 100 * r2, -r2_weight * 100 * r2, r2_weight * 50 * r2, -r2_weight * 50 * r2],
+        0.0
+    )
+    raw = slope_score + ema_score + r2_bonus
+    raw = np.where(valid, raw, 0.0)
+    score = np.round(standardize_series(raw, valid, cfg["std"]))
+    return {"T": np.where(valid, score, 0.0), "T_raw": raw, "Tm": np.where(valid, dir_flag, 0)}
+
+
+def momentum_series(high, low, close, window: int, cfg: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """M因子序列（score_momentum逐bar等价）"""
+    from ats_core.features.ta_core import atr as wilder_atr
+
+    p = cfg["params"]
+    n = len(close)
+    bars = np.minimum(np.arange(1, n + 1), window)
+    valid = bars >= cfg["min_data_points"]
+    lb = int(p["slope_lookback"])
+
+    ema_fast, ema_slow = _ema(close, p["ema_fast"]), _ema(close, p["ema_slow"])
+    diff = ema_fast - ema_slow
+    momentum_now = _rolling_sum(diff, lb) / lb
+    momentum_prev = _shift(momentum_now, lb)
+    accel = momentum_now - momentum_prev
+    slope_now = (ema_fast - _shift(ema_fast, lb - 1)) / (lb - 1)
+
+    # 相对历史归一化：窗口内位置[2lb, bars)的斜率、[3lb, bars)的加速度
+    t = np.arange(n)
+    window_start = t - bars + 1
+    hist_slope = (ema_fast - _shift(ema_fast, lb)) / (lb - 1)
+    slope_count = bars - 2 * lb
+    accel_count = bars - 3 * lb
+    use_hist = bars >= 30
+    avg_abs_slope = np.maximum(1e-8, _range_mean(np.abs(hist_slope), window_start + 2 * lb, t))
+    avg_abs_accel = np.maximum(1e-8, _range_mean(np.abs(accel), window_start + 3 * lb, t))
+    has_slope_hist = use_hist & (slope_count >= 10)
+    has_accel_hist = use_hist & (accel_count >= 10)
+
+    atr_now = np.maximum(1e-9, np.asarray(wilder_atr(high, low, close, p["atr_period"]) or np.ones(n)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope_norm = np.where(has_slope_hist, slope_now / avg_abs_slope, slope_now / atr_now)
+        accel_norm = np.where(has_accel_hist, accel / avg_abs_accel, accel / atr_now)
+
+    slope_score = (_directional_score(np.nan_to_num(slope_norm), 0.0, p["slope_scale"]) - 50) * 2
+    accel_score = (_directional_score(np.nan_to_num(accel_norm), 0.0, p["accel_scale"]) - 50) * 2
+    raw = p["slope_weight"] * slope_score + p["accel_weight"] * accel_score
+    raw = np.where(valid, raw, 0.0)
+    score = np.round(standardize_series(raw, valid, cfg["std"]))
+    return {"M": np.where(valid, score, 0.0), "M_raw": raw}
+
+
+def cvd_flow_series(close, quote_volume, taker_buy_quote, window: int, cfg: Dict[str, Any],
+                    eps_slope_min: float = 1e-8) -> Dict[str, np.ndarray]:
+    """C因子序列（score_cvd_flow逐bar等价，CVD在每个窗口内从0累计）"""
+    p = cfg["params"]
+    n = len(close)
+    bars = np.minimum(np.arange(1, n + 1), window)
+    valid = bars >= cfg["min_data_points"]
+    k = int(p.get("regression_window_size", 7))
+
+    delta = 2.0 * taker_buy_quote - quote_volume
+    delta = np.where(np.isfinite(delta), delta, 0.0)
+    cum = np.cumsum(delta)
+    t = np.arange(n)
+    window_start = t - bars + 1
+    base = np.where(window_start > 0, cum[np.maximum(window_start - 1, 0)], 0.0)  # 窗口起点前的累计值
+
+    # 当前回归窗口（最近k点，窗口内累计CVD，IQR异常点降权）
+    reg = np.full((n, k), np.nan)
+    if n >= k:
+        reg[k - 1:] = sliding_window_view(cum, k)
+    reg = reg - base[:, None]
+    outlier = p.get("outlier_detection", {"enabled": True, "min_points": 5, "iqr_multiplier": 1.5, "weight": 0.3})
+    if outlier.get("enabled", True) and k >= outlier["min_points"] and k >= 4:
+        ordered = np.sort(reg, axis=1)
+        q1 = ordered[:, int(0.25 * (k - 1))]
+        q3 = ordered[:, int(0.75 * (k - 1))]
+        iqr = q3 - q1
+        mult = outlier["iqr_multiplier"]
+        mask = (iqr != 0)[:, None] & ((reg < (q1 - mult * iqr)[:, None]) | (reg > (q3 + mult * iqr)[:, None]))
+        reg = np.where(mask, reg * outlier["weight"], reg)
+    xc = np.arange(k) - (k - 1) / 2.0
+    centered = reg - reg.mean(axis=1)[:, None]
+    slope = centered @ xc / float(np.sum(xc ** 2))
+    ss_tot = np.sum(centered ** 2, axis=1)
+    ss_res = np.sum((centered - slope[:, None] * xc[None, :]) ** 2, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r2 = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, 0.0)
+    slope, r2 = np.nan_to_num(slope), np.nan_to_num(r2)
+
+    # 相对历史归一化：窗口内全部k点斜率（未降权）
+    hist_slope, _, _ = _rolling_linreg(cum, k)
+    abs_hist = np.abs(hist_slope)
+    hist_count = bars - (k - 1)
+    use_hist = (bars >= p.get("min_historical_samples", 30)) & (hist_count >= 10)
+    avg_abs_slope = np.maximum(eps_slope_min, _range_mean(abs_hist, window_start + k - 1, t))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = np.where(
+            use_hist,
+            100.0 * np.tanh(slope / avg_abs_slope / p.get("relative_intensity_scale", 2.0)),
+            100.0 * np.tanh(slope / p.get("absolute_scale_fallback", 1000.0)),
+        )
+
+    # R²不足时打折
+    stability = p.get("stability_factor_params", {"base": 0.7, "multiplier": 0.3, "r2_baseline": 0.7})
+    factor = np.minimum(1.0, stability["base"] + stability["multiplier"] * (r2 / stability["r2_baseline"]))
+    score = np.where(r2 >= p.get("r2_threshold", 0.7), score, score * factor)
+
+    # 拥挤度：|斜率| >= 窗口内历史|斜率|的P95
+    percentile = p.get("crowding_percentile", 95) / 100.0
+    crowd_rows = use_hist & (hist_count >= 20)
+    lengths = np.where(crowd_rows, hist_count, 0)
+    p95 = _trailing_reduce(
+        np.nan_to_num(abs_hist), lengths,
+        lambda w: np.sort(w, axis=1)[:, int(percentile * (w.shape[1] - 1))]
+    )
+    crowded = crowd_rows & (np.abs(slope) >= p95)
+    score = np.where(crowded, score * (100 - p["crowding_p95_penalty"]) / 100.0, score)
+
+    raw = np.where(valid, score, 0.0)
+    result = np.round(standardize_series(raw, valid, cfg["std"]))
+    return {"C": np.where(valid, result, 0.0), "C_raw": raw}
+
+
+def volume_series(close, quote_volume, window: int, cfg: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """V因子序列（score_volume(quote_volume, closes)逐bar等价）"""
+    p = cfg["params"]
+    vol = np.asarray(quote_volume, dtype=float)
+    n = len(vol)
+    bars = np.minimum(np.arange(1, n + 1), window)
+    valid = bars >= cfg["min_data_points"]
+
+    v5 = _rolling_sum(vol, 5) / 5.0
+    v20 = _rolling_sum(vol, 20) / 20.0
+    vlevel = v5 / np.maximum(1e-12, v20)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cur = np.log(np.maximum(1e-9, vol / np.maximum(1e-9, v20)))
+        prv = np.log(np.maximum(1e-9, _shift(vol, 1) / np.maximum(1e-9, _shift(v20, 1))))
+    vroc = cur - prv
+
+    vlevel_score = (_directional_score(np.nan_to_num(vlevel, nan=1.0), 1.0, p["vlevel_scale"]) - 50) * 2
+    vroc_score = (_directional_score(np.nan_to_num(vroc), 0.0, p["vroc_scale"]) - 50) * 2
+    strength = np.clip(p["vlevel_weight"] * vlevel_score + p["vroc_weight"] * vroc_score, -100, 100)
+
+    # 价格方向（自适应阈值：窗口内|lookback涨跌幅|中位数，限制在0.1%~2%）
+    lb = int(p["price_lookback"])
+    prev = _shift(close, lb)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change = np.where(prev != 0, (close - prev) / np.abs(prev), np.nan)
+    trend_pct = (close - prev) / np.maximum(1e-12, np.abs(prev))
+    adaptive = (p["adaptive_threshold_mode"] != "legacy") & (bars >= 50)
+    lengths = np.where(adaptive, bars - lb, 0)
+    median = _trailing_reduce(np.abs(change), lengths, lambda w: np.nanpercentile(w, 50, axis=1))
+    threshold = np.where(adaptive, np.clip(np.nan_to_num(median, nan=0.005), 0.001, 0.02), 0.005)
+    has_price = bars >= lb + 1
+    direction = np.where(has_price & (trend_pct > threshold), 1,
+                         np.where(has_price & (trend_pct < -threshold), -1, 0))
+
+    raw = np.where(direction == -1, -strength, strength)
+    raw = np.where(valid, raw, 0.0)
+    score = np.round(standardize_series(raw, valid, cfg["std"]))
+    return {"V": np.where(valid, score, 0.0), "V_raw": raw}
+
+
+# ==================== 组合 ====================
+
+def compute_factor_series(
+    high, low, close, quote_volume,
+    taker_buy_quote=None,
+    window: int = DEFAULT_WINDOW,
+    factor_params: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    一次计算整段K线的T/M/C/V因子序列（因果）
+
+    Args:
+        high/low/close: 价格序列
+        quote_volume: 成交额（USDT，analyze_symbol的V因子输入）
+        taker_buy_quote: 主动买入成交额（None=无数据，C因子不计算）
+        window: 每根bar可见的K线窗口（与扫描器一致，默认300）
+        factor_params: load_factor_params()结果（None=自动读取）
+
+    Returns:
+        {"T", "M", "C"(可选), "V", 及 *_raw 原始值}，长度与输入相同
+    """
+    from ats_core.features.cvd_flow import _get_eps_slope_min
+
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    quote_volume = np.asarray(quote_volume, dtype=float)
+    cfg = factor_params or load_factor_params()
+
+    result: Dict[str, np.ndarray] = {}
+    result.update(trend_series(high, low, close, window, cfg["T"]))
+    result.update(momentum_series(high, low, close, window, cfg["M"]))
+    if taker_buy_quote is not None:
+        result.update(cvd_flow_series(
+            close, quote_volume, np.asarray(taker_buy_quote, dtype=float), window, cfg["C"],
+            eps_slope_min=_get_eps_slope_min()
+        ))
+    result.update(volume_series(close, quote_volume, window, cfg["V"]))
+    return result
+
+
+def weighted_score_series(scores: Dict[str, np.ndarray], weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    逐bar加权分数（scorecard的向量化版本：Σ(score×weight)/Σ(weight)，只计入给定因子）
+
+    Args:
+        scores: {factor: 序列}
+        weights: 因子权重（None=factors_unified.json基础权重）
+
+    Returns:
+        -100~+100加权分数序列
+    """
+    if weights is None:
+        weights = get_factor_config().get_weights_dict()
+    total = None
+    weight_sum = 0.0
+    for factor, series in scores.items():
+        weight = weights.get(factor, 0.0)
+        if not weight:
+            continue
+        contribution = np.asarray(series, dtype=float) * weight
+        total = contribution if total is None else total + contribution
+        weight_sum += weight
+    if total is None or weight_sum == 0:
+        length = len(next(iter(scores.values()))) if scores else 0
+        return np.zeros(length)
+    return total / weight_sum
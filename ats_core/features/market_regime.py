@@ -16,8 +16,7 @@ BTC/ETH市场大盘趋势过滤器（方案B - 独立过滤器）
 from typing import Dict, Any, Tuple, Union
 import math
 
-# 缓存市场趋势结果（避免重复计算）
-_market_cache = {}
+from ats_core.sources.request_cache import get_request_cache, kline_tag
 
 
 def _get_kline_field(kline: Union[dict, list], field: str) -> float:
@@ -131,7 +130,8 @@ def calculate_market_regime(cache_key: str = None) -> Tuple[int, Dict[str, Any]]
     计算BTC/ETH市场大盘趋势
 
     Args:
-        cache_key: 缓存键（通常是时间戳），用于避免同一分钟内重复计算
+        cache_key: 已弃用（保留兼容）。结果由请求缓存按1h K线收盘边界缓存，
+                   BTC/ETH 1h K线收盘事件会同时失效该结果
 
     Returns:
         (market_regime, meta):
@@ -142,64 +142,66 @@ def calculate_market_regime(cache_key: str = None) -> Tuple[int, Dict[str, Any]]
             "regime_desc": 市场状态描述
           }
     """
-    # 检查缓存
-    if cache_key and cache_key in _market_cache:
-        return _market_cache[cache_key]
-
+    cache = get_request_cache()
     try:
-        from ats_core.sources.binance import get_klines
+        market_regime, meta = cache.get_or_load(
+            ("market_regime",),
+            _compute_market_regime,
+            cache.bar_aligned_ttl("1h"),
+            tags=(kline_tag("BTCUSDT", "1h"), kline_tag("ETHUSDT", "1h")),
+        )
+        return market_regime, dict(meta)
+    except Exception as e:
+        # 数据获取失败时返回中性（不缓存）
+        return 0, {
+            "btc_trend": 0,
+            "eth_trend": 0,
+            "regime_desc": "数据不足",
+            "market_regime": 0,
+            "error": str(e)
+        }
 
-        # 获取BTC和ETH的K线数据
-        btc_k1 = get_klines("BTCUSDT", "1h", 100)
-        eth_k1 = get_klines("ETHUSDT", "1h", 100)
 
-        # 提取收盘价
-        # P0 Bugfix: 使用兼容函数支持字典格式K线
-        btc_closes = [float(_get_kline_field(k, "close")) for k in btc_k1]
-        eth_closes = [float(_get_kline_field(k, "close")) for k in eth_k1]
+def _compute_market_regime() -> Tuple[int, Dict[str, Any]]:
+    """拉取BTC/ETH 1h K线并计算市场趋势（异常向上抛出，由调用方降级）"""
+    from ats_core.sources.binance import get_klines
 
-        # 计算趋势分数（使用1小时级别算法）
-        btc_trend = _calc_single_trend(btc_closes)
-        eth_trend = _calc_single_trend(eth_closes)
+    # 获取BTC和ETH的K线数据
+    btc_k1 = get_klines("BTCUSDT", "1h", 100)
+    eth_k1 = get_klines("ETHUSDT", "1h", 100)
 
-        # 加权计算市场趋势（BTC 70%, ETH 30%）
-        market_regime = int(btc_trend * 0.7 + eth_trend * 0.3)
+    # 提取收盘价
+    # P0 Bugfix: 使用兼容函数支持字典格式K线
+    btc_closes = [float(_get_kline_field(k, "close")) for k in btc_k1]
+    eth_closes = [float(_get_kline_field(k, "close")) for k in eth_k1]
 
-        # 状态描述
-        if market_regime >= 60:
-            regime_desc = "强势牛市"
-        elif market_regime >= 30:
-            regime_desc = "温和牛市"
-        elif market_regime >= -30:
-            regime_desc = "震荡市场"
-        elif market_regime >= -60:
-            regime_desc = "温和熊市"
-        else:
-            regime_desc = "强势熊市"
+    # 计算趋势分数（使用1小时级别算法）
+    btc_trend = _calc_single_trend(btc_closes)
+    eth_trend = _calc_single_trend(eth_closes)
 
-        meta = {
-            "btc_trend": btc_trend,
-            "eth_trend": eth_trend,
-            "regime_desc": regime_desc,
-            "market_regime": market_regime
-        }
+    # 加权计算市场趋势（BTC 70%, ETH 30%）
+    market_regime = int(btc_trend * 0.7 + eth_trend * 0.3)
 
-        # 缓存结果
-        result = (market_regime, meta)
-        if cache_key:
-            _market_cache[cache_key] = result
+    # 状态描述
+    if market_regime >= 60:
+        regime_desc = "强势牛市"
+    elif market_regime >= 30:
+        regime_desc = "温和牛市"
+    elif market_regime >= -30:
+        regime_desc = "震荡市场"
+    elif market_regime >= -60:
+        regime_desc = "温和熊市"
+    else:
+        regime_desc = "强势熊市"
 
-        return result
+    meta = {
+        "btc_trend": btc_trend,
+        "eth_trend": eth_trend,
+        "regime_desc": regime_desc,
+        "market_regime": market_regime
+    }
 
-    except Exception as e:
-        # 数据获取失败时返回中性
-        return 0, {
-            "btc_trend": 0,
-            "eth_trend": 0,
-            "regime_desc": "数据不足",
-            "market_regime": 0,
-            "error": str(e)
-        }
+    return market_regime, meta
 
 
 def _ema(seq: list, n: int) -> list:
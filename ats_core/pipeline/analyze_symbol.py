@@ -1870,8 +1870,11 @@ def analyze_symbol(symbol: str) -> Dict[str, Any]:
 
     # 获取订单簿数据（L因子）
     # 注：后续将实现价格带法（±bps聚合）替代固定档位数
+    # 本地订单簿已同步时直接使用（无REST调用），否则拉取REST快照
+    from ats_core.data.orderbook_manager import get_orderbook_manager
     try:
-        orderbook = get_orderbook_snapshot(symbol, limit=100)
+        orderbook = get_orderbook_manager().get_orderbook(symbol, limit=100) \
+            or get_orderbook_snapshot(symbol, limit=100)
     except Exception as e:
         from ats_core.logging import warn
         warn(f"获取{symbol}订单簿失败: {e}")
@@ -58,6 +58,7 @@ class OptimizedBatchScanner:
 
         # v6.6因子系统：预加载的市场数据缓存
         self.orderbook_cache = {}      # {symbol: orderbook_dict} - L调制器
+        self.orderbook_manager = None  # v7.4.5: 本地订单簿（启用时替代orderbook_cache）
         self.mark_price_cache = {}     # {symbol: mark_price} - B因子
         self.funding_rate_cache = {}   # {symbol: funding_rate} - B因子
         self.spot_price_cache = {}     # {symbol: spot_price} - B因子
@@ -279,8 +280,7 @@ class OptimizedBatchScanner:
         # 导入新增的批量数据获取函数
         from ats_core.sources.binance import (
             get_all_spot_prices,
-            get_all_premium_index,
-            get_orderbook_snapshot
+            get_all_premium_index
         )
 
         # 5.1 批量获取现货价格（1次API调用）
@@ -312,58 +312,23 @@ class OptimizedBatchScanner:
             self.mark_price_cache = {}
             self.funding_rate_cache = {}
 
-        # 5.3 批量获取订单簿快照（并发获取，约140次API调用）
-        log("   5.3 批量获取订单簿深度（100档，价格带法）...")
-        log("       🚀 使用并发模式，预计20-30秒")
+        # 5.3 订单簿
+        # v7.4.5: 优先使用本地订单簿（REST快照 + @depth@100ms差分同步），扫描时零REST调用；
+        #         未启用时、以及启动时未能同步的币种，预加载REST快照作为兜底
+        from ats_core.data.orderbook_manager import get_orderbook_manager
 
-        orderbook_success = 0
-        orderbook_failed = 0
-
-        # 🔧 FIX: 使用并发获取，大幅提升速度
-        async def fetch_one_orderbook(symbol: str):
-            """异步获取单个订单簿"""
-            try:
-                # 在线程池中运行同步函数，避免阻塞事件循环
-                loop = asyncio.get_event_loop()
-                # 注：使用足够深度供价格带法分析
-                orderbook = await loop.run_in_executor(
-                    None,  # 使用默认线程池
-                    lambda: get_orderbook_snapshot(symbol, limit=100)
-                )
-                return symbol, orderbook, None
-            except Exception as e:
-                return symbol, None, e
-
-        # 分批并发获取（避免速率限制）
-        batch_size = 20  # 每批20个并发请求
-        for i in range(0, len(symbols), batch_size):
-            batch = symbols[i:i+batch_size]
-
-            # 并发获取这一批的所有订单簿
-            tasks = [fetch_one_orderbook(symbol) for symbol in batch]
-            results = await asyncio.gather(*tasks)
-
-            # 处理结果
-            for symbol, orderbook, error in results:
-                if error is None and orderbook:
-                    self.orderbook_cache[symbol] = orderbook
-                    orderbook_success += 1
-                else:
-                    orderbook_failed += 1
-                    # 记录前5个失败的详细信息
-                    if orderbook_failed <= 5:
-                        warn(f"       获取{symbol}订单簿失败: {error}")
+        orderbook_manager = get_orderbook_manager()
+        rest_symbols = symbols
+        if orderbook_manager.enabled:
+            log("   5.3 启动本地订单簿（快照 + 差分深度流）...")
+            synced = await orderbook_manager.start(symbols)
+            self.orderbook_manager = orderbook_manager
+            log(f"       ✅ 已同步: {synced}/{len(symbols)}")
+            rest_symbols = [s for s in symbols if not orderbook_manager.is_synced(s)]
 
-            # 批间延迟（避免速率限制）
-            if i + batch_size < len(symbols):
-                await asyncio.sleep(0.5)  # 减少延迟，因为并发了
-
-            # 进度显示
-            progress = min(i + batch_size, len(symbols))
-            if progress % 40 == 0 or progress >= len(symbols):
-                log(f"       进度: {progress}/{len(symbols)} ({progress/len(symbols)*100:.0f}%)")
-
-        log(f"       ✅ 成功: {orderbook_success}, 失败: {orderbook_failed}")
+        if rest_symbols:
+            log(f"   5.3 批量获取订单簿深度（100档，价格带法，{len(rest_symbols)}个币种）...")
+            await self._load_rest_orderbooks(rest_symbols)
 
         # v6.6: 移除聚合成交数据获取（Q因子已废弃）
         # 原v6.5代码：5.4 批量获取聚合成交数据
@@ -383,8 +348,7 @@ class OptimizedBatchScanner:
             self.oi_cache = await batch_get_open_interest_hist(
                 symbols=symbols,
                 period='1h',
-                limit=300,
-                batch_size=20
+                limit=300
             )
             oi_elapsed = time.time() - oi_start
             oi_success = sum(1 for oi_data in self.oi_cache.values() if oi_data)
@@ -530,7 +494,8 @@ class OptimizedBatchScanner:
         min_score: int = 35,  # v6.3: 降低阈值从70到35（专家建议 #4）
         max_symbols: Optional[int] = None,
         on_signal_found: Optional[callable] = None,
-        verbose: bool = False
+        verbose: bool = False,
+        publish_reports: bool = True
     ) -> Dict:
         """
         批量扫描（超快速，约5秒）
@@ -541,6 +506,8 @@ class OptimizedBatchScanner:
             on_signal_found: 发现信号时的回调函数（实时处理信号）
                             async def callback(signal_dict) -> None
             verbose: 是否显示所有币种的详细因子评分（默认False，只显示前10个）
+            publish_reports: 是否生成统计报告并写入仓库/数据库/Telegram
+                            （默认True；基准测试传False，只测扫描本身）
 
         Returns:
             扫描结果字典
@@ -774,7 +741,7 @@ class OptimizedBatchScanner:
                 analysis_start = time.time()
 
                 # 获取v6.6因子系统所需的市场数据
-                orderbook = self.orderbook_cache.get(symbol)
+                orderbook = self._get_orderbook(symbol)
                 mark_price = self.mark_price_cache.get(symbol)
                 funding_rate = self.funding_rate_cache.get(symbol)
                 spot_price = self.spot_price_cache.get(symbol)
@@ -1041,6 +1008,22 @@ class OptimizedBatchScanner:
         log(f"   内存占用: {cache_stats['memory_estimate_mb']:.1f}MB")
         log("=" * 60)
 
+        scan_result = {
+            'results': results,
+            'total_symbols': len(symbols),
+            'signals_found': len(results),
+            'skipped': skipped,
+            'errors': errors,
+            'elapsed_seconds': round(scan_elapsed, 2),
+            'symbols_per_second': round(len(symbols) / scan_elapsed, 2),
+            'api_calls': 0,  # ✅ 0次API调用
+            'cache_stats': cache_stats
+        }
+
+        # benchmark: publish_reports=False时不生成报告
+        if not publish_reports:
+            return scan_result
+
         # v6.8: 生成统计分析报告并写入仓库
         try:
             stats = get_global_stats()
@@ -1051,9 +1034,6 @@ class OptimizedBatchScanner:
 
             # v6.8+: 写入仓库（JSON + Markdown）
             try:
-                from ats_core.analysis.report_writer import get_report_writer
-                writer = get_report_writer()
-
                 # 生成数据
                 summary_data = stats.generate_summary_data()
                 detail_data = stats.generate_detail_data()
@@ -1067,53 +1047,13 @@ class OptimizedBatchScanner:
                     'memory_mb': cache_stats.get('memory_estimate_mb', 0)
                 }
 
-                # 写入文件
-                files = writer.write_scan_report(
-                    summary=summary_data,
-                    detail=detail_data,
-                    text_report=report
-                )
-
-                log("✅ 报告已写入仓库:")
-                for key, path in files.items():
-                    log(f"   - {key}: {path}")
-
-                # v7.2+: 写入数据库（历史统计）
-                try:
-                    from ats_core.data.analysis_db import get_analysis_db
-                    analysis_db = get_analysis_db()
-                    record_id = analysis_db.write_scan_statistics(summary_data)
-                    log(f"✅ 扫描统计已写入数据库（记录ID: {record_id}）")
-                except Exception as e:
-                    warn(f"⚠️  写入数据库失败: {e}")
-
-                # v6.9+: 自动提交并推送到Git仓库（静默模式）
-                import subprocess
-                from pathlib import Path
-                auto_commit_script = Path(__file__).parent.parent.parent / 'scripts' / 'auto_commit_reports.sh'
-
-                if auto_commit_script.exists():
-                    try:
-                        result = subprocess.run(
-                            ['bash', str(auto_commit_script)],
-                            capture_output=True,
-                            text=True,
-                            timeout=60
-                        )
-                        if result.returncode == 0:
-                            # 只显示脚本输出的成功消息（✅开头的行）
-                            for line in result.stdout.strip().split('\n'):
-                                if line.startswith('✅'):
-                                    log(line)
-                                    break
-                        else:
-                            warn(f"⚠️  自动提交失败: {result.stderr}")
-                    except subprocess.TimeoutExpired:
-                        warn("⚠️  自动提交超时（60秒）")
-                    except Exception as e:
-                        warn(f"⚠️  自动提交异常: {e}")
-                else:
-                    log(f"⚠️  自动提交脚本不存在: {auto_commit_script}")
+                # v7.4.3: 报告落盘/数据库/git提交交给写后队列（扫描循环只入队，不等待磁盘和git；
+                # submit_async在队列满时转到线程池等待，不阻塞事件循环）
+                persistence = get_scan_persistence()
+                await persistence.submit_async("scan_report", (summary_data, detail_data, report))
+                await persistence.submit_async("scan_statistics", summary_data)
+                await persistence.submit_async("report_commit", None)
+                log("✅ 报告已加入写后队列（reports/latest/ + 数据库 + git提交在后台执行）")
 
             except Exception as e:
                 warn(f"⚠️  写入仓库失败: {e}")
@@ -1197,17 +1137,7 @@ class OptimizedBatchScanner:
         except Exception as e:
             warn(f"⚠️  生成统计报告失败: {e}")
 
-        return {
-            'results': results,
-            'total_symbols': len(symbols),
-            'signals_found': len(results),
-            'skipped': skipped,
-            'errors': errors,
-            'elapsed_seconds': round(scan_elapsed, 2),
-            'symbols_per_second': round(len(symbols) / scan_elapsed, 2),
-            'api_calls': 0,  # ✅ 0次API调用
-            'cache_stats': cache_stats
-        }
+        return scan_result
 
     async def refresh_symbols_list(self) -> bool:
         """
@@ -1241,8 +1171,22 @@ class OptimizedBatchScanner:
             )
 
             if success:
+                removed = set(self.symbols_active) - set(new_symbols)
                 self.symbols_active = new_symbols
                 self.symbols = new_symbols  # 向后兼容
+                # 移除的币种：退订差分深度流，删除REST兜底快照
+                for symbol in removed:
+                    self.orderbook_cache.pop(symbol, None)
+                if self.orderbook_manager is not None:
+                    if removed:
+                        await self.orderbook_manager.unsubscribe(removed)
+                    await self.orderbook_manager.start(new_symbols)  # 仅订阅新增币种
+                    unsynced = [
+                        s for s in new_symbols
+                        if not self.orderbook_manager.is_synced(s) and s not in self.orderbook_cache
+                    ]
+                    if unsynced:
+                        await self._load_rest_orderbooks(unsynced)
                 self.last_refresh_time = now
                 self.consecutive_failures = 0
             else:
@@ -1255,14 +1199,155 @@ class OptimizedBatchScanner:
             self.consecutive_failures += 1
             return False
 
+    async def _load_rest_orderbooks(self, symbols: List[str]) -> None:
+        """
+        批量预加载REST订单簿快照到orderbook_cache（100档，供价格带法分析）
+
+        v7.4.4: 固定分批（20并发 + 批间0.5秒）改为AIMD自适应并发（见ats_core.sources.fanout）
+        v7.4.5: 本地订单簿启用时只为未同步的币种加载（兜底）
+        """
+        from ats_core.sources.binance import get_orderbook_snapshot
+        from ats_core.sources.fanout import AdaptiveFanout
+
+        orderbook_success = 0
+        orderbook_failed = 0
+
+        def on_orderbook(symbol, orderbook, error):
+            nonlocal orderbook_success, orderbook_failed
+            if error is None and orderbook:
+                self.orderbook_cache[symbol] = orderbook
+                orderbook_success += 1
+            else:
+                orderbook_failed += 1
+                # 记录前5个失败的详细信息
+                if orderbook_failed <= 5:
+                    warn(f"       获取{symbol}订单簿失败: {error}")
+
+            # 进度显示
+            progress = orderbook_success + orderbook_failed
+            if progress % 40 == 0 or progress >= len(symbols):
+                log(f"       进度: {progress}/{len(symbols)} ({progress/len(symbols)*100:.0f}%)")
+
+        orderbook_report = await AdaptiveFanout("orderbook").run(
+            symbols, lambda symbol: get_orderbook_snapshot(symbol, limit=100), on_result=on_orderbook
+        )
+
+        log(f"       ✅ 成功: {orderbook_success}, 失败: {orderbook_failed}, "
+            f"吞吐: {orderbook_report.stats['throughput_per_sec']}/秒, "
+            f"并发: {orderbook_report.stats['final_concurrency']}")
+
+    def _get_orderbook(self, symbol: str):
+        """
+        L调制器订单簿：本地订单簿（一致的前100档）优先；
+        未同步或连接不健康时回退到orderbook_cache中的REST快照
+        （未启用本地订单簿、启动/刷新时未能同步的币种已预加载；
+        启动后才失步的币种使用启动时加载的快照，若有）
+
+        v7.4.5: 扫描路径不发起REST请求
+        """
+        if self.orderbook_manager is not None:
+            orderbook = self.orderbook_manager.get_orderbook(symbol, limit=100)
+            if orderbook is not None:
+                return orderbook
+        return self.orderbook_cache.get(symbol)
+
     async def close(self):
-        """关闭扫描器"""
+        """关闭扫描器（等待写后队列排空）"""
+        if self.orderbook_manager is not None:
+            await self.orderbook_manager.stop()
+
         if self.client:
             await self.client.close()
 
+        if _scan_persistence is not None:
+            drained = await asyncio.get_running_loop().run_in_executor(None, _scan_persistence.flush)
+            if not drained:
+                warn("⚠️  写后队列未能排空")
+
         log("✅ 优化批量扫描器已关闭")
 
 
+# ============ 写后持久化（v7.4.3） ============
+
+_scan_persistence = None
+
+
+def _write_scan_report(item) -> None:
+    """写后队列处理：扫描报告写入仓库（JSON + Markdown）"""
+    from ats_core.analysis.report_writer import get_report_writer
+
+    summary_data, detail_data, report = item
+    files = get_report_writer().write_scan_report(
+        summary=summary_data,
+        detail=detail_data,
+        text_report=report
+    )
+
+    log("✅ 报告已写入仓库:")
+    for key, path in files.items():
+        log(f"   - {key}: {path}")
+
+
+def _write_scan_statistics(summary_data) -> None:
+    """写后队列处理：扫描统计写入数据库（历史统计）"""
+    from ats_core.data.analysis_db import get_analysis_db
+
+    record_id = get_analysis_db().write_scan_statistics(summary_data)
+    log(f"✅ 扫描统计已写入数据库（记录ID: {record_id}）")
+
+
+def _commit_reports(_item) -> None:
+    """写后队列处理：自动提交并推送报告到Git仓库（静默模式，积压时只执行一次）"""
+    import subprocess
+    from pathlib import Path
+    auto_commit_script = Path(__file__).parent.parent.parent / 'scripts' / 'auto_commit_reports.sh'
+
+    if not auto_commit_script.exists():
+        log(f"⚠️  自动提交脚本不存在: {auto_commit_script}")
+        return
+
+    try:
+        result = subprocess.run(
+            ['bash', str(auto_commit_script)],
+            capture_output=True,
+            text=True,
+            timeout=60
+        )
+        if result.returncode == 0:
+            # 只显示脚本输出的成功消息（✅开头的行）
+            for line in result.stdout.strip().split('\n'):
+                if line.startswith('✅'):
+                    log(line)
+                    break
+        else:
+            warn(f"⚠️  自动提交失败: {result.stderr}")
+    except subprocess.TimeoutExpired:
+        warn("⚠️  自动提交超时（60秒）")
+    except Exception as e:
+        warn(f"⚠️  自动提交异常: {e}")
+
+
+def get_scan_persistence():
+    """
+    获取扫描结果写后队列（首次调用时注册处理函数）
+
+    记录类型:
+    - scan_report: (summary, detail, text_report) → reports/latest/
+    - scan_statistics: summary → AnalysisDB.scan_statistics
+    - report_commit: None → scripts/auto_commit_reports.sh（同批次合并为一次）
+    """
+    global _scan_persistence
+    if _scan_persistence is None:
+        from ats_core.data.write_behind import get_write_behind_queue
+
+        queue = get_write_behind_queue()
+        queue.register("scan_report", _write_scan_report)
+        queue.register("scan_statistics", _write_scan_statistics)
+        queue.register("report_commit", _commit_reports, coalesce_latest=True)
+        _scan_persistence = queue
+    return _scan_persistence
+
+
 # ============ 便捷函数 ============
 
 async def run_optimized_scan(
@@ -1331,86 +1416,63 @@ async def run_optimized_scan(
 
 async def benchmark_comparison(test_symbols: int = 20):
     """
-    性能对比测试（当前REST vs WebSocket缓存）
+    性能对比测试（REST预热 vs 缓存扫描，离线合成数据）
+
+    v1.1: 改用ats_core.benchmark合成数据集 + 本地币安替身服务，
+          不再依赖已移除的pool_manager模块和实盘API，结果可复现
 
     Args:
         test_symbols: 测试币种数量
 
     对比内容:
-    1. 当前REST方案（每次获取K线）
-    2. WebSocket缓存方案（从缓存读取）
+    1. REST方案：每轮经API拉取K线（cache_warmup基准）+ 分析
+    2. WebSocket缓存方案：K线已在缓存中，仅扫描分析（scan基准）
+
+    完整基准测试见 scripts/benchmark_suite.py
     """
+    from ats_core.benchmark import BenchmarkSuite
+
     log("\n" + "=" * 60)
-    log("📊 性能对比测试")
+    log("📊 性能对比测试（合成数据 + 本地替身服务）")
     log("=" * 60)
     log(f"   测试币种数: {test_symbols}")
     log("=" * 60)
 
-    # 1. 测试WebSocket缓存方案
-    log("\n1️⃣  测试WebSocket缓存方案...")
-    ws_start = time.time()
-
-    scanner = OptimizedBatchScanner()
-    await scanner.initialize()
-    ws_results = await scanner.scan(max_symbols=test_symbols)
-
-    ws_elapsed = time.time() - ws_start
-    await scanner.close()
-
-    # 2. 测试当前REST方案（模拟）
-    log("\n2️⃣  测试当前REST方案（模拟）...")
-    from ats_core.pipeline.analyze_symbol import analyze_symbol
-    from ats_core.pools.pool_manager import get_pool_manager
-
-    rest_start = time.time()
-
-    manager = get_pool_manager(
-        elite_cache_hours=24,
-        overlay_cache_hours=1,
-        verbose=False
+    suite = BenchmarkSuite({
+        "universe": {"n_symbols": max(test_symbols, 2), "history_days": 30},
+        "scan": {"max_symbols": test_symbols},
+        "cache_warmup": {"max_symbols": test_symbols},
+    })
+    # 基准内部使用asyncio.run，在线程池中执行
+    report = await asyncio.get_running_loop().run_in_executor(
+        None, suite.run, ["cache_warmup", "scan"]
     )
-    symbols, _ = manager.get_merged_universe()
-    symbols = symbols[:test_symbols]
-
-    rest_results = []
-    for symbol in symbols:
-        try:
-            result = analyze_symbol(symbol)
-            prime_strength = result.get('publish', {}).get('prime_strength', 0)
-            if prime_strength >= 70:
-                rest_results.append(result)
-        except Exception:
-            pass
+    if report.errors:
+        error(f"❌ 性能对比测试失败: {report.errors}")
+        return
 
-    rest_elapsed = time.time() - rest_start
+    warmup = report.results["cache_warmup"]
+    scan = report.results["scan"]
+    rest_elapsed = warmup.total_seconds + scan.total_seconds
+    scan_only_time = scan.total_seconds
 
-    # 3. 对比结果
     log("\n" + "=" * 60)
     log("📊 性能对比结果")
     log("=" * 60)
 
-    log(f"\n当前REST方案:")
+    log(f"\nREST方案（拉取K线 + 分析）:")
     log(f"   耗时: {rest_elapsed:.1f}秒")
     log(f"   速度: {test_symbols/rest_elapsed:.1f} 币种/秒")
-    log(f"   信号数: {len(rest_results)}")
-
-    log(f"\nWebSocket缓存方案:")
-    log(f"   耗时: {ws_elapsed:.1f}秒（包含预热）")
-    log(f"   速度: {test_symbols/ws_elapsed:.1f} 币种/秒")
-    log(f"   信号数: {ws_results['signals_found']}")
-
-    # 计算扫描部分的速度（排除预热）
-    scan_only_time = ws_results['elapsed_seconds']
+    log(f"   API调用: {warmup.extra['api_requests'] + scan.extra['api_requests']}次")
 
     log(f"\nWebSocket缓存方案（仅扫描部分）:")
     log(f"   耗时: {scan_only_time:.1f}秒")
-    log(f"   速度: {test_symbols/scan_only_time:.1f} 币种/秒 🚀")
-
-    speedup = rest_elapsed / scan_only_time
+    log(f"   速度: {scan.throughput:.1f} 币种/秒 🚀")
+    log(f"   API调用: {scan.extra['api_requests']}次")
+    log(f"   信号数: {scan.extra['signals_found']}")
 
     log(f"\n⚡ 性能提升:")
-    log(f"   速度提升: {speedup:.1f}x")
-    log(f"   API调用减少: 100% (400次 → 0次)")
+    log(f"   速度提升: {rest_elapsed / scan_only_time:.1f}x")
 
     log("=" * 60)
 
@@ -1419,5 +1481,5 @@ if __name__ == "__main__":
     # 运行优化扫描（扫描全部币种）
     asyncio.run(run_optimized_scan(min_score=65))
 
-    # 性能对比测试（需要pool_manager模块）
+    # 性能对比测试（离线合成数据）
     # asyncio.run(benchmark_comparison(test_symbols=20))
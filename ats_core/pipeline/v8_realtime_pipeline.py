@@ -86,6 +86,7 @@ class V8RealtimePipeline:
         storage_cfg = self.config.get("storage_layer", {})
         self.storage_enabled = storage_cfg.get("enabled", True)
         self.storage_path = storage_cfg.get("storage_path", "data/v8_storage")
+        self.storage_cfg = storage_cfg
 
         # 初始化组件
         self._init_components()
@@ -261,7 +262,7 @@ class V8RealtimePipeline:
             # 延迟导入避免循环依赖
             if self.storage is None:
                 from cs_ext.storage.cryptostore_adapter import CryptostoreAdapter
-                self.storage = CryptostoreAdapter(base_path=self.storage_path)
+                self.storage = CryptostoreAdapter(base_path=self.storage_path, config=self.storage_cfg)
 
             self.storage.store_signal(
                 ts=signal.timestamp,
@@ -417,7 +418,7 @@ class V8RealtimePipeline:
         try:
             if self.storage is None:
                 from cs_ext.storage.cryptostore_adapter import CryptostoreAdapter
-                self.storage = CryptostoreAdapter(base_path=self.storage_path)
+                self.storage = CryptostoreAdapter(base_path=self.storage_path, config=self.storage_cfg)
 
             self.storage.store_trade(
                 ts=trade.timestamp,
@@ -432,6 +433,9 @@ class V8RealtimePipeline:
     def stop(self) -> None:
         """停止V8管道"""
         self._running = False
+        if self.storage is not None:
+            self.storage.close()
+            logger.info(f"V8存储已关闭: {self.storage.get_stats()}")
         logger.info("V8管道已停止")
 
     def get_status(self) -> Dict[str, Any]:
@@ -20,6 +20,7 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+import os
 import time
 from typing import Any, Callable, Dict, List, Optional
 from collections import deque
@@ -50,6 +51,10 @@ class DataFeed:
         self.reconnect_delay = config.get("reconnect_delay", 5)
         self.buffer_size = config.get("buffer_size", 1000)
         self.kline_lookback_bars = config.get("kline_lookback_bars", 300)
+        # 本地替身服务地址（source=binance_standin时使用，未配置时读取ATS_BINANCE_STANDIN）
+        self.standin_url = (
+            config.get("standin_url") or os.environ.get("ATS_BINANCE_STANDIN", "http://127.0.0.1:8765")
+        ).rstrip("/")
 
         # 符号列表（转小写用于WebSocket）
         self.symbols = [s.lower() for s in symbols]
@@ -169,6 +174,8 @@ class DataFeed:
 
         if self.source == "binance_mainnet":
             ws_url = f"wss://stream.binance.com:9443/stream?streams={stream_name}"
+        elif self.source == "binance_standin":
+            ws_url = f"{self.standin_url.replace('http', 'ws', 1)}/stream?streams={stream_name}"
         else:
             # 默认使用mainnet
             ws_url = f"wss://stream.binance.com:9443/stream?streams={stream_name}"
@@ -243,6 +250,8 @@ class DataFeed:
 
         # K线完成时更新缓冲区
         if kline_data["is_closed"]:
+            # 注：这里是现货K线流，不失效请求缓存（缓存的是合约fapi K线，
+            # 由合约K线流RealtimeKlineCache在收盘时失效）
             buffer = self.kline_buffers.get(symbol)
             if buffer is not None:
                 # 避免重复添加
@@ -271,7 +280,10 @@ class DataFeed:
         """
         import aiohttp
 
-        base_url = "https://api.binance.com/api/v3/klines"
+        if self.source == "binance_standin":
+            base_url = f"{self.standin_url}/api/v3/klines"
+        else:
+            base_url = "https://api.binance.com/api/v3/klines"
 
         for symbol in self.symbols:
             symbol_upper = symbol.upper()
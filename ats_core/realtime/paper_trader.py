@@ -85,6 +85,7 @@ class PaperTrader:
         self.state_manager = StateManager(
             config.get("reporting", {})
         )
+        self.state_manager.attach(self.broker)
 
         # 设置回调
         self.data_feed.set_callbacks(
@@ -119,10 +120,8 @@ class PaperTrader:
         logger.info("🚀 Paper Trading启动")
         logger.info("=" * 60)
 
-        # 尝试恢复状态
-        saved_state = self.state_manager.load_state()
-        if saved_state:
-            self.broker.load_state(saved_state)
+        # 尝试恢复状态（快照 + 状态日志重放）
+        if self.state_manager.restore(self.broker):
             logger.info("已恢复上次状态")
 
         # 预加载历史数据
@@ -157,8 +156,8 @@ class PaperTrader:
         # 停止数据流
         await self.data_feed.stop()
 
-        # 保存最终状态
-        self.state_manager.save_state(self.broker.save_state(), force=True)
+        # 保存最终状态（写快照并截断状态日志）
+        self.state_manager.checkpoint(self.broker, force=True)
 
         # 打印最终报告
         self._print_final_report()
@@ -175,8 +174,8 @@ class PaperTrader:
         self.broker.on_price_update(symbol, price, timestamp)
         self.broker.on_time(timestamp)
 
-        # 定期保存状态
-        self.state_manager.save_state(self.broker.save_state())
+        # 定期保存状态（订单/成交/平仓已实时写入状态日志）
+        self.state_manager.checkpoint(self.broker)
 
         # 定期打印状态
         if self.state_manager.should_log_status():
@@ -9,13 +9,22 @@ StateManager - 状态持久化和恢复
 
 状态文件格式：
 {
-    "version": "1.0",
+    "version": "1.1",
     "timestamp": 1234567890000,
-    "broker_state": {...},
-    "data_feed_state": {...}
+    "journal_seq": 123,
+    "broker_state": {...}
 }
 
-Version: v1.0.0
+v1.1 快照 + 状态日志（journal）:
+- attach(broker)后，Broker的订单/成交/平仓/SL-TP修改事件逐条追加到 <state>_journal.jsonl
+- checkpoint()按save_state_interval追加轻量marks事件（最新价格、开仓持仓MFE/MAE），
+  按snapshot_interval或journal事件数超过snapshot_max_journal_events写紧凑快照并截断journal
+- restore(broker)加载快照后只重放journal_seq之后的事件
+- 保存开销与变化量成正比，而非与全部订单/持仓历史成正比
+- 交易日志 <state>_trades.jsonl 附带偏移索引 <state>_trades.idx（每行8字节小端偏移），
+  get_trade_history(limit)从文件尾部定位最近N条，无需解析全部日志
+
+Version: v1.1.0
 Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
 """
 
@@ -24,6 +33,7 @@ from __future__ import annotations
 import json
 import logging
 import os
+import struct
 import time
 from datetime import datetime
 from pathlib import Path
@@ -56,12 +66,24 @@ class StateManager:
         if state_dir:
             os.makedirs(state_dir, exist_ok=True)
 
+        # v1.1: 快照与状态日志配置
+        self.snapshot_interval = config.get("snapshot_interval", 3600)  # 秒
+        self.snapshot_max_journal_events = config.get("snapshot_max_journal_events", 10000)
+        self.journal_fsync = config.get("journal_fsync", False)
+
         # 交易日志文件
         self.trade_log_file = self.state_file.replace(".json", "_trades.jsonl")
+        self.trade_index_file = self.state_file.replace(".json", "_trades.idx")
+        self.journal_file = self.state_file.replace(".json", "_journal.jsonl")
 
         # 状态
         self._last_save_time = 0
         self._last_log_time = 0
+        self._last_snapshot_time = time.time()
+        self._journal_seq = self._read_last_journal_seq()
+        self._journal_events = 0
+        self._summary: Optional[Dict[str, Any]] = None
+        self._trade_index_checked = False
 
         logger.info(
             f"StateManager初始化: "
@@ -88,16 +110,17 @@ class StateManager:
 
         try:
             state = {
-                "version": "1.0",
+                "version": "1.1",
                 "timestamp": int(current_time * 1000),
                 "saved_at": datetime.now().isoformat(),
+                "journal_seq": self._journal_seq,
                 "broker_state": broker_state,
             }
 
-            # 写入临时文件再重命名（原子操作）
+            # 写入临时文件再重命名（原子操作，紧凑格式）
             temp_file = self.state_file + ".tmp"
             with open(temp_file, "w", encoding="utf-8") as f:
-                json.dump(state, f, indent=2, ensure_ascii=False)
+                json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
 
             os.replace(temp_file, self.state_file)
 
@@ -113,9 +136,15 @@ class StateManager:
         """
         加载状态
 
+        只返回快照中的broker_state（不含journal中之后的事件，完整恢复请用restore()）
+
         Returns:
             状态数据或None
         """
+        state = self._read_snapshot()
+        return state.get("broker_state") if state else None
+
+    def _read_snapshot(self) -> Optional[Dict[str, Any]]:
         if not os.path.exists(self.state_file):
             logger.info(f"状态文件不存在: {self.state_file}")
             return None
@@ -133,12 +162,171 @@ class StateManager:
                 f"saved_at={saved_at}"
             )
 
-            return state.get("broker_state")
+            return state
 
         except Exception as e:
             logger.error(f"状态加载失败: {e}")
             return None
 
+    # ==================== 快照 + 状态日志（v1.1新增） ====================
+
+    def attach(self, broker) -> None:
+        """把Broker的状态事件接入journal（平仓事件同时写入交易日志）"""
+        broker.set_journal(self._on_broker_event)
+
+    def restore(self, broker) -> bool:
+        """
+        恢复Broker状态：加载快照，再重放journal中快照之后的事件
+
+        重放期间暂停journal回调，完成后重新attach。
+
+        Returns:
+            是否恢复了任何状态
+        """
+        state = self._read_snapshot()
+        snapshot_seq = state.get("journal_seq", 0) if state else 0
+
+        broker.set_journal(None)
+        try:
+            if state and state.get("broker_state"):
+                broker.load_state(state["broker_state"])
+            replayed = 0
+            for event in self._iter_journal():
+                if event["seq"] <= snapshot_seq:
+                    continue
+                broker.apply_journal_event(event["type"], event["data"])
+                replayed += 1
+            self._journal_events = replayed
+        finally:
+            self.attach(broker)
+
+        if replayed:
+            logger.info(f"状态日志重放: {replayed}条事件（快照seq={snapshot_seq}）")
+        return bool(state) or replayed > 0
+
+    def checkpoint(self, broker, force: bool = False) -> bool:
+        """
+        定期持久化（替代每个tick调用save_state(broker.save_state())）
+
+        - 每save_interval：追加marks事件（与开仓持仓数成正比）
+        - 每snapshot_interval或journal超过snapshot_max_journal_events条：写快照并截断journal
+        - force=True：立即写快照
+
+        Returns:
+            是否写入了任何内容
+        """
+        current_time = time.time()
+        snapshot_due = (
+            force
+            or current_time - self._last_snapshot_time >= self.snapshot_interval
+            or self._journal_events >= self.snapshot_max_journal_events
+        )
+        if snapshot_due:
+            if not self.save_state(broker.save_state(), force=True):
+                return False
+            self._last_snapshot_time = current_time
+            self._truncate_journal()
+            return True
+
+        if (current_time - self._last_save_time) < self.save_interval:
+            return False
+        self.append_event("marks", broker.mark_state())
+        self._last_save_time = current_time
+        return True
+
+    def append_event(self, event_type: str, data: Dict[str, Any]) -> None:
+        """追加一条状态日志事件"""
+        self._journal_seq += 1
+        line = json.dumps(
+            {"seq": self._journal_seq, "type": event_type, "ts": int(time.time() * 1000), "data": data},
+            ensure_ascii=False, separators=(",", ":"),
+        )
+        with open(self.journal_file, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            if self.journal_fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._journal_events += 1
+
+    def _on_broker_event(self, event_type: str, data: Dict[str, Any]) -> None:
+        self.append_event(event_type, data)
+        if event_type == "close":
+            position = data["position"]
+            holding = None
+            if position.get("close_time") is not None:
+                holding = (position["close_time"] - position["open_time"]) / 60000
+            self.log_position_close(
+                position_id=position["id"],
+                symbol=position["symbol"],
+                direction=position["direction"],
+                entry_price=position["entry_price"],
+                exit_price=position["exit_price"],
+                quantity=position["quantity"],
+                realized_pnl=position["realized_pnl"],
+                realized_pnl_pct=position["realized_pnl_pct"],
+                exit_reason=position["exit_reason"],
+                holding_minutes=holding,
+            )
+
+    def _iter_journal(self):
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # 写入中断的半行
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"状态日志损坏行已跳过: {self.journal_file}")
+
+    def _read_last_journal_seq(self) -> int:
+        """journal最后一条的seq（journal为空时取快照的journal_seq）"""
+        last = self._tail_lines(self.journal_file, 1)
+        if last:
+            try:
+                return json.loads(last[-1])["seq"]
+            except (json.JSONDecodeError, KeyError):
+                pass
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, "r", encoding="utf-8") as f:
+                    return json.load(f).get("journal_seq", 0)
+            except Exception:
+                pass
+        return 0
+
+    def _truncate_journal(self) -> None:
+        """快照已包含全部事件：清空journal（seq继续递增）"""
+        try:
+            with open(self.journal_file, "w", encoding="utf-8"):
+                pass
+            self._journal_events = 0
+        except Exception as e:
+            logger.error(f"状态日志截断失败: {e}")
+
+    @staticmethod
+    def _tail_lines(path: str, n: int, block_size: int = 8192) -> List[str]:
+        """从文件尾部读取最后n行完整行"""
+        if n <= 0 or not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            pos = end
+            data = b""
+            while pos > 0 and data.count(b"\n") <= n:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        lines = data.split(b"\n")
+        if lines and lines[-1] == b"":
+            lines.pop()
+        else:
+            lines = lines[:-1]  # 末尾半行
+        return [line.decode("utf-8") for line in lines[-n:] if line.strip()]
+
     def log_trade(self, trade_data: Dict[str, Any]) -> None:
         """
         记录交易日志（追加模式）
@@ -148,9 +336,15 @@ class StateManager:
         """
         try:
             trade_data["logged_at"] = datetime.now().isoformat()
+            line = (json.dumps(trade_data, ensure_ascii=False) + "\n").encode("utf-8")
 
-            with open(self.trade_log_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(trade_data, ensure_ascii=False) + "\n")
+            self._ensure_trade_index()
+            with open(self.trade_log_file, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(line)
+            with open(self.trade_index_file, "ab") as f:
+                f.write(struct.pack("<Q", offset))
+            self._update_summary(trade_data)
 
             logger.debug(f"交易日志记录: {trade_data.get('id', 'unknown')}")
 
@@ -247,6 +441,8 @@ class StateManager:
         """
         获取交易历史
 
+        v1.1：有limit时通过偏移索引从文件尾部定位，只解析最近limit条
+
         Args:
             limit: 返回数量限制
 
@@ -258,7 +454,17 @@ class StateManager:
 
         trades = []
         try:
+            start = 0
+            if limit:
+                self._ensure_trade_index()
+                count = os.path.getsize(self.trade_index_file) // 8
+                if count > limit:
+                    with open(self.trade_index_file, "rb") as f:
+                        f.seek((count - limit) * 8)
+                        start = struct.unpack("<Q", f.read(8))[0]
+
             with open(self.trade_log_file, "r", encoding="utf-8") as f:
+                f.seek(start)
                 for line in f:
                     if line.strip():
                         trades.append(json.loads(line))
@@ -272,6 +478,36 @@ class StateManager:
             logger.error(f"读取交易历史失败: {e}")
             return []
 
+    def _ensure_trade_index(self) -> None:
+        """偏移索引缺失或与交易日志不一致时重建（一次全量扫描）"""
+        if self._trade_index_checked:
+            return
+        self._trade_index_checked = True
+        log_size = os.path.getsize(self.trade_log_file) if os.path.exists(self.trade_log_file) else 0
+        index_size = os.path.getsize(self.trade_index_file) if os.path.exists(self.trade_index_file) else 0
+        if index_size % 8 == 0:
+            if log_size == 0 and index_size == 0:
+                return
+            if index_size:
+                with open(self.trade_index_file, "rb") as f:
+                    f.seek(index_size - 8)
+                    last = struct.unpack("<Q", f.read(8))[0]
+                with open(self.trade_log_file, "rb") as f:
+                    f.seek(last)
+                    if last < log_size and f.tell() + len(f.readline()) == log_size:
+                        return
+
+        offsets = []
+        with open(self.trade_log_file, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    offsets.append(offset)
+                offset += len(line)
+        with open(self.trade_index_file, "wb") as f:
+            f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        logger.info(f"交易日志索引已重建: {len(offsets)}条")
+
     def should_log_status(self) -> bool:
         """
         检查是否应该记录状态日志
@@ -298,38 +534,48 @@ class StateManager:
             os.remove(self.trade_log_file)
             logger.info(f"交易日志已删除: {self.trade_log_file}")
 
+        for path in (self.trade_index_file, self.journal_file):
+            if os.path.exists(path):
+                os.remove(path)
+        self._journal_seq = 0
+        self._journal_events = 0
+        self._summary = None
+        self._trade_index_checked = False
+
     def get_summary(self) -> Dict[str, Any]:
         """
         获取状态摘要
 
+        v1.1：首次调用扫描一次交易日志，之后随log_trade增量更新
+
         Returns:
             状态摘要
         """
-        trades = self.get_trade_history()
-
-        # 统计
-        total_trades = len([t for t in trades if t.get("type") == "POSITION_CLOSE"])
-        wins = len([
-            t for t in trades
-            if t.get("type") == "POSITION_CLOSE" and t.get("realized_pnl", 0) > 0
-        ])
-        losses = len([
-            t for t in trades
-            if t.get("type") == "POSITION_CLOSE" and t.get("realized_pnl", 0) <= 0
-        ])
-
-        total_pnl = sum([
-            t.get("realized_pnl", 0)
-            for t in trades
-            if t.get("type") == "POSITION_CLOSE"
-        ])
-
+        if self._summary is None:
+            summary = {"total_trades": 0, "wins": 0, "losses": 0, "total_pnl": 0.0}
+            self._summary = summary
+            for trade in self.get_trade_history():
+                self._update_summary(trade)
+
+        summary = self._summary
+        total_trades = summary["total_trades"]
         return {
             "total_trades": total_trades,
-            "wins": wins,
-            "losses": losses,
-            "win_rate": wins / total_trades if total_trades > 0 else 0,
-            "total_pnl": total_pnl,
+            "wins": summary["wins"],
+            "losses": summary["losses"],
+            "win_rate": summary["wins"] / total_trades if total_trades > 0 else 0,
+            "total_pnl": summary["total_pnl"],
             "state_file": self.state_file,
             "trade_log_file": self.trade_log_file,
         }
+
+    def _update_summary(self, trade: Dict[str, Any]) -> None:
+        if self._summary is None or trade.get("type") != "POSITION_CLOSE":
+            return
+        pnl = trade.get("realized_pnl", 0) or 0
+        self._summary["total_trades"] += 1
+        if pnl > 0:
+            self._summary["wins"] += 1
+        else:
+            self._summary["losses"] += 1
+        self._summary["total_pnl"] += pnl
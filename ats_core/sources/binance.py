@@ -6,23 +6,31 @@ import hmac
 import json
 import os
 import time
+import urllib.error
 import urllib.parse
-import urllib.request
 from typing import Any, Dict, List, Optional, Union
 
 from ats_core.backoff import sleep_retry  # 指数退避
-from ats_core.utils.rate_limiter import binance_rate_limit  # v3.1: API限流保护
+from ats_core.sources.http_pool import get_http_pool  # v3.3: 连接池（keep-alive + gzip）
+from ats_core.sources.request_cache import get_request_cache  # v3.5: 请求合并 + 短TTL缓存
+from ats_core.sources.weight_budget import (  # v3.4: 进程级权重预算（与binance_safe/异步客户端共用）
+    budget_key,
+    default_priority_for,
+    endpoint_weight,
+    get_weight_budget,
+)
 
 # 允许通过环境变量覆盖网关，便于内网代理或将来切换
-BASE = os.environ.get("BINANCE_FAPI_BASE", "https://fapi.binance.com")
-SPOT_BASE = os.environ.get("BINANCE_SPOT_BASE", "https://api.binance.com")
+# v3.2: ATS_BINANCE_STANDIN 指向本地替身服务（ats_core.sources.standin）时，合约与现货端点都切换过去
+STANDIN_BASE = os.environ.get("ATS_BINANCE_STANDIN", "").rstrip("/")
+BASE = os.environ.get("BINANCE_FAPI_BASE", STANDIN_BASE or "https://fapi.binance.com")
+SPOT_BASE = os.environ.get("BINANCE_SPOT_BASE", STANDIN_BASE or "https://api.binance.com")
 
 # API认证（可选，用于需要签名的端点）
 API_KEY = os.environ.get("BINANCE_API_KEY", "")
 API_SECRET = os.environ.get("BINANCE_API_SECRET", "")
 
 
-@binance_rate_limit(calls_per_minute=1000)  # v3.1: API限流保护（留20%余量）
 def _get(
     path_or_url: str,
     params: Optional[Dict[str, Any]] = None,
@@ -33,7 +41,8 @@ def _get(
     """
     统一 GET 请求，带重试与简单 UA；path_or_url 可以是完整 URL 或以 / 开头的路径
 
-    v3.1: 添加API限流保护，防止触发Binance风控（1000次/分钟，留20%余量）
+    v3.3: 经共享连接池发送（复用TCP/TLS连接，gzip压缩），按端点统计耗时
+    v3.4: 限流改为进程级权重预算（按端点权重申请，按X-MBX-USED-WEIGHT-1M对账，429/418按Retry-After暂停）
     """
     if path_or_url.startswith("http"):
         url = path_or_url
@@ -42,13 +51,38 @@ def _get(
     q = urllib.parse.urlencode({k: v for k, v in (params or {}).items() if v is not None})
     full = f"{url}?{q}" if q else url
 
+    return _send(full, params, {"User-Agent": "ats-analyzer/1.0"}, timeout, retries, signed=False)
+
+
+def _send(
+    full: str,
+    params: Optional[Dict[str, Any]],
+    headers: Dict[str, str],
+    timeout: float,
+    retries: int,
+    *,
+    signed: bool,
+) -> Any:
+    """经权重预算与连接池发送GET请求（每次尝试都重新申请权重）"""
+    pool = get_http_pool()
+    budget = get_weight_budget()
+    key = budget_key(full)
+    weight = endpoint_weight(full, params)
+    priority = default_priority_for(signed=signed)
+
     last_err: Optional[Exception] = None
     for i in range(retries + 1):
+        budget.acquire(weight, priority, key)
         try:
-            req = urllib.request.Request(full, headers={"User-Agent": "ats-analyzer/1.0"})
-            with urllib.request.urlopen(req, timeout=float(timeout)) as r:
-                data = r.read()
-                return json.loads(data)
+            resp = pool.get(full, headers=headers, timeout=float(timeout))
+            budget.observe(resp.status, resp.headers, key)
+            return json.loads(resp.body)
+        except urllib.error.HTTPError as e:
+            budget.observe(e.code, e.headers, key)
+            last_err = e
+            if e.code in (429, 418):
+                continue  # 预算已按Retry-After暂停，下一次acquire会等待
+            sleep_retry(i)
         except Exception as e:
             last_err = e
             sleep_retry(i)
@@ -58,7 +92,6 @@ def _get(
     raise RuntimeError("unknown http error")
 
 
-@binance_rate_limit(calls_per_minute=1000)  # v3.1: API限流保护（留20%余量）
 def _get_signed(
     path: str,
     params: Optional[Dict[str, Any]] = None,
@@ -71,7 +104,7 @@ def _get_signed(
 
     用于需要认证的端点（如部分清算数据端点）
 
-    v3.1: 添加API限流保护，防止触发Binance风控（1000次/分钟，留20%余量）
+    v3.4: 经进程级权重预算发送（未显式设置优先级时按TRADING）
     """
     if not API_KEY or not API_SECRET:
         raise RuntimeError("需要API认证：请设置BINANCE_API_KEY和BINANCE_API_SECRET环境变量")
@@ -94,26 +127,11 @@ def _get_signed(
     # 构建完整URL
     full = f"{url}?{urllib.parse.urlencode(params)}"
 
-    last_err: Optional[Exception] = None
-    for i in range(retries + 1):
-        try:
-            req = urllib.request.Request(
-                full,
-                headers={
-                    "User-Agent": "ats-analyzer/1.0",
-                    "X-MBX-APIKEY": API_KEY
-                }
-            )
-            with urllib.request.urlopen(req, timeout=float(timeout)) as r:
-                data = r.read()
-                return json.loads(data)
-        except Exception as e:
-            last_err = e
-            sleep_retry(i)
-
-    if last_err:
-        raise last_err
-    raise RuntimeError("unknown http error")
+    headers = {
+        "User-Agent": "ats-analyzer/1.0",
+        "X-MBX-APIKEY": API_KEY
+    }
+    return _send(full, params, headers, timeout, retries, signed=True)
 
 
 # ------------------------- K线 -------------------------
@@ -130,6 +148,9 @@ def get_klines(
     每条记录字段：
       [ openTime, open, high, low, close, volume, closeTime, quoteAssetVolume,
         numberOfTrades, takerBuyBaseVolume, takerBuyQuoteVolume, ignore ]
+
+    v3.5: 最新K线（无start/end）经请求缓存：并发相同请求合并，TTL不跨越K线收盘，
+          收盘事件触发失效（见ats_core.sources.request_cache）
     """
     symbol = symbol.upper()
     limit = int(max(1, min(int(limit), 1500)))
@@ -144,6 +165,11 @@ def get_klines(
     if end_time is not None:
         params["endTime"] = int(end_time)
 
+    if start_time is None and end_time is None:
+        return get_request_cache().klines(
+            symbol, interval, limit,
+            lambda: _get("/fapi/v1/klines", params, timeout=10.0, retries=2),
+        )
     return _get("/fapi/v1/klines", params, timeout=10.0, retries=2)
 
 
@@ -364,8 +390,12 @@ def get_all_premium_index() -> List[Dict[str, Any]]:
             "nextFundingTime": 1234567890000,
             "time": 1234567890000
         }
+
+    v3.5: 经请求缓存（短TTL，并发请求合并）
     """
-    return _get("/fapi/v1/premiumIndex", None, timeout=10.0, retries=2)
+    return get_request_cache().premium_index(
+        lambda: _get("/fapi/v1/premiumIndex", None, timeout=10.0, retries=2)
+    )
 
 
 # ------------------------- 强平订单（清算数据） -------------------------
@@ -489,6 +519,11 @@ def get_agg_trades(
 def get_ticker_24h(symbol: Optional[str] = None):
     """
     symbol=None -> 返回全市场列表；否则返回单个 symbol 的字典
+
+    v3.5: 经请求缓存（短TTL，并发请求合并）
     """
     params = {"symbol": symbol.upper()} if symbol else None
-    return _get("/fapi/v1/ticker/24hr", params, timeout=8.0, retries=2)
\ No newline at end of file
+    return get_request_cache().ticker_24h(
+        params and params["symbol"],
+        lambda: _get("/fapi/v1/ticker/24hr", params, timeout=8.0, retries=2),
+    )
\ No newline at end of file
@@ -4,103 +4,36 @@
 
 核心改进：
 1. 完整的请求头（模拟浏览器）
-2. 请求频率控制（rate limiter）
-3. 权重追踪
+2. 请求频率控制（进程级权重预算，见ats_core.sources.weight_budget）
+3. 权重追踪（按X-MBX-USED-WEIGHT-1M对账）
 4. 自动重试和降级
+5. 共享连接池（keep-alive + gzip，见ats_core.sources.http_pool）
 """
 from __future__ import annotations
 
 import json
 import os
 import time
+import urllib.error
 import urllib.parse
-import urllib.request
 from typing import Any, Dict, List, Optional, Union
-from collections import deque
-import threading
-
-# 允许通过环境变量覆盖网关
-BASE = os.environ.get("BINANCE_FAPI_BASE", "https://fapi.binance.com")
-
-# ========== Rate Limiter（请求频率控制器）==========
-
-class RateLimiter:
-    """
-    令牌桶算法实现请求频率控制
-
-    币安限制：
-    - IP限制：2400请求/分钟
-    - 权重限制：6000权重/分钟
-
-    为了安全，我们设置为：
-    - 最大1200请求/分钟（50%余量）
-    - 最大3000权重/分钟（50%余量）
-    """
-
-    def __init__(self, max_requests_per_minute=1200, max_weight_per_minute=3000):
-        self.max_requests = max_requests_per_minute
-        self.max_weight = max_weight_per_minute
-
-        # 使用滑动窗口记录最近1分钟的请求
-        self.request_times = deque()
-        self.request_weights = deque()
-
-        self.lock = threading.Lock()
-
-    def wait_if_needed(self, weight: int = 1):
-        """
-        在请求前调用，如果超过限制则等待
-
-        Args:
-            weight: 本次请求的权重
-        """
-        with self.lock:
-            now = time.time()
-            cutoff = now - 60.0  # 1分钟前
-
-            # 清理1分钟前的记录
-            while self.request_times and self.request_times[0] < cutoff:
-                self.request_times.popleft()
-                self.request_weights.popleft()
-
-            # 检查是否超过限制
-            current_requests = len(self.request_times)
-            current_weight = sum(self.request_weights)
-
-            # 如果超过限制，等待到最早的请求过期
-            if current_requests >= self.max_requests or current_weight + weight > self.max_weight:
-                if self.request_times:
-                    sleep_time = 60.0 - (now - self.request_times[0]) + 0.1
-                    if sleep_time > 0:
-                        print(f"⚠️  Rate limit reached, sleeping {sleep_time:.1f}s...")
-                        time.sleep(sleep_time)
-                        # 递归重试
-                        return self.wait_if_needed(weight)
-
-            # 记录本次请求
-            self.request_times.append(now)
-            self.request_weights.append(weight)
-
-    def get_current_usage(self):
-        """获取当前使用情况"""
-        with self.lock:
-            now = time.time()
-            cutoff = now - 60.0
-
-            # 清理过期记录
-            while self.request_times and self.request_times[0] < cutoff:
-                self.request_times.popleft()
-                self.request_weights.popleft()
-
-            return {
-                'requests': len(self.request_times),
-                'weight': sum(self.request_weights),
-                'requests_limit': self.max_requests,
-                'weight_limit': self.max_weight
-            }
-
-# 全局rate limiter实例
-_rate_limiter = RateLimiter()
+from ats_core.sources.http_pool import get_http_pool
+from ats_core.sources.weight_budget import (
+    budget_key,
+    default_priority_for,
+    endpoint_weight,
+    get_weight_budget,
+)
+
+# 允许通过环境变量覆盖网关（ATS_BINANCE_STANDIN: 本地替身服务）
+BASE = os.environ.get(
+    "BINANCE_FAPI_BASE",
+    os.environ.get("ATS_BINANCE_STANDIN", "").rstrip("/") or "https://fapi.binance.com"
+)
+
+# ========== 请求权重预算 ==========
+# v3.4: 原模块内RateLimiter（滑动窗口，只统计本模块请求）改为进程级权重预算，
+# 与 sources/binance、BinanceFuturesClient 共用同一计数（见ats_core.sources.weight_budget）
 
 # ========== 改进的请求函数 ==========
 
@@ -110,7 +43,7 @@ def _get_safe(
     *,
     timeout: float = 10.0,
     retries: int = 3,
-    weight: int = 1,
+    weight: Optional[int] = None,
 ) -> Any:
     """
     安全的GET请求，带完整请求头和频率控制
@@ -120,20 +53,23 @@ def _get_safe(
         params: 查询参数
         timeout: 超时时间
         retries: 重试次数
-        weight: 请求权重（用于rate limiting）
+        weight: 请求权重（None时按端点与limit查表）
 
     Returns:
         API响应数据
     """
-    # 等待rate limiter放行
-    _rate_limiter.wait_if_needed(weight)
-
     # 构建URL
     if path_or_url.startswith("http"):
         url = path_or_url
     else:
         url = BASE + path_or_url
 
+    budget = get_weight_budget()
+    key = budget_key(url)
+    if weight is None:
+        weight = endpoint_weight(url, params)
+    priority = default_priority_for()
+
     q = urllib.parse.urlencode({k: v for k, v in (params or {}).items() if v is not None})
     full_url = f"{url}?{q}" if q else url
 
@@ -142,47 +78,35 @@ def _get_safe(
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
         "Accept": "application/json, text/plain, */*",
         "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
+        "Accept-Encoding": "gzip, deflate",
         "Connection": "keep-alive",
         "Referer": "https://www.binance.com/",
         "Origin": "https://www.binance.com",
     }
 
+    pool = get_http_pool()
     last_err: Optional[Exception] = None
 
     for attempt in range(retries + 1):
+        # 等待权重预算放行（429后按Retry-After暂停）
+        budget.acquire(weight, priority, key)
         try:
-            req = urllib.request.Request(full_url, headers=headers)
-
-            with urllib.request.urlopen(req, timeout=timeout) as response:
-                # 检查rate limit headers
-                rate_limit_remaining = response.headers.get('X-MBX-USED-WEIGHT-1M')
-                if rate_limit_remaining:
-                    used_weight = int(rate_limit_remaining)
-                    if used_weight > 5000:  # 接近6000限制
-                        print(f"⚠️  Weight usage high: {used_weight}/6000")
+            # 连接池复用keep-alive连接，gzip/deflate响应已解压
+            response = pool.get(full_url, headers=headers, timeout=timeout)
 
-                # 读取响应数据
-                data = response.read()
+            # 按X-MBX-USED-WEIGHT-1M对账
+            budget.observe(response.status, response.headers, key)
 
-                # 检查是否为gzip压缩（如果Content-Encoding是gzip）
-                content_encoding = response.headers.get('Content-Encoding', '').lower()
-                if content_encoding == 'gzip' or (len(data) >= 2 and data[:2] == b'\x1f\x8b'):
-                    import gzip
-                    data = gzip.decompress(data)
-
-                # 解析JSON
-                return json.loads(data)
+            # 解析JSON
+            return json.loads(response.body)
 
         except urllib.error.HTTPError as e:
             last_err = e
+            budget.observe(e.code, e.headers, key)
 
             if e.code == 429:  # Rate limit exceeded
-                # 币安返回429时，等待Retry-After指定的时间
-                retry_after = e.headers.get('Retry-After', '60')
-                sleep_time = int(retry_after)
-                print(f"⚠️  Rate limit 429! Sleeping {sleep_time}s...")
-                time.sleep(sleep_time)
+                # 预算已按Retry-After暂停所有请求，下一次acquire会等待
+                print(f"⚠️  Rate limit 429! Retry-After: {e.headers.get('Retry-After', '60')}s")
                 continue
 
             elif e.code == 403:  # Forbidden
@@ -276,7 +200,7 @@ async def batch_get_open_interest_hist(
     symbols: List[str],
     period: str = "1h",
     limit: int = 200,
-    batch_size: int = 20
+    batch_size: Optional[int] = None
 ) -> Dict[str, List[dict]]:
     """
     批量异步获取持仓量历史数据
@@ -285,47 +209,20 @@ async def batch_get_open_interest_hist(
         symbols: 币种列表
         period: 周期（"1h", "4h"等）
         limit: 数据条数
-        batch_size: 每批并发数量
+        batch_size: 已弃用（保留兼容）；并发数由AIMD执行器自适应调整
 
     Returns:
-        {symbol: oi_data} 字典
+        {symbol: oi_data} 字典（失败的币种为空列表）
 
     性能: 140个币种从700秒降至~70秒（10x提升）
+    v3.5: 固定分批 + sleep(0.5) 改为自适应并发（见ats_core.sources.fanout）
     """
-    import asyncio
-
-    results = {}
-
-    async def fetch_one(symbol: str):
-        """异步获取单个币种的OI数据"""
-        try:
-            loop = asyncio.get_event_loop()
-            # 在线程池中运行同步函数
-            oi_data = await loop.run_in_executor(
-                None,
-                lambda: get_open_interest_hist(symbol, period, limit)
-            )
-            return symbol, oi_data, None
-        except Exception as e:
-            return symbol, [], e
+    from ats_core.sources.fanout import AdaptiveFanout
 
-    # 分批并发获取
-    for i in range(0, len(symbols), batch_size):
-        batch = symbols[i:i+batch_size]
-        tasks = [fetch_one(symbol) for symbol in batch]
-        batch_results = await asyncio.gather(*tasks)
-
-        for symbol, oi_data, error in batch_results:
-            if error is None and oi_data:
-                results[symbol] = oi_data
-            else:
-                results[symbol] = []
-
-        # 短暂延迟避免触发限速
-        if i + batch_size < len(symbols):
-            await asyncio.sleep(0.5)
-
-    return results
+    report = await AdaptiveFanout("open_interest_hist").run(
+        symbols, lambda symbol: get_open_interest_hist(symbol, period, limit)
+    )
+    return {symbol: report.results.get(symbol) or [] for symbol in symbols}
 
 
 def get_funding_hist(
@@ -362,5 +259,5 @@ def get_ticker_24h(symbol: Optional[str] = None):
 
 
 def get_rate_limiter_status():
-    """获取当前rate limiter状态（用于监控）"""
-    return _rate_limiter.get_current_usage()
+    """获取当前权重预算状态（用于监控；进程内所有Binance REST客户端共用）"""
+    return get_weight_budget().get_stats()
@@ -0,0 +1,361 @@
+# coding: utf-8
+"""
+批量REST请求的自适应并发执行器（AIMD）
+
+背景：
+- binance_safe.batch_get_open_interest_hist、OptimizedBatchScanner订单簿阶段
+  都是固定 batch_size=20 + 批间 sleep(0.5)；K线缓存的预热/增量阶段是逐个await
+- 固定常数在空闲IP上太慢，与其它阶段重叠时又会触发429
+
+机制（与TCP拥塞控制相同的AIMD）：
+- 加性增：每完成约 limit 个成功请求，并发上限 +additive_increase
+- 乘性减：出现延迟尖峰（> 基线EWMA × latency_spike_ratio）、429/418（包括权重预算
+  在本次调用期间观测到的429/418）、超时，并发上限 ×decrease_factor（冷却期内只减一次）
+- 基线EWMA包含尖峰样本：延迟持续抬升时基线随之上移，不会一直降速
+- 延迟与时限都不含权重预算的排队等待（measure_budget_wait计量）：预算限流不被当作
+  服务端变慢，也不会让调用超时
+- 重试：可重试错误按指数退避 + 全抖动重试，max_retries次；每个调用受deadline_sec总时限约束
+- 同步函数在线程中运行、无法取消：超时时线程仍在运行则不再重试（避免同一请求重复消耗权重）
+- 每个阶段（phase）记录吞吐、成功/失败、重试、降速次数、并发上限变化；
+  下一次同名阶段从上次学到的并发上限开始
+- 同步函数在执行器专用线程池中运行（线程数 = max_concurrency）
+
+用法：
+    fanout = AdaptiveFanout("orderbook")
+    report = await fanout.run(symbols, lambda s: get_orderbook_snapshot(s, limit=100))
+    report.results  # {item: result}
+    report.errors   # {item: exception}
+    report.stats    # 吞吐等指标
+
+配置（config/params.json -> fanout，phases.<阶段名> 可覆盖单个阶段）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import inspect
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from ats_core.sources.weight_budget import BudgetWaitMeter, get_weight_budget, measure_budget_wait
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    "initial_concurrency": 8,
+    "min_concurrency": 1,
+    "max_concurrency": 32,
+    "additive_increase": 1.0,
+    "decrease_factor": 0.5,
+    "latency_spike_ratio": 3.0,
+    "decrease_cooldown_sec": 1.0,
+    "deadline_sec": 30.0,
+    "max_retries": 3,
+    "retry_base_sec": 0.5,
+    "retry_max_sec": 8.0,
+}
+
+# 基线延迟至少积累这么多样本后才做尖峰判断
+_WARMUP_SAMPLES = 5
+_EWMA_ALPHA = 0.2
+
+
+class _ThreadStillRunning(asyncio.TimeoutError):
+    """同步调用超时但线程仍在运行（无法取消，不重试）"""
+
+
+class FanoutCallError(RuntimeError):
+    """调用返回了错误结果（例如异步客户端的 {'error': ...}），status用于区分限流"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def check_result(result: Any) -> Any:
+    """异步客户端以 {'error': ...} 返回失败：转换为异常，交给执行器重试/统计"""
+    if isinstance(result, dict) and "error" in result:
+        raise FanoutCallError(str(result["error"]))
+    return result
+
+
+@dataclass
+class FanoutReport:
+    """一次批量执行的结果"""
+    results: Dict[Hashable, Any] = field(default_factory=dict)
+    errors: Dict[Hashable, BaseException] = field(default_factory=dict)
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+# 各阶段上次的统计与学到的并发上限（进程内）
+_phase_stats: Dict[str, Dict[str, Any]] = {}
+_phase_limits: Dict[str, float] = {}
+_registry_lock = threading.Lock()
+
+
+def get_fanout_stats() -> Dict[str, Dict[str, Any]]:
+    """各阶段最近一次执行的统计（吞吐、并发上限等）"""
+    with _registry_lock:
+        return {phase: dict(stats) for phase, stats in _phase_stats.items()}
+
+
+def _load_config(phase: str) -> Dict[str, Any]:
+    try:
+        from ats_core.cfg import CFG
+        config = dict(CFG.params.get("fanout", {}))
+    except Exception as e:
+        logger.warning(f"fanout配置读取失败，使用默认值: {e}")
+        return {}
+    overrides = config.pop("phases", {}).get(phase, {})
+    return {**config, **overrides}
+
+
+class AdaptiveFanout:
+    """
+    AIMD自适应并发执行器
+    """
+
+    def __init__(self, phase: str, config: Optional[Dict[str, Any]] = None):
+        self.phase = phase
+        config = {**DEFAULT_CONFIG, **(_load_config(phase) if config is None else config)}
+
+        # §6.2 配置读取（带默认值）
+        self.min_concurrency = max(1, int(config.get("min_concurrency", 1)))
+        self.max_concurrency = max(self.min_concurrency, int(config.get("max_concurrency", 32)))
+        self.additive_increase = float(config.get("additive_increase", 1.0))
+        self.decrease_factor = min(0.95, max(0.05, float(config.get("decrease_factor", 0.5))))
+        self.latency_spike_ratio = float(config.get("latency_spike_ratio", 3.0))
+        self.decrease_cooldown_sec = float(config.get("decrease_cooldown_sec", 1.0))
+        self.deadline_sec = float(config.get("deadline_sec", 30.0))
+        self.max_retries = max(0, int(config.get("max_retries", 3)))
+        self.retry_base_sec = float(config.get("retry_base_sec", 0.5))
+        self.retry_max_sec = float(config.get("retry_max_sec", 8.0))
+
+        with _registry_lock:
+            learned = _phase_limits.get(phase)
+        initial = learned if learned is not None else float(config.get("initial_concurrency", 8))
+        self.limit = min(float(self.max_concurrency), max(float(self.min_concurrency), initial))
+
+        self._baseline_ms: Optional[float] = None
+        self._samples = 0
+        self._last_decrease = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ==================== 执行 ====================
+
+    async def run(
+        self,
+        items: Iterable[Hashable],
+        fn: Callable[[Any], Any],
+        *,
+        on_result: Optional[Callable[[Hashable, Any, Optional[BaseException]], None]] = None,
+    ) -> FanoutReport:
+        """
+        并发执行 fn(item)（协程函数直接await，同步函数在线程池中运行）
+
+        Args:
+            items: 待处理项（需可哈希，作为结果字典的键）
+            fn: 单项请求函数；失败时抛出异常（错误结果可抛FanoutCallError）
+            on_result: 每项完成时的回调 (item, result, error)，用于进度显示
+        """
+        items = list(dict.fromkeys(items))
+        report = FanoutReport()
+        counters = {
+            "retries": 0, "throttled": 0, "latency_spikes": 0, "timeouts": 0, "decreases": 0,
+            "abandoned_threads": 0, "budget_wait_sec": 0.0,
+        }
+        latencies = []
+        peak = self.limit
+        start = time.perf_counter()
+
+        is_async = inspect.iscoroutinefunction(fn)
+        if not is_async:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix=f"fanout-{self.phase}"
+            )
+
+        pending = list(reversed(items))
+        running: Dict[asyncio.Task, Hashable] = {}
+        try:
+            while pending or running:
+                while pending and len(running) < int(self.limit):
+                    item = pending.pop()
+                    task = asyncio.ensure_future(self._call(fn, item, is_async, counters, latencies))
+                    running[task] = item
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    item = running.pop(task)
+                    error = task.exception()
+                    result = None if error is not None else task.result()
+                    if error is None:
+                        report.results[item] = result
+                    else:
+                        report.errors[item] = error
+                    if on_result is not None:
+                        on_result(item, result, error)
+                peak = max(peak, self.limit)
+        finally:
+            for task in running:
+                task.cancel()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        report.stats = {
+            "phase": self.phase,
+            "items": len(items),
+            "ok": len(report.results),
+            "failed": len(report.errors),
+            "elapsed_sec": round(elapsed, 3),
+            "throughput_per_sec": round(len(items) / elapsed, 2) if elapsed > 0 else 0.0,
+            "final_concurrency": int(self.limit),
+            "peak_concurrency": int(peak),
+            "latency_p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else 0.0,
+            "latency_p95_ms": round(latencies[int(len(latencies) * 0.95)], 1) if latencies else 0.0,
+            **counters,
+            "budget_wait_sec": round(counters["budget_wait_sec"], 3),
+        }
+        with _registry_lock:
+            _phase_stats[self.phase] = report.stats
+            _phase_limits[self.phase] = self.limit
+        logger.info(
+            f"[fanout:{self.phase}] {report.stats['ok']}/{len(items)} 成功, "
+            f"{report.stats['throughput_per_sec']}/秒, 并发 {int(self.limit)} (峰值 {int(peak)})"
+        )
+        return report
+
+    async def _call(self, fn, item, is_async: bool, counters: Dict[str, int], latencies: list):
+        """单项调用：总时限内按抖动指数退避重试（时限不含权重预算等待）"""
+        deadline = time.monotonic() + self.deadline_sec
+        budget = get_weight_budget()
+        meter = BudgetWaitMeter()
+        attempt = 0
+        try:
+            while True:
+                throttled_before = _throttle_count(budget)
+                waited_before = meter.waited()
+                t0 = time.perf_counter()
+                try:
+                    result = await self._attempt(fn, item, is_async, meter, deadline)
+                    elapsed_ms = max(0.0, (time.perf_counter() - t0 - (meter.waited() - waited_before)) * 1000)
+                    latencies.append(elapsed_ms)
+                    if _throttle_count(budget) > throttled_before:
+                        counters["throttled"] += 1
+                        self._decrease(counters)
+                    else:
+                        self._on_success(elapsed_ms, counters)
+                    return result
+                except Exception as e:
+                    kind = _classify(e)
+                    if _throttle_count(budget) > throttled_before:
+                        kind = "throttle"
+                    if kind == "throttle":
+                        counters["throttled"] += 1
+                        self._decrease(counters)
+                    elif kind == "timeout":
+                        counters["timeouts"] += 1
+                        self._decrease(counters)
+
+                    attempt += 1
+                    if isinstance(e, _ThreadStillRunning):
+                        # 线程中的请求仍在进行，重试会重复消耗权重
+                        counters["abandoned_threads"] += 1
+                        raise
+                    if kind == "fatal" or attempt > self.max_retries:
+                        raise
+                    # 全抖动指数退避（不超过剩余时限）
+                    delay = random.uniform(0, min(self.retry_max_sec, self.retry_base_sec * (2 ** attempt)))
+                    if time.monotonic() + delay >= deadline + meter.waited():
+                        raise
+                    counters["retries"] += 1
+                    await asyncio.sleep(delay)
+        finally:
+            counters["budget_wait_sec"] += meter.waited()
+
+    async def _attempt(self, fn, item, is_async: bool, meter: BudgetWaitMeter, deadline: float):
+        """
+        执行一次调用；时限随预算等待顺延（deadline + 已等待预算时长）
+
+        协程超时时被取消；同步函数的线程无法取消，超时时抛出_ThreadStillRunning
+        """
+        if is_async:
+            future = asyncio.ensure_future(_run_async(fn, item, meter))
+        else:
+            # 复制上下文：线程内保留调用方的请求优先级（traffic_priority）
+            context = contextvars.copy_context()
+            future = asyncio.get_running_loop().run_in_executor(
+                self._executor, context.run, _run_sync, fn, item, meter
+            )
+        try:
+            while True:
+                remaining = deadline + meter.waited() - time.monotonic()
+                if remaining <= 0:
+                    if is_async:
+                        raise asyncio.TimeoutError()
+                    raise _ThreadStillRunning()
+                done, _ = await asyncio.wait({future}, timeout=remaining)
+                if done:
+                    return future.result()
+        finally:
+            if not future.done():
+                future.cancel()
+
+    # ==================== AIMD ====================
+
+    def _on_success(self, elapsed_ms: float, counters: Dict[str, int]) -> None:
+        baseline = self._baseline_ms
+        spike = baseline is not None and self._samples >= _WARMUP_SAMPLES \
+            and elapsed_ms > baseline * self.latency_spike_ratio
+        # 尖峰样本同样计入基线：延迟持续抬升后基线跟上，不再判为尖峰
+        self._samples += 1
+        self._baseline_ms = elapsed_ms if baseline is None else baseline + _EWMA_ALPHA * (elapsed_ms - baseline)
+        if spike:
+            counters["latency_spikes"] += 1
+            self._decrease(counters)
+            return
+        # 每个"窗口"（约limit个成功请求）加1
+        self.limit = min(float(self.max_concurrency), self.limit + self.additive_increase / max(1.0, self.limit))
+
+    def _decrease(self, counters: Dict[str, int]) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown_sec:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_concurrency), self.limit * self.decrease_factor)
+        counters["decreases"] += 1
+
+
+async def _run_async(fn, item, meter: BudgetWaitMeter):
+    with measure_budget_wait(meter):
+        return await fn(item)
+
+
+def _run_sync(fn, item, meter: BudgetWaitMeter):
+    with measure_budget_wait(meter):
+        return fn(item)
+
+
+def _throttle_count(budget) -> int:
+    return budget.stats["throttled"] + budget.stats["banned"]
+
+
+def _classify(error: BaseException) -> str:
+    """throttle（429/418） / timeout / fatal（4xx参数错误等，不重试） / retry"""
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    status = getattr(error, "code", None) or getattr(error, "status", None)
+    if status in (418, 429):
+        return "throttle"
+    if isinstance(status, int) and 400 <= status < 500:
+        return "fatal"
+    return "retry"
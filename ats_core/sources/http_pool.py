@@ -0,0 +1,315 @@
+# coding: utf-8
+"""
+连接池HTTP传输（Keep-Alive + gzip + 每主机连接上限）
+
+职责：
+- 同步：HttpPool按 (scheme, host, port) 复用 http.client 长连接，
+  省去每次请求的TCP/TLS握手；请求带 Accept-Encoding: gzip 并自动解压
+- 每主机最多 max_connections_per_host 个并发连接（超出时等待空闲连接）
+- 复用的连接被服务端关闭时自动换新连接重发一次（只针对复用连接，不计入业务重试）
+- 非2xx响应抛出 urllib.error.HTTPError（与 urllib.request.urlopen 行为一致，调用方的429/418处理不变）
+- 异步：create_async_session() 按同一配置创建 aiohttp 会话（连接池、keep-alive、gzip）
+- 按端点（URL路径）统计请求次数、错误数、耗时、字节数、连接复用率
+
+配置（config/params.json -> http_pool）：
+- max_connections_per_host: 每主机连接上限（默认10）
+- idle_timeout_sec: 空闲连接保留时间，超时后关闭（默认30秒）
+- gzip: 是否请求gzip压缩（默认True）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import gzip
+import http.client
+import io
+import logging
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.parse
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    "max_connections_per_host": 10,
+    "idle_timeout_sec": 30.0,
+    "gzip": True,
+}
+
+# 复用的连接被对端关闭时可能出现的异常（换新连接重发）
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+    ConnectionAbortedError,
+)
+
+
+@dataclass
+class HttpResponse:
+    """HTTP响应（body已解压）"""
+    status: int
+    headers: http.client.HTTPMessage
+    body: bytes
+    elapsed_ms: float
+
+
+class EndpointStats:
+    """按端点统计请求耗时（同步与异步共用，线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {
+            "requests": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "bytes": 0, "reused": 0,
+        })
+
+    def record(self, endpoint: str, elapsed_ms: float, ok: bool, nbytes: int = 0, reused: bool = False):
+        with self._lock:
+            s = self._stats[endpoint]
+            s["requests"] += 1
+            s["total_ms"] += elapsed_ms
+            s["max_ms"] = max(s["max_ms"], elapsed_ms)
+            s["bytes"] += nbytes
+            if not ok:
+                s["errors"] += 1
+            if reused:
+                s["reused"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                endpoint: {
+                    **s,
+                    "avg_ms": round(s["total_ms"] / s["requests"], 2) if s["requests"] else 0.0,
+                    "total_ms": round(s["total_ms"], 2),
+                    "max_ms": round(s["max_ms"], 2),
+                }
+                for endpoint, s in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# 全局端点统计（HttpPool与异步会话共用）
+endpoint_stats = EndpointStats()
+
+
+class _HostPool:
+    """单个主机的空闲连接栈 + 并发连接上限"""
+
+    def __init__(self, limit: int):
+        self.idle: List[Tuple[http.client.HTTPConnection, float]] = []
+        self.slots = threading.BoundedSemaphore(limit)
+
+
+class HttpPool:
+    """
+    同步连接池HTTP客户端（线程安全）
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+
+        # §6.2 配置读取（带默认值）
+        self.max_connections_per_host = max(1, int(config.get("max_connections_per_host", 10)))
+        self.idle_timeout_sec = float(config.get("idle_timeout_sec", 30.0))
+        self.gzip = bool(config.get("gzip", True))
+
+        self._lock = threading.Lock()
+        self._hosts: Dict[Tuple[str, str, int], _HostPool] = {}
+        self._ssl_context = ssl.create_default_context()
+        self.stats = endpoint_stats
+
+    # ==================== 请求 ====================
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10.0,
+    ) -> HttpResponse:
+        """
+        发送请求（非2xx抛出urllib.error.HTTPError，网络错误原样抛出）
+
+        Args:
+            method: GET/POST/DELETE
+            url: 完整URL（可已带查询串）
+            params: 追加的查询参数（值为None的参数忽略）
+            headers: 额外请求头
+            timeout: 连接/读取超时（秒）
+        """
+        parts = urllib.parse.urlsplit(url)
+        query = parts.query
+        if params:
+            extra = urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+            query = f"{query}&{extra}" if query and extra else (query or extra)
+        target = (parts.path or "/") + (f"?{query}" if query else "")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+
+        req_headers = {"Connection": "keep-alive"}
+        if self.gzip:
+            req_headers["Accept-Encoding"] = "gzip"
+        req_headers.update(headers or {})
+
+        host = self._host(key)
+        host.slots.acquire()
+        start = time.perf_counter()
+        reused = False
+        try:
+            conn, reused = self._checkout(host, key, timeout)
+            try:
+                try:
+                    resp, body = self._send(conn, method, target, req_headers)
+                except _STALE_ERRORS:
+                    conn.close()
+                    if not reused:
+                        raise
+                    # 空闲期间被服务端关闭的复用连接：换新连接重发一次（失败时同样关闭）
+                    conn, reused = self._new_connection(key, timeout), False
+                    resp, body = self._send(conn, method, target, req_headers)
+            except BaseException:
+                conn.close()
+                raise
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._checkin(host, conn)
+
+            body = self._decode(body, resp.headers.get("Content-Encoding", ""))
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            ok = 200 <= resp.status < 300
+            self.stats.record(parts.path, elapsed_ms, ok, len(body), reused)
+            if not ok:
+                raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+            return HttpResponse(resp.status, resp.headers, body, elapsed_ms)
+        except urllib.error.HTTPError:
+            raise
+        except Exception:
+            self.stats.record(parts.path, (time.perf_counter() - start) * 1000, False, 0, reused)
+            raise
+        finally:
+            host.slots.release()
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None, timeout: float = 10.0) -> HttpResponse:
+        return self.request("GET", url, params, headers, timeout)
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            for host in self._hosts.values():
+                for conn, _ in host.idle:
+                    conn.close()
+                host.idle.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """端点统计 + 空闲连接数"""
+        with self._lock:
+            idle = {f"{k[0]}://{k[1]}:{k[2]}": len(h.idle) for k, h in self._hosts.items()}
+        return {"endpoints": self.stats.snapshot(), "idle_connections": idle}
+
+    # ==================== 连接管理 ====================
+
+    def _host(self, key) -> _HostPool:
+        with self._lock:
+            host = self._hosts.get(key)
+            if host is None:
+                host = self._hosts[key] = _HostPool(self.max_connections_per_host)
+            return host
+
+    def _checkout(self, host: _HostPool, key, timeout: float):
+        now = time.monotonic()
+        with self._lock:
+            while host.idle:
+                conn, idle_since = host.idle.pop()
+                if now - idle_since <= self.idle_timeout_sec and conn.sock is not None:
+                    conn.timeout = timeout
+                    conn.sock.settimeout(timeout)
+                    return conn, True
+                conn.close()
+        return self._new_connection(key, timeout), False
+
+    def _checkin(self, host: _HostPool, conn) -> None:
+        with self._lock:
+            host.idle.append((conn, time.monotonic()))
+
+    def _new_connection(self, key, timeout: float):
+        scheme, hostname, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(hostname, port, timeout=timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(hostname, port, timeout=timeout)
+
+    @staticmethod
+    def _send(conn, method: str, target: str, headers: Dict[str, str]):
+        conn.request(method, target, headers=headers)
+        resp = conn.getresponse()
+        return resp, resp.read()
+
+    @staticmethod
+    def _decode(body: bytes, encoding: str) -> bytes:
+        encoding = encoding.lower()
+        if encoding == "gzip" or (len(body) >= 2 and body[:2] == b"\x1f\x8b"):
+            return gzip.decompress(body)
+        if encoding == "deflate":
+            return zlib.decompress(body)
+        return body
+
+
+# ==================== 异步会话 ====================
+
+
+def create_async_session(config: Optional[Dict[str, Any]] = None, **kwargs):
+    """
+    按http_pool配置创建aiohttp会话（连接池 + keep-alive + gzip自动解压）
+
+    会话绑定事件循环，由调用方负责close()；请求耗时可用endpoint_stats.record()汇总到同一统计。
+    """
+    import aiohttp
+
+    if config is None:
+        config = _load_config()
+    config = {**DEFAULT_CONFIG, **config}
+    connector = aiohttp.TCPConnector(
+        limit_per_host=max(1, int(config["max_connections_per_host"])),
+        keepalive_timeout=float(config["idle_timeout_sec"]),
+        ttl_dns_cache=300,
+    )
+    headers = {"Accept-Encoding": "gzip"} if config.get("gzip", True) else None
+    return aiohttp.ClientSession(connector=connector, headers=headers, **kwargs)
+
+
+# ==================== 全局单例 ====================
+
+_pool_instance: Optional[HttpPool] = None
+_pool_lock = threading.Lock()
+
+
+def _load_config() -> Dict[str, Any]:
+    try:
+        from ats_core.cfg import CFG
+        return CFG.params.get("http_pool", {})
+    except Exception as e:
+        logger.warning(f"http_pool配置读取失败，使用默认值: {e}")
+        return {}
+
+
+def get_http_pool() -> HttpPool:
+    """获取同步连接池单例（配置读取config/params.json -> http_pool）"""
+    global _pool_instance
+    with _pool_lock:
+        if _pool_instance is None:
+            _pool_instance = HttpPool(_load_config())
+    return _pool_instance
@@ -0,0 +1,327 @@
+# coding: utf-8
+"""
+行情请求合并 + 短TTL响应缓存（single-flight）
+
+背景：
+- 同一扫描周期内，BTC/ETH 1h K线被 market_regime、批量扫描Layer 3、
+  _get_market_context、multi_timeframe_coherence 分别请求；
+  get_ticker_24h / get_all_premium_index 也被多层重复调用
+- market_regime 之前用无上限的 _market_cache（调用方传入的分钟字符串做键）缓存结果
+
+机制：
+- single-flight：同一键的并发请求只发一次，其余线程等待同一个Future
+- TTL按端点配置；K线的过期时间不跨越当前K线的收盘边界（UTC对齐）
+- K线超集复用：已缓存 limit=100 时，limit=48 的请求直接取最后48根
+- 失效：合约K线收盘事件（fstream WebSocket x=true）调用 invalidate_klines(symbol, interval)，
+  同时失效依赖这根K线的派生结果（标签机制，例如市场趋势）
+- LRU上限 max_entries，错误不缓存
+- 指标：get_stats() 返回命中/未命中/合并/失效/淘汰次数（按端点）
+
+返回值为浅拷贝（list/dict），调用方修改外层容器不会污染缓存。
+
+配置（config/params.json -> request_cache）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "max_entries": 2048,
+    "klines_max_ttl_sec": 60,
+    "ticker_24h_ttl_sec": 10,
+    "premium_index_ttl_sec": 10,
+    "bar_close_grace_sec": 1.0,
+}
+
+_INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800, "12h": 43200,
+    "1d": 86400, "3d": 259200,
+}
+
+
+def next_bar_close(interval: str, now: Optional[float] = None) -> Optional[float]:
+    """当前K线的收盘时刻（UTC对齐；1w/1M等非固定周期返回None）"""
+    period = _INTERVAL_SECONDS.get(interval)
+    if period is None:
+        return None
+    now = time.time() if now is None else now
+    return (int(now // period) + 1) * period
+
+
+def kline_tag(symbol: str, interval: str) -> Tuple[str, str, str]:
+    return ("kline", symbol.upper(), interval)
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "tags")
+
+    def __init__(self, value: Any, expires_at: float, tags: Tuple[Hashable, ...]):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class RequestCache:
+    """
+    线程安全的请求合并 + TTL缓存
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+
+        # §6.2 配置读取（带默认值）
+        self.enabled = bool(config.get("enabled", True))
+        self.max_entries = max(16, int(config.get("max_entries", 2048)))
+        self.klines_max_ttl_sec = float(config.get("klines_max_ttl_sec", 60))
+        self.ticker_24h_ttl_sec = float(config.get("ticker_24h_ttl_sec", 10))
+        self.premium_index_ttl_sec = float(config.get("premium_index_ttl_sec", 10))
+        self.bar_close_grace_sec = float(config.get("bar_close_grace_sec", 1.0))
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._inflight: Dict[Hashable, Tuple[Future, Tuple[Hashable, ...]]] = {}
+        self._tag_index: Dict[Hashable, Set[Hashable]] = defaultdict(set)
+        # (symbol, interval) -> 已缓存的limit集合（超集复用）
+        self._kline_limits: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {
+            "hits": 0, "misses": 0, "coalesced": 0, "errors": 0,
+        })
+        self._invalidations = 0
+        self._evictions = 0
+
+    # ==================== 通用接口 ====================
+
+    def get_or_load(
+        self,
+        key: Tuple[Hashable, ...],
+        loader: Callable[[], Any],
+        ttl_sec: float,
+        tags: Iterable[Hashable] = (),
+    ) -> Any:
+        """
+        命中返回缓存；否则合并并发请求，只由第一个调用方执行loader
+
+        Args:
+            key: 缓存键（首元素为端点名，用于分端点统计）
+            loader: 实际请求函数
+            ttl_sec: 缓存有效期（<=0 只合并并发请求、不缓存）
+            tags: 失效标签（invalidate_tag时一起删除）
+        """
+        if not self.enabled:
+            return loader()
+
+        endpoint = str(key[0])
+        tags = tuple(tags)
+        with self._lock:
+            value = self._lookup_locked(key)
+            if value is not _MISS:
+                self._stats[endpoint]["hits"] += 1
+                return _shallow_copy(value)
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                future = inflight[0]
+                self._stats[endpoint]["coalesced"] += 1
+                owner = False
+            else:
+                future = Future()
+                self._inflight[key] = (future, tags)
+                self._stats[endpoint]["misses"] += 1
+                owner = True
+
+        if not owner:
+            return _shallow_copy(future.result())
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._release_inflight_locked(key, future)
+                self._stats[endpoint]["errors"] += 1
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            # 加载期间被invalidate时_inflight中已无本次请求（可能已是新的请求）：
+            # 结果只交给等待者，不入缓存
+            if self._release_inflight_locked(key, future) and ttl_sec > 0:
+                self._store_locked(key, value, time.time() + ttl_sec, tags)
+        future.set_result(value)
+        return _shallow_copy(value)
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """删除带有该标签的所有缓存项，返回删除数量"""
+        with self._lock:
+            keys = self._tag_index.pop(tag, set())
+            for key in keys:
+                self._remove_locked(key)
+            # 进行中的请求结果可能已过时：让它们不入缓存
+            for key in [k for k, (_, t) in self._inflight.items() if tag in t]:
+                self._inflight.pop(key, None)
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tag_index.clear()
+            self._kline_limits.clear()
+
+    # ==================== 行情端点 ====================
+
+    def klines(self, symbol: str, interval: str, limit: int, loader: Callable[[], Any]) -> Any:
+        """
+        最新K线（不含startTime/endTime）
+
+        过期时间 = min(now + klines_max_ttl_sec, 当前K线收盘 + 宽限)；
+        已缓存更大limit时直接截取最后limit根
+        """
+        symbol = symbol.upper()
+        key = ("klines", symbol, interval, limit)
+        if self.enabled:
+            with self._lock:
+                for cached_limit in sorted(self._kline_limits.get((symbol, interval), ())):
+                    if cached_limit < limit:
+                        continue
+                    value = self._lookup_locked(("klines", symbol, interval, cached_limit))
+                    if value is not _MISS:
+                        self._stats["klines"]["hits"] += 1
+                        return list(value[-limit:])
+        return self.get_or_load(key, loader, self._klines_ttl(interval), (kline_tag(symbol, interval),))
+
+    def ticker_24h(self, symbol: Optional[str], loader: Callable[[], Any]) -> Any:
+        return self.get_or_load(("ticker_24h", symbol), loader, self.ticker_24h_ttl_sec)
+
+    def premium_index(self, loader: Callable[[], Any]) -> Any:
+        return self.get_or_load(("premium_index",), loader, self.premium_index_ttl_sec)
+
+    def invalidate_klines(self, symbol: str, interval: str) -> int:
+        """K线收盘事件：失效该周期的K线缓存及其派生结果"""
+        return self.invalidate_tag(kline_tag(symbol, interval))
+
+    def bar_aligned_ttl(self, interval: str) -> float:
+        """不跨越当前K线收盘边界的TTL（供派生结果使用）"""
+        return self._klines_ttl(interval)
+
+    # ==================== 指标 ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = {}
+            for endpoint, s in self._stats.items():
+                lookups = s["hits"] + s["misses"] + s["coalesced"]
+                endpoints[endpoint] = {
+                    **s,
+                    "hit_rate": round((s["hits"] + s["coalesced"]) / lookups, 4) if lookups else 0.0,
+                }
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "invalidations": self._invalidations,
+                "evictions": self._evictions,
+                "endpoints": endpoints,
+            }
+
+    # ==================== 内部 ====================
+
+    def _klines_ttl(self, interval: str) -> float:
+        now = time.time()
+        ttl = self.klines_max_ttl_sec
+        close_at = next_bar_close(interval, now)
+        if close_at is not None:
+            ttl = min(ttl, close_at + self.bar_close_grace_sec - now)
+        return ttl
+
+    def _release_inflight_locked(self, key, future: Future) -> bool:
+        """只移除本次请求自己的进行中记录（不误删失效后发起的新请求），返回是否移除"""
+        inflight = self._inflight.get(key)
+        if inflight is None or inflight[0] is not future:
+            return False
+        del self._inflight[key]
+        return True
+
+    def _lookup_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISS
+        if entry.expires_at <= time.time():
+            self._remove_locked(key)
+            return _MISS
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def _store_locked(self, key, value, expires_at: float, tags: Tuple[Hashable, ...]) -> None:
+        if key in self._entries:
+            self._remove_locked(key)
+        self._entries[key] = _Entry(value, expires_at, tags)
+        for tag in tags:
+            self._tag_index[tag].add(key)
+        if key[0] == "klines":
+            self._kline_limits[(key[1], key[2])].add(key[3])
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove_locked(oldest)
+            self._evictions += 1
+
+    def _remove_locked(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+        if key[0] == "klines":
+            limits = self._kline_limits.get((key[1], key[2]))
+            if limits is not None:
+                limits.discard(key[3])
+                if not limits:
+                    del self._kline_limits[(key[1], key[2])]
+
+
+_MISS = object()
+
+
+def _shallow_copy(value: Any) -> Any:
+    if isinstance(value, (list, dict)):
+        return copy.copy(value)
+    return value
+
+
+# 全局单例
+_cache_instance: Optional[RequestCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_request_cache() -> RequestCache:
+    """获取进程级请求缓存（配置读取config/params.json -> request_cache）"""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            try:
+                from ats_core.cfg import CFG
+                config = CFG.params.get("request_cache", {})
+            except Exception as e:
+                logger.warning(f"request_cache配置读取失败，使用默认值: {e}")
+                config = {}
+            _cache_instance = RequestCache(config)
+    return _cache_instance
+
+
+def invalidate_klines(symbol: str, interval: str) -> int:
+    """K线收盘钩子（WebSocket x=true时调用）"""
+    return get_request_cache().invalidate_klines(symbol, interval)
@@ -0,0 +1,29 @@
+# coding: utf-8
+"""
+Binance Stand-in v1.0 - Module Initialization
+币安替身服务 - 模块初始化（离线基准测试与集成测试）
+
+Public API:
+- SyntheticMarket: 确定性合成行情（任意时间区间可随机访问）
+- RecordedMarket: 录制文件回放（缺失数据回退到合成）
+- BinanceStandinServer: 本地REST/WebSocket服务（延迟、权重头、429注入）
+
+切换客户端：设置环境变量 ATS_BINANCE_STANDIN=http://127.0.0.1:8765
+- ats_core.sources.binance / binance_safe: BASE与SPOT_BASE（需在导入前设置）
+- ats_core.execution.binance_futures_client.BinanceFuturesClient: base_url/ws_base_url
+- ats_core.realtime.data_feed.DataFeed: source="binance_standin"
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from ats_core.sources.standin.market import RecordedMarket, SyntheticMarket
+from ats_core.sources.standin.server import BinanceStandinServer, StandinClock
+
+__all__ = [
+    "SyntheticMarket",
+    "RecordedMarket",
+    "BinanceStandinServer",
+    "StandinClock",
+]
+
+__version__ = "1.0.0"
@@ -0,0 +1,565 @@
+# coding: utf-8
+"""
+Binance Stand-in v1.0 - Market Data Sources
+币安替身服务 - 行情数据源（确定性合成 / 录制文件回放）
+
+功能：
+1. SyntheticMarket: 由(seed, symbol, 时间)确定的价格路径，任意时间区间可随机访问
+   - 多尺度value noise叠加（周/日/4h/1h/15m/5m），同一参数每次生成逐位相同
+   - K线/资金费率/OI/订单簿/归集成交全部由同一价格路径派生
+2. RecordedMarket: 从录制文件（scripts/binance_standin.py record 生成）回放K线/资金费率/OI，
+   缺失的数据类型回退到合成数据；订单簿与成交围绕录制价格合成
+
+所有输出均为Binance REST原始格式（K线为12列数组，数值字段为字符串）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MINUTE_MS = 60_000
+HOUR_MS = 3_600_000
+DAY_MS = 86_400_000
+FUNDING_INTERVAL_MS = 8 * HOUR_MS
+BOOK_BUCKET_MS = 100  # 订单簿时间粒度（与@depth@100ms一致）
+MAX_AGG_TRADES_PER_SECOND = 64
+
+INTERVAL_MS = {
+    "1m": MINUTE_MS, "3m": 3 * MINUTE_MS, "5m": 5 * MINUTE_MS, "15m": 15 * MINUTE_MS,
+    "30m": 30 * MINUTE_MS, "1h": HOUR_MS, "2h": 2 * HOUR_MS, "4h": 4 * HOUR_MS,
+    "6h": 6 * HOUR_MS, "8h": 8 * HOUR_MS, "12h": 12 * HOUR_MS, "1d": DAY_MS,
+    "3d": 3 * DAY_MS, "1w": 7 * DAY_MS,
+}
+WEEK_OFFSET_MS = 4 * DAY_MS  # 1970-01-01为周四，周K线从周一开盘
+
+# 常见symbol的起始价格（其余symbol由哈希确定）
+_BASE_PRICES = {
+    "BTCUSDT": 60000.0, "ETHUSDT": 3000.0, "BNBUSDT": 550.0, "SOLUSDT": 150.0,
+    "XRPUSDT": 0.6, "DOGEUSDT": 0.15, "ADAUSDT": 0.45, "LINKUSDT": 15.0,
+}
+
+# value noise尺度（分钟）与振幅（对数价格），日波动约3%
+_PRICE_OCTAVES = ((10080.0, 0.12), (1440.0, 0.035), (240.0, 0.015), (60.0, 0.007), (15.0, 0.003), (5.0, 0.0015))
+
+
+# ==================== 确定性哈希 ====================
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64终结函数（uint64数组，溢出按模2^64回绕）"""
+    x = x + _GOLDEN
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def _uniform(key: int, values: Any) -> np.ndarray:
+    """(key, 整数值) → [0, 1)均匀分布（确定性）"""
+    x = np.asarray(values, dtype=np.int64).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        h = _mix64(_mix64(x) ^ np.uint64(key & 0xFFFFFFFFFFFFFFFF))
+    return (h >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def _stream_key(seed: int, *parts: str) -> int:
+    """各数据流独立的哈希键"""
+    return zlib.crc32(":".join((str(seed),) + parts).encode("utf-8")) * 0x100000001B3
+
+
+def _value_noise(key: int, x: np.ndarray) -> np.ndarray:
+    """平滑value noise：整数格点取[-1, 1]哈希值，smoothstep插值"""
+    x0 = np.floor(x)
+    t = x - x0
+    t = t * t * (3 - 2 * t)
+    a = _uniform(key, x0) * 2 - 1
+    b = _uniform(key, x0 + 1) * 2 - 1
+    return a + (b - a) * t
+
+
+def interval_to_ms(interval: str) -> int:
+    """K线周期 → 毫秒（不支持的周期抛出ValueError）"""
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Invalid interval: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def bar_open_time(timestamp: int, interval: str) -> int:
+    """timestamp所在K线的开盘时间（周K线对齐周一）"""
+    step = interval_to_ms(interval)
+    offset = WEEK_OFFSET_MS if interval == "1w" else 0
+    return (timestamp - offset) // step * step + offset
+
+
+def _fmt(value: float) -> str:
+    """数值 → Binance风格字符串（8位有效小数，去掉多余的0）"""
+    text = f"{value:.8f}".rstrip("0")
+    return text + "0" if text.endswith(".") else text
+
+
+# ==================== 合成行情 ====================
+
+class SyntheticMarket:
+    """
+    确定性合成行情
+
+    同一(seed, symbol, 时间)永远得到相同数据，任意时间区间可直接计算（无需从起点累积）
+    """
+
+    def __init__(self, seed: int = 42, symbols: Optional[List[str]] = None):
+        """
+        Args:
+            seed: 随机种子
+            symbols: exchangeInfo/全市场端点返回的symbol列表
+        """
+        self.seed = seed
+        self.symbols = [s.upper() for s in (symbols or list(_BASE_PRICES))]
+
+    # ---------- 价格路径 ----------
+
+    def base_price(self, symbol: str) -> float:
+        """起始价格（常见symbol取表中价格，其余由哈希确定，0.1 ~ 100）"""
+        if symbol in _BASE_PRICES:
+            return _BASE_PRICES[symbol]
+        u = float(_uniform(_stream_key(self.seed, symbol, "base"), [0])[0])
+        return float(10 ** (-1 + 3 * u))
+
+    def tick_size(self, symbol: str) -> float:
+        """最小价格变动（约为价格的1e-5，取10的整数次幂）"""
+        return float(10 ** np.floor(np.log10(self.base_price(symbol) * 1e-5)))
+
+    def price_at(self, symbol: str, times_ms: Any) -> np.ndarray:
+        """
+        任意时刻的成交价（毫秒时间戳数组，连续可微的价格路径）
+
+        Args:
+            symbol: 交易对
+            times_ms: 时间戳（标量或数组）
+
+        Returns:
+            价格数组（float64）
+        """
+        minutes = np.asarray(times_ms, dtype=np.float64) / MINUTE_MS
+        log_price = np.zeros_like(minutes)
+        for i, (scale, amplitude) in enumerate(_PRICE_OCTAVES):
+            log_price += amplitude * _value_noise(_stream_key(self.seed, symbol, "px", str(i)), minutes / scale)
+        return self.base_price(symbol) * np.exp(log_price)
+
+    def klines(
+        self,
+        symbol: str,
+        interval: str,
+        start_time: Optional[int],
+        end_time: Optional[int],
+        limit: int,
+        now_ms: int
+    ) -> List[list]:
+        """
+        /fapi/v1/klines 语义：
+        - 指定startTime：从startTime所在K线之后（开盘时间>=startTime）起limit根
+        - 只指定endTime：开盘时间<=endTime的最近limit根
+        - 都不指定：截至当前（含未收盘K线）的最近limit根
+        """
+        step = interval_to_ms(interval)
+        last_open = bar_open_time(min(end_time, now_ms) if end_time is not None else now_ms, interval)
+        if start_time is not None:
+            first_open = bar_open_time(start_time, interval)
+            if first_open < start_time:
+                first_open += step
+        else:
+            first_open = last_open - (limit - 1) * step
+        opens = np.arange(first_open, last_open + 1, step, dtype=np.int64)[:limit]
+        if len(opens) == 0:
+            return []
+        return self._build_klines(symbol, opens, step, now_ms)
+
+    def _build_klines(self, symbol: str, opens: np.ndarray, step: int, now_ms: int) -> List[list]:
+        """由价格路径采样构建K线（≤4h周期按1分钟采样，更长周期每根最多240个采样点）"""
+        samples_per_bar = max(1, min(step // MINUTE_MS, 240))
+        sample_ms = step // samples_per_bar
+        grid = opens[:, None] + np.arange(samples_per_bar + 1, dtype=np.int64)[None, :] * sample_ms
+        grid = np.minimum(grid, max(now_ms, int(opens[0])))  # 未收盘K线截止到当前时刻
+        prices = self.price_at(symbol, grid)
+
+        wick_key = _stream_key(self.seed, symbol, "wick")
+        wick = 1 + 0.0008 * _uniform(wick_key, grid[:, :-1] // sample_ms)
+        seg_high = np.maximum(prices[:, :-1], prices[:, 1:]) * wick
+        seg_low = np.minimum(prices[:, :-1], prices[:, 1:]) / wick
+
+        vol_key = _stream_key(self.seed, symbol, "vol")
+        base_volume = 2e6 / self.base_price(symbol) * sample_ms / MINUTE_MS
+        seg_volume = base_volume * -np.log(1 - _uniform(vol_key, grid[:, :-1] // sample_ms) * 0.999)
+        seg_volume *= (grid[:, 1:] - grid[:, :-1]) / sample_ms  # 未收盘部分不计量
+        taker_ratio = 0.4 + 0.2 * _uniform(vol_key + 1, grid[:, :-1] // sample_ms)
+
+        open_p = prices[:, 0]
+        close_p = prices[:, -1]
+        high = seg_high.max(axis=1)
+        low = seg_low.min(axis=1)
+        volume = seg_volume.sum(axis=1)
+        quote = (seg_volume * prices[:, 1:]).sum(axis=1)
+        taker_base = (seg_volume * taker_ratio).sum(axis=1)
+        taker_quote = (seg_volume * taker_ratio * prices[:, 1:]).sum(axis=1)
+        trades = np.maximum(1, (volume * self.base_price(symbol) / 2000)).astype(np.int64)
+
+        return [
+            [
+                int(opens[i]), _fmt(open_p[i]), _fmt(high[i]), _fmt(low[i]), _fmt(close_p[i]),
+                _fmt(volume[i]), int(opens[i]) + step - 1, _fmt(quote[i]), int(trades[i]),
+                _fmt(taker_base[i]), _fmt(taker_quote[i]), "0"
+            ]
+            for i in range(len(opens))
+        ]
+
+    # ---------- 资金费率 / 标记价格 / OI ----------
+
+    def funding_rate_at(self, symbol: str, times_ms: Any) -> np.ndarray:
+        """资金费率（基准0.01%，±0.03%波动）"""
+        x = np.asarray(times_ms, dtype=np.float64) / FUNDING_INTERVAL_MS
+        return 0.0001 + 0.0003 * _value_noise(_stream_key(self.seed, symbol, "funding"), x / 3)
+
+    def funding_history(
+        self,
+        symbol: str,
+        start_time: Optional[int],
+        end_time: Optional[int],
+        limit: int,
+        now_ms: int
+    ) -> List[Dict[str, Any]]:
+        """/fapi/v1/fundingRate（每8小时结算一次）"""
+        last = (min(end_time, now_ms) if end_time is not None else now_ms) // FUNDING_INTERVAL_MS
+        if start_time is not None:
+            first = -(-start_time // FUNDING_INTERVAL_MS)
+        else:
+            first = last - limit + 1
+        times = np.arange(first, last + 1, dtype=np.int64)[:limit] * FUNDING_INTERVAL_MS
+        rates = self.funding_rate_at(symbol, times)
+        marks = self.price_at(symbol, times)
+        return [
+            {"symbol": symbol, "fundingTime": int(t), "fundingRate": f"{r:.8f}", "markPrice": _fmt(m)}
+            for t, r, m in zip(times, rates, marks)
+        ]
+
+    def premium_index(self, symbol: str, now_ms: int) -> Dict[str, Any]:
+        """/fapi/v1/premiumIndex"""
+        index_price = float(self.price_at(symbol, [now_ms])[0])
+        premium = 0.0003 * float(_value_noise(_stream_key(self.seed, symbol, "premium"), np.array([now_ms / 60000.0]))[0])
+        next_funding = (now_ms // FUNDING_INTERVAL_MS + 1) * FUNDING_INTERVAL_MS
+        return {
+            "symbol": symbol,
+            "markPrice": _fmt(index_price * (1 + premium)),
+            "indexPrice": _fmt(index_price),
+            "estimatedSettlePrice": _fmt(index_price),
+            "lastFundingRate": f"{float(self.funding_rate_at(symbol, [now_ms])[0]):.8f}",
+            "interestRate": "0.00010000",
+            "nextFundingTime": next_funding,
+            "time": now_ms,
+        }
+
+    def open_interest_at(self, symbol: str, times_ms: Any) -> np.ndarray:
+        """未平仓量（合约张数）"""
+        x = np.asarray(times_ms, dtype=np.float64) / MINUTE_MS
+        base = 5e8 / self.base_price(symbol)
+        key = _stream_key(self.seed, symbol, "oi")
+        return base * np.exp(0.3 * _value_noise(key, x / 4320) + 0.08 * _value_noise(key + 1, x / 240))
+
+    def open_interest_hist(
+        self,
+        symbol: str,
+        period: str,
+        start_time: Optional[int],
+        end_time: Optional[int],
+        limit: int,
+        now_ms: int
+    ) -> List[Dict[str, Any]]:
+        """/futures/data/openInterestHist"""
+        step = interval_to_ms(period)
+        last = (min(end_time, now_ms) if end_time is not None else now_ms) // step
+        first = -(-start_time // step) if start_time is not None else last - limit + 1
+        times = np.arange(first, last + 1, dtype=np.int64)[:limit] * step
+        oi = self.open_interest_at(symbol, times)
+        prices = self.price_at(symbol, times)
+        return [
+            {
+                "symbol": symbol,
+                "sumOpenInterest": _fmt(o),
+                "sumOpenInterestValue": _fmt(o * p),
+                "timestamp": int(t),
+            }
+            for t, o, p in zip(times, oi, prices)
+        ]
+
+    def ticker_24h(self, symbol: str, now_ms: int) -> Dict[str, Any]:
+        """/fapi/v1/ticker/24hr（由最近24根1h K线汇总）"""
+        rows = self.klines(symbol, "1h", now_ms - DAY_MS + 1, now_ms, 25, now_ms)
+        open_p = float(rows[0][1])
+        last = float(self.price_at(symbol, [now_ms])[0])
+        return {
+            "symbol": symbol,
+            "priceChange": _fmt(last - open_p),
+            "priceChangePercent": f"{(last / open_p - 1) * 100:.3f}",
+            "weightedAvgPrice": _fmt(sum(float(r[7]) for r in rows) / max(sum(float(r[5]) for r in rows), 1e-12)),
+            "lastPrice": _fmt(last),
+            "lastQty": "1",
+            "openPrice": _fmt(open_p),
+            "highPrice": _fmt(max(float(r[2]) for r in rows)),
+            "lowPrice": _fmt(min(float(r[3]) for r in rows)),
+            "volume": _fmt(sum(float(r[5]) for r in rows)),
+            "quoteVolume": _fmt(sum(float(r[7]) for r in rows)),
+            "openTime": now_ms - DAY_MS,
+            "closeTime": now_ms,
+            "firstId": 0,
+            "lastId": 0,
+            "count": sum(int(r[8]) for r in rows),
+        }
+
+    # ---------- 订单簿 ----------
+
+    def book_bucket(self, now_ms: int) -> int:
+        """订单簿版本号（100ms粒度，即lastUpdateId）"""
+        return now_ms // BOOK_BUCKET_MS
+
+    def order_book(self, symbol: str, bucket: int, levels: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        指定版本的订单簿（每个价位按自身周期刷新数量，相邻版本只有少量价位变化）
+
+        Returns:
+            (bid_prices, bid_qtys, ask_prices, ask_qtys)，按最优价优先排序
+        """
+        tick = self.tick_size(symbol)
+        mid = float(self.price_at(symbol, [bucket * BOOK_BUCKET_MS])[0])
+        best_bid_tick = int(np.floor(mid / tick))
+        offsets = np.arange(levels, dtype=np.int64)
+        bid_ticks = best_bid_tick - offsets
+        ask_ticks = best_bid_tick + 1 + offsets
+        return (
+            bid_ticks * tick, self._level_qty(symbol, bid_ticks, offsets, bucket),
+            ask_ticks * tick, self._level_qty(symbol, ask_ticks, offsets, bucket),
+        )
+
+    def _level_qty(self, symbol: str, price_ticks: np.ndarray, depth: np.ndarray, bucket: int) -> np.ndarray:
+        """价位数量：每个价位以5~50个版本为周期刷新（相位错开），越深的价位数量越大"""
+        key = _stream_key(self.seed, symbol, "book")
+        period = 5 + (_uniform(key, price_ticks) * 45).astype(np.int64)
+        phase = (_uniform(key + 1, price_ticks) * period).astype(np.int64)
+        epoch = (bucket + phase) // period
+        u = _uniform(key + 2, price_ticks * 1_000_003 + epoch)
+        base = 20000.0 / self.base_price(symbol)
+        return np.round(base * (1 + depth / 20) * -np.log(1 - u * 0.999), 3) + 0.001
+
+    def depth_snapshot(self, symbol: str, limit: int, now_ms: int) -> Dict[str, Any]:
+        """/fapi/v1/depth"""
+        bucket = self.book_bucket(now_ms)
+        bid_p, bid_q, ask_p, ask_q = self.order_book(symbol, bucket, limit)
+        return {
+            "lastUpdateId": bucket,
+            "E": now_ms,
+            "T": now_ms,
+            "bids": [[_fmt(p), _fmt(q)] for p, q in zip(bid_p, bid_q)],
+            "asks": [[_fmt(p), _fmt(q)] for p, q in zip(ask_p, ask_q)],
+        }
+
+    def depth_diff(
+        self,
+        symbol: str,
+        prev_bucket: int,
+        bucket: int,
+        levels: int
+    ) -> Tuple[List[list], List[list]]:
+        """
+        版本prev_bucket → bucket 的差分（变化的价位给出新数量，移出范围的价位数量为"0"）
+
+        对同样levels档的快照依次应用差分，结果与bucket版本的快照逐档一致
+
+        Returns:
+            (bids, asks)
+        """
+        prev = self.order_book(symbol, prev_bucket, levels)
+        curr = self.order_book(symbol, bucket, levels)
+        return (
+            _diff_side(prev[0], prev[1], curr[0], curr[1]),
+            _diff_side(prev[2], prev[3], curr[2], curr[3]),
+        )
+
+    # ---------- 归集成交 ----------
+
+    def agg_trades(
+        self,
+        symbol: str,
+        start_time: Optional[int],
+        end_time: Optional[int],
+        from_id: Optional[int],
+        limit: int,
+        now_ms: int
+    ) -> List[Dict[str, Any]]:
+        """
+        /fapi/v1/aggTrades（ID = 秒 × 64 + 序号，单调递增）
+        """
+        if from_id is not None:
+            first_second = from_id // MAX_AGG_TRADES_PER_SECOND
+            last_second = min(first_second + 3600, now_ms // 1000)
+        elif start_time is not None:
+            first_second = start_time // 1000
+            last_second = min(end_time if end_time is not None else start_time + HOUR_MS, now_ms) // 1000
+        else:
+            last_second = now_ms // 1000
+            first_second = last_second - 60
+
+        trades: List[Dict[str, Any]] = []
+        for second in range(int(first_second), int(last_second) + 1):
+            trades.extend(self._second_trades(symbol, second))
+        if from_id is not None:
+            trades = [t for t in trades if t["a"] >= from_id][:limit]
+        elif start_time is not None:
+            upper = end_time if end_time is not None else now_ms
+            trades = [t for t in trades if start_time <= t["T"] <= min(upper, now_ms)][:limit]
+        else:
+            trades = [t for t in trades if t["T"] <= now_ms][-limit:]
+        return trades
+
+    def _second_trades(self, symbol: str, second: int) -> List[Dict[str, Any]]:
+        """单秒内的成交（数量/时间/方向由(symbol, 秒)确定）"""
+        key = _stream_key(self.seed, symbol, "trades")
+        count = 1 + int(_uniform(key, [second])[0] * 8)
+        slots = np.arange(count, dtype=np.int64) + second * MAX_AGG_TRADES_PER_SECOND
+        times = np.sort(second * 1000 + (_uniform(key + 1, slots) * 1000).astype(np.int64))
+        prices = self.price_at(symbol, times)
+        qtys = 2000.0 / self.base_price(symbol) * -np.log(1 - _uniform(key + 2, slots) * 0.999)
+        makers = _uniform(key + 3, slots) < 0.5
+        return [
+            {
+                "a": int(slots[i]), "p": _fmt(prices[i]), "q": _fmt(round(qtys[i], 3) + 0.001),
+                "f": int(slots[i]), "l": int(slots[i]), "T": int(times[i]), "m": bool(makers[i]),
+            }
+            for i in range(count)
+        ]
+
+    def exchange_info(self, now_ms: int) -> Dict[str, Any]:
+        """/fapi/v1/exchangeInfo（最小子集）"""
+        return {
+            "timezone": "UTC",
+            "serverTime": now_ms,
+            "rateLimits": [],
+            "symbols": [
+                {
+                    "symbol": symbol,
+                    "pair": symbol,
+                    "contractType": "PERPETUAL",
+                    "status": "TRADING",
+                    "baseAsset": symbol[:-4],
+                    "quoteAsset": "USDT",
+                    "marginAsset": "USDT",
+                    "pricePrecision": max(0, int(-np.log10(self.tick_size(symbol)))),
+                    "filters": [{"filterType": "PRICE_FILTER", "tickSize": _fmt(self.tick_size(symbol))}],
+                }
+                for symbol in self.symbols
+            ],
+        }
+
+
+def _diff_side(prev_p: np.ndarray, prev_q: np.ndarray, curr_p: np.ndarray, curr_q: np.ndarray) -> List[list]:
+    """单边差分：新增/数量变化的价位 + 移出的价位（数量0）"""
+    prev = dict(zip(np.round(prev_p, 10), prev_q))
+    curr = dict(zip(np.round(curr_p, 10), curr_q))
+    changes = [[_fmt(p), _fmt(q)] for p, q in curr.items() if prev.get(p) != q]
+    changes.extend([_fmt(p), "0"] for p in prev if p not in curr)
+    return changes
+
+
+# ==================== 录制数据回放 ====================
+
+class RecordedMarket(SyntheticMarket):
+    """
+    录制文件回放（目录结构与scripts/binance_standin.py record一致）:
+        {directory}/klines/{SYMBOL}_{interval}.json    Binance K线数组
+        {directory}/funding/{SYMBOL}.json              资金费率历史
+        {directory}/oi/{SYMBOL}_{period}.json          OI历史
+
+    价格路径取录制K线中最细周期的收盘价线性插值（订单簿/成交/标记价格围绕它合成），
+    缺失的数据类型回退到SyntheticMarket
+    """
+
+    def __init__(self, directory: str, seed: int = 42, symbols: Optional[List[str]] = None):
+        self.directory = Path(directory)
+        self._klines: Dict[Tuple[str, str], List[list]] = {}
+        self._funding: Dict[str, List[Dict]] = {}
+        self._oi: Dict[Tuple[str, str], List[Dict]] = {}
+        self._price_path: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        for path in sorted((self.directory / "klines").glob("*.json")):
+            symbol, interval = path.stem.rsplit("_", 1)
+            self._klines[(symbol, interval)] = sorted(json.loads(path.read_text()), key=lambda r: r[0])
+        for path in sorted((self.directory / "funding").glob("*.json")):
+            self._funding[path.stem] = sorted(json.loads(path.read_text()), key=lambda r: r["fundingTime"])
+        for path in sorted((self.directory / "oi").glob("*.json")):
+            symbol, period = path.stem.rsplit("_", 1)
+            self._oi[(symbol, period)] = sorted(json.loads(path.read_text()), key=lambda r: r["timestamp"])
+
+        recorded_symbols = sorted({symbol for symbol, _ in self._klines})
+        super().__init__(seed=seed, symbols=symbols or recorded_symbols or None)
+
+        for symbol in recorded_symbols:
+            finest = min(
+                (interval for s, interval in self._klines if s == symbol),
+                key=interval_to_ms
+            )
+            rows = self._klines[(symbol, finest)]
+            self._price_path[symbol] = (
+                np.array([r[6] + 1 for r in rows], dtype=np.float64),
+                np.array([float(r[4]) for r in rows], dtype=np.float64),
+            )
+
+        logger.info(
+            f"RecordedMarket loaded: {len(self._klines)} kline files, "
+            f"{len(self._funding)} funding, {len(self._oi)} oi ({self.directory})"
+        )
+
+    def base_price(self, symbol: str) -> float:
+        path = self._price_path.get(symbol)
+        return float(path[1][0]) if path is not None else super().base_price(symbol)
+
+    def price_at(self, symbol: str, times_ms: Any) -> np.ndarray:
+        path = self._price_path.get(symbol)
+        if path is None:
+            return super().price_at(symbol, times_ms)
+        return np.interp(np.asarray(times_ms, dtype=np.float64), path[0], path[1])
+
+    def klines(self, symbol, interval, start_time, end_time, limit, now_ms):
+        rows = self._klines.get((symbol, interval))
+        if rows is None:
+            return super().klines(symbol, interval, start_time, end_time, limit, now_ms)
+        upper = min(end_time, now_ms) if end_time is not None else now_ms
+        return _window(rows, lambda r: r[0], start_time, upper, limit)
+
+    def funding_history(self, symbol, start_time, end_time, limit, now_ms):
+        rows = self._funding.get(symbol)
+        if rows is None:
+            return super().funding_history(symbol, start_time, end_time, limit, now_ms)
+        upper = min(end_time, now_ms) if end_time is not None else now_ms
+        return _window(rows, lambda r: r["fundingTime"], start_time, upper, limit)
+
+    def open_interest_hist(self, symbol, period, start_time, end_time, limit, now_ms):
+        rows = self._oi.get((symbol, period))
+        if rows is None:
+            return super().open_interest_hist(symbol, period, start_time, end_time, limit, now_ms)
+        upper = min(end_time, now_ms) if end_time is not None else now_ms
+        return _window(rows, lambda r: r["timestamp"], start_time, upper, limit)
+
+
+def _window(rows: List[Any], key, start_time: Optional[int], upper: int, limit: int) -> List[Any]:
+    """录制记录按时间窗口截取（startTime优先取前limit条，否则取截至upper的最后limit条）"""
+    selected = [r for r in rows if key(r) <= upper and (start_time is None or key(r) >= start_time)]
+    return selected[:limit] if start_time is not None else selected[-limit:]
@@ -0,0 +1,596 @@
+# coding: utf-8
+"""
+Binance Stand-in v1.0 - Local REST / WebSocket Server
+币安替身服务 - 本地REST与WebSocket服务（离线基准测试与集成测试）
+
+功能：
+1. REST（单端口）：/fapi/v1/{time,exchangeInfo,klines,premiumIndex,ticker/24hr,fundingRate,
+   depth,aggTrades,openInterest}、/futures/data/openInterestHist、/api/v3/{klines,ticker/price}
+2. WebSocket：/ws/<stream>[/<stream>...]（原始推送）与 /stream?streams=...（combined包装）
+   - <symbol>@kline_<interval>、<symbol>@markPrice[@1s]、<symbol>@depth<N>[@100ms|@500ms]
+   - <symbol>@depth[@100ms|@500ms]（差分，U/u/pu与REST快照lastUpdateId对齐）、<symbol>@aggTrade
+3. 故障注入：固定延迟+抖动、X-MBX-USED-WEIGHT-1M权重头、超限429 + Retry-After、
+   按比例随机注入429、连续429后418封禁、WebSocket定时断线
+4. 时钟：实时时钟 + 偏移，或从replay_start_ms起按replay_speed倍速回放（配合录制数据）
+
+使用：
+    server = BinanceStandinServer(config)
+    base_url = server.start_in_thread()        # 如 http://127.0.0.1:8765
+    os.environ["ATS_BINANCE_STANDIN"] = base_url  # 在导入ats_core.sources.binance之前设置
+    ...
+    server.stop_thread()
+
+配置驱动（config/params.json -> binance_standin）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import WSMsgType, web
+
+from ats_core.sources.standin.market import (
+    BOOK_BUCKET_MS,
+    RecordedMarket,
+    SyntheticMarket,
+    bar_open_time,
+    interval_to_ms,
+)
+
+logger = logging.getLogger(__name__)
+
+WEIGHT_WINDOW_MS = 60_000
+
+
+class StandinClock:
+    """
+    替身服务时钟
+
+    - replay_start_ms=None：当前时间 + clock_offset_ms
+    - replay_start_ms指定：服务启动时刻对应replay_start_ms，之后按replay_speed倍速前进
+    """
+
+    def __init__(self, clock_offset_ms: int = 0, replay_start_ms: Optional[int] = None, replay_speed: float = 1.0):
+        self.clock_offset_ms = clock_offset_ms
+        self.replay_start_ms = replay_start_ms
+        self.replay_speed = replay_speed
+        self._wall_start = time.time()
+
+    def now_ms(self) -> int:
+        if self.replay_start_ms is None:
+            return int(time.time() * 1000) + self.clock_offset_ms
+        elapsed = (time.time() - self._wall_start) * self.replay_speed
+        return int(self.replay_start_ms + elapsed * 1000)
+
+    def wall_seconds(self, market_ms: int) -> float:
+        """市场时间间隔 → 实际等待秒数"""
+        speed = self.replay_speed if self.replay_start_ms is not None else 1.0
+        return market_ms / 1000.0 / max(speed, 1e-9)
+
+
+class BinanceApiError(Exception):
+    """Binance风格错误响应（HTTP状态码 + code/msg）"""
+
+    def __init__(self, status: int, code: int, msg: str):
+        super().__init__(msg)
+        self.status = status
+        self.code = code
+        self.msg = msg
+
+
+class BinanceStandinServer:
+    """
+    本地币安替身服务（aiohttp.web，REST与WebSocket共用一个端口）
+
+    配置驱动（config/params.json -> binance_standin）:
+    - host / port: 监听地址（port=0时自动分配）
+    - seed / symbols: 合成行情参数
+    - data_dir: 录制数据目录（null=纯合成）
+    - latency_ms / latency_jitter_ms: 每个REST请求的人工延迟
+    - weight_limit_1m: 每分钟权重上限（超限返回429）
+    - inject_429_rate: 随机注入429的比例（0~1，按seed可复现）
+    - ban_after_429: 连续N次429后返回418（0=不封禁），封禁持续retry_after_seconds后解除
+    - retry_after_seconds: 429/418响应的Retry-After
+    - clock_offset_ms / replay_start_ms / replay_speed: 时钟（见StandinClock）
+    - ws_kline_push_ms / ws_mark_push_ms: K线与标记价格推送间隔
+    - ws_disconnect_after_seconds: WebSocket连接N秒后由服务端断开（0=不断开）
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, market: Optional[SyntheticMarket] = None):
+        """
+        Args:
+            config: 替身服务配置
+            market: 行情数据源（None时按data_dir/seed自动创建）
+        """
+        config = config or {}
+
+        # §6.2 配置化：所有参数从配置读取，提供默认值
+        self.host = config.get("host", "127.0.0.1")
+        self.port = config.get("port", 8765)
+        self.latency_ms = config.get("latency_ms", 0.0)
+        self.latency_jitter_ms = config.get("latency_jitter_ms", 0.0)
+        self.weight_limit_1m = config.get("weight_limit_1m", 2400)
+        self.inject_429_rate = config.get("inject_429_rate", 0.0)
+        self.ban_after_429 = config.get("ban_after_429", 0)
+        self.retry_after_seconds = config.get("retry_after_seconds", 5)
+        self.ws_kline_push_ms = config.get("ws_kline_push_ms", 250)
+        self.ws_mark_push_ms = config.get("ws_mark_push_ms", 3000)
+        self.ws_disconnect_after_seconds = config.get("ws_disconnect_after_seconds", 0)
+
+        seed = config.get("seed", 42)
+        if market is None:
+            data_dir = config.get("data_dir")
+            symbols = config.get("symbols")
+            market = RecordedMarket(data_dir, seed=seed, symbols=symbols) if data_dir else SyntheticMarket(seed, symbols)
+        self.market = market
+        self.clock = StandinClock(
+            clock_offset_ms=config.get("clock_offset_ms", 0),
+            replay_start_ms=config.get("replay_start_ms"),
+            replay_speed=config.get("replay_speed", 1.0),
+        )
+
+        self._fault_rng = random.Random(seed)
+        self._latency_rng = random.Random(seed + 1)
+        self._window_start = 0
+        self._used_weight = 0
+        self._consecutive_429 = 0
+        self._banned_until_ms = 0
+        self.stats = {"requests": 0, "rejected_429": 0, "rejected_418": 0, "ws_connections": 0, "ws_messages": 0}
+
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ws_clients: set = set()
+
+    # ==================== 生命周期 ====================
+
+    def build_app(self) -> web.Application:
+        """构建aiohttp应用（路由 + 延迟/限流中间件）"""
+        app = web.Application(middlewares=[self._middleware])
+        rest_routes: List[Tuple[str, Callable]] = [
+            ("/fapi/v1/ping", self._ping),
+            ("/fapi/v1/time", self._time),
+            ("/fapi/v1/exchangeInfo", self._exchange_info),
+            ("/fapi/v1/klines", self._klines),
+            ("/fapi/v1/premiumIndex", self._premium_index),
+            ("/fapi/v1/ticker/24hr", self._ticker_24h),
+            ("/fapi/v1/fundingRate", self._funding_rate),
+            ("/fapi/v1/depth", self._depth),
+            ("/fapi/v1/aggTrades", self._agg_trades),
+            ("/fapi/v1/openInterest", self._open_interest),
+            ("/futures/data/openInterestHist", self._open_interest_hist),
+            ("/api/v3/klines", self._klines),
+            ("/api/v3/ticker/price", self._spot_ticker_price),
+        ]
+        for path, handler in rest_routes:
+            app.router.add_get(path, handler)
+        app.router.add_get("/ws/{streams:.+}", self._ws_raw)
+        app.router.add_get("/stream", self._ws_combined)
+        return app
+
+    async def start(self) -> str:
+        """在当前事件循环中启动，返回base_url"""
+        self._runner = web.AppRunner(self.build_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"Binance stand-in listening on {self.base_url}")
+        return self.base_url
+
+    async def stop(self) -> None:
+        """停止服务（关闭所有WebSocket连接）"""
+        for ws in list(self._ws_clients):
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def start_in_thread(self, timeout: float = 10.0) -> str:
+        """
+        在后台线程中启动（供同步代码/基准测试使用）
+
+        Returns:
+            base_url
+        """
+        started = threading.Event()
+        errors: List[BaseException] = []
+
+        def _run() -> None:
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.start())
+            except BaseException as e:  # 启动失败时通知调用方
+                errors.append(e)
+                started.set()
+                return
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_run, name="binance-standin", daemon=True)
+        self._thread.start()
+        if not started.wait(timeout):
+            raise TimeoutError("Binance stand-in failed to start")
+        if errors:
+            raise errors[0]
+        return self.base_url
+
+    def stop_thread(self) -> None:
+        """停止后台线程中的服务"""
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+            self._thread = None
+            self._loop = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_base_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    # ==================== 中间件：延迟 / 权重 / 故障注入 ====================
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler: Callable) -> web.StreamResponse:
+        if request.path.startswith("/ws/") or request.path == "/stream":
+            return await handler(request)
+
+        self.stats["requests"] += 1
+        delay_ms = self.latency_ms + self._latency_rng.uniform(0, self.latency_jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000.0)
+
+        now_ms = int(time.time() * 1000)
+        if now_ms - self._window_start >= WEIGHT_WINDOW_MS:
+            self._window_start = now_ms - now_ms % WEIGHT_WINDOW_MS
+            self._used_weight = 0
+        self._used_weight += _request_weight(request.path, request.query)
+
+        if self.ban_after_429 and self._consecutive_429 >= self.ban_after_429:
+            # 进入封禁：Retry-After到期后解除，计数清零
+            self._banned_until_ms = now_ms + int(self.retry_after_seconds * 1000)
+            self._consecutive_429 = 0
+        if now_ms < self._banned_until_ms:
+            self.stats["rejected_418"] += 1
+            return self._limit_response(418, -1003, "Way too many requests; IP banned.")
+        if self._used_weight > self.weight_limit_1m:
+            return self._limit_response(429, -1003, "Too many requests; current limit is %d request weight per 1 MINUTE." % self.weight_limit_1m)
+        if self.inject_429_rate > 0 and self._fault_rng.random() < self.inject_429_rate:
+            return self._limit_response(429, -1003, "Too many requests (injected).")
+        self._consecutive_429 = 0
+
+        try:
+            response = await handler(request)
+        except BinanceApiError as e:
+            response = web.json_response({"code": e.code, "msg": e.msg}, status=e.status)
+        self._add_weight_headers(response)
+        return response
+
+    def _limit_response(self, status: int, code: int, msg: str) -> web.Response:
+        if status == 429:
+            self.stats["rejected_429"] += 1
+            self._consecutive_429 += 1
+        response = web.json_response({"code": code, "msg": msg}, status=status)
+        retry_after = self.retry_after_seconds
+        if status == 418:
+            # 封禁期间返回剩余时长（至少1秒）
+            retry_after = max(1, math.ceil((self._banned_until_ms - time.time() * 1000) / 1000))
+        response.headers["Retry-After"] = str(retry_after)
+        self._add_weight_headers(response)
+        return response
+
+    def _add_weight_headers(self, response: web.StreamResponse) -> None:
+        response.headers["X-MBX-USED-WEIGHT-1M"] = str(self._used_weight)
+        response.headers["X-MBX-USED-WEIGHT"] = str(self._used_weight)
+
+    # ==================== REST ====================
+
+    async def _ping(self, request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    async def _time(self, request: web.Request) -> web.Response:
+        return web.json_response({"serverTime": self.clock.now_ms()})
+
+    async def _exchange_info(self, request: web.Request) -> web.Response:
+        return web.json_response(self.market.exchange_info(self.clock.now_ms()))
+
+    async def _klines(self, request: web.Request) -> web.Response:
+        q = request.query
+        symbol = _require_symbol(q)
+        interval = q.get("interval", "")
+        try:
+            interval_to_ms(interval)
+        except ValueError:
+            raise BinanceApiError(400, -1120, "Invalid interval.")
+        max_limit = 1000 if request.path.startswith("/api/") else 1500
+        limit = _int_param(q, "limit", 500, 1, max_limit)
+        rows = self.market.klines(
+            symbol, interval, _opt_int(q, "startTime"), _opt_int(q, "endTime"), limit, self.clock.now_ms()
+        )
+        return web.json_response(rows)
+
+    async def _premium_index(self, request: web.Request) -> web.Response:
+        now_ms = self.clock.now_ms()
+        symbol = request.query.get("symbol")
+        if symbol:
+            return web.json_response(self.market.premium_index(symbol.upper(), now_ms))
+        return web.json_response([self.market.premium_index(s, now_ms) for s in self.market.symbols])
+
+    async def _ticker_24h(self, request: web.Request) -> web.Response:
+        now_ms = self.clock.now_ms()
+        symbol = request.query.get("symbol")
+        if symbol:
+            return web.json_response(self.market.ticker_24h(symbol.upper(), now_ms))
+        return web.json_response([self.market.ticker_24h(s, now_ms) for s in self.market.symbols])
+
+    async def _funding_rate(self, request: web.Request) -> web.Response:
+        q = request.query
+        rows = self.market.funding_history(
+            _require_symbol(q), _opt_int(q, "startTime"), _opt_int(q, "endTime"),
+            _int_param(q, "limit", 100, 1, 1000), self.clock.now_ms()
+        )
+        return web.json_response(rows)
+
+    async def _depth(self, request: web.Request) -> web.Response:
+        q = request.query
+        limit = _int_param(q, "limit", 500, 5, 1000)
+        return web.json_response(self.market.depth_snapshot(_require_symbol(q), limit, self.clock.now_ms()))
+
+    async def _agg_trades(self, request: web.Request) -> web.Response:
+        q = request.query
+        rows = self.market.agg_trades(
+            _require_symbol(q), _opt_int(q, "startTime"), _opt_int(q, "endTime"),
+            _opt_int(q, "fromId"), _int_param(q, "limit", 500, 1, 1000), self.clock.now_ms()
+        )
+        return web.json_response(rows)
+
+    async def _open_interest(self, request: web.Request) -> web.Response:
+        symbol = _require_symbol(request.query)
+        now_ms = self.clock.now_ms()
+        oi = float(self.market.open_interest_at(symbol, [now_ms])[0])
+        return web.json_response({"symbol": symbol, "openInterest": f"{oi:.3f}", "time": now_ms})
+
+    async def _open_interest_hist(self, request: web.Request) -> web.Response:
+        q = request.query
+        period = q.get("period", "")
+        if period not in ("5m", "15m", "30m", "1h", "2h", "4h", "6h", "12h", "1d"):
+            raise BinanceApiError(400, -1120, "Invalid period.")
+        rows = self.market.open_interest_hist(
+            _require_symbol(q), period, _opt_int(q, "startTime"), _opt_int(q, "endTime"),
+            _int_param(q, "limit", 30, 1, 500), self.clock.now_ms()
+        )
+        return web.json_response(rows)
+
+    async def _spot_ticker_price(self, request: web.Request) -> web.Response:
+        now_ms = self.clock.now_ms()
+        symbol = request.query.get("symbol")
+        symbols = [symbol.upper()] if symbol else self.market.symbols
+        rows = [{"symbol": s, "price": f"{float(self.market.price_at(s, [now_ms])[0]):.8f}"} for s in symbols]
+        return web.json_response(rows[0] if symbol else rows)
+
+    # ==================== WebSocket ====================
+
+    async def _ws_raw(self, request: web.Request) -> web.WebSocketResponse:
+        return await self._serve_ws(request, request.match_info["streams"].split("/"), combined=False)
+
+    async def _ws_combined(self, request: web.Request) -> web.WebSocketResponse:
+        streams = [s for s in request.query.get("streams", "").split("/") if s]
+        return await self._serve_ws(request, streams, combined=True)
+
+    async def _serve_ws(self, request: web.Request, streams: List[str], combined: bool) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=None)
+        await ws.prepare(request)
+        self._ws_clients.add(ws)
+        self.stats["ws_connections"] += 1
+
+        async def send(stream: str, data: Dict[str, Any]) -> None:
+            payload = {"stream": stream, "data": data} if combined else data
+            await ws.send_str(json.dumps(payload))
+            self.stats["ws_messages"] += 1
+
+        tasks = []
+        for stream in streams:
+            pusher = self._stream_pusher(stream)
+            if pusher is None:
+                logger.warning(f"Unsupported stream: {stream}")
+                continue
+            tasks.append(asyncio.ensure_future(pusher(stream, send)))
+        if self.ws_disconnect_after_seconds > 0:
+            tasks.append(asyncio.ensure_future(self._disconnect_later(ws)))
+
+        try:
+            async for msg in ws:  # 客户端消息（SUBSCRIBE等）仅确认，不改变订阅
+                if msg.type == WSMsgType.TEXT:
+                    try:
+                        request_id = json.loads(msg.data).get("id")
+                    except (ValueError, AttributeError):
+                        request_id = None
+                    await ws.send_str(json.dumps({"result": None, "id": request_id}))
+                elif msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._ws_clients.discard(ws)
+        return ws
+
+    async def _disconnect_later(self, ws: web.WebSocketResponse) -> None:
+        await asyncio.sleep(self.ws_disconnect_after_seconds)
+        await ws.close()
+
+    def _stream_pusher(self, stream: str) -> Optional[Callable]:
+        """解析stream名称 → 推送协程"""
+        symbol_part, _, channel = stream.partition("@")
+        symbol = symbol_part.upper()
+        if not channel:
+            return None
+        parts = channel.split("@")
+        name = parts[0]
+        speed_ms = 500 if "500ms" in parts[1:] else 100 if "100ms" in parts[1:] else 250
+
+        if name.startswith("kline_"):
+            interval = name[len("kline_"):]
+            try:
+                interval_to_ms(interval)
+            except ValueError:
+                return None
+            return lambda s, send: self._push_kline(symbol, interval, s, send)
+        if name == "markPrice":
+            period_ms = 1000 if "1s" in parts[1:] else self.ws_mark_push_ms
+            return lambda s, send: self._push_mark_price(symbol, period_ms, s, send)
+        if name == "depth":
+            return lambda s, send: self._push_depth_diff(symbol, speed_ms, s, send)
+        if name.startswith("depth") and name[len("depth"):].isdigit():
+            levels = int(name[len("depth"):])
+            return lambda s, send: self._push_partial_depth(symbol, levels, speed_ms, s, send)
+        if name == "aggTrade":
+            return lambda s, send: self._push_agg_trades(symbol, s, send)
+        return None
+
+    async def _push_kline(self, symbol: str, interval: str, stream: str, send: Callable) -> None:
+        """K线推送：当前K线每ws_kline_push_ms推送一次；跨越收盘时先推送x=true的收盘K线"""
+        step = interval_to_ms(interval)
+        current_open: Optional[int] = None
+        while True:
+            now_ms = self.clock.now_ms()
+            open_time = bar_open_time(now_ms, interval)
+            if current_open is not None and open_time != current_open:
+                closed = self.market.klines(symbol, interval, current_open, current_open, 1, now_ms)
+                if closed:
+                    await send(stream, _kline_event(symbol, interval, closed[0], now_ms, True))
+            current_open = open_time
+            row = self.market.klines(symbol, interval, open_time, now_ms, 1, now_ms)
+            if row:
+                await send(stream, _kline_event(symbol, interval, row[0], now_ms, row[0][6] < now_ms))
+            await asyncio.sleep(self.clock.wall_seconds(min(self.ws_kline_push_ms, step)))
+
+    async def _push_mark_price(self, symbol: str, period_ms: int, stream: str, send: Callable) -> None:
+        while True:
+            now_ms = self.clock.now_ms()
+            index = self.market.premium_index(symbol, now_ms)
+            await send(stream, {
+                "e": "markPriceUpdate", "E": now_ms, "s": symbol,
+                "p": index["markPrice"], "i": index["indexPrice"], "P": index["estimatedSettlePrice"],
+                "r": index["lastFundingRate"], "T": index["nextFundingTime"],
+            })
+            await asyncio.sleep(self.clock.wall_seconds(period_ms))
+
+    async def _push_partial_depth(self, symbol: str, levels: int, speed_ms: int, stream: str, send: Callable) -> None:
+        prev_bucket: Optional[int] = None
+        while True:
+            now_ms = self.clock.now_ms()
+            bucket = self.market.book_bucket(now_ms)
+            snapshot = self.market.depth_snapshot(symbol, levels, now_ms)
+            await send(stream, {
+                "e": "depthUpdate", "E": now_ms, "T": now_ms, "s": symbol,
+                "U": (prev_bucket or bucket - 1) + 1, "u": bucket, "pu": prev_bucket or bucket - 1,
+                "b": snapshot["bids"], "a": snapshot["asks"],
+            })
+            prev_bucket = bucket
+            await asyncio.sleep(self.clock.wall_seconds(speed_ms))
+
+    async def _push_depth_diff(self, symbol: str, speed_ms: int, stream: str, send: Callable) -> None:
+        """
+        差分深度（1000档范围）：事件覆盖版本区间(pu, u]，U=pu+1；
+        REST快照lastUpdateId=L时，丢弃u<L的事件，首个事件满足U<=L<=u
+        """
+        prev_bucket = self.market.book_bucket(self.clock.now_ms()) - 1
+        while True:
+            await asyncio.sleep(self.clock.wall_seconds(speed_ms))
+            now_ms = self.clock.now_ms()
+            bucket = self.market.book_bucket(now_ms)
+            if bucket <= prev_bucket:
+                continue
+            bids, asks = self.market.depth_diff(symbol, prev_bucket, bucket, 1000)
+            await send(stream, {
+                "e": "depthUpdate", "E": now_ms, "T": bucket * BOOK_BUCKET_MS, "s": symbol,
+                "U": prev_bucket + 1, "u": bucket, "pu": prev_bucket, "b": bids, "a": asks,
+            })
+            prev_bucket = bucket
+
+    async def _push_agg_trades(self, symbol: str, stream: str, send: Callable) -> None:
+        """归集成交：每秒推送上一秒的成交"""
+        last_second = self.clock.now_ms() // 1000
+        while True:
+            await asyncio.sleep(self.clock.wall_seconds(1000))
+            now_second = self.clock.now_ms() // 1000
+            for second in range(last_second, now_second):
+                for trade in self.market._second_trades(symbol, second):
+                    await send(stream, dict(trade, e="aggTrade", E=trade["T"], s=symbol))
+            last_second = now_second
+
+
+# ==================== 工具函数 ====================
+
+def _request_weight(path: str, query: Any) -> int:
+    """Binance文档中的请求权重（按端点与limit）"""
+    if path.startswith("/futures/data/"):
+        return 0  # 不计入REQUEST_WEIGHT（合约数据端点单独按IP限频）
+    limit = int(query.get("limit", 0) or 0)
+    has_symbol = "symbol" in query
+    if path.endswith("/klines"):
+        if path.startswith("/api/"):
+            return 2
+        limit = limit or 500
+        return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+    if path == "/fapi/v1/depth":
+        limit = limit or 500
+        return 2 if limit <= 50 else 5 if limit <= 100 else 10 if limit <= 500 else 20
+    if path == "/fapi/v1/ticker/24hr":
+        return 1 if has_symbol else 40
+    if path == "/fapi/v1/premiumIndex":
+        return 1 if has_symbol else 10
+    if path == "/api/v3/ticker/price":
+        return 2 if has_symbol else 4
+    if path == "/fapi/v1/aggTrades":
+        return 20
+    return 1
+
+
+def _kline_event(symbol: str, interval: str, row: list, now_ms: int, closed: bool) -> Dict[str, Any]:
+    return {
+        "e": "kline", "E": now_ms, "s": symbol,
+        "k": {
+            "t": row[0], "T": row[6], "s": symbol, "i": interval, "f": 0, "L": 0,
+            "o": row[1], "c": row[4], "h": row[2], "l": row[3], "v": row[5], "n": row[8],
+            "x": closed, "q": row[7], "V": row[9], "Q": row[10], "B": "0",
+        },
+    }
+
+
+def _require_symbol(query: Any) -> str:
+    symbol = query.get("symbol")
+    if not symbol:
+        raise BinanceApiError(400, -1102, "Mandatory parameter 'symbol' was not sent, was empty/null, or malformed.")
+    return symbol.upper()
+
+
+def _opt_int(query: Any, key: str) -> Optional[int]:
+    value = query.get(key)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise BinanceApiError(400, -1100, f"Illegal characters found in parameter '{key}'.")
+
+
+def _int_param(query: Any, key: str, default: int, minimum: int, maximum: int) -> int:
+    value = _opt_int(query, key)
+    return default if value is None else max(minimum, min(value, maximum))
@@ -0,0 +1,396 @@
+# coding: utf-8
+"""
+Binance请求权重预算（进程级，线程安全 + asyncio友好）
+
+背景：
+- 之前 binance_safe.RateLimiter、utils.rate_limiter.binance_rate_limit、
+  BinanceFuturesClient（无限流，只靠sleep）各自计数，互相不可见，
+  并发阶段合计可能超过IP权重上限
+- 现在所有REST调用（sources/binance*、BinanceFuturesClient）都先向同一预算申请权重
+
+机制：
+- 按Binance规则以自然分钟为窗口计数（合约fapi与现货api分别计数）
+- 合约数据端点 /futures/data/*（OI历史、多空比等）不计入REQUEST_WEIGHT（不在
+  X-MBX-USED-WEIGHT中），单独按IP限频（默认每5分钟1000次），使用独立窗口futures_data，
+  不参与响应头对账，429只暂停该窗口
+- 端点权重：endpoint_weight(path, params)，按官方文档（klines/depth按limit分档等）
+- 与服务端对账：响应头 X-MBX-USED-WEIGHT-1M 高于本地计数时以服务端为准；
+  429/418 的 Retry-After 期间所有申请暂停
+- 优先级：TRADING（下单/账户） > LIVE（实时扫描，默认） > BACKFILL（回填/预热）
+  低优先级只能用到上限的一定比例（priority_caps），并且有更高优先级在等待时让行
+- 指标：get_stats() 返回各窗口已用权重、利用率、各优先级等待次数/时长、429次数
+- 等待计量：measure_budget_wait(meter) 范围内的申请把等待时长累加到meter
+  （供调用方从请求延迟/时限中扣除预算等待，例如AdaptiveFanout）
+
+优先级设置：
+    with traffic_priority(Priority.BACKFILL):   # 同步代码 / asyncio任务内均可
+        ...
+
+配置（config/params.json -> binance_weight_budget）
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+import urllib.parse
+from enum import IntEnum
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """请求优先级（数值越小越优先）"""
+    TRADING = 0
+    LIVE = 1
+    BACKFILL = 2
+
+
+DEFAULT_CONFIG = {
+    "fapi_limit_1m": 2400,
+    "spot_limit_1m": 6000,
+    "futures_data_limit_5m": 1000,
+    "safety_ratio": 0.9,
+    "priority_caps": {"trading": 1.0, "live": 0.9, "backfill": 0.7},
+    "max_wait_sec": 120.0,
+}
+
+_priority_var: contextvars.ContextVar[Optional[Priority]] = contextvars.ContextVar(
+    "binance_traffic_priority", default=None
+)
+
+
+@contextlib.contextmanager
+def traffic_priority(priority: Priority):
+    """在当前线程/asyncio任务内设置请求优先级"""
+    token = _priority_var.set(priority)
+    try:
+        yield
+    finally:
+        _priority_var.reset(token)
+
+
+class BudgetWaitMeter:
+    """累计一次调用在权重预算上的等待时长（进行中的等待也计入）"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._since: Optional[float] = None
+
+    def waited(self, now: Optional[float] = None) -> float:
+        since = self._since
+        if since is None:
+            return self.seconds
+        return self.seconds + (time.monotonic() if now is None else now) - since
+
+
+_wait_meter_var: contextvars.ContextVar[Optional[BudgetWaitMeter]] = contextvars.ContextVar(
+    "binance_budget_wait_meter", default=None
+)
+
+
+@contextlib.contextmanager
+def measure_budget_wait(meter: BudgetWaitMeter):
+    """在当前线程/asyncio任务内把预算等待时长累加到meter"""
+    token = _wait_meter_var.set(meter)
+    try:
+        yield meter
+    finally:
+        _wait_meter_var.reset(token)
+
+
+def current_priority(default: Priority = Priority.LIVE) -> Priority:
+    value = _priority_var.get()
+    return default if value is None else value
+
+
+def budget_key(url_or_path: str) -> str:
+    """现货 /api/、合约 /fapi/ 与合约数据 /futures/data/ 分别计数"""
+    path = urllib.parse.urlsplit(url_or_path).path if "://" in url_or_path else url_or_path
+    if path.startswith("/api/"):
+        return "spot"
+    if path.startswith("/futures/data/"):
+        return "futures_data"
+    return "fapi"
+
+
+def endpoint_weight(path: str, params: Optional[Mapping[str, Any]] = None) -> int:
+    """Binance文档中的请求权重（按端点与limit）"""
+    if "://" in path:
+        path = urllib.parse.urlsplit(path).path
+    params = params or {}
+    limit = int(params.get("limit", 0) or 0)
+    has_symbol = params.get("symbol") is not None
+    if path.endswith("/klines"):
+        if path.startswith("/api/"):
+            return 2
+        limit = limit or 500
+        return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+    if path in ("/fapi/v1/depth", "/api/v3/depth"):
+        limit = limit or 500
+        return 2 if limit <= 50 else 5 if limit <= 100 else 10 if limit <= 500 else 20
+    if path == "/fapi/v1/ticker/24hr":
+        return 1 if has_symbol else 40
+    if path == "/fapi/v1/premiumIndex":
+        return 1 if has_symbol else 10
+    if path == "/api/v3/ticker/price":
+        return 2 if has_symbol else 4
+    if path == "/fapi/v1/aggTrades":
+        return 20
+    if path == "/fapi/v1/forceOrders":
+        return 20 if has_symbol else 50
+    if path in ("/fapi/v2/account", "/fapi/v2/balance", "/fapi/v2/positionRisk"):
+        return 5
+    if path == "/fapi/v1/openOrders":
+        return 1 if has_symbol else 40
+    return 1
+
+
+def default_priority_for(signed: bool = False) -> Priority:
+    """未显式设置优先级时：签名请求（下单/账户）按TRADING，其余按上下文（默认LIVE）"""
+    explicit = _priority_var.get()
+    if explicit is not None:
+        return explicit
+    return Priority.TRADING if signed else Priority.LIVE
+
+
+class BudgetExceeded(RuntimeError):
+    """等待超过max_wait_sec仍未获得权重"""
+
+
+class _Window:
+    def __init__(self, limit: int, period_sec: int = 60, reconcile: bool = True):
+        self.limit = limit
+        self.period_sec = period_sec
+        self.reconcile = reconcile  # 是否按X-MBX-USED-WEIGHT-1M对账
+        self.minute = 0  # 当前窗口序号（now // period_sec）
+        self.used = 0
+        self.server_used = 0
+        self.granted = 0
+        self.blocked_until = 0.0  # 仅本窗口的429暂停（futures_data）
+
+    def roll(self, now: float) -> None:
+        minute = int(now // self.period_sec)
+        if minute != self.minute:
+            self.minute = minute
+            self.used = 0
+            self.server_used = 0
+
+    def next_window_in(self, now: float) -> float:
+        return (self.minute + 1) * self.period_sec - now + 0.05
+
+
+class WeightBudget:
+    """
+    进程级权重预算
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+
+        # §6.2 配置读取（带默认值）
+        safety = float(config.get("safety_ratio", 0.9))
+        self.max_wait_sec = float(config.get("max_wait_sec", 120.0))
+        caps = {**DEFAULT_CONFIG["priority_caps"], **config.get("priority_caps", {})}
+        self.priority_caps = {
+            Priority.TRADING: float(caps["trading"]),
+            Priority.LIVE: float(caps["live"]),
+            Priority.BACKFILL: float(caps["backfill"]),
+        }
+        self._windows = {
+            "fapi": _Window(int(config["fapi_limit_1m"] * safety)),
+            "spot": _Window(int(config["spot_limit_1m"] * safety)),
+            "futures_data": _Window(
+                int(config["futures_data_limit_5m"] * safety), period_sec=300, reconcile=False
+            ),
+        }
+
+        self._cond = threading.Condition()
+        self._blocked_until = 0.0
+        self._waiting = {p: 0 for p in Priority}
+        self.stats = {
+            "requests": {p.name.lower(): 0 for p in Priority},
+            "waits": {p.name.lower(): 0 for p in Priority},
+            "wait_seconds": {p.name.lower(): 0.0 for p in Priority},
+            "throttled": 0,
+            "banned": 0,
+            "reconciled": 0,
+        }
+
+    # ==================== 申请 ====================
+
+    def acquire(self, weight: int, priority: Priority = Priority.LIVE, key: str = "fapi") -> None:
+        """同步申请权重（阻塞直到可用，超过max_wait_sec抛出BudgetExceeded）"""
+        start = time.monotonic()
+        with self._cond:
+            delay = self._try_reserve_locked(weight, priority, key)
+            if delay == 0:
+                return
+            self._waiting[priority] += 1
+            meter = _start_meter(start)
+            try:
+                while delay > 0:
+                    if time.monotonic() - start + delay > self.max_wait_sec:
+                        raise BudgetExceeded(f"等待{key}权重超时（weight={weight}, priority={priority.name}）")
+                    self._cond.wait(delay)
+                    delay = self._try_reserve_locked(weight, priority, key)
+            finally:
+                self._waiting[priority] -= 1
+                self._record_wait_locked(priority, time.monotonic() - start)
+                _stop_meter(meter, start)
+
+    async def acquire_async(self, weight: int, priority: Priority = Priority.LIVE, key: str = "fapi") -> None:
+        """异步申请权重（不阻塞事件循环）"""
+        start = time.monotonic()
+        with self._cond:
+            delay = self._try_reserve_locked(weight, priority, key)
+            if delay == 0:
+                return
+            self._waiting[priority] += 1
+        meter = _start_meter(start)
+        try:
+            while delay > 0:
+                if time.monotonic() - start + delay > self.max_wait_sec:
+                    raise BudgetExceeded(f"等待{key}权重超时（weight={weight}, priority={priority.name}）")
+                await asyncio.sleep(min(delay, 0.25))
+                with self._cond:
+                    delay = self._try_reserve_locked(weight, priority, key)
+        finally:
+            with self._cond:
+                self._waiting[priority] -= 1
+                self._record_wait_locked(priority, time.monotonic() - start)
+            _stop_meter(meter, start)
+
+    def _try_reserve_locked(self, weight: int, priority: Priority, key: str) -> float:
+        """能预留则记账并返回0，否则返回建议等待秒数"""
+        now = time.time()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        window = self._windows[key]
+        if now < window.blocked_until:
+            return window.blocked_until - now
+        window.roll(now)
+        next_minute = window.next_window_in(now)
+
+        # 有更高优先级在等待时让行
+        if any(self._waiting[p] for p in Priority if p < priority):
+            return min(0.05, next_minute)
+
+        cap = int(window.limit * self.priority_caps[priority])
+        if window.used + weight > cap and window.used > 0:
+            return next_minute
+
+        window.used += weight
+        window.granted += weight
+        self.stats["requests"][priority.name.lower()] += 1
+        return 0.0
+
+    def _record_wait_locked(self, priority: Priority, seconds: float) -> None:
+        name = priority.name.lower()
+        self.stats["waits"][name] += 1
+        self.stats["wait_seconds"][name] += seconds
+
+    # ==================== 对账 ====================
+
+    def observe(self, status: int, headers: Optional[Mapping[str, str]], key: str = "fapi") -> None:
+        """
+        根据响应对账
+
+        - X-MBX-USED-WEIGHT-1M：服务端计数高于本地时以服务端为准（futures_data不对账）
+        - 429/418：按Retry-After暂停全部申请（缺省60秒）；futures_data的429只暂停该窗口
+        """
+        used = _header(headers, "X-MBX-USED-WEIGHT-1M")
+        retry_after = _header(headers, "Retry-After")
+        with self._cond:
+            window = self._windows[key]
+            window.roll(time.time())
+            if used is not None and window.reconcile:
+                window.server_used = used
+                if used > window.used:
+                    window.used = used
+                    self.stats["reconciled"] += 1
+            if status in (418, 429):
+                pause = float(retry_after) if retry_after is not None else 60.0
+                self.stats["banned" if status == 418 else "throttled"] += 1
+                if status == 429 and not window.reconcile:
+                    window.blocked_until = max(window.blocked_until, time.time() + pause)
+                    logger.warning(f"Binance返回429（{key}），该类请求暂停{pause:.0f}秒")
+                else:
+                    self._blocked_until = max(self._blocked_until, time.time() + pause)
+                    logger.warning(f"Binance返回{status}，全部请求暂停{pause:.0f}秒")
+            self._cond.notify_all()
+
+    # ==================== 指标 ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.time()
+            windows = {}
+            for key, window in self._windows.items():
+                window.roll(now)
+                windows[key] = {
+                    "used": window.used,
+                    "server_used": window.server_used,
+                    "limit": window.limit,
+                    "utilization": round(window.used / window.limit, 4) if window.limit else 0.0,
+                    "granted_total": window.granted,
+                }
+            return {
+                "windows": windows,
+                "blocked_for_sec": round(max(0.0, self._blocked_until - now), 2),
+                "waiting": {p.name.lower(): n for p, n in self._waiting.items()},
+                **{k: (dict(v) if isinstance(v, dict) else v) for k, v in self.stats.items()},
+            }
+
+
+def _start_meter(start: float) -> Optional[BudgetWaitMeter]:
+    meter = _wait_meter_var.get()
+    if meter is not None:
+        meter._since = start
+    return meter
+
+
+def _stop_meter(meter: Optional[BudgetWaitMeter], start: float) -> None:
+    if meter is not None:
+        meter.seconds += time.monotonic() - start
+        meter._since = None
+
+
+def _header(headers: Optional[Mapping[str, str]], name: str) -> Optional[int]:
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    try:
+        return int(float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# 全局单例
+_budget_instance: Optional[WeightBudget] = None
+_budget_lock = threading.Lock()
+
+
+def get_weight_budget() -> WeightBudget:
+    """获取进程级权重预算（配置读取config/params.json -> binance_weight_budget）"""
+    global _budget_instance
+    with _budget_lock:
+        if _budget_instance is None:
+            try:
+                from ats_core.cfg import CFG
+                config = CFG.params.get("binance_weight_budget", {})
+            except Exception as e:
+                logger.warning(f"binance_weight_budget配置读取失败，使用默认值: {e}")
+                config = {}
+            _budget_instance = WeightBudget(config)
+    return _budget_instance
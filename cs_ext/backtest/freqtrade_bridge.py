@@ -1,6 +1,7 @@
 # cs_ext/backtest/freqtrade_bridge.py
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
+import numpy as np
 from pandas import DataFrame
 
 from freqtrade.strategy.interface import IStrategy
@@ -9,25 +10,71 @@ from ats_core.env.bootstrap import bootstrap_env
 
 bootstrap_env()
 
-# 根据你的真实路径调整，如果函数名或模块不一致，请在后续人工微调
-try:
-    from ats_core.pipeline.analyze_symbol import analyze_symbol_with_preloaded_klines
-except ImportError:
-    analyze_symbol_with_preloaded_klines = None
-    print(
-        "[CryptoSignalStrategy] WARNING: "
-        "无法导入 analyze_symbol_with_preloaded_klines，请根据实际项目结构修改导入路径。"
+from ats_core.features.factor_series import (
+    DEFAULT_WINDOW,
+    compute_factor_series,
+    load_factor_params,
+    weighted_score_series,
+)
+
+# analyze_symbol对成熟币要求的最少1h K线数（不足时不出信号）
+MIN_ANALYSIS_BARS = 50
+
+
+def populate_cryptosignal_columns(
+    dataframe: DataFrame,
+    window: int = DEFAULT_WINDOW,
+    factor_params: Optional[Dict[str, Dict[str, Any]]] = None,
+    weights: Optional[Dict[str, float]] = None,
+) -> DataFrame:
+    """
+    在整个 dataframe 上一次计算 CryptoSignal 因子列（因果、向量化）。
+
+    因子定义与实时扫描器相同（ats_core.features.factor_series）：
+    - cs_T / cs_M / cs_V：趋势 / 动量 / 量能（OHLCV即可计算）
+    - cs_C：CVD资金流，需要 taker_buy_quote 列（主动买入成交额），缺失时为0且不参与加权
+    - cs_score：A层可用因子按基础权重加权（-100~+100），cs_confidence = |cs_score|
+
+    成交额优先使用 quote_volume 列，缺失时用 volume × close 近似。
+    OI/基差/盘口/BTC相关因子需要 dataframe 以外的数据，不参与计算。
+    """
+    high = dataframe["high"].to_numpy(dtype=float)
+    low = dataframe["low"].to_numpy(dtype=float)
+    close = dataframe["close"].to_numpy(dtype=float)
+    if "quote_volume" in dataframe.columns:
+        quote_volume = dataframe["quote_volume"].to_numpy(dtype=float)
+    else:
+        quote_volume = dataframe["volume"].to_numpy(dtype=float) * close
+    taker_buy_quote = (
+        dataframe["taker_buy_quote"].to_numpy(dtype=float)
+        if "taker_buy_quote" in dataframe.columns else None
+    )
+
+    series = compute_factor_series(
+        high, low, close, quote_volume,
+        taker_buy_quote=taker_buy_quote,
+        window=window,
+        factor_params=factor_params or load_factor_params(),
     )
+    factors = [f for f in ("T", "M", "C", "V") if f in series]
+    for factor in ("T", "M", "C", "V"):
+        dataframe[f"cs_{factor}"] = series[factor] if factor in series else 0.0
+
+    score = weighted_score_series({f: series[f] for f in factors}, weights)
+    score[:MIN_ANALYSIS_BARS - 1] = 0.0
+    dataframe["cs_score"] = score
+    dataframe["cs_confidence"] = np.abs(score)
+    return dataframe
 
 
 class CryptoSignalStrategy(IStrategy):
     """
-    使用 CryptoSignal 作为信号引擎的 Freqtrade 策略骨架。
+    使用 CryptoSignal 作为信号引擎的 Freqtrade 策略。
 
     核心思路：
-    - Freqtrade 提供历史K线（dataframe）
-    - 本策略将 dataframe 转给 CryptoSignal 的分析逻辑
-    - 根据返回的方向/强度/概率，告诉 Freqtrade 何时做多/做空
+    - populate_indicators：整段 dataframe 一次性计算 CryptoSignal 因子列（因果，无未来数据）
+    - populate_entry_trend：按加权分数与强度阈值做列运算生成多/空入场信号
+    - 每根bar的因子值等价于实时扫描器在该时刻对最近 factor_window 根K线的分析
     """
 
     timeframe = "1h"
@@ -40,77 +87,31 @@ class CryptoSignalStrategy(IStrategy):
 
     use_custom_stoploss = False
 
-    def _call_cryptosignal(self, df_row: DataFrame, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        调用 CryptoSignal 分析逻辑。
-
-        这里采用"单行 DataFrame"，你也可以改为传整个窗口给 analyze_symbol。
-        返回统一结构：
-            {
-                "direction": "long" / "short" / "none",
-                "final_strength": float,
-                "probability": float,
-            }
-        """
-        if analyze_symbol_with_preloaded_klines is None:
-            return {
-                "direction": "none",
-                "final_strength": 0.0,
-                "probability": 0.5,
-            }
-
-        pair = metadata.get("pair", "")
-
-        # 占位：这里直接把 df_row 当作 klines，后续可根据你的函数签名调整
-        klines = df_row.copy()
-
-        try:
-            result = analyze_symbol_with_preloaded_klines(
-                symbol=pair,
-                klines=klines,
-                # TODO: 其他必要参数请根据实际函数签名补充
-            )
-        except Exception as e:
-            print(f"[CryptoSignalStrategy] analyze_symbol_with_preloaded_klines error: {e}")
-            return {
-                "direction": "none",
-                "final_strength": 0.0,
-                "probability": 0.5,
-            }
-
-        # 假设 result 是 dict，包含以下字段，如有不同请后续调整
-        direction = result.get("direction", "none")  # 'long' / 'short' / 'none'
-        final_strength = float(result.get("final_strength", 0.0))
-        probability = float(result.get("probability", 0.5))
-
-        return {
-            "direction": direction,
-            "final_strength": final_strength,
-            "probability": probability,
-        }
+    # 因子窗口（与扫描器1h K线缓存一致）
+    factor_window: int = DEFAULT_WINDOW
+    startup_candle_count: int = MIN_ANALYSIS_BARS
+
+    # 最小信号强度 [0, 1]：|cs_score| >= 100 × min_signal_strength 时入场
+    min_signal_strength: float = 0.3
 
     def populate_indicators(self, dataframe: DataFrame, metadata: Dict[str, Any]) -> DataFrame:
         """
-        Freqtrade 要求的接口。当前依赖 CryptoSignal，因此此处直接返回即可。
+        计算 CryptoSignal 因子列（cs_T/cs_M/cs_C/cs_V/cs_score/cs_confidence）。
         """
-        return dataframe
+        return populate_cryptosignal_columns(dataframe, window=self.factor_window)
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: Dict[str, Any]) -> DataFrame:
         """
-        逐行调用 CryptoSignal，生成做多/做空信号。
+        根据加权分数生成做多/做空信号（列运算）。
         """
+        threshold = 100.0 * self.min_signal_strength
+        tradable = dataframe["volume"] > 0
+
         dataframe["enter_long"] = 0
         dataframe["enter_short"] = 0
-
-        for idx in range(len(dataframe)):
-            row = dataframe.iloc[idx:idx + 1]
-            signal = self._call_cryptosignal(row, metadata)
-            direction = signal["direction"]
-
-            if direction == "long":
-                dataframe.at[dataframe.index[idx], "enter_long"] = 1
-            elif direction == "short":
-                dataframe.at[dataframe.index[idx], "enter_short"] = 1
+        dataframe.loc[tradable & (dataframe["cs_score"] >= threshold), "enter_long"] = 1
+        if self.can_short:
+            dataframe.loc[tradable & (dataframe["cs_score"] <= -threshold), "enter_short"] = 1
 
         return dataframe
 
@@ -14,12 +14,20 @@ Cryptostore 数据落盘适配层（轻量骨架版）
 
 import os
 import json
+import gzip
+import atexit
+import logging
+import shutil
 import threading
-from dataclasses import dataclass, asdict
-from typing import Optional, List, Literal
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, List, Literal, Tuple
 
 import datetime
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class StorageEvent:
@@ -41,12 +49,57 @@ class SimpleFileStorageAdapter:
     一个简单的文件落盘实现：
     - 线程安全
     - 支持 JSON 行格式，便于后续用 pandas / spark / clickhouse 导入
+
+    写入方式：
+    - 每个 (日期, 类别) 保持一个打开的文件句柄，事件写入内存缓冲区
+    - 缓冲区满（buffer_bytes）或距上次刷新超过 flush_interval_sec 时刷新到磁盘
+    - 跨日后旧日期的句柄在空闲 rotate_grace_sec 后关闭（轮转）
+    - compression_enabled 时轮转后的文件由后台线程压缩为 <类别>.jsonl.gz
+      （迟到事件写入新的 .jsonl，再次轮转时作为新的gzip成员追加，gzip可直接连续读取）
+
+    配置项（config，均有默认值）：
+    - buffer_bytes: 每个文件的写缓冲大小（默认256KB）
+    - flush_interval_sec: 定时刷新间隔（默认1秒，0=每条事件立即刷新）
+    - fsync: 刷新时是否fsync（默认False，只保证写入OS缓存）
+    - max_open_files: 最多同时打开的文件数，超出时关闭最久未写入的（默认32）
+    - rotate_grace_sec: 跨日后旧日期文件的空闲关闭时间（默认300秒）
+    - compression_enabled: 轮转后是否gzip压缩（默认False）
     """
 
-    def __init__(self, base_dir: str = "data/storage", file_format: Literal["jsonl"] = "jsonl"):
+    def __init__(
+        self,
+        base_dir: str = "data/storage",
+        file_format: Literal["jsonl"] = "jsonl",
+        config: Optional[Dict[str, Any]] = None,
+    ):
+        config = config or {}
         self.base_dir = base_dir
         self.file_format = file_format
+
+        self.buffer_bytes = max(4096, int(config.get("buffer_bytes", 256 * 1024)))
+        self.flush_interval_sec = float(config.get("flush_interval_sec", 1.0))
+        self.fsync = bool(config.get("fsync", False))
+        self.max_open_files = max(1, int(config.get("max_open_files", 32)))
+        self.rotate_grace_sec = float(config.get("rotate_grace_sec", 300.0))
+        self.compression_enabled = bool(config.get("compression_enabled", False))
+
         self._lock = threading.Lock()
+        # (date, category) -> [文件句柄, 最后写入时间]，按最近写入排序
+        self._handles: "OrderedDict[Tuple[datetime.date, str], list]" = OrderedDict()
+        self._dirty = False
+        self._closed = False
+        self._pending_compress: List[str] = []
+        self._wake = threading.Event()
+        self._maintenance: Optional[threading.Thread] = None
+
+        self.stats = {
+            "events": 0,
+            "bytes": 0,
+            "flushes": 0,
+            "rotations": 0,
+            "compressed": 0,
+            "dropped": 0,
+        }
         os.makedirs(self.base_dir, exist_ok=True)
 
     def _get_file_path(self, date: datetime.date, category: str) -> str:
@@ -64,15 +117,177 @@ class SimpleFileStorageAdapter:
         """
         追加事件到对应文件。
         当前实现为 JSON Lines 格式：一行一个 JSON。
+
+        写入缓冲区后立即返回，写入失败或已关闭时丢弃该事件（计入 stats["dropped"]）。
         """
-        date = datetime.date.fromtimestamp(event.ts)
-        file_path = self._get_file_path(date, event.category)
+        try:
+            date = datetime.date.fromtimestamp(event.ts)
+            # 字段顺序与asdict(event)一致（asdict会深拷贝payload，热路径上开销明显）
+            record = {
+                "ts": event.ts,
+                "category": event.category,
+                "symbol": event.symbol,
+                "payload": event.payload,
+            }
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        except (TypeError, ValueError, OverflowError, OSError) as e:
+            logger.warning(f"事件序列化失败，丢弃: {event.category} {event.symbol}: {e}")
+            with self._lock:
+                self.stats["dropped"] += 1
+            return
 
-        line = json.dumps(asdict(event), ensure_ascii=False)
+        with self._lock:
+            if self._closed:
+                self.stats["dropped"] += 1
+                return
+            try:
+                f = self._get_handle_locked(date, event.category)
+                f.write(line)
+                if self.flush_interval_sec <= 0:
+                    self._flush_file(f)
+            except OSError as e:
+                logger.error(f"写入存储文件失败，丢弃事件: {event.category} {date}: {e}")
+                self.stats["dropped"] += 1
+                self._close_handle_locked((date, event.category))
+                return
+            self.stats["events"] += 1
+            self.stats["bytes"] += len(line)
+            self._dirty = True
+            self._ensure_maintenance()
+
+    def flush(self, fsync: Optional[bool] = None) -> None:
+        """
+        把所有缓冲区写入磁盘
 
+        Args:
+            fsync: 是否fsync（None=使用配置的fsync）
+        """
+        fsync = self.fsync if fsync is None else fsync
         with self._lock:
-            with open(file_path, "a", encoding="utf-8") as f:
-                f.write(line + "\n")
+            self._flush_all_locked(fsync)
+
+    def close(self) -> None:
+        """刷新并关闭所有文件，等待后台压缩完成（之后的事件被丢弃）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            today = datetime.date.today()
+            for key in list(self._handles):
+                self._close_handle_locked(key, rotated=key[0] < today)
+        self._wake.set()
+        if self._maintenance is not None:
+            self._maintenance.join()
+        self._compress_pending()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """写入统计（dropped = 序列化/写入失败或关闭后丢弃的事件数）"""
+        with self._lock:
+            return {**self.stats, "open_files": len(self._handles)}
+
+    # ==================== 句柄管理 ====================
+
+    def _get_handle_locked(self, date: datetime.date, category: str):
+        key = (date, category)
+        entry = self._handles.get(key)
+        if entry is None:
+            while len(self._handles) >= self.max_open_files:
+                oldest = next(iter(self._handles))
+                self._close_handle_locked(oldest, rotated=oldest[0] < date)
+            path = self._get_file_path(date, category)
+            entry = [open(path, "ab", buffering=self.buffer_bytes), 0.0]
+            self._handles[key] = entry
+        else:
+            self._handles.move_to_end(key)
+        entry[1] = time.monotonic()
+        return entry[0]
+
+    def _close_handle_locked(self, key, rotated: bool = False) -> None:
+        entry = self._handles.pop(key, None)
+        if entry is None:
+            return
+        f = entry[0]
+        try:
+            self._flush_file(f, self.fsync)
+            f.close()
+        except OSError as e:
+            logger.error(f"关闭存储文件失败: {f.name}: {e}")
+            return
+        if rotated:
+            self.stats["rotations"] += 1
+            if self.compression_enabled:
+                # 先改名再压缩：迟到事件会重新打开原文件名，不与压缩冲突
+                pending = f"{f.name}.{time.time_ns()}.rotating"
+                try:
+                    os.replace(f.name, pending)
+                except OSError as e:
+                    logger.error(f"轮转存储文件失败: {f.name}: {e}")
+                    return
+                self._pending_compress.append(pending)
+                self._wake.set()
+
+    def _flush_file(self, f, fsync: bool = False) -> None:
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+
+    def _flush_all_locked(self, fsync: bool) -> None:
+        for key, entry in list(self._handles.items()):
+            try:
+                self._flush_file(entry[0], fsync)
+            except OSError as e:
+                logger.error(f"刷新存储文件失败: {entry[0].name}: {e}")
+                self._handles.pop(key, None)
+        self._dirty = False
+        self.stats["flushes"] += 1
+
+    # ==================== 后台刷新 / 轮转 / 压缩 ====================
+
+    def _ensure_maintenance(self) -> None:
+        if self._maintenance is None:
+            self._maintenance = threading.Thread(
+                target=self._run_maintenance, name="storage-flush", daemon=True
+            )
+            self._maintenance.start()
+            atexit.register(self.close)
+
+    def _run_maintenance(self) -> None:
+        interval = self.flush_interval_sec if self.flush_interval_sec > 0 else 1.0
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            with self._lock:
+                if self._closed:
+                    return
+                if self._dirty:
+                    self._flush_all_locked(self.fsync)
+                self._rotate_locked()
+            self._compress_pending()
+
+    def _rotate_locked(self) -> None:
+        """关闭跨日后空闲超过rotate_grace_sec的旧日期文件"""
+        today = datetime.date.today()
+        now = time.monotonic()
+        for key, entry in list(self._handles.items()):
+            if key[0] < today and now - entry[1] >= self.rotate_grace_sec:
+                self._close_handle_locked(key, rotated=True)
+
+    def _compress_pending(self) -> None:
+        while True:
+            with self._lock:
+                if not self._pending_compress:
+                    return
+                path = self._pending_compress.pop(0)
+            target = path.rsplit(".", 2)[0] + ".gz"
+            try:
+                # 追加为新的gzip成员（同一文件多次轮转时仍可连续解压）
+                with open(path, "rb") as src, gzip.open(target, "ab") as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(path)
+                with self._lock:
+                    self.stats["compressed"] += 1
+            except OSError as e:
+                logger.error(f"压缩存储文件失败: {path}: {e}")
 
 
 class CryptostoreAdapter:
@@ -85,11 +300,25 @@ class CryptostoreAdapter:
     - 或根据 cryptostore 的 config 生成对应的订阅 & 落盘规则
     """
 
-    def __init__(self, backend: Optional[SimpleFileStorageAdapter] = None):
+    def __init__(
+        self,
+        backend: Optional[SimpleFileStorageAdapter] = None,
+        base_path: Optional[str] = None,
+        config: Optional[Dict[str, Any]] = None,
+    ):
         if backend is None:
-            backend = SimpleFileStorageAdapter()
+            backend = SimpleFileStorageAdapter(base_path or "data/storage", config=config)
         self._backend = backend
 
+    def flush(self, fsync: Optional[bool] = None):
+        self._backend.flush(fsync)
+
+    def close(self):
+        self._backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._backend.get_stats()
+
     def store_trade(self, ts: float, symbol: str, price: float, size: float, side: str):
         event = StorageEvent(
             ts=ts,
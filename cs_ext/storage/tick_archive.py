@@ -0,0 +1,481 @@
+# cs_ext/storage/tick_archive.py
+"""
+列式 tick / 订单簿 / 因子快照归档 + 回放
+
+JSONL 落盘（SimpleFileStorageAdapter）便于导入，但回读一天的成交需要逐行解析。
+这里提供定长列式二进制格式，读取时直接 memmap 成 NumPy 数组：
+
+目录结构：
+    <base_dir>/<YYYY-MM-DD>/<category>/<SYMBOL>.bin   列式数据（按块追加）
+    <base_dir>/<YYYY-MM-DD>/<category>/<SYMBOL>.idx   索引（JSON行：首行schema，之后每块一行）
+
+块格式：
+- 每块 n 行，各列依次连续存放（小端定长），每列按8字节对齐
+- 块内按 ts 排序；索引行记录 offset / rows / ts_min / ts_max
+- 块之间不要求有序（导入顺序任意），读取时按 ts_min 排序、重叠块合并排序
+- 先写数据块、后追加索引行：进程中断时未索引的尾部数据被忽略
+
+类别与列：
+- trade：ts(f8) price(f8) size(f8) side(i1, 1=buy / -1=sell)
+- book：ts(f8) bid_px / bid_qty / ask_px / ask_qty（每行 depth 档，f8，不足补NaN）
+- factor：ts(f8) + 各因子列（f8，列名在首次写入时确定）
+
+回放：
+- ReplayDriver 按时间戳合并多个交易对的成交与订单簿，
+  以 on_trade / on_orderbook 喂给 RealtimeFactorCalculator（或V8RealtimePipeline），
+  speed=N 按 N 倍速还原事件间隔，speed=0 全速回放（基准测试）
+"""
+
+import datetime
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("trade", "book", "factor")
+DEFAULT_CHUNK_ROWS = 65536
+DEFAULT_BOOK_DEPTH = 20
+
+_SIDE_CODES = {"buy": 1, "sell": -1}
+
+
+def _trade_schema() -> List[Tuple[str, str, int]]:
+    return [("ts", "<f8", 1), ("price", "<f8", 1), ("size", "<f8", 1), ("side", "i1", 1)]
+
+
+def _book_schema(depth: int) -> List[Tuple[str, str, int]]:
+    return [("ts", "<f8", 1)] + [
+        (name, "<f8", depth) for name in ("bid_px", "bid_qty", "ask_px", "ask_qty")
+    ]
+
+
+def _factor_schema(names: Sequence[str]) -> List[Tuple[str, str, int]]:
+    return [("ts", "<f8", 1)] + [(name, "<f8", 1) for name in names]
+
+
+def _column_layout(schema, rows: int) -> List[Tuple[str, np.dtype, int, int]]:
+    """各列在块内的 (名称, dtype, 宽度, 相对偏移)"""
+    layout = []
+    offset = 0
+    for name, dtype, width in schema:
+        dt = np.dtype(dtype)
+        layout.append((name, dt, width, offset))
+        offset += -(-rows * width * dt.itemsize // 8) * 8
+    return layout
+
+
+def _chunk_nbytes(schema, rows: int) -> int:
+    name, dt, width, offset = _column_layout(schema, rows)[-1]
+    return offset + -(-rows * width * dt.itemsize // 8) * 8
+
+
+def _day_of(ts: float) -> str:
+    return datetime.date.fromtimestamp(ts).isoformat()
+
+
+# ==================== 写入 ====================
+
+
+class _Series:
+    """单个 (日期, 类别, 交易对) 文件的写缓冲"""
+
+    def __init__(self, bin_path: str, schema):
+        self.bin_path = bin_path
+        self.idx_path = bin_path[:-4] + ".idx"
+        self.schema = schema
+        self.rows: List[Tuple] = []
+        if not os.path.exists(self.idx_path):
+            with open(self.idx_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"schema": schema}) + "\n")
+        else:
+            existing = _read_index(self.idx_path)[0]
+            if existing != [tuple(c) for c in schema]:
+                raise ValueError(f"归档schema不一致: {self.idx_path}")
+
+    def write_chunk(self) -> int:
+        if not self.rows:
+            return 0
+        rows = sorted(self.rows, key=lambda r: r[0])
+        self.rows = []
+        n = len(rows)
+        buf = bytearray(_chunk_nbytes(self.schema, n))
+        for col, (name, dt, width, offset) in enumerate(_column_layout(self.schema, n)):
+            arr = np.frombuffer(buf, dtype=dt, count=n * width, offset=offset)
+            values = [r[col] for r in rows]
+            arr[:] = np.asarray(values, dtype=dt).reshape(-1)
+        with open(self.bin_path, "ab") as f:
+            offset = f.tell()
+            f.write(buf)
+        with open(self.idx_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "offset": offset, "rows": n, "ts_min": rows[0][0], "ts_max": rows[-1][0],
+            }) + "\n")
+        return n
+
+
+class TickArchiveWriter:
+    """
+    列式归档写入器（线程安全）
+
+    每个 (日期, 类别, 交易对) 缓冲 chunk_rows 行后写成一个块；flush()/close() 写出剩余行。
+    """
+
+    def __init__(
+        self,
+        base_dir: str = "data/tick_archive",
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        book_depth: int = DEFAULT_BOOK_DEPTH,
+    ):
+        self.base_dir = base_dir
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.book_depth = max(1, int(book_depth))
+        self._series: Dict[Tuple[str, str, str], _Series] = {}
+        self._factor_names: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"rows": 0, "chunks": 0}
+
+    def append_trade(self, symbol: str, ts: float, price: float, size: float, side: str):
+        self._append("trade", symbol, ts, (ts, price, size, _SIDE_CODES.get(side, 0)))
+
+    def append_book(self, symbol: str, ts: float, bids, asks):
+        """bids/asks: [[price, size], ...]（bids降序、asks升序），截断/补NaN到 book_depth 档"""
+        d = self.book_depth
+        bid = np.full((2, d), np.nan)
+        ask = np.full((2, d), np.nan)
+        if len(bids):
+            b = np.asarray(bids[:d], dtype=float)
+            bid[:, :len(b)] = b[:, :2].T
+        if len(asks):
+            a = np.asarray(asks[:d], dtype=float)
+            ask[:, :len(a)] = a[:, :2].T
+        self._append("book", symbol, ts, (ts, bid[0], bid[1], ask[0], ask[1]))
+
+    def append_factors(self, symbol: str, ts: float, factors: Dict[str, float]):
+        """因子列名以该交易对首次写入的键为准，之后缺失的键写NaN、新增的键忽略"""
+        symbol = symbol.upper()
+        with self._lock:
+            names = self._factor_names.setdefault(symbol, sorted(factors))
+        row = (ts,) + tuple(float(factors.get(name, np.nan)) for name in names)
+        self._append("factor", symbol, ts, row)
+
+    def flush(self):
+        with self._lock:
+            for series in self._series.values():
+                self._write_locked(series)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._series.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _append(self, category: str, symbol: str, ts: float, row: Tuple):
+        symbol = symbol.upper()
+        key = (_day_of(ts), category, symbol)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._open_series_locked(key)
+            series.rows.append(row)
+            if len(series.rows) >= self.chunk_rows:
+                self._write_locked(series)
+
+    def _open_series_locked(self, key) -> _Series:
+        day, category, symbol = key
+        if category == "trade":
+            schema = _trade_schema()
+        elif category == "book":
+            schema = _book_schema(self.book_depth)
+        else:
+            schema = _factor_schema(self._factor_names[symbol])
+        dir_path = os.path.join(self.base_dir, day, category)
+        os.makedirs(dir_path, exist_ok=True)
+        series = _Series(os.path.join(dir_path, f"{symbol}.bin"), schema)
+        self._series[key] = series
+        return series
+
+    def _write_locked(self, series: _Series):
+        n = series.write_chunk()
+        if n:
+            self.stats["rows"] += n
+            self.stats["chunks"] += 1
+
+
+# ==================== 读取 ====================
+
+
+def _read_index(idx_path: str):
+    """返回 (schema, [chunk, ...])"""
+    with open(idx_path, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    schema = [tuple(c) for c in json.loads(lines[0])["schema"]]
+    chunks = []
+    for line in lines[1:]:
+        try:
+            chunks.append(json.loads(line))
+        except ValueError:
+            break  # 中断写入留下的半行
+    return schema, chunks
+
+
+class TickArchiveReader:
+    """
+    列式归档读取器
+
+    read() 按时间范围 memmap 相关块，按时间顺序、按 batch_rows 产出 {列名: ndarray} 批次
+    （时间重叠的块合并排序后产出副本，其余为只读视图）。
+    book 的价量列形状为 (rows, depth)；trade 的 side 为 1/-1。
+    """
+
+    def __init__(self, base_dir: str = "data/tick_archive"):
+        self.base_dir = base_dir
+
+    def days(self) -> List[str]:
+        if not os.path.isdir(self.base_dir):
+            return []
+        return sorted(d for d in os.listdir(self.base_dir) if len(d) == 10 and d[4] == "-")
+
+    def symbols(self, category: str, day: str) -> List[str]:
+        dir_path = os.path.join(self.base_dir, day, category)
+        if not os.path.isdir(dir_path):
+            return []
+        return sorted(f[:-4] for f in os.listdir(dir_path) if f.endswith(".idx"))
+
+    def read(
+        self,
+        category: str,
+        symbol: str,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None,
+        batch_rows: Optional[int] = None,
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        读取 [start_ts, end_ts) 内的数据
+
+        Args:
+            category: trade / book / factor
+            symbol: 交易对
+            start_ts / end_ts: 时间范围（秒，None=不限；跨日时依次读取各日文件）
+            batch_rows: 每批最大行数（None=每块一批）
+
+        Yields:
+            {列名: ndarray}（数组是只读memmap视图，需修改时请copy）
+        """
+        symbol = symbol.upper()
+        for day in self._days_in_range(start_ts, end_ts):
+            base = os.path.join(self.base_dir, day, category, symbol)
+            if not os.path.exists(base + ".idx"):
+                continue
+            schema, chunks = _read_index(base + ".idx")
+            if not chunks:
+                continue
+            yield from self._read_file(base + ".bin", schema, chunks, start_ts, end_ts, batch_rows)
+
+    def read_all(self, category: str, symbol: str, start_ts: Optional[float] = None,
+                 end_ts: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """读取范围内全部数据并拼接为单个批次"""
+        batches = list(self.read(category, symbol, start_ts, end_ts))
+        if not batches:
+            return {}
+        return {name: np.concatenate([b[name] for b in batches]) for name in batches[0]}
+
+    def _days_in_range(self, start_ts, end_ts) -> List[str]:
+        days = self.days()
+        if start_ts is not None:
+            first = _day_of(start_ts)
+            days = [d for d in days if d >= first]
+        if end_ts is not None:
+            last = _day_of(end_ts)
+            days = [d for d in days if d <= last]
+        return days
+
+    def _read_file(self, bin_path, schema, chunks, start_ts, end_ts, batch_rows):
+        # 块内有序，但块之间不保证（如轮转的 .gz 晚于更新的 .jsonl 导入）：
+        # 相关块按 ts_min 排序，时间区间重叠的块合并为一组，组内按 ts 稳定排序
+        selected = [
+            c for c in chunks
+            if (end_ts is None or c["ts_min"] < end_ts) and (start_ts is None or c["ts_max"] >= start_ts)
+        ]
+        selected.sort(key=lambda c: c["ts_min"])
+        groups: List[List[Dict[str, Any]]] = []
+        group_end = None
+        for chunk in selected:
+            if groups and chunk["ts_min"] < group_end:
+                groups[-1].append(chunk)
+                group_end = max(group_end, chunk["ts_max"])
+            else:
+                groups.append([chunk])
+                group_end = chunk["ts_max"]
+
+        mm = np.memmap(bin_path, dtype=np.uint8, mode="r")
+        for group in groups:
+            if len(group) == 1:
+                cols = _chunk_columns(mm, schema, group[0])
+            else:
+                parts = [_chunk_columns(mm, schema, chunk) for chunk in group]
+                merged = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+                order = np.argsort(merged["ts"], kind="stable")
+                cols = {name: arr[order] for name, arr in merged.items()}
+            ts = cols["ts"]
+            n = len(ts)
+            lo = 0 if start_ts is None else int(np.searchsorted(ts, start_ts, "left"))
+            hi = n if end_ts is None else int(np.searchsorted(ts, end_ts, "left"))
+            step = batch_rows or max(1, hi - lo)
+            for i in range(lo, hi, step):
+                j = min(hi, i + step)
+                yield {name: arr[i:j] for name, arr in cols.items()}
+
+
+def _chunk_columns(mm: np.memmap, schema, chunk: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """单个块的各列（只读视图）"""
+    n = chunk["rows"]
+    cols = {}
+    for name, dt, width, offset in _column_layout(schema, n):
+        arr = np.frombuffer(mm, dtype=dt, count=n * width, offset=chunk["offset"] + offset)
+        cols[name] = arr.reshape(n, width) if width > 1 else arr
+    return cols
+
+
+# ==================== JSONL 导入 ====================
+
+
+def import_jsonl_day(storage_dir: str, day: str, writer: TickArchiveWriter) -> Dict[str, int]:
+    """
+    把 SimpleFileStorageAdapter 某一天的 JSONL（或轮转压缩后的 .jsonl.gz）导入列式归档
+
+    Returns:
+        {类别: 导入行数}
+    """
+    import gzip
+
+    mapping = {"trade": "trade", "orderbook": "book", "factor": "factor"}
+    counts: Dict[str, int] = {}
+    day_dir = os.path.join(storage_dir, day)
+    for source, category in mapping.items():
+        for path, opener in ((f"{source}.jsonl.gz", gzip.open), (f"{source}.jsonl", open)):
+            full = os.path.join(day_dir, path)
+            if not os.path.exists(full):
+                continue
+            with opener(full, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        evt = json.loads(line)
+                    except ValueError:
+                        continue
+                    p = evt["payload"]
+                    if category == "trade":
+                        writer.append_trade(evt["symbol"], evt["ts"], p["price"], p["size"], p["side"])
+                    elif category == "book":
+                        writer.append_book(evt["symbol"], evt["ts"], p["bids"], p["asks"])
+                    else:
+                        writer.append_factors(evt["symbol"], evt["ts"], p)
+                    counts[category] = counts.get(category, 0) + 1
+    writer.flush()
+    return counts
+
+
+# ==================== 回放 ====================
+
+
+class ReplayDriver:
+    """
+    把归档的成交/订单簿按时间顺序回放给实时因子计算器
+
+    target 需提供 on_trade(TradeData) / on_orderbook(OrderbookData)；
+    传入 V8RealtimePipeline 时使用其 factor_calculator。
+    """
+
+    def __init__(self, reader: TickArchiveReader, target, speed: float = 0.0,
+                 batch_rows: int = 8192):
+        """
+        Args:
+            reader: 归档读取器
+            target: RealtimeFactorCalculator 或 V8RealtimePipeline
+            speed: 回放倍速（N=按事件间隔的1/N还原，0=不等待全速回放）
+            batch_rows: 每次从归档读取的行数
+        """
+        self.reader = reader
+        self.target = getattr(target, "factor_calculator", target)
+        self.speed = float(speed)
+        self.batch_rows = batch_rows
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, symbols: Sequence[str], start_ts: Optional[float] = None,
+            end_ts: Optional[float] = None, include_book: bool = True) -> Dict[str, Any]:
+        """
+        回放 [start_ts, end_ts) 内的数据（同一时间戳订单簿先于成交）
+
+        Returns:
+            回放统计（事件数、耗时、事件/秒、最大落后时间）
+        """
+        from ats_core.realtime.factor_calculator import OrderbookData, TradeData
+
+        streams = []
+        for symbol in symbols:
+            streams.append(self._trade_events(symbol.upper(), start_ts, end_ts))
+            if include_book:
+                streams.append(self._book_events(symbol.upper(), start_ts, end_ts))
+
+        stats = {"trades": 0, "books": 0, "max_lag_sec": 0.0}
+        wall_start = time.perf_counter()
+        first_ts = None
+        for ts, kind, symbol, data in heapq.merge(*streams, key=lambda e: (e[0], e[1])):
+            if self._stop.is_set():
+                break
+            if self.speed > 0:
+                if first_ts is None:
+                    first_ts = ts
+                due = (ts - first_ts) / self.speed
+                delay = due - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    stats["max_lag_sec"] = max(stats["max_lag_sec"], -delay)
+            if kind == 0:
+                bids, asks = data
+                self.target.on_orderbook(OrderbookData(symbol=symbol, timestamp=ts, bids=bids, asks=asks))
+                stats["books"] += 1
+            else:
+                price, size, side = data
+                self.target.on_trade(TradeData(symbol=symbol, timestamp=ts, price=price, size=size, side=side))
+                stats["trades"] += 1
+
+        elapsed = time.perf_counter() - wall_start
+        events = stats["trades"] + stats["books"]
+        stats.update({
+            "events": events,
+            "elapsed_sec": round(elapsed, 3),
+            "events_per_sec": round(events / elapsed, 1) if elapsed > 0 else 0.0,
+        })
+        return stats
+
+    def _trade_events(self, symbol, start_ts, end_ts):
+        for batch in self.reader.read("trade", symbol, start_ts, end_ts, self.batch_rows):
+            sides = np.where(batch["side"] > 0, "buy", "sell").tolist()
+            for ts, price, size, side in zip(batch["ts"].tolist(), batch["price"].tolist(),
+                                             batch["size"].tolist(), sides):
+                yield ts, 1, symbol, (price, size, side)
+
+    def _book_events(self, symbol, start_ts, end_ts):
+        for batch in self.reader.read("book", symbol, start_ts, end_ts, self.batch_rows):
+            bid_px, bid_qty = batch["bid_px"], batch["bid_qty"]
+            ask_px, ask_qty = batch["ask_px"], batch["ask_qty"]
+            for i, ts in enumerate(batch["ts"].tolist()):
+                bm = ~np.isnan(bid_px[i])
+                am = ~np.isnan(ask_px[i])
+                bids = np.column_stack((bid_px[i][bm], bid_qty[i][bm])).tolist()
+                asks = np.column_stack((ask_px[i][am], ask_qty[i][am])).tolist()
+                yield ts, 0, symbol, (bids, asks)
@@ -85,6 +85,9 @@ Examples:
 
   # Generate markdown report
   python scripts/backtest_four_step.py --symbols ETHUSDT --start 2024-08-01 --end 2024-11-01 --output reports/eth.json --report-format markdown --report-output reports/eth.md
+
+  # Checkpointed run (re-run the same command with --resume after a crash)
+  python scripts/backtest_four_step.py --symbols ETHUSDT --start 2024-01-01 --end 2024-06-01 --output reports/eth_6m.json --checkpoint data/backtest_cache/checkpoints/eth_6m.ckpt.gz --resume
         """
     )
 
@@ -132,6 +135,21 @@ Examples:
         default=None,
         help="Optional report output path (if not specified, report is printed to stdout)"
     )
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="Checkpoint file path, saved periodically during signal generation (v2.3)"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from --checkpoint if it exists (same config required)"
+    )
+    parser.add_argument(
+        "--fork-from",
+        default=None,
+        help="Continue from another run's checkpoint with the current config (shared warm-up prefix)"
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -242,7 +260,14 @@ def main():
             symbols=symbols,
             start_time=start_ts,
             end_time=end_ts,
-            interval=args.interval
+            interval=args.interval,
+            checkpoint_path=args.checkpoint,
+            resume_from=(
+                args.checkpoint
+                if args.resume and args.checkpoint and Path(args.checkpoint).exists()
+                else None
+            ),
+            fork_from=args.fork_from
         )
     except Exception as e:
         logger.error(f"回测执行失败: {e}", exc_info=True)
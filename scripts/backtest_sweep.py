@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Backtest Framework v1.7 - Parameter Sweep CLI
+回测框架 - 四步系统参数扫描命令行脚本
+
+功能：
+- 一次计算因子快照（可落盘复用）
+- 网格/随机/拉丁超立方候选生成
+- 进程池并行评估，结果表排序导出（CSV/JSON）
+
+参数空间文件（JSON）格式:
+    {
+        "step1_direction.min_final_strength": [5.0, 7.0, 9.0],
+        "step3_risk.take_profit.min_risk_reward_ratio": {"low": 1.2, "high": 2.5}
+    }
+    - grid模式：每个参数为候选值列表
+    - random/lhs模式：列表=离散候选值，{"low","high","type"}=连续区间
+
+Usage:
+    # 网格扫描（首次运行构建并保存因子快照）
+    python scripts/backtest_sweep.py \\
+        --symbols ETHUSDT,SOLUSDT \\
+        --start 2024-08-01 \\
+        --end 2024-11-01 \\
+        --space config/sweep_space.json \\
+        --factor-cache data/backtest_cache/factors_eth_sol.pkl.gz \\
+        --output reports/sweep_eth_sol.csv
+
+    # 复用已有因子快照，拉丁超立方采样2000个候选
+    python scripts/backtest_sweep.py \\
+        --factor-cache data/backtest_cache/factors_eth_sol.pkl.gz \\
+        --space config/sweep_space.json \\
+        --mode lhs --samples 2000 \\
+        --output reports/sweep_lhs.csv
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ats_core.backtest import (
+    HistoricalDataLoader,
+    FactorCache,
+    ParameterSweep
+)
+from ats_core.cfg import CFG
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_arguments():
+    """
+    解析命令行参数
+
+    Returns:
+        argparse.Namespace: 解析后的参数
+    """
+    parser = argparse.ArgumentParser(
+        description="CryptoSignal Backtest Parameter Sweep v1.7",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument("--symbols", default=None, help="Comma-separated trading pairs (required when building the factor cache)")
+    parser.add_argument("--start", default=None, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--interval", default=None, help="Candle interval (default: from config)")
+    parser.add_argument("--space", required=True, help="Parameter space JSON file")
+    parser.add_argument("--mode", choices=["grid", "random", "lhs"], default="grid", help="Sampling mode (default: grid)")
+    parser.add_argument("--samples", type=int, default=100, help="Number of samples for random/lhs (default: 100)")
+    parser.add_argument("--factor-cache", default=None, help="Factor snapshot cache file (loaded if exists, otherwise built and saved)")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: from config)")
+    parser.add_argument("--output", required=True, help="Output file path")
+    parser.add_argument("--format", choices=["csv", "json"], default=None, help="Output format (default: from config)")
+    parser.add_argument("--top", type=int, default=10, help="Print top-N candidates (default: 10)")
+
+    return parser.parse_args()
+
+
+def parse_date(date_str: str) -> int:
+    """解析日期字符串为Unix时间戳（毫秒）"""
+    try:
+        dt = datetime.strptime(date_str, "%Y-%m-%d")
+        return int(dt.timestamp() * 1000)
+    except ValueError as e:
+        logger.error(f"日期格式错误: {date_str} - {e}")
+        sys.exit(1)
+
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+
+    CFG.reload()
+    backtest_config = CFG.params.get("backtest", {})
+    sweep_config = dict(backtest_config.get("sweep", {}))
+    if args.workers is not None:
+        sweep_config["max_workers"] = args.workers
+
+    # 1. 因子快照（加载或构建）
+    cache_path = args.factor_cache
+    if cache_path and Path(cache_path).exists():
+        logger.info(f"加载因子快照: {cache_path}")
+        factor_cache = FactorCache.load(cache_path)
+    else:
+        if not (args.symbols and args.start and args.end):
+            logger.error("构建因子快照需要 --symbols/--start/--end")
+            sys.exit(1)
+        symbols = [s.strip().upper() for s in args.symbols.split(",")]
+        data_loader = HistoricalDataLoader(backtest_config.get("data_loader", {}))
+        factor_cache = FactorCache(sweep_config, data_loader).build(
+            symbols, parse_date(args.start), parse_date(args.end), args.interval
+        )
+        if cache_path:
+            factor_cache.save(cache_path)
+
+    # 2. 候选生成
+    with open(args.space, "r", encoding="utf-8") as f:
+        space = json.load(f)
+
+    sweep = ParameterSweep(
+        sweep_config,
+        engine_config=backtest_config.get("engine", {}),
+        metrics_config=backtest_config.get("metrics", {}),
+        monte_carlo_config=backtest_config.get("monte_carlo", {})
+    )
+    candidates = sweep.generate_candidates(space, mode=args.mode, n_samples=args.samples)
+    logger.info(f"候选参数: {len(candidates)}个 (mode={args.mode})")
+
+    # 3. 执行与导出
+    result = sweep.run(factor_cache, candidates, cache_path=cache_path)
+    sweep.export(result, args.output, args.format or sweep_config.get("export_format", "csv"))
+
+    # 4. 打印Top-N
+    print()
+    print("=" * 70)
+    print(f"SWEEP TOP {args.top} (rank_by={sweep.rank_by})")
+    print("=" * 70)
+    for rank, row in enumerate(result.rows[:args.top], 1):
+        print(
+            f"#{rank:<3} trades={row.filled_trades:<5} win={row.win_rate:6.2f}% "
+            f"PF={row.profit_factor:5.2f} Sharpe={row.sharpe_ratio:6.2f} "
+            f"MDD={row.max_drawdown_percent:6.2f}% | {row.params}"
+        )
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
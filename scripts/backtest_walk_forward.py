@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Backtest Framework v1.8 - Walk-Forward Optimization CLI
+回测框架 - 滚动前推优化命令行脚本
+
+功能：
+- 历史数据只加载一次，因子快照可落盘复用（与backtest_sweep.py共享缓存格式）
+- 每个fold：训练窗口参数扫描选参 → 测试窗口样本外评估
+- fold级进程并行，输出各fold结果与整体OOS指标（JSON）
+
+Usage:
+    python scripts/backtest_walk_forward.py \\
+        --symbols ETHUSDT,SOLUSDT \\
+        --start 2024-01-01 \\
+        --end 2024-11-01 \\
+        --space config/sweep_space.json \\
+        --factor-cache data/backtest_cache/factors_eth_sol.pkl.gz \\
+        --train-days 60 --test-days 15 --mode rolling \\
+        --output reports/walk_forward_eth_sol.json
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+Design: docs/BACKTEST_FRAMEWORK_v1.0_DESIGN.md
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ats_core.backtest import (
+    HistoricalDataLoader,
+    FactorCache,
+    ParameterSweep,
+    WalkForwardRunner
+)
+from ats_core.cfg import CFG
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_arguments():
+    """
+    解析命令行参数
+
+    Returns:
+        argparse.Namespace: 解析后的参数
+    """
+    parser = argparse.ArgumentParser(
+        description="CryptoSignal Walk-Forward Optimization v1.8",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument("--symbols", default=None, help="Comma-separated trading pairs (required when building the factor cache)")
+    parser.add_argument("--start", default=None, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="End date (YYYY-MM-DD)")
+    parser.add_argument("--interval", default=None, help="Candle interval (default: from config)")
+    parser.add_argument("--space", required=True, help="Parameter space JSON file")
+    parser.add_argument("--search", choices=["grid", "random", "lhs"], default="grid", help="Candidate sampling mode (default: grid)")
+    parser.add_argument("--samples", type=int, default=100, help="Number of samples for random/lhs (default: 100)")
+    parser.add_argument("--factor-cache", default=None, help="Factor snapshot cache file (loaded if exists, otherwise built and saved)")
+    parser.add_argument("--mode", choices=["anchored", "rolling"], default=None, help="Window mode (default: from config)")
+    parser.add_argument("--train-days", type=int, default=None, help="Training window length in days (default: from config)")
+    parser.add_argument("--test-days", type=int, default=None, help="Test window length in days (default: from config)")
+    parser.add_argument("--step-days", type=int, default=None, help="Window step in days (default: from config)")
+    parser.add_argument("--workers", type=int, default=None, help="Fold process pool size (default: from config)")
+    parser.add_argument("--output", required=True, help="Output JSON file path")
+
+    return parser.parse_args()
+
+
+def parse_date(date_str: str) -> int:
+    """解析日期字符串为Unix时间戳（毫秒）"""
+    try:
+        dt = datetime.strptime(date_str, "%Y-%m-%d")
+        return int(dt.timestamp() * 1000)
+    except ValueError as e:
+        logger.error(f"日期格式错误: {date_str} - {e}")
+        sys.exit(1)
+
+
+def main():
+    """主函数"""
+    args = parse_arguments()
+
+    CFG.reload()
+    backtest_config = CFG.params.get("backtest", {})
+    sweep_config = dict(backtest_config.get("sweep", {}))
+    wf_config = dict(backtest_config.get("walk_forward", {}))
+    for key in ("mode", "train_days", "test_days", "step_days"):
+        value = getattr(args, key)
+        if value is not None:
+            wf_config[key] = value
+    if args.workers is not None:
+        wf_config["max_workers"] = args.workers
+
+    # 1. 因子快照（加载或构建）
+    cache_path = args.factor_cache
+    if cache_path and Path(cache_path).exists():
+        logger.info(f"加载因子快照: {cache_path}")
+        factor_cache = FactorCache.load(cache_path)
+    else:
+        if not (args.symbols and args.start and args.end):
+            logger.error("构建因子快照需要 --symbols/--start/--end")
+            sys.exit(1)
+        symbols = [s.strip().upper() for s in args.symbols.split(",")]
+        data_loader = HistoricalDataLoader(backtest_config.get("data_loader", {}))
+        factor_cache = FactorCache(sweep_config, data_loader).build(
+            symbols, parse_date(args.start), parse_date(args.end), args.interval
+        )
+        if cache_path:
+            factor_cache.save(cache_path)
+
+    # 2. 候选生成
+    with open(args.space, "r", encoding="utf-8") as f:
+        space = json.load(f)
+
+    sweep = ParameterSweep(
+        sweep_config,
+        engine_config=backtest_config.get("engine", {}),
+        metrics_config=backtest_config.get("metrics", {}),
+        monte_carlo_config=backtest_config.get("monte_carlo", {})
+    )
+    candidates = sweep.generate_candidates(space, mode=args.search, n_samples=args.samples)
+    logger.info(f"候选参数: {len(candidates)}个 (mode={args.search})")
+
+    # 3. 执行与导出
+    runner = WalkForwardRunner(wf_config, sweep)
+    result = runner.run(factor_cache, candidates)
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result.to_dict(), f, indent=2, ensure_ascii=False, default=str)
+    logger.info(f"✅ 结果已保存: {output_path}")
+
+    # 4. 打印fold摘要
+    print()
+    print("=" * 70)
+    print(f"WALK-FORWARD (mode={runner.mode}, WFE={result.metadata['walk_forward_efficiency']})")
+    print("=" * 70)
+    for fold_result in result.folds:
+        if fold_result.error:
+            print(f"fold #{fold_result.fold.fold_id:<3} ERROR: {fold_result.error}")
+            continue
+        train, test = fold_result.train_row, fold_result.test_row
+        print(
+            f"fold #{fold_result.fold.fold_id:<3} IS Sharpe={train.sharpe_ratio:6.2f} "
+            f"OOS Sharpe={test.sharpe_ratio:6.2f} OOS trades={test.filled_trades:<4} "
+            f"| {fold_result.best_params}"
+        )
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Benchmark Suite v1.0 - CLI Script
+吞吐量基准测试 - 命令行脚本
+
+功能：
+- 在合成数据集（GBM + 状态切换）上运行analyze/scan/backtest/cache_warmup/db_writes基准
+- 输出JSON结果（机器可读）
+- 与基线结果对比，吞吐下降超过阈值时以退出码1结束（可用于CI回归检查）
+
+Usage:
+    # 全部基准（配置读取config/params.json -> benchmark）
+    python scripts/benchmark_suite.py --output reports/benchmark/latest.json
+
+    # 1000个symbol的扫描基准
+    python scripts/benchmark_suite.py --symbols 1000 --benchmarks scan
+
+    # 与基线对比（吞吐下降>10%视为回归）
+    python scripts/benchmark_suite.py --baseline reports/benchmark/baseline.json --tolerance 0.10
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+import argparse
+import copy
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ats_core.cfg import CFG
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_arguments():
+    """
+    解析命令行参数
+
+    Returns:
+        argparse.Namespace: 解析后的参数
+    """
+    parser = argparse.ArgumentParser(
+        description="CryptoSignal Benchmark Suite v1.0",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--symbols", type=int, default=None, help="Universe size (default: from config)")
+    parser.add_argument("--seed", type=int, default=None, help="Universe seed (default: from config)")
+    parser.add_argument("--benchmarks", default=None,
+                        help="Comma-separated benchmarks: analyze,scan,backtest,cache_warmup,db_writes (default: all)")
+    parser.add_argument("--output", default=None, help="Output JSON path")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON for regression comparison")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="Allowed throughput drop vs baseline (default: from config, 0.10)")
+    parser.add_argument("--quiet", action="store_true", help="Suppress analysis logs (stdout)")
+    return parser.parse_args()
+
+
+def main():
+    from ats_core.benchmark import BenchmarkSuite, compare_reports
+
+    args = parse_arguments()
+
+    config = copy.deepcopy(CFG.params.get("benchmark", {}))
+    universe = config.setdefault("universe", {})
+    if args.symbols is not None:
+        universe["n_symbols"] = args.symbols
+    if args.seed is not None:
+        universe["seed"] = args.seed
+    tolerance = args.tolerance if args.tolerance is not None else config.get("regression_tolerance", 0.10)
+    benchmarks = [b.strip() for b in args.benchmarks.split(",") if b.strip()] if args.benchmarks else None
+
+    suite = BenchmarkSuite(config)
+    if args.quiet:
+        # 分析流程通过ats_core.logging.log打印到stdout，基准测试期间屏蔽
+        import contextlib
+        import io
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = suite.run(benchmarks)
+    else:
+        report = suite.run(benchmarks)
+
+    print("\n" + "=" * 70)
+    print(f"Benchmark results (universe={report.universe['n_symbols']} symbols, "
+          f"commit={report.environment.get('git_commit')})")
+    print("=" * 70)
+    for name, result in report.results.items():
+        p95 = result.latency_ms.get("p95")
+        latency = f"  p95={p95:.2f}ms" if p95 is not None else ""
+        print(f"  {name:<14} {result.throughput:>12.2f} {result.unit:<10} "
+              f"({result.n_items} items, {result.total_seconds:.2f}s){latency}")
+    for name, message in report.errors.items():
+        print(f"  {name:<14} FAILED: {message}")
+
+    if args.output:
+        report.save(args.output)
+        logger.info(f"Results saved: {args.output}")
+
+    exit_code = 1 if report.errors else 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparisons = compare_reports(baseline, report.to_dict(), tolerance=tolerance)
+        print("\n" + "-" * 70)
+        print(f"Comparison vs {args.baseline} (tolerance {tolerance:.0%})")
+        print("-" * 70)
+        for item in comparisons:
+            flag = "REGRESSION" if item["regression"] else "ok"
+            print(f"  {item['name']:<14} {item['baseline']:>12.2f} -> {item['current']:>12.2f} "
+                  f"{item['unit']:<10} {item['change']:+.1%}  {flag}")
+        if any(item["regression"] for item in comparisons):
+            exit_code = 1
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
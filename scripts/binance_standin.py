@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Binance Stand-in v1.0 - CLI Script
+币安替身服务 - 命令行脚本
+
+功能：
+- serve: 启动本地币安替身服务（合成行情或录制数据回放）
+- record: 从真实API录制K线/资金费率/OI到目录，供RecordedMarket离线回放
+
+Usage:
+    # 合成行情（配置读取config/params.json -> binance_standin）
+    python scripts/binance_standin.py serve --port 8765
+
+    # 故障注入：每请求50ms延迟，5%随机429
+    python scripts/binance_standin.py serve --latency-ms 50 --inject-429-rate 0.05
+
+    # 录制 → 回放（时钟从录制起点开始，60倍速）
+    python scripts/binance_standin.py record --symbols BTCUSDT,ETHUSDT --intervals 1h,4h \\
+        --start 2024-08-01 --end 2024-09-01 --output data/standin/aug
+    python scripts/binance_standin.py serve --data-dir data/standin/aug \\
+        --replay-start 2024-08-01 --replay-speed 60
+
+    # 客户端切换到替身服务
+    ATS_BINANCE_STANDIN=http://127.0.0.1:8765 python scripts/backtest_four_step.py ...
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ats_core.cfg import CFG
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_arguments():
+    """
+    解析命令行参数
+
+    Returns:
+        argparse.Namespace: 解析后的参数
+    """
+    parser = argparse.ArgumentParser(
+        description="CryptoSignal Binance Stand-in v1.0",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="Run the local stand-in server")
+    serve.add_argument("--host", default=None, help="Listen host (default: from config)")
+    serve.add_argument("--port", type=int, default=None, help="Listen port (default: from config)")
+    serve.add_argument("--seed", type=int, default=None, help="Synthetic market seed")
+    serve.add_argument("--symbols", default=None, help="Comma-separated symbols for market-wide endpoints")
+    serve.add_argument("--data-dir", default=None, help="Recorded data directory (default: synthetic)")
+    serve.add_argument("--latency-ms", type=float, default=None, help="Fixed latency per REST request")
+    serve.add_argument("--latency-jitter-ms", type=float, default=None, help="Uniform latency jitter")
+    serve.add_argument("--weight-limit", type=int, default=None, help="Request weight limit per minute")
+    serve.add_argument("--inject-429-rate", type=float, default=None, help="Fraction of requests answered with 429")
+    serve.add_argument("--replay-start", default=None, help="Replay clock start (YYYY-MM-DD)")
+    serve.add_argument("--replay-speed", type=float, default=None, help="Replay clock speed multiplier")
+
+    record = subparsers.add_parser("record", help="Record real market data for offline replay")
+    record.add_argument("--symbols", required=True, help="Comma-separated symbols")
+    record.add_argument("--intervals", default="1h", help="Comma-separated kline intervals (default: 1h)")
+    record.add_argument("--oi-period", default="1h", help="Open interest history period (default: 1h)")
+    record.add_argument("--start", required=True, help="Start date (YYYY-MM-DD)")
+    record.add_argument("--end", required=True, help="End date (YYYY-MM-DD)")
+    record.add_argument("--output", required=True, help="Output directory")
+
+    return parser.parse_args()
+
+
+def _date_ms(value: str) -> int:
+    return int(datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def serve(args) -> None:
+    """启动替身服务（阻塞直到Ctrl+C）"""
+    from ats_core.sources.standin import BinanceStandinServer
+
+    config = dict(CFG.params.get("binance_standin", {}))
+    overrides = {
+        "host": args.host,
+        "port": args.port,
+        "seed": args.seed,
+        "symbols": args.symbols.split(",") if args.symbols else None,
+        "data_dir": args.data_dir,
+        "latency_ms": args.latency_ms,
+        "latency_jitter_ms": args.latency_jitter_ms,
+        "weight_limit_1m": args.weight_limit,
+        "inject_429_rate": args.inject_429_rate,
+        "replay_start_ms": _date_ms(args.replay_start) if args.replay_start else None,
+        "replay_speed": args.replay_speed,
+    }
+    config.update({k: v for k, v in overrides.items() if v is not None})
+
+    async def _run():
+        server = BinanceStandinServer(config)
+        base_url = await server.start()
+        logger.info(f"export ATS_BINANCE_STANDIN={base_url}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+            logger.info(f"Stand-in stats: {server.stats}")
+
+    try:
+        asyncio.run(_run())
+    except KeyboardInterrupt:
+        pass
+
+
+def record(args) -> None:
+    """录制K线/资金费率/OI（分页拉取，目录结构与RecordedMarket一致）"""
+    from ats_core.sources import binance
+    from ats_core.sources.standin.market import interval_to_ms
+
+    output = Path(args.output)
+    for sub in ("klines", "funding", "oi"):
+        (output / sub).mkdir(parents=True, exist_ok=True)
+    start_ms, end_ms = _date_ms(args.start), _date_ms(args.end)
+
+    for symbol in [s.strip().upper() for s in args.symbols.split(",") if s.strip()]:
+        for interval in args.intervals.split(","):
+            rows, cursor = [], start_ms
+            while cursor < end_ms:
+                batch = binance.get_klines(symbol, interval, limit=1500, start_time=cursor, end_time=end_ms - 1)
+                if not batch:
+                    break
+                rows.extend(batch)
+                cursor = int(batch[-1][0]) + interval_to_ms(interval)
+            (output / "klines" / f"{symbol}_{interval}.json").write_text(json.dumps(rows))
+            logger.info(f"{symbol} {interval}: {len(rows)} klines")
+
+        funding, cursor = [], start_ms
+        while cursor < end_ms:
+            batch = binance.get_funding_hist(symbol, limit=1000, start_time=cursor, end_time=end_ms - 1)
+            if not batch:
+                break
+            funding.extend(batch)
+            cursor = int(batch[-1]["fundingTime"]) + 1
+        (output / "funding" / f"{symbol}.json").write_text(json.dumps(funding))
+
+        # Binance仅保留最近30天OI历史
+        oi = binance.get_open_interest_hist(symbol, period=args.oi_period, limit=500, end_time=end_ms - 1)
+        (output / "oi" / f"{symbol}_{args.oi_period}.json").write_text(json.dumps(oi))
+        logger.info(f"{symbol}: {len(funding)} funding, {len(oi)} oi")
+
+
+def main():
+    args = parse_arguments()
+    if args.command == "serve":
+        serve(args)
+    else:
+        record(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,7 @@ import signal
 import json
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
 
 # UTC时区（统一使用UTC，与Binance API保持一致）
 TZ_UTC = timezone.utc
@@ -63,6 +64,7 @@ from ats_core.analysis.report_writer import get_report_writer
 try:
     from ats_core.data.trade_recorder import get_recorder
     from ats_core.data.analysis_db import get_analysis_db
+    from ats_core.data.write_behind import get_write_behind_queue
     DATA_RECORDING_AVAILABLE = True
 except ImportError as e:
     warn(f"数据采集模块不可用: {e}")
@@ -184,7 +186,13 @@ class RealtimeSignalScanner:
             try:
                 self.recorder = get_recorder()
                 self.analysis_db = get_analysis_db()
-                log(f"✅ 数据采集已启用（TradeRecorder + AnalysisDB）")
+                self.analysis_db.start_retention()  # v7.4.3: 后台按月归档/清理（分块短事务，不阻塞写入）
+
+                # v7.4.3: 写后队列（扫描循环只入队，写线程批量落库）
+                self.persistence = get_write_behind_queue()
+                self.persistence.register("signal_snapshot", self._record_snapshot)
+                self.persistence.register("scan_signals", self._write_scan_signals, batched=True)
+                log(f"✅ 数据采集已启用（TradeRecorder + AnalysisDB，写后队列）")
 
                 # 显示当前统计
                 stats = self.recorder.get_statistics()
@@ -245,13 +253,12 @@ class RealtimeSignalScanner:
         # 优点：架构清晰，避免重复计算，scan_summary.md统计正确
 
         # 记录到数据库（v7.2增强已在batch_scan中完成）
+        # v7.4.3: 只入队，由写后队列在后台写入（AnalysisDB按批次单事务写入）
+        # submit_async：队列满（block背压）时在线程池等待，不阻塞WebSocket处理
         if self.record_data:
             for result in results:
-                try:
-                    self.recorder.record_signal_snapshot(result)
-                    self.analysis_db.write_complete_signal(result)
-                except Exception as e:
-                    error(f"数据记录失败 {result.get('symbol')}: {e}")
+                await self.persistence.submit_async("signal_snapshot", result)
+            await self.persistence.submit_async("scan_signals", results)
 
         # 过滤Prime信号（七道闸门 + AntiJitter）
         # results已包含v7.2增强数据（含v72_enhancements字段）
@@ -393,6 +400,21 @@ class RealtimeSignalScanner:
 
         log(f"\n✅ v7.2信号发送完成（Top 1策略）\n")
 
+    def _record_snapshot(self, result: Dict[str, Any]):
+        """写后队列处理：记录信号快照"""
+        try:
+            self.recorder.record_signal_snapshot(result)
+        except Exception as e:
+            error(f"数据记录失败 {result.get('symbol')}: {e}")
+
+    def _write_scan_signals(self, batches: List[List[Dict[str, Any]]]):
+        """写后队列处理：积压的多轮扫描结果一个事务写入AnalysisDB"""
+        results = [result for batch in batches for result in batch]
+        try:
+            self.analysis_db.write_scan_batch(results)
+        except Exception as e:
+            error(f"AnalysisDB批量写入失败: {e}")
+
     async def run_periodic(self, interval_seconds: int = 300):
         """
         定期扫描
@@ -440,6 +462,8 @@ class RealtimeSignalScanner:
                 log("⏳ 等待60秒后重试...\n")
                 await asyncio.sleep(60)
 
+        if self.record_data:
+            await asyncio.get_running_loop().run_in_executor(None, self.persistence.flush)
         log("✅ 扫描器已停止")
 
     def show_statistics(self):
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Tick Replay - CLI Script
+列式归档回放 - 命令行脚本
+
+功能：
+- 把V8存储（JSONL）的某几天导入列式归档（--import-from）
+- 按N倍速（或全速）把归档的成交/订单簿回放进V8实时管道，输出回放统计（JSON）
+
+Usage:
+    # 导入 data/v8_storage 的某天并全速回放（吞吐基准）
+    python scripts/replay_ticks.py --import-from data/v8_storage --days 2025-11-22 --symbols BTCUSDT
+
+    # 10倍速回放指定时间段
+    python scripts/replay_ticks.py --symbols BTCUSDT ETHUSDT --start 1763769600 --end 1763773200 --speed 10
+
+Standard: SYSTEM_ENHANCEMENT_STANDARD.md v3.3.0
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from cs_ext.storage.tick_archive import (
+    ReplayDriver,
+    TickArchiveReader,
+    TickArchiveWriter,
+    import_jsonl_day,
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_arguments():
+    """
+    解析命令行参数
+
+    Returns:
+        argparse.Namespace: 解析后的参数
+    """
+    parser = argparse.ArgumentParser(
+        description="CryptoSignal Tick Replay",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--archive", default="data/tick_archive", help="Columnar archive directory")
+    parser.add_argument("--import-from", default=None, help="JSONL storage directory to import first")
+    parser.add_argument("--days", nargs="*", default=None, help="Days (YYYY-MM-DD) to import/replay")
+    parser.add_argument("--symbols", nargs="+", required=True, help="Symbols to replay")
+    parser.add_argument("--start", type=float, default=None, help="Start timestamp (seconds)")
+    parser.add_argument("--end", type=float, default=None, help="End timestamp (seconds, exclusive)")
+    parser.add_argument("--speed", type=float, default=0.0, help="Replay speed multiplier (0 = as fast as possible)")
+    parser.add_argument("--no-book", action="store_true", help="Replay trades only")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Replay into V8RealtimePipeline (signals, storage disabled) instead of the factor calculator")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    symbols = [s.upper() for s in args.symbols]
+
+    if args.import_from:
+        writer = TickArchiveWriter(args.archive)
+        for day in args.days or sorted(p.name for p in Path(args.import_from).iterdir() if p.is_dir()):
+            counts = import_jsonl_day(args.import_from, day, writer)
+            logger.info(f"导入 {day}: {counts}")
+        writer.close()
+
+    reader = TickArchiveReader(args.archive)
+    start, end = args.start, args.end
+    if args.days and start is None and end is None:
+        from datetime import datetime, timedelta
+        start = datetime.fromisoformat(min(args.days)).timestamp()
+        end = (datetime.fromisoformat(max(args.days)) + timedelta(days=1)).timestamp()
+
+    if args.pipeline:
+        from ats_core.pipeline.v8_realtime_pipeline import V8RealtimePipeline
+        target = V8RealtimePipeline(symbols, {"storage_layer": {"enabled": False}})
+    else:
+        from ats_core.realtime.factor_calculator import RealtimeFactorCalculator
+        target = RealtimeFactorCalculator(symbols)
+
+    driver = ReplayDriver(reader, target, speed=args.speed)
+    try:
+        stats = driver.run(symbols, start, end, include_book=not args.no_book)
+    except KeyboardInterrupt:
+        driver.stop()
+        return 1
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
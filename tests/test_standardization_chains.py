@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+StandardizationChain隔离测试（回测检查点 isolated_chain_states）
+
+验证:
+1. STANDARDIZATION_CHAINS中的每条链在isolated_chain_states内都能正常标准化
+   （链被置为None后由_get_<attr>()延迟初始化，不能依赖导入时创建的实例）
+2. 退出后调用方的链实例恢复
+3. score_accel在空链状态下可直接评分
+
+Usage:
+    python3 -m pytest tests/test_standardization_chains.py
+"""
+
+import importlib
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ats_core.backtest.checkpoint import STANDARDIZATION_CHAINS, isolated_chain_states
+from ats_core.scoring.scoring_utils import StandardizationChain
+
+
+def test_every_chain_scores_inside_isolated_states():
+    """每条链在独立状态下从空链开始，并能完成标准化"""
+    modules = {module_name: importlib.import_module(module_name) for module_name, _ in STANDARDIZATION_CHAINS}
+    outer = {
+        (module_name, attr): getattr(modules[module_name], attr)
+        for module_name, attr in STANDARDIZATION_CHAINS
+    }
+
+    with isolated_chain_states():
+        for module_name, attr in STANDARDIZATION_CHAINS:
+            module = modules[module_name]
+            assert getattr(module, attr) is None, f"{module_name}.{attr} 未置为空链"
+
+            getter = getattr(module, f"_get{attr}", None)
+            assert getter is not None, f"{module_name} 缺少延迟初始化函数 _get{attr}()"
+            for raw in (10.0, -5.0, 30.0):
+                score, _ = getter().standardize(raw)
+                assert isinstance(score, float)
+            assert isinstance(getattr(module, attr), StandardizationChain)
+
+    for (module_name, attr), chain in outer.items():
+        assert getattr(modules[module_name], attr) is chain, f"{module_name}.{attr} 未恢复"
+
+
+def test_score_accel_inside_isolated_states():
+    """score_accel使用延迟初始化的链（空链状态下不抛AttributeError）"""
+    from ats_core.features.accel import score_accel
+
+    closes = [100.0 + 0.5 * i for i in range(60)]
+    cvd_series = [float(i) for i in range(60)]
+    with isolated_chain_states():
+        score, meta = score_accel(closes, cvd_series)
+    assert 0 <= score <= 100
+    assert "cvd6" in meta
+
+
+if __name__ == "__main__":
+    test_every_chain_scores_inside_isolated_states()
+    test_score_accel_inside_isolated_states()
+    print("✅ StandardizationChain隔离测试通过")